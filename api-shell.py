@@ -1,9 +1,31 @@
 #!/usr/bin/env python
+"""
+medgen-python interactive shell.
+
+    ./api-shell.py
+    ./api-shell.py --warm panel.txt                   # genes and CUIs to resolve before the prompt
+    ./api-shell.py --genes BRCA1,BRCA2 --cuis C0006142
+"""
+import argparse
 
 from medgen.api import *
+from medgen import magics
 
 _EOL = '\r\n'
 
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--warm', metavar='FILE', help='file of gene symbols / ids and CUIs to warm the caches with')
+parser.add_argument('--genes', default='', help='comma separated genes to warm the caches with')
+parser.add_argument('--cuis', default='', help='comma separated CUIs to warm the caches with')
+args = parser.parse_args()
+
+genes = [gene for gene in args.genes.split(',') if gene]
+cuis = [cui for cui in args.cuis.split(',') if cui]
+if args.warm:
+    warm_genes, warm_cuis = magics.read_warm_file(args.warm)
+    genes += warm_genes
+    cuis += warm_cuis
+
 print(_EOL)
 print(_EOL)
 print(_EOL)
@@ -15,10 +37,17 @@ print('        type whos for api function list')
 
 print('              In [1]: whos ')
 print()
+print('        %medgen_queries <expr>   SQL issued by an API call')
+print('        %medgen_profile <expr>   timings, spans, cache hits, memory')
 print('#################################################################')
 
+if genes or cuis:
+    print('warmed %d genes, %d concepts' % magics.warm(genes, cuis))
+
 hgvs_text  = 'NM_001232.3:c.919G>C'
 hgvs_text2 = 'NM_198578.3:c.6055G>A'
 
-import IPython
-IPython.embed()
+from IPython.terminal.embed import InteractiveShellEmbed
+shell = InteractiveShellEmbed()
+magics.load_ipython_extension(shell)
+shell()
@@ -0,0 +1,207 @@
+""" asyncio versions of the annotate API (see medgen.db.aio).
+
+Each function is a coroutine with the same name and result as its medgen.api counterpart, so
+one request can gather lookups across the gene, clinvar, medgen and hugo schemas concurrently:
+
+    gene, conditions, significance = await asyncio.gather(
+        GeneInfo('BRCA2'), Gene2ConditionSource('BRCA2'), Gene2ClinicalSignificance('BRCA2'))
+"""
+import asyncio
+from collections import OrderedDict
+
+from ..db.aio import AsyncSQLData, AsyncGeneDB, AsyncClinVarDB, AsyncMedGenDB, AsyncHugoDB
+from ..db.registry import get_db, instances
+from ..log import log
+from .gene import _parse_locus_databases, _parse_gene_synonyms
+from .variant import _citations_to_pubmeds
+from .concept import _medgen_url
+
+##########################################################################################
+#
+#       Functions
+#
+##########################################################################################
+
+async def _gene_id(gene):
+    return await get_db(AsyncGeneDB).get_gene_id(gene)
+
+async def _gene_symbol(gene):
+    try:
+        int(gene)
+    except ValueError:
+        return gene
+    return await get_db(AsyncGeneDB).get_gene_name(gene)
+
+async def _gene2condition(gene):
+    return await get_db(AsyncClinVarDB).gene2condition(await _gene_id(gene))
+
+async def _gene2clinical_significance(gene):
+    return await get_db(AsyncClinVarDB).gene_to_clinical_significance_type_frequency(await _gene_id(gene))
+
+async def _gene_summary(gene):
+    return await get_db(AsyncClinVarDB).gene_summary(await _gene_id(gene))
+
+async def _gene_locus_databases(gene):
+    try:
+        symbol = await _gene_symbol(gene)
+        return _parse_locus_databases(gene, await get_db(AsyncHugoDB).get_locus_specific_databases(symbol))
+    except Exception as err:
+        msg = 'Failed to fetch LocusSpecificDatabases for gene_symbol'
+        log.error(msg)
+        raise err
+
+async def _gene_synonyms(gene):
+    if gene is None:
+        return None
+    return _parse_gene_synonyms(gene, await get_db(AsyncGeneDB).get_gene_synonyms(gene))
+
+async def _define_medgen_concept(cui):
+    try:
+        concept_def = await get_db(AsyncMedGenDB).concept_definition(cui)
+        concept_def['url'] = _medgen_url(cui)
+        return concept_def
+    except Exception:
+        return None
+
+async def _disease_name(concept):
+    cui = await get_db(AsyncMedGenDB).get_concept_id(concept)
+    return await get_db(AsyncClinVarDB).disease_name(cui)
+
+async def _clinvar_variant2pubmed(hgvs_text):
+    citations = await get_db(AsyncClinVarDB).var_citations(hgvs_text)
+    if not citations:
+        return set()
+    # PMCID -> PMID conversion is a blocking eutils call.
+    return await asyncio.get_running_loop().run_in_executor(None, _citations_to_pubmeds, citations)
+
+def _clinvar_ids(id_column):
+    async def clinvar_ids(hgvs_text):
+        try:
+            return await get_db(AsyncClinVarDB).clinvar_ids(str(hgvs_text), id_column)
+        except Exception as err:
+            log.debug('no clinvar %s for variant hgvs_text %s ' % (id_column, hgvs_text))
+    return clinvar_ids
+
+def _db_coroutine(db_class, method_name):
+    async def api_function(*args, **kwargs):
+        return await getattr(get_db(db_class), method_name)(*args, **kwargs)
+    api_function.__name__ = method_name
+    return api_function
+
+async def annotate_gene(gene):
+    """
+    Gene, conditions, clinical significance, LSDBs and literature for one gene,
+    fetched concurrently.
+
+    :param gene: Entrez gene id or HGNC gene name
+    :return: OrderedDict, or None for a gene not in gene_info
+    """
+    stages = OrderedDict([
+        ('GeneInfo',                  GeneInfo(gene)),
+        ('Gene2ConditionSource',      Gene2ConditionSource(gene)),
+        ('Gene2ClinicalSignificance', Gene2ClinicalSignificance(gene)),
+        ('Gene2LocusDB',              Gene2LocusDB(gene)),
+        ('Gene2PubMed',               Gene2PubMed(gene)),
+    ])
+    results = await asyncio.gather(*stages.values(), return_exceptions=True)
+    if results[0] is None:
+        # unknown gene: the other stages have nothing to say (or failed for want of a symbol)
+        return None
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return OrderedDict(zip(stages.keys(), results))
+
+async def annotate_concept(cui):
+    """
+    Name, definition, disease names, subtypes and parents for one concept, fetched concurrently.
+
+    :param cui: MedGen concept (CUI or UID)
+    :return: OrderedDict
+    """
+    stages = OrderedDict([
+        ('ConceptName',     ConceptName(cui)),
+        ('Define',          ConceptDefinition(cui)),
+        ('DiseaseName',     DiseaseName(cui)),
+        ('DiseaseSubtypes', DiseaseSubtypes(cui)),
+        ('DiseaseParents',  DiseaseParents(cui)),
+    ])
+    results = await asyncio.gather(*stages.values())
+    return OrderedDict(zip(stages.keys(), results))
+
+async def annotate_disease(cui):
+    """
+    Disease names, subtypes and parents for one concept, fetched concurrently.
+
+    :param cui: MedGen concept (CUI or UID)
+    :return: OrderedDict
+    """
+    stages = OrderedDict([
+        ('DiseaseName',     DiseaseName(cui)),
+        ('DiseaseSubtypes', DiseaseSubtypes(cui)),
+        ('DiseaseParents',  DiseaseParents(cui)),
+    ])
+    results = await asyncio.gather(*stages.values())
+    return OrderedDict(zip(stages.keys(), results))
+
+async def annotate_variant(hgvs_text):
+    """
+    ClinVar identifiers and literature for one variant, fetched concurrently.
+
+    :param hgvs_text: c.DNA
+    :return: OrderedDict
+    """
+    stages = OrderedDict([
+        ('VariationID',  ClinvarVariationID(hgvs_text)),
+        ('AlleleID',     ClinvarAlleleID(hgvs_text)),
+        ('RCVaccession', ClinvarAccession(hgvs_text)),
+        ('PubMeds',      ClinvarPubmeds(hgvs_text)),
+    ])
+    results = await asyncio.gather(*stages.values())
+    return OrderedDict(zip(stages.keys(), results))
+
+async def close():
+    """
+    Close the connection pools of the shared async databases.
+    """
+    for db in instances():
+        if isinstance(db, AsyncSQLData):
+            await db.close()
+
+##########################################################################################
+#
+#       API
+#
+##########################################################################################
+
+GeneID            = _gene_id
+GeneName          = _db_coroutine(AsyncGeneDB, 'get_gene_name')
+GeneInfo          = _db_coroutine(AsyncGeneDB, 'get_gene_info')
+GeneSynonyms      = _gene_synonyms
+
+Gene2PubMed       = _db_coroutine(AsyncGeneDB, 'gene2pubmed')
+Gene2Function     = _db_coroutine(AsyncGeneDB, 'gene_function')
+Gene2MIM          = _db_coroutine(AsyncGeneDB, 'gene2mim')
+Gene2LocusDB      = _gene_locus_databases
+
+Gene2ConditionSource      = _gene2condition
+Gene2ClinicalSignificance = _gene2clinical_significance
+GeneSummary               = _gene_summary
+
+ConceptName       = _db_coroutine(AsyncMedGenDB, 'concept_name')
+ConceptDefinition = _define_medgen_concept
+ConceptRelations  = _db_coroutine(AsyncMedGenDB, 'concept_relations')
+ConceptSources    = _db_coroutine(AsyncMedGenDB, 'concept_sources')
+
+DiseaseName       = _disease_name
+DiseaseSubtypes   = _db_coroutine(AsyncMedGenDB, 'disease_subtypes')
+DiseaseParents    = _db_coroutine(AsyncMedGenDB, 'disease_parents')
+
+ClinvarAccession   = _clinvar_ids('RCVaccession')
+ClinvarAlleleID    = _clinvar_ids('AlleleID')
+ClinvarVariationID = _clinvar_ids('VariationID')
+ClinvarPubmeds     = _clinvar_variant2pubmed
+
+# ALIAS
+Define = ConceptDefinition
+Relate = ConceptRelations
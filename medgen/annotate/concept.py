@@ -1,5 +1,7 @@
 ##########################################################################################
 from ..db.medgen import MedGenDB
+from ..db.registry import get_db, db_method
+from ..trace import traced
 
 ##########################################################################################
 #
@@ -28,7 +30,7 @@ def _define_medgen_concept(cui):
     :return: Definition string
     """
     try:
-        concept_def = MedGenDB().concept_definition(cui)
+        concept_def = get_db(MedGenDB).concept_definition(cui)
         concept_def['url'] = _medgen_url(cui)
 
         return concept_def
@@ -41,11 +43,11 @@ def _define_medgen_concept(cui):
 #
 ##########################################################################################
 
-ConceptName = MedGenDB().concept_name
-ConceptDefinition  = _define_medgen_concept
-ConceptRelations   = MedGenDB().concept_relations
-ConceptSources     = MedGenDB().concept_sources
-ConceptURL         = _medgen_url
+ConceptName = traced('ConceptName', db_method(MedGenDB, 'concept_name'))
+ConceptDefinition  = traced('ConceptDefinition', _define_medgen_concept)
+ConceptRelations   = traced('ConceptRelations', db_method(MedGenDB, 'concept_relations'))
+ConceptSources     = traced('ConceptSources', db_method(MedGenDB, 'concept_sources'))
+ConceptURL         = traced('ConceptURL', _medgen_url)
 
 # ALIAS
 Define  = ConceptDefinition
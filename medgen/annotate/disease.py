@@ -2,6 +2,8 @@
 from ..db.medgen     import MedGenDB
 from ..db.clinvar    import ClinVarDB
 from ..parse.concept import Concept
+from ..db.registry   import db_method
+from ..trace          import traced
 
 
 ##########################################################################################
@@ -10,6 +12,6 @@ from ..parse.concept import Concept
 #
 ##########################################################################################
 
-DiseaseName     = ClinVarDB().disease_name
-DiseaseSubtypes = MedGenDB().disease_subtypes
-DiseaseParents  = MedGenDB().disease_parents
+DiseaseName     = traced('DiseaseName', db_method(ClinVarDB, 'disease_name'))
+DiseaseSubtypes = traced('DiseaseSubtypes', db_method(MedGenDB, 'disease_subtypes'))
+DiseaseParents  = traced('DiseaseParents', db_method(MedGenDB, 'disease_parents'))
@@ -5,6 +5,8 @@ from ..log        import log
 from ..db.gene    import GeneDB
 from ..db.hugo    import HugoDB
 from ..db.clinvar import ClinVarDB
+from ..db.registry import get_db, db_method
+from ..trace import traced
 
 ##########################################################################################
 #
@@ -12,40 +14,67 @@ from ..db.clinvar import ClinVarDB
 #
 ##########################################################################################
 
-def _gene_locus_databases(gene):
+def _parse_locus_databases(gene, row):
     """
-    Get Locus Specific Databases for Gene
     :param gene: hugo gene name
-    :return: array of LSDBs from Hugo Gene, the official source of gene names.
+    :param row: result of HugoDB.get_locus_specific_databases
+    :return: dict {Gene, LocusSpecificDatabases, pubmeds}
     """
-    try:
-        row = HugoDB().get_locus_specific_databases(gene)
+    parsed = OrderedDict()
+    parsed['Gene'] = str(gene)
 
-        parsed = OrderedDict()
-        parsed['Gene'] = str(gene)
+    dbs  = OrderedDict()
+    text = row['LocusSpecificDatabases']
 
-        dbs  = OrderedDict()
-        text = row['LocusSpecificDatabases']
+    if text is not None and len(text) > 1:
+        for csv in text.split(','):
+            (name, url) = csv.split('|')
+            dbs[name] = url
 
-        if text is not None and len(text) > 1:
-            for csv in text.split(','):
-                (name, url) = csv.split('|')
-                dbs[name] = url
+    parsed['LocusSpecificDatabases'] = dbs
 
-        parsed['LocusSpecificDatabases'] = dbs
+    pubmds = []
+    text = row['pubmeds']
 
-        pubmds = []
-        text = row['pubmeds']
+    if text is not None and len(text) > 0:
+        for pmid in text.split(','):
+            pmid = pmid.strip(' ')
+            pubmds.append(str(pmid)) # @TODO: MetaPub?
+            #pubmds.append(PubMed(pmid)) # @TODO: MetaPub?
 
-        if text is not None and len(text) > 0:
-            for pmid in text.split(','):
-                pmid = pmid.strip(' ')
-                pubmds.append(str(pmid)) # @TODO: MetaPub?
-                #pubmds.append(PubMed(pmid)) # @TODO: MetaPub?
+        parsed['pubmeds'] = pubmds
 
-            parsed['pubmeds'] = pubmds
+    return parsed
 
-        return parsed
+def _parse_gene_synonyms(gene, aliases):
+    """
+    :param gene: string hugo gene name (hgnc)
+    :param aliases: result of GeneDB.get_gene_synonyms
+    :return: sorted list of gene symbols and names, including unofficial ones.
+    """
+    synonyms = set()
+
+    if (aliases is None) or (len(aliases) < 1):
+        raise Exception('could not retrieve gene SYNONYMS for '+gene)
+
+    for row in aliases:
+        synonyms.add(row.get('Symbol'))
+
+        for gene_alias in row.get('Synonyms').split('|'):
+            if gene_alias.strip():
+                synonyms.add(gene_alias)
+
+    return sorted(synonyms)
+
+def _gene_locus_databases(gene):
+    """
+    Get Locus Specific Databases for Gene
+    :param gene: hugo gene name
+    :return: array of LSDBs from Hugo Gene, the official source of gene names.
+    """
+    try:
+        row = get_db(HugoDB).get_locus_specific_databases(gene)
+        return _parse_locus_databases(gene, row)
     except Exception as err:
         msg = 'Failed to fetch LocusSpecificDatabases for gene_symbol'
         log.error(msg)
@@ -57,25 +86,11 @@ def _gene_synonyms(gene):
     :param gene: string hugo gene name (hgnc)
     :return: set of gene symbols and names, including unofficial ones.
     """
-    synonyms = set()
-
     if gene is None:
        log.warn('Could not get HGNC GeneName synonyms' )
        return None
     else:
-       aliases = GeneDB().get_gene_synonyms(gene)
-
-       if (aliases is None) or (len(aliases) < 1):
-           raise Exception('could not retrieve gene SYNONYMS for '+gene)
-       else:
-           for row in aliases:
-               synonyms.add(row.get('Symbol'))
-
-               for gene_alias in row.get('Synonyms').split('|'):
-                   if gene_alias.strip():
-                       synonyms.add(gene_alias)
-
-    return sorted(synonyms)
+       return _parse_gene_synonyms(gene, get_db(GeneDB).get_gene_synonyms(gene))
 
 def _gene_preferred(gene):
     """
@@ -89,7 +104,7 @@ def _gene_preferred(gene):
     if gene is None:
        return None
     else:
-       aliases = GeneDB().get_gene_synonyms(gene)
+       aliases = get_db(GeneDB).get_gene_synonyms(gene)
 
        if (aliases is None) or (len(aliases) < 1):
            raise Exception('could not retrieve PREFERRED gene name for '+gene)
@@ -105,18 +120,19 @@ def _gene_preferred(gene):
 #
 ##########################################################################################
 
-Gene2PubMed      = GeneDB().gene2pubmed
-Gene2Function    = GeneDB().gene_function
-Gene2LocusDB     = _gene_locus_databases
+Gene2PubMed      = traced('Gene2PubMed', db_method(GeneDB, 'gene2pubmed'))
+Gene2Function    = traced('Gene2Function', db_method(GeneDB, 'gene_function'))
+Gene2LocusDB     = traced('Gene2LocusDB', _gene_locus_databases)
 
-Gene2MIM                  = GeneDB().gene2mim
-Gene2ConditionSource      = ClinVarDB().gene2condition
-Gene2ClinicalSignificance = ClinVarDB().gene_to_clinical_significance_type_frequency
+Gene2MIM                  = traced('Gene2MIM', db_method(GeneDB, 'gene2mim'))
+Gene2ConditionSource      = traced('Gene2ConditionSource', db_method(ClinVarDB, 'gene2condition'))
+Gene2ClinicalSignificance = traced('Gene2ClinicalSignificance',
+                                   db_method(ClinVarDB, 'gene_to_clinical_significance_type_frequency'))
 
-GeneInfo          = GeneDB().get_gene_info
-GeneID            = GeneDB().get_gene_id
-GeneName          = GeneDB().get_gene_name
-GeneSynonyms      = _gene_synonyms
-GeneNamePreferred = _gene_preferred
+GeneInfo          = traced('GeneInfo', db_method(GeneDB, 'get_gene_info'))
+GeneID            = traced('GeneID', db_method(GeneDB, 'get_gene_id'))
+GeneName          = traced('GeneName', db_method(GeneDB, 'get_gene_name'))
+GeneSynonyms      = traced('GeneSynonyms', _gene_synonyms)
+GeneNamePreferred = traced('GeneNamePreferred', _gene_preferred)
 
 
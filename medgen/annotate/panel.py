@@ -0,0 +1,193 @@
+""" Gene panel annotation: the per-gene API calls run in parallel, one merged record per gene. """
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from ..log import log
+from .. import trace
+from ..db.gene    import GeneDB
+from ..db.hugo    import HugoDB
+from ..db.clinvar import ClinVarDB
+from ..db.registry import get_db
+from ..parse.gene import Gene
+from .gene import Gene2PubMed, Gene2Function, Gene2LocusDB, Gene2MIM, Gene2ConditionSource, \
+                  Gene2ClinicalSignificance, GeneInfo, GeneSynonyms
+
+DEFAULT_MAX_WORKERS  = 16
+DEFAULT_MAX_PER_HOST = 8   # concurrent queries against any one DB host
+
+_END = object()   # end of the genes iterator (None is a gene like any other)
+
+def _synonyms(gene):
+    return GeneSynonyms(Gene(gene).name)
+
+# stage name -> (function of gene, SQLData class it queries)
+STAGES = OrderedDict([
+    ('GeneInfo',                  (GeneInfo,                  GeneDB)),
+    ('GeneSynonyms',              (_synonyms,                 GeneDB)),
+    ('Gene2MIM',                  (Gene2MIM,                  GeneDB)),
+    ('Gene2ConditionSource',      (Gene2ConditionSource,      ClinVarDB)),
+    ('Gene2ClinicalSignificance', (Gene2ClinicalSignificance, ClinVarDB)),
+    ('Gene2LocusDB',              (Gene2LocusDB,              HugoDB)),
+    ('Gene2Function',             (Gene2Function,             GeneDB)),
+    ('Gene2PubMed',               (Gene2PubMed,               GeneDB)),
+])
+
+##########################################################################################
+#
+#       Timing
+#
+##########################################################################################
+
+class StageTimings(object):
+    """
+    Per-stage call count, errors, total and max seconds, collected across a whole panel.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = OrderedDict()
+
+    def add(self, stage, seconds, failed=False):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {'calls': 0, 'errors': 0, 'total': 0.0, 'max': 0.0})
+            entry['calls'] += 1
+            entry['errors'] += 1 if failed else 0
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+
+    def summary(self):
+        """
+        :return: OrderedDict {stage: {calls, errors, total, mean, max}} (seconds)
+        """
+        with self._lock:
+            report = OrderedDict()
+            for stage, entry in self.stages.items():
+                report[stage] = dict(entry, mean=entry['total'] / entry['calls'])
+            return report
+
+    def log_summary(self):
+        for stage, entry in self.summary().items():
+            log.info('%s: calls=%d errors=%d mean=%.4fs max=%.4fs total=%.2fs',
+                     stage, entry['calls'], entry['errors'], entry['mean'], entry['max'], entry['total'])
+
+##########################################################################################
+#
+#       Pipeline
+#
+##########################################################################################
+
+def _host(db_class):
+    if db_class is None:
+        return None
+    return get_db(db_class)._db_host
+
+_pools = {}       # max_workers -> (pid, ThreadPoolExecutor)
+_pools_lock = threading.Lock()
+
+def _pool(max_workers):
+    # Long-lived, so that every panel runs on the same threads and reuses their
+    # (thread-local) DB connections instead of opening new ones per call.
+    with _pools_lock:
+        pid, pool = _pools.get(max_workers, (None, None))
+        if pid != os.getpid():
+            # not inherited across fork: the parent's worker threads don't exist here
+            pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='medgen-panel')
+            _pools[max_workers] = (os.getpid(), pool)
+        return pool
+
+def _merged(parts, stages):
+    record = OrderedDict([('Gene', parts['Gene'])])
+    for name in stages:
+        record[name] = parts['results'][name]
+    record['errors'] = parts['errors']
+    record['timing'] = OrderedDict((name, parts['timing'][name]) for name in stages)
+    return record
+
+def annotate_panel(genes, stages=None, max_workers=DEFAULT_MAX_WORKERS, max_per_host=DEFAULT_MAX_PER_HOST,
+                   timings=None):
+    """
+    Annotate a gene panel. Every (gene, stage) pair is a task on a shared thread pool; at most
+    max_per_host tasks query the same DB host at once. A record is yielded as soon as all
+    stages of its gene are done, so records arrive in completion order, not panel order.
+
+    Record:
+        {'Gene': gene, <stage>: result, ..., 'errors': {stage: repr(error)}, 'timing': {stage: seconds}}
+
+    :param genes: iterable of Entrez gene ids and/or HGNC gene names (consumed lazily)
+    :param stages: OrderedDict {name: (function, SQLData class)}, default STAGES
+    :param max_workers: thread pool size (one pool per size, kept for later panels)
+    :param max_per_host: concurrent queries per DB host
+    :param timings: optional StageTimings to collect per-stage timing for the whole panel
+    :return: generator of OrderedDict records
+    """
+    stages = STAGES if stages is None else stages
+    max_genes_in_flight = max(1, 2 * max_workers // max(1, len(stages)))
+
+    host_slots = {}
+    for name, (function, db_class) in stages.items():
+        host = _host(db_class)
+        if host not in host_slots:
+            host_slots[host] = threading.BoundedSemaphore(max_per_host)
+    stage_slots = dict((name, host_slots[_host(db_class)]) for name, (function, db_class) in stages.items())
+
+    def run_stage(gene, name, function):
+        with stage_slots[name]:
+            start = time.perf_counter()
+            try:
+                return name, function(gene), None, time.perf_counter() - start
+            except Exception as err:
+                return name, None, err, time.perf_counter() - start
+
+    genes = iter(genes)
+    records = {}      # panel position -> record under construction
+    remaining = {}    # panel position -> stages not yet done
+    futures = {}      # future -> panel position
+    position = 0
+
+    pool = _pool(max_workers)
+    try:
+        while True:
+            while len(records) < max_genes_in_flight:
+                gene = next(genes, _END)
+                if gene is _END:
+                    break
+                records[position] = {'Gene': gene, 'results': {}, 'errors': OrderedDict(), 'timing': {}}
+                remaining[position] = len(stages)
+                for name, (function, db_class) in stages.items():
+                    futures[pool.submit(trace.bind(run_stage), gene, name, function)] = position
+                position += 1
+
+            if not futures:
+                break
+
+            done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures.pop(future)
+                name, result, error, seconds = future.result()
+                record = records[index]
+                record['results'][name] = result
+                record['timing'][name] = seconds
+                if error is not None:
+                    log.debug('panel stage %s failed for %s: %r', name, record['Gene'], error)
+                    record['errors'][name] = repr(error)
+                if timings is not None:
+                    timings.add(name, seconds, failed=error is not None)
+
+                remaining[index] -= 1
+                if remaining[index] == 0:
+                    del remaining[index]
+                    yield _merged(records.pop(index), stages)
+    finally:
+        # the pool outlives this panel: drop the tasks of an abandoned one
+        for future in futures:
+            future.cancel()
+
+##########################################################################################
+#
+#       API
+#
+##########################################################################################
+
+AnnotatePanel = annotate_panel
@@ -1,4 +1,6 @@
 from ..db.personalgenomes import PersonalGenomesDB
+from ..db.registry import get_db
+from ..trace import traced
 
 ##########################################################################################
 #
@@ -7,11 +9,11 @@ from ..db.personalgenomes import PersonalGenomesDB
 ##########################################################################################
 
 def _variant_to_bionotate(gene, amino_acid_position):
-    return PersonalGenomesDB().bionotate__gene_aa_pos(gene, amino_acid_position)
+    return get_db(PersonalGenomesDB).bionotate__gene_aa_pos(gene, amino_acid_position)
 
 ##########################################################################################
 #
 #       API
 #
 ##########################################################################################
-Bionotate = _variant_to_bionotate
+Bionotate = traced('Bionotate', _variant_to_bionotate)
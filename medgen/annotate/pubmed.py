@@ -1,6 +1,7 @@
-#### metapub
-from metapub import PubMedFetcher, PubMedArticle
-from medgen.db.medgen import MedGenDB
+#### metapub is imported on first use (it is slow to import).
+
+from .. import metrics
+from ..trace import traced
 
 ##########################################################################################
 #
@@ -15,7 +16,9 @@ def _pubmed_pmid_to_article(pmid):
     :param pmid: int or str
     :return: PubMedArticle
     """
-    return PubMedFetcher().article_by_pmid(str(pmid))
+    from metapub import PubMedFetcher
+    with metrics.eutils_request('article_by_pmid'):
+        return PubMedFetcher().article_by_pmid(str(pmid))
 
 def _pubmed_central_pmcid_to_article(pmcid):
     """
@@ -25,12 +28,14 @@ def _pubmed_central_pmcid_to_article(pmcid):
     :param pmcid:
     :return: PubMedArticle
     """
-    return PubMedFetcher().article_by_pmcid(str(pmcid))
+    from metapub import PubMedFetcher
+    with metrics.eutils_request('article_by_pmcid'):
+        return PubMedFetcher().article_by_pmcid(str(pmcid))
 
 ##########################################################################################
 #
 #       API
 #
 ##########################################################################################
-PMID2Article = _pubmed_pmid_to_article
-PMCID2Article = _pubmed_central_pmcid_to_article
+PMID2Article = traced('PMID2Article', _pubmed_pmid_to_article)
+PMCID2Article = traced('PMCID2Article', _pubmed_central_pmcid_to_article)
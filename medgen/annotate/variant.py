@@ -1,12 +1,13 @@
 """ Variant-level annotation functions requiring ClinvarDB and Metapub (NCBI/eutils). """
 
-import requests, json, urllib
-
-from metapub.text_mining import is_pmcid, is_ncbi_bookID 
-from metapub.pubmedcentral import get_pmid_for_otherid
+# metapub (NCBI/eutils) is imported on first use: it is slow to import, and most callers
+# only need the ClinvarDB lookups.
 
 from ..db.clinvar import ClinVarDB
+from ..db.registry import get_db
 from ..log import log
+from .. import metrics
+from ..trace import traced
 
 ##########################################################################################
 #
@@ -21,7 +22,7 @@ def _clinvar_variant_accession(hgvs_text):
     :return: RCVAccession "Reference ClinVar Accession"
     """
     try:
-        return ClinVarDB().accession_for_hgvs_text(str(hgvs_text))
+        return get_db(ClinVarDB).accession_for_hgvs_text(str(hgvs_text))
     except Exception as err:
         log.debug("no clinvar accession for variant hgvs_text %s " % hgvs_text)
 
@@ -32,7 +33,7 @@ def _clinvar_variant_allele_id(hgvs_text):
     :return: AlleleID
     """
     try:
-        return ClinVarDB().allele_id_for_hgvs_text(hgvs_text)
+        return get_db(ClinVarDB).allele_id_for_hgvs_text(hgvs_text)
     except Exception as err:
         log.debug('no clinvar AlleleID for variant hgvs_text %s ' % hgvs_text)
 
@@ -43,7 +44,7 @@ def _clinvar_variant_variation_id(hgvs_text):
     :return: VariationID
     """
     try:
-        return ClinVarDB().variation_id_for_hgvs_text(hgvs_text)
+        return get_db(ClinVarDB).variation_id_for_hgvs_text(hgvs_text)
     except Exception as err:
         log.debug('no clinvar VariationID for variant hgvs_text %s ' % hgvs_text)
 
@@ -59,8 +60,16 @@ def _clinvar_variant2pubmed(hgvs_text):
     :param hgvs_text: c.DNA
     :return: set(PMIDs and possibly also NBK ids)
     """
+    return _citations_to_pubmeds(get_db(ClinVarDB).var_citations(hgvs_text))
+
+def _citations_to_pubmeds(citations):
+    """
+    :param citations: result of ClinVarDB.var_citations
+    :return: set(PMIDs and possibly also NBK ids)
+    """
+    from metapub.text_mining import is_pmcid, is_ncbi_bookID
+
     pubmeds = []
-    citations = ClinVarDB().var_citations(hgvs_text)
     if citations:
         for cite in citations:
             some_id = cite['citation_id']
@@ -70,7 +79,7 @@ def _clinvar_variant2pubmed(hgvs_text):
                 pubmeds.append(some_id)
             elif is_pmcid(some_id):
                 try:
-                    pmid = get_pmid_for_otherid(some_id)
+                    pmid = _pmid_for_otherid(some_id)
                     if pmid is not None:
                         log.debug('found PubMedCentral PMCID %s, converted to PMID %s ', some_id, str(pmid))
                         pubmeds.append(pmid)
@@ -85,16 +94,23 @@ def _clinvar_variant2pubmed(hgvs_text):
     return set(pubmeds)
 
 
+def _pmid_for_otherid(article_id):
+    from metapub.pubmedcentral import get_pmid_for_otherid
+    with metrics.eutils_request('get_pmid_for_otherid'):
+        return get_pmid_for_otherid(article_id)
+
 def clinvar2pmid_with_accessions(hgvs_list):
+    from metapub.text_mining import is_ncbi_bookID
+
     ret = []
-    citations = ClinVarDB().var_citations(hgvs_list)
+    citations = get_db(ClinVarDB).var_citations(hgvs_list)
     if citations:
         for cite in citations:
             article_id = cite['citation_id']
             if is_ncbi_bookID(article_id):
                 pmid = article_id
             else:
-                pmid = article_id if cite['citation_source'] == 'PubMed' else get_pmid_for_otherid(article_id)
+                pmid = article_id if cite['citation_source'] == 'PubMed' else _pmid_for_otherid(article_id)
             if pmid:
                 ret.append({"hgvs_text": cite['HGVS'], "pmid": pmid, "accession": cite['RCVaccession']})
     return ret
@@ -106,7 +122,7 @@ def clinvar2pmid_with_accessions(hgvs_list):
 #
 ##########################################################################################
 
-ClinvarAccession   = _clinvar_variant_accession
-ClinvarAlleleID    = _clinvar_variant_allele_id
-ClinvarPubmeds     = _clinvar_variant2pubmed
-ClinvarVariationID = _clinvar_variant_variation_id
+ClinvarAccession   = traced('ClinvarAccession', _clinvar_variant_accession)
+ClinvarAlleleID    = traced('ClinvarAlleleID', _clinvar_variant_allele_id)
+ClinvarPubmeds     = traced('ClinvarPubmeds', _clinvar_variant2pubmed)
+ClinvarVariationID = traced('ClinvarVariationID', _clinvar_variant_variation_id)
@@ -1,32 +1,72 @@
+""" medgen API.
+
+Names are resolved on first access (PEP 562 module __getattr__), so "import medgen.api" does not
+import the db/annotate modules, read config, or connect to anything. "from medgen.api import *"
+still works (see __all__), and database objects are only built when an API function is first called.
+"""
+import os
+from importlib import import_module
+
+_API = {}
+
+def _lazy(module, *names):
+    for name in names:
+        _API[name] = module
+
 ##########################################################################
 # parse
 
-from .parse.gene    import Gene
-from .parse.concept import Concept
+_lazy('.parse.gene',    'Gene')
+_lazy('.parse.concept', 'Concept')
 
 ##########################################################################
 # db
 
-from .db.dataset import SQLData
-from .db.medgen  import MedGenDB
-from .db.gene    import GeneDB
-from .db.hugo    import HugoDB
-from .db.personalgenomes import PersonalGenomesDB
-from .db.clinvar import ClinVarDB
+_lazy('.db.dataset', 'SQLData')
+_lazy('.db.medgen',  'MedGenDB')
+_lazy('.db.gene',    'GeneDB')
+_lazy('.db.hugo',    'HugoDB')
+_lazy('.db.personalgenomes', 'PersonalGenomesDB')
+_lazy('.db.clinvar', 'ClinVarDB')
 
 ##########################################################################
 # annotate
 
-from .annotate.variant import ClinvarPubmeds, ClinvarAccession, ClinvarAlleleID, ClinvarVariationID
+_lazy('.annotate.variant', 'ClinvarPubmeds', 'ClinvarAccession', 'ClinvarAlleleID', 'ClinvarVariationID')
+
+_lazy('.annotate.gene',    'GeneID', 'GeneName')
+_lazy('.annotate.gene',    'GeneInfo',    'GeneSynonyms', 'GeneNamePreferred')
+_lazy('.annotate.gene',    'Gene2PubMed', 'Gene2LocusDB', 'Gene2Function')
+_lazy('.annotate.gene',    'Gene2MIM',    'Gene2ConditionSource', 'Gene2ClinicalSignificance')
 
-from .annotate.gene    import GeneID, GeneName
-from .annotate.gene    import GeneInfo,    GeneSynonyms, GeneNamePreferred
-from .annotate.gene    import Gene2PubMed, Gene2LocusDB, Gene2Function
-from .annotate.gene    import Gene2MIM,    Gene2ConditionSource, Gene2ClinicalSignificance
+_lazy('.annotate.disease', 'DiseaseName', 'DiseaseParents', 'DiseaseSubtypes')
+_lazy('.annotate.concept', 'ConceptName', 'ConceptDefinition', 'ConceptRelations', 'ConceptSources', 'Define', 'Relate')
 
-from .annotate.disease import DiseaseName, DiseaseParents, DiseaseSubtypes
-from .annotate.concept import ConceptName, ConceptDefinition, ConceptRelations, ConceptSources, Define, Relate
+_lazy('.annotate.pubmed', 'PMCID2Article', 'PMID2Article')
 
-from .annotate.pubmed import PMCID2Article, PMID2Article
+_lazy('.annotate.panel', 'AnnotatePanel')
 
 ##########################################################################
+
+__all__ = sorted(_API)
+
+# set by medgen.loadtest.start_capture (or the MEDGEN_CAPTURE=<file> environment variable):
+# wraps each API function as it is resolved, to log the calls made to it.
+_wrap = None
+
+def __getattr__(name):
+    try:
+        module = _API[name]
+    except KeyError:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(import_module(module, 'medgen'), name)
+    if _wrap is None and os.environ.get('MEDGEN_CAPTURE'):
+        from .loadtest import start_capture
+        start_capture(os.environ['MEDGEN_CAPTURE'])
+    if _wrap is not None:
+        value = _wrap(name, value)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_API))
@@ -0,0 +1,386 @@
+""" Benchmarks of the medgen.api functions, with a baseline comparison.
+
+    medgen-benchmark run --embedded bench-db/ --scale 1 -o current.json
+    medgen-benchmark compare baseline.json current.json
+
+or both at once (exit status 1 if anything regressed):
+
+    medgen-benchmark run --embedded bench-db/ -o current.json --baseline baseline.json
+
+Every public API function which only needs the database is run on a typical input and on a
+worst case: hub genes (TP53 has the largest PMID list), hub concepts (C0006142 has hundreds of
+relations and subtypes) and the most cited variant. PMID2Article and PMCID2Article need NCBI
+eutils and are not benchmarked.
+
+Per case the report has the latency distribution of the warm calls, the number of queries and
+rows per call (counted with medgen.db.dataset.add_query_listener) and the peak memory allocated
+by one call (tracemalloc). With --embedded the run is offline: the databases are sqlite files
+built from medgen.synthetic (see medgen.db.embedded), so the hub inputs exist at every --scale.
+--record saves every query and result of a run, and --replay serves a later run from that file
+alone (see medgen.db.replay). Otherwise the configured MySQL databases are used.
+"""
+import sys
+import json
+import time
+import platform
+import argparse
+import threading
+import tracemalloc
+from collections import OrderedDict, namedtuple
+
+from . import __version__
+from .log import log
+from .stats import StreamingHistogram
+from .db.dataset import add_query_listener, remove_query_listener
+from .db.gene import GeneDB, GeneBorg
+
+DEFAULT_REPEAT = 20
+DEFAULT_MIN_SECONDS = 0.2   # keep calling a case until both repeat and min seconds are reached
+DEFAULT_THRESHOLD = 0.25    # relative increase which counts as a regression
+NOISE_SECONDS = 0.0005      # latency differences below this are never regressions
+NOISE_BYTES = 64 * 1024     # nor are peak memory differences below this
+
+def _panel(genes):
+    from .annotate.panel import AnnotatePanel
+    return list(AnnotatePanel(genes))
+
+# (medgen.api function, label, argument). 'hub' cases are the worst-case inputs.
+CASES = [
+    ('GeneID',                    'typical', 'CASQ2'),
+    ('GeneID',                    'hub',     'TP53'),
+    ('GeneName',                  'typical', 845),
+    ('GeneInfo',                  'typical', 845),
+    ('GeneInfo',                  'hub',     'TP53'),
+    ('GeneSynonyms',              'typical', 'CASQ2'),
+    ('GeneNamePreferred',         'typical', 'CASQ2'),
+    ('Gene2PubMed',               'typical', 845),
+    ('Gene2PubMed',               'hub',     7157),
+    ('Gene2Function',             'typical', 845),
+    ('Gene2Function',             'hub',     7157),
+    ('Gene2MIM',                  'typical', 845),
+    ('Gene2LocusDB',              'typical', 'CASQ2'),
+    ('Gene2LocusDB',              'hub',     'TP53'),
+    ('Gene2ConditionSource',      'typical', 845),
+    ('Gene2ConditionSource',      'hub',     7157),
+    ('Gene2ClinicalSignificance', 'typical', 845),
+    ('Gene2ClinicalSignificance', 'hub',     7157),
+    ('ClinvarVariationID',        'typical', 'NM_001232.3:c.919G>C'),
+    ('ClinvarAlleleID',           'typical', 'NM_001232.3:c.919G>C'),
+    ('ClinvarAccession',          'typical', 'NM_002485.4:c.1222A>G'),
+    ('ClinvarPubmeds',            'typical', 'NM_001232.3:c.919G>C'),
+    ('ClinvarPubmeds',            'hub',     'NM_000410.3:c.845G>A'),
+    ('ConceptName',               'typical', 'C0018995'),
+    ('ConceptDefinition',         'typical', 'C0018995'),
+    ('ConceptSources',            'typical', 'C0018995'),
+    ('ConceptRelations',          'typical', 'C0018995'),
+    ('ConceptRelations',          'hub',     'C0006142'),
+    ('DiseaseName',               'typical', 'C0018995'),
+    ('DiseaseParents',            'typical', 'C0007194'),
+    ('DiseaseSubtypes',           'typical', 'C0018995'),
+    ('DiseaseSubtypes',           'hub',     'C0006142'),
+    ('AnnotatePanel',             'typical', ['CASQ2', 'ACADM', 'NBN']),
+    ('AnnotatePanel',             'hub',     ['TP53', 'BRCA1', 'BRCA2']),
+]
+
+# a regression found by compare()
+Regression = namedtuple('Regression', ['case', 'metric', 'baseline', 'current'])
+
+def case_name(function, label):
+    return '%s[%s]' % (function, label)
+
+def _warm_up(cases):
+    # one-off costs (imports, reading config, building the shared SQLData instances) are not
+    # part of any case's cold call.
+    for module in ('metapub.text_mining', 'metapub.pubmedcentral'):
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+    for function_name, label, argument in cases:
+        _api_function(function_name)
+    from .db.registry import get_db
+    from .db.clinvar import ClinVarDB
+    from .db.medgen import MedGenDB
+    from .db.hugo import HugoDB
+    for db_class in (GeneDB, ClinVarDB, MedGenDB, HugoDB):
+        get_db(db_class)
+
+def _api_function(name):
+    if name == 'AnnotatePanel':
+        return _panel
+    from . import api
+    return getattr(api, name)
+
+##########################################################################################
+#
+#       Run
+#
+##########################################################################################
+
+class QueryTally(object):
+    """
+    Query listener: number of queries and rows seen (from any thread) since the last take().
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.rows = 0
+
+    def __call__(self, event):
+        with self._lock:
+            self.queries += 1
+            self.rows += max(event.rows, 0)
+
+    def take(self):
+        with self._lock:
+            counts = self.queries, self.rows
+            self.queries = self.rows = 0
+        return counts
+
+def run_case(function, argument, repeat=DEFAULT_REPEAT, min_seconds=DEFAULT_MIN_SECONDS, tally=None):
+    """
+    Benchmark function(argument): one cold call (peak memory), then warm calls until
+    repeat calls and min_seconds have passed.
+
+    :return: OrderedDict {calls, errors, error, latency, queries_per_call, rows_per_call,
+                          cold_seconds, cold_queries, peak_bytes}
+    """
+    own_tally = tally is None
+    if own_tally:
+        tally = QueryTally()
+        add_query_listener(tally)
+    errors = 0
+    error = None
+    try:
+        tally.take()
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            function(argument)
+        except Exception as err:
+            errors, error = 1, repr(err)
+        cold_seconds = time.perf_counter() - start
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        cold_queries = tally.take()[0]
+
+        latency = StreamingHistogram()
+        calls = 0
+        began = time.perf_counter()
+        while calls < repeat or time.perf_counter() - began < min_seconds:
+            start = time.perf_counter()
+            try:
+                function(argument)
+            except Exception as err:
+                errors += 1
+                error = repr(err)
+            latency.add(time.perf_counter() - start)
+            calls += 1
+        queries, rows = tally.take()
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        if own_tally:
+            remove_query_listener(tally)
+
+    result = OrderedDict()
+    result['calls'] = calls
+    result['errors'] = errors
+    result['error'] = error
+    result['latency'] = latency.summary()
+    result['queries_per_call'] = queries / float(calls)
+    result['rows_per_call'] = rows / float(calls)
+    result['cold_seconds'] = cold_seconds
+    result['cold_queries'] = cold_queries
+    result['peak_bytes'] = peak_bytes
+    return result
+
+def run(cases=None, repeat=DEFAULT_REPEAT, min_seconds=DEFAULT_MIN_SECONDS, select=None, meta=None):
+    """
+    Run benchmark cases against whichever databases SQLData currently connects to.
+
+    :param cases: list of (function name, label, argument), default CASES
+    :param select: optional substring; only cases whose name contains it are run
+    :param meta: extra entries for the report's 'meta' section (e.g. which database)
+    :return: report dict {'meta': {...}, 'cases': {name: run_case() result + function, label, argument}}
+    """
+    cases = CASES if cases is None else cases
+    report = OrderedDict()
+    report['meta'] = OrderedDict([
+        ('medgen', __version__),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('time', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('repeat', repeat),
+        ('min_seconds', min_seconds),
+        ])
+    report['meta'].update(meta or {})
+    report['cases'] = OrderedDict()
+
+    _warm_up(cases)
+    tally = QueryTally()
+    add_query_listener(tally)
+    try:
+        for function_name, label, argument in cases:
+            name = case_name(function_name, label)
+            if select and select not in name:
+                continue
+            # every case starts cold, whichever cases ran before it.
+            GeneBorg.clear()
+            result = OrderedDict([('function', function_name), ('label', label), ('argument', argument)])
+            result.update(run_case(_api_function(function_name), argument, repeat, min_seconds, tally))
+            if result['error']:
+                log.warning('benchmark %s: %s', name, result['error'])
+            report['cases'][name] = result
+    finally:
+        remove_query_listener(tally)
+    return report
+
+##########################################################################################
+#
+#       Compare
+#
+##########################################################################################
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Regressions of current against baseline (both run() reports):
+        - latency p50 or p95 up by more than threshold (and more than NOISE_SECONDS)
+        - more queries per call, cold or warm (any increase)
+        - peak memory up by more than threshold (and more than NOISE_BYTES)
+        - errors in a case that had none
+
+    :return: list of Regression
+    """
+    regressions = []
+    for name, now in current['cases'].items():
+        then = baseline['cases'].get(name)
+        if then is None:
+            continue
+        for pct in ('p50', 'p95'):
+            old, new = then['latency'][pct], now['latency'][pct]
+            if old is not None and new is not None and \
+                    new > old * (1 + threshold) and new - old > NOISE_SECONDS:
+                regressions.append(Regression(name, 'latency_' + pct, old, new))
+        if now['queries_per_call'] > then['queries_per_call']:
+            regressions.append(Regression(name, 'queries_per_call', then['queries_per_call'], now['queries_per_call']))
+        if now['cold_queries'] > then['cold_queries']:
+            regressions.append(Regression(name, 'cold_queries', then['cold_queries'], now['cold_queries']))
+        old, new = then['peak_bytes'], now['peak_bytes']
+        if new > old * (1 + threshold) and new - old > NOISE_BYTES:
+            regressions.append(Regression(name, 'peak_bytes', old, new))
+        if now['errors'] and not then['errors']:
+            regressions.append(Regression(name, 'errors', then['errors'], now['errors']))
+    return regressions
+
+def format_report(report):
+    # cached functions issue their queries on the cold call only.
+    lines = ['%-38s %10s %10s %10s %10s %8s %8s %10s' % (
+        'case', 'cold ms', 'p50 ms', 'p95 ms', 'max ms', 'cold q', 'queries', 'peak KB')]
+    for name, case in report['cases'].items():
+        lat = case['latency']
+        lines.append('%-38s %10.3f %10.3f %10.3f %10.3f %8d %8.1f %10.1f%s' % (
+            name, case['cold_seconds'] * 1000, lat['p50'] * 1000, lat['p95'] * 1000, lat['max'] * 1000,
+            case['cold_queries'], case['queries_per_call'], case['peak_bytes'] / 1024.0, '  ERROR %s' % case['error'] if case['error'] else ''))
+    return '\n'.join(lines)
+
+def format_regressions(regressions, baseline, current, threshold=DEFAULT_THRESHOLD):
+    lines = []
+    for key in ('database', 'scale'):
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            lines.append('warning: baseline %s %r, current %r' % (key, baseline['meta'].get(key),
+                                                                   current['meta'].get(key)))
+    missing = sorted(set(baseline['cases']) - set(current['cases']))
+    if missing:
+        lines.append('not run: %s' % ', '.join(missing))
+    for reg in regressions:
+        lines.append('REGRESSION %-38s %-18s %s -> %s' % (reg.case, reg.metric, reg.baseline, reg.current))
+    if not regressions:
+        lines.append('no regressions (threshold %s)' % threshold)
+    return '\n'.join(lines)
+
+def _load(path):
+    with open(path) as fh:
+        return json.load(fh, object_pairs_hook=OrderedDict)
+
+##########################################################################################
+#
+#       CLI
+#
+##########################################################################################
+
+def _latency(text):
+    return text if text == 'recorded' else float(text)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='medgen-benchmark', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command')
+
+    run_cmd = commands.add_parser('run', help='run the benchmarks')
+    run_cmd.add_argument('-o', '--output', help='write the JSON report here')
+    run_cmd.add_argument('--embedded', metavar='DIRECTORY',
+                         help='use (building if needed) embedded synthetic databases in DIRECTORY')
+    run_cmd.add_argument('--rebuild', action='store_true', help='rebuild the embedded databases')
+    run_cmd.add_argument('--scale', type=float, default=1.0, help='synthetic scale of a new embedded build')
+    run_cmd.add_argument('--seed', type=int, default=0)
+    run_cmd.add_argument('--record', metavar='FILE', help='also record every query to FILE (see medgen.db.replay)')
+    run_cmd.add_argument('--replay', metavar='FILE', help='serve queries from a recording instead of a database')
+    run_cmd.add_argument('--replay-latency', type=_latency, default=None,
+                         help="seconds added to every replayed query, or 'recorded'")
+    run_cmd.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='warm calls per case (minimum)')
+    run_cmd.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS)
+    run_cmd.add_argument('-k', '--select', help='only cases whose name contains this, e.g. Gene2PubMed or [hub]')
+    run_cmd.add_argument('--baseline', help='compare with this report; exit status 1 on regressions')
+    run_cmd.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    compare_cmd = commands.add_parser('compare', help='compare two reports; exit status 1 on regressions')
+    compare_cmd.add_argument('baseline')
+    compare_cmd.add_argument('current')
+    compare_cmd.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        meta = OrderedDict()
+        if args.embedded:
+            from .db import embedded
+            embedded.prepare(args.embedded, args.scale, args.seed, args.rebuild)
+            meta['database'] = 'embedded'
+            meta['scale'] = args.scale
+            meta['seed'] = args.seed
+        elif args.replay:
+            from .db import replay
+            replay.use(args.replay, args.replay_latency)
+            meta['database'] = 'replay'
+            meta['replay_latency'] = args.replay_latency
+        else:
+            meta['database'] = 'mysql'
+        recorder = None
+        if args.record:
+            from .db.replay import Recorder
+            recorder = Recorder(args.record).start()
+        try:
+            report = run(repeat=args.repeat, min_seconds=args.min_seconds, select=args.select, meta=meta)
+        finally:
+            if recorder is not None:
+                recorder.stop()
+        sys.stderr.write(format_report(report) + '\n')
+        if args.output:
+            with open(args.output, 'w') as fh:
+                json.dump(report, fh, indent=2)
+        if args.baseline:
+            baseline = _load(args.baseline)
+            regressions = compare(baseline, report, args.threshold)
+            sys.stderr.write(format_regressions(regressions, baseline, report, args.threshold) + '\n')
+            return 1 if regressions else 0
+        return 0
+    elif args.command == 'compare':
+        baseline, current = _load(args.baseline), _load(args.current)
+        regressions = compare(baseline, current, args.threshold)
+        sys.stderr.write(format_regressions(regressions, baseline, current, args.threshold) + '\n')
+        return 1 if regressions else 0
+    parser.print_help()
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+""" medgen-annotate: batch annotation of HGVS strings, gene symbols/ids or concepts.
+
+    medgen-annotate variants.tsv --column hgvs_c -o annotated.jsonl
+    cut -f1 genes.txt | medgen-annotate --workers 32 > genes.jsonl
+
+Input is TSV (one query per row; --column picks the column) or JSONL (--field picks the key).
+Queries are classified as HGVS, concept (UMLS CUI, or MedGen UID: a number of up to 6 digits)
+or gene; use --kind gene for a file of Entrez gene ids. TSV rows without the column, and JSONL
+lines which are not JSON objects with the field, are skipped with a warning.
+Each input row produces one JSON line, in input order. Point lookups from all workers are
+coalesced into batched queries (medgen.db.loader), and at most --window rows are in flight,
+so memory stays flat however long the input is.
+"""
+import re
+import sys
+import json
+import time
+import argparse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .db.loader import get_loader
+from .db.medgen import is_format_umls, is_format_medgen
+from .db.rows import json_default
+from .log import log
+from .stats import StreamingHistogram
+
+DEFAULT_WORKERS = 16
+DEFAULT_WINDOW = 1000
+
+re_hgvs = re.compile(r'^\S+:[cgmnpr]\.\S+$')
+
+##########################################################################################
+#
+#       Annotation of one query
+#
+##########################################################################################
+
+def query_kind(query):
+    """
+    :param query: HGVS string, UMLS CUI or MedGen UID, or gene symbol / Entrez gene id
+    :return: 'hgvs', 'cui', or 'gene' (numbers of up to 6 digits are MedGen UIDs: see --kind)
+    """
+    if re_hgvs.match(query):
+        return 'hgvs'
+    if (is_format_umls(query) and query[1:].isdigit()) or is_format_medgen(query):
+        # (is_format_umls alone takes 8 letter symbols starting with C, e.g. CDKN2AIP)
+        return 'cui'
+    return 'gene'
+
+def _annotate_hgvs(hgvs_text):
+    return OrderedDict([('VariationID',  get_loader('ClinvarVariationID').load(hgvs_text)),
+                        ('AlleleID',     get_loader('ClinvarAlleleID').load(hgvs_text)),
+                        ('RCVaccession', get_loader('ClinvarAccession').load(hgvs_text))])
+
+def _annotate_gene(gene):
+    gene_id = get_loader('GeneID').load(gene)
+    name = get_loader('GeneName').load(gene_id) if gene_id is not None else None
+    return OrderedDict([('GeneID', gene_id), ('GeneName', name)])
+
+def _annotate_cui(cui):
+    row = get_loader('ConceptName').load(cui)
+    return OrderedDict([('ConceptName', row['name'] if row else None),
+                        ('ConceptSource', row['source'] if row else None)])
+
+ANNOTATORS = {
+    'hgvs': _annotate_hgvs,
+    'gene': _annotate_gene,
+    'cui':  _annotate_cui,
+}
+
+def annotate(record, kind='auto'):
+    """
+    :param record: OrderedDict with at least 'query'
+    :return: (record with annotations added, seconds taken)
+    """
+    start = time.perf_counter()
+    query = record['query']
+    record['kind'] = query_kind(query) if kind == 'auto' else kind
+    try:
+        record.update(ANNOTATORS[record['kind']](query))
+    except Exception as err:
+        record['error'] = repr(err)
+    return record, time.perf_counter() - start
+
+##########################################################################################
+#
+#       Input / Output
+#
+##########################################################################################
+
+def read_tsv(lines, column=0):
+    """
+    :param column: column index, or column name (then the first line is a header)
+    :return: generator of OrderedDict {'query', ...}
+    """
+    header = None
+    if not isinstance(column, int):
+        header = next(lines, '').rstrip('\r\n').split('\t')
+        column = header.index(column)
+
+    for number, line in enumerate(lines, 2 if header else 1):
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('#'):
+            continue
+        cells = line.split('\t')
+        if column >= len(cells):
+            log.warning('skipping line %d: no column %d in %r', number, column, line)
+            continue
+        record = OrderedDict([('query', cells[column].strip())])
+        if header:
+            record.update((name, value) for name, value in zip(header, cells) if name != 'query')
+        yield record
+
+def read_jsonl(lines, field='query'):
+    """
+    :param field: key of the query in each object
+    :return: generator of OrderedDict {'query', ...}
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line, object_pairs_hook=OrderedDict)
+            query = obj[field]
+        except (ValueError, KeyError, TypeError) as err:
+            # not JSON, not an object, or no field
+            log.warning('skipping line %d: %r in %r', number, err, line.rstrip('\r\n'))
+            continue
+        record = OrderedDict([('query', str(query).strip())])
+        record.update((key, value) for key, value in obj.items() if key != 'query')
+        yield record
+
+def run(records, output, workers=DEFAULT_WORKERS, window=DEFAULT_WINDOW, kind='auto'):
+    """
+    Annotate records on a thread pool with at most `window` in flight; write JSON lines in input order.
+
+    :return: dict summary {items, errors, seconds, items_per_sec, latency}
+    """
+    latency = StreamingHistogram()
+    errors = 0
+    items = 0
+    start = time.perf_counter()
+    pending = deque()
+
+    def drain_one():
+        record, seconds = pending.popleft().result()
+        latency.add(seconds)
+        output.write(json.dumps(record, default=json_default) + '\n')
+        return 1 if 'error' in record else 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for record in records:
+            if len(pending) >= window:
+                errors += drain_one()
+            pending.append(pool.submit(annotate, record, kind))
+            items += 1
+        while pending:
+            errors += drain_one()
+
+    seconds = time.perf_counter() - start
+    return OrderedDict([('items', items),
+                        ('errors', errors),
+                        ('seconds', seconds),
+                        ('items_per_sec', items / seconds if seconds else None),
+                        ('latency', latency.summary())])
+
+def format_summary(summary):
+    lat = summary['latency']
+    if not summary['items']:
+        return 'medgen-annotate: no input'
+    return ('medgen-annotate: %d items (%d errors) in %.2fs = %.1f items/s; '
+            'latency p50=%.1fms p95=%.1fms p99=%.1fms max=%.1fms' % (
+                summary['items'], summary['errors'], summary['seconds'], summary['items_per_sec'],
+                lat['p50'] * 1000, lat['p95'] * 1000, lat['p99'] * 1000, lat['max'] * 1000))
+
+##########################################################################################
+#
+#       main
+#
+##########################################################################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='medgen-annotate', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', nargs='?', default='-', help='input file (default: stdin)')
+    parser.add_argument('-o', '--output', default='-', help='output JSONL file (default: stdout)')
+    parser.add_argument('--format', choices=['auto', 'tsv', 'jsonl'], default='auto')
+    parser.add_argument('--column', default='0', help='TSV column: index, or name in the header line')
+    parser.add_argument('--field', default='query', help='JSONL key holding the query')
+    parser.add_argument('--kind', choices=['auto', 'hgvs', 'gene', 'cui'], default='auto')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help='max rows in flight')
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt == 'auto':
+        fmt = 'jsonl' if args.input.endswith(('.jsonl', '.json')) else 'tsv'
+
+    infile = sys.stdin if args.input == '-' else open(args.input)
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        lines = iter(infile)
+        if fmt == 'jsonl':
+            records = read_jsonl(lines, args.field)
+        else:
+            column = int(args.column) if args.column.isdigit() else args.column
+            records = read_tsv(lines, column)
+
+        summary = run(records, outfile, workers=args.workers, window=args.window, kind=args.kind)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    sys.stderr.write(format_summary(summary) + '\n')
+    return 1 if summary['errors'] == summary['items'] and summary['items'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,16 +17,30 @@ CFGDIR = os.getenv('MEDGEN_CONFIG_DIR', default_config_dir)
 ENV = os.getenv('MEDGEN_ENV', 'default')
 
 
-log.info("MedGen Configuration Settings: ")
-log.info("CFGDIR: %s" % CFGDIR)
-log.info("ENV: %s" % ENV)
-
-
 def _get_config(dirname=CFGDIR, env=ENV):
+    log.info("MedGen Configuration Settings: ")
+    log.info("CFGDIR: %s" % dirname)
+    log.info("ENV: %s" % env)
+
     config = ConfigParser()
     configs = [os.path.join(dirname, x) for x in os.listdir(dirname) if x.find(env) > -1]
     config.read(configs)
     return config
 
-config = _get_config()
-
+_config = None
+
+def get_config():
+    """
+    Configuration is read from CFGDIR on first use (not at import), then shared.
+    :return: ConfigParser
+    """
+    global _config
+    if _config is None:
+        _config = _get_config()
+    return _config
+
+def __getattr__(name):
+    # keeps "from medgen.config import config" working without reading config files at import time.
+    if name == 'config':
+        return get_config()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
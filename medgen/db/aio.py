@@ -0,0 +1,254 @@
+""" asyncio counterparts of the SQLData classes, backed by aiomysql and its connection pool.
+
+    db = get_db(AsyncGeneDB)
+    info = await db.get_gene_info('BRCA2')
+
+A pool belongs to the event loop that created it. Pass pool= to use a pool of your own
+(or a local stand-in with the same acquire()/cursor() interface).
+"""
+import time
+import asyncio
+
+from ..log import log
+from .. import metrics
+from .dataset import _template
+from . import gene, clinvar, medgen, hugo
+from .medgen import is_format_umls, is_format_medgen
+
+DEFAULT_POOL_MINSIZE = 1
+DEFAULT_POOL_MAXSIZE = 10
+
+##########################################################################################
+#
+#       AsyncSQLData Class
+#
+##########################################################################################
+
+class AsyncSQLData(object):
+    """
+    MySQL base class for asynchronous selects from medgen linked databases.
+    Same configuration as SQLData (config_section, db_host, db_user, db_pass, dataset).
+    """
+    def __init__(self, *args, **kwargs):
+        self._cfg_section = kwargs.get('config_section', 'DEFAULT')
+
+        from ..config import get_config
+        config = get_config()
+        self._db_host = kwargs.get('db_host', None) or config.get(self._cfg_section, 'db_host')
+        self._db_port = int(kwargs.get('db_port', None) or config.get(self._cfg_section, 'db_port', fallback=3306))
+        self._db_user = kwargs.get('db_user', None) or config.get(self._cfg_section, 'db_user')
+        self._db_pass = kwargs.get('db_pass', None) or config.get(self._cfg_section, 'db_pass')
+        self._db_name = kwargs.get('dataset', None) or config.get(self._cfg_section, 'dataset')
+
+        self.minsize = kwargs.get('minsize', DEFAULT_POOL_MINSIZE)
+        self.maxsize = kwargs.get('maxsize', DEFAULT_POOL_MAXSIZE)
+
+        # created upon first query, unless supplied
+        self._pool = kwargs.get('pool', None)
+        self._pool_lock = None
+
+    async def pool(self):
+        """
+        :return: connection pool (created on first use)
+        """
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    import aiomysql
+                    self._pool = await aiomysql.create_pool(host=self._db_host,
+                                                            port=self._db_port,
+                                                            user=self._db_user,
+                                                            password=self._db_pass,
+                                                            db=self._db_name,
+                                                            minsize=self.minsize,
+                                                            maxsize=self.maxsize,
+                                                            cursorclass=aiomysql.DictCursor,
+                                                            charset='utf8',
+                                                            use_unicode=True,
+                                                            autocommit=True)
+        return self._pool
+
+    async def close(self):
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            pool.close()
+            await pool.wait_closed()
+
+    async def fetchall(self, select_sql, *args):
+        """
+        Coroutine version of SQLData.fetchall. Supplied *args are bound by the driver.
+
+        :param select_sql: (str)
+        :returns: results as list of dictionaries
+        """
+        pool = await self.pool()
+        start = time.perf_counter()
+        async with pool.acquire() as conn:
+            acquired = time.perf_counter()
+            metrics.POOL_WAIT_SECONDS.labels(self._cfg_section).observe(acquired - start)
+            async with conn.cursor() as cursor:
+                if args:
+                    await cursor.execute(select_sql, args)
+                else:
+                    # no args: a stray % (as in 'where x LIKE "%blah"') must not be taken as a placeholder.
+                    await cursor.execute(select_sql)
+                rows = list(await cursor.fetchall())
+        if metrics.enabled:
+            metrics.observe_query(self._cfg_section, _template(self), time.perf_counter() - acquired, len(rows))
+        return rows
+
+    async def fetchrow(self, select_sql, *args):
+        """
+        :returns: first row, or None if there are no results
+        """
+        res = await self.fetchall(select_sql, *args)
+        return res[0] if len(res) > 0 else None
+
+    async def fetchID(self, select_sql, *args, **kwargs):
+        id_colname = kwargs.get('id_colname', 'ID')
+
+        results = await self.fetchrow(select_sql, *args)
+        if results is not None:
+            if id_colname in results:
+                return results[id_colname]
+            else:
+                raise RuntimeError("No ID column found.  SQL query: %s" % select_sql)
+        return None  # no results found
+
+    async def ping(self):
+        try:
+            return {'tables': await self.fetchall('call mem')}
+        except Exception as err:
+            log.error('DB connection is dead: %r' % err)
+            return False
+
+##########################################################################################
+#
+#       Schemas (see the SQLData class of the same name for table descriptions; same SQL)
+#
+##########################################################################################
+
+class AsyncGeneDB(AsyncSQLData):
+    """
+    async GeneDB
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('config_section', 'gene')
+        super(AsyncGeneDB, self).__init__(**kwargs)
+        self._gene2id = {}
+
+    async def get_gene_id(self, gene_name):
+        try:
+            int(gene_name)
+        except ValueError:
+            if gene_name not in self._gene2id:
+                gene_id = await self.fetchID(gene.GENE_ID_SQL, gene_name.upper())
+                if gene_id is None:
+                    return None
+                self._gene2id[gene_name] = gene_id
+            return self._gene2id[gene_name]
+        else:
+            return gene_name
+
+    async def get_gene_name(self, gene_name):
+        return await self.fetchID(gene.GENE_NAME_SQL, await self.get_gene_id(gene_name))
+
+    async def get_gene_info(self, gene_name):
+        gene_id = await self.get_gene_id(gene_name)
+        if gene_id is None:
+            return None
+        return await self.fetchrow(gene.GENE_INFO_SQL, int(gene_id))
+
+    async def get_gene_synonyms(self, symbol):
+        return await self.fetchall(gene.GENE_SYNONYMS_SQL,
+                                   symbol, symbol, '%|' + symbol, symbol + '|%', '%|' + symbol + '|%', symbol)
+
+    async def gene2pubmed(self, gene_name):
+        return await self.fetchall(gene.GENE2PUBMED_SQL, await self.get_gene_id(gene_name))
+
+    async def gene2mim(self, gene_name):
+        return await self.fetchall(gene.GENE2MIM_SQL, await self.get_gene_id(gene_name))
+
+    async def gene_function(self, gene_name):
+        return await self.fetchall(gene.GENE_FUNCTION_SQL, await self.get_gene_id(gene_name))
+
+
+class AsyncClinVarDB(AsyncSQLData):
+    """
+    async ClinVarDB
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('config_section', 'clinvar')
+        super(AsyncClinVarDB, self).__init__(**kwargs)
+
+    async def clinvar_ids(self, hgvs_text, id_column='VariationID'):
+        if id_column not in ('VariationID', 'AlleleID', 'RCVaccession'):
+            raise ValueError('unknown ClinVar id_column %s' % id_column)
+        res = await self.fetchall(clinvar.CLINVAR_IDS_SQL.format(id_column), hgvs_text)
+        return [entry['ID'] for entry in res]
+
+    async def var_citations(self, hgvs_text):
+        return await self.fetchall(clinvar.VAR_CITATIONS_SQL.format(clinvar.hgvs_clause([hgvs_text])), hgvs_text)
+
+    async def disease_name(self, cui):
+        return await self.fetchall(clinvar.DISEASE_NAME_SQL, cui)
+
+    async def gene2condition(self, gene_id):
+        return await self.fetchall(clinvar.GENE2CONDITION_SQL, gene_id)
+
+    async def gene_summary(self, gene_id):
+        return await self.fetchrow(clinvar.GENE_SUMMARY_SQL, gene_id)
+
+    async def gene_to_clinical_significance_type_frequency(self, gene_id):
+        return await self.fetchall(clinvar.GENE_SIGNIFICANCE_FREQUENCY_SQL, gene_id)
+
+
+class AsyncMedGenDB(AsyncSQLData):
+    """
+    async MedGenDB
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('config_section', 'medgen')
+        super(AsyncMedGenDB, self).__init__(**kwargs)
+
+    async def get_concept_id(self, unique_id):
+        if is_format_umls(unique_id):
+            return unique_id
+
+        if is_format_medgen(unique_id):
+            return await self.fetchID(medgen.MEDGEN2UMLS_SQL, int(unique_id))
+
+        raise Exception('Unknown concept unique identifier format for %s' % unique_id)
+
+    async def concept_name(self, cui):
+        return await self.fetchrow(medgen.CONCEPT_NAME_SQL, await self.get_concept_id(cui))
+
+    async def concept_definition(self, cui):
+        return await self.fetchrow(medgen.CONCEPT_DEFINITION_SQL, await self.get_concept_id(cui))
+
+    async def concept_relations(self, cui):
+        cui = await self.get_concept_id(cui)
+        return await self.fetchall(medgen.CONCEPT_RELATIONS_SQL, cui, cui)
+
+    async def concept_sources(self, cui):
+        return await self.fetchall(medgen.CONCEPT_SOURCES_SQL, await self.get_concept_id(cui))
+
+    async def disease_subtypes(self, cui):
+        return await self.fetchall(medgen.DISEASE_SUBTYPES_SQL, await self.get_concept_id(cui))
+
+    async def disease_parents(self, cui):
+        return await self.fetchall(medgen.DISEASE_PARENTS_SQL, await self.get_concept_id(cui))
+
+
+class AsyncHugoDB(AsyncSQLData):
+    """
+    async HugoDB
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('config_section', 'hugo')
+        super(AsyncHugoDB, self).__init__(**kwargs)
+
+    async def get_locus_specific_databases(self, gene_symbol):
+        return await self.fetchrow(hugo.LOCUS_SPECIFIC_DATABASES_SQL, gene_symbol)
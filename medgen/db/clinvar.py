@@ -3,6 +3,31 @@ from ..parse.concept import Concept
 from ..parse.gene import Gene
 from ..log import log, IS_DEBUG_ENABLED
 
+##########################################################################################
+#
+#       SQL (shared with medgen.db.aio)
+#
+##########################################################################################
+
+CLINVAR_IDS_SQL    = 'select distinct {} as ID from clinvar_hgvs where HGVS = %s'     # .format(id_column)
+VAR_CITATIONS_SQL  = ('select C.citation_id, C.citation_source, H.RCVaccession, H.HGVS '
+                      'from clinvar_hgvs H, var_citations C '
+                      'where H.VariationID = C.VariationID and ({})')            # .format(HGVS clause)
+DISEASE_NAME_SQL   = 'select * from disease_names where ConceptID = %s'
+GENE2CONDITION_SQL = 'select * from gene_condition_source_id where GeneID = %s'
+GENE_SUMMARY_SQL   = 'select * from gene_specific_summary where GeneID = %s limit 1'
+GENE_SIGNIFICANCE_FREQUENCY_SQL = (' select ClinicalSignificance, count(*) as cnt_variants '
+                                   ' from variant_summary '
+                                   ' where GeneID = %s '
+                                   ' group by ClinicalSignificance '
+                                   ' order by cnt_variants    desc ')
+
+def hgvs_clause(hgvs_texts):
+    """
+    :return: the VAR_CITATIONS_SQL condition for len(hgvs_texts) HGVS placeholders
+    """
+    return ' or '.join(['H.HGVS = %s'] * len(hgvs_texts))
+
 ##########################################################################################
 #
 #       SQLData Class
@@ -27,13 +52,29 @@ class ClinVarDB(SQLData):
         :param id_column: 'VariationID', 'AlleleID', or 'RCVaccession'
         :return: clinvar identifer 'VariationID', 'AlleleID', or 'RCVaccession'
         """
-        res = self.fetchall(
-            ' select distinct %s as ID ' % id_column +
-            ' from clinvar_hgvs ' +
-            ' where HGVS = "%s"' % hgvs_text)
+        res = self.fetchall(CLINVAR_IDS_SQL.format(id_column), hgvs_text)
 
         return [entry['ID'] for entry in res]
 
+    def clinvar_ids_many(self, hgvs_texts, id_column='VariationID'):
+        """
+        Batch of clinvar_ids: one query for many HGVS text labels.
+
+        :param hgvs_texts: list of c.DNA, r.RNA, p.Protein, or g.Genomic
+        :param id_column: 'VariationID', 'AlleleID', or 'RCVaccession'
+        :return: dict {hgvs_text: [clinvar identifiers]}
+        """
+        found = dict((hgvs_text, []) for hgvs_text in hgvs_texts)
+        if found:
+            res = self.fetchall(
+                ' select distinct HGVS, %s as ID ' % id_column +
+                ' from clinvar_hgvs ' +
+                ' where HGVS in ({})'.format(','.join(['%s'] * len(found))), *found.keys())
+            for entry in res:
+                if entry['HGVS'] in found:
+                    found[entry['HGVS']].append(entry['ID'])
+        return found
+
     def accession_for_hgvs_text(self, hgvs_text):
         """
         Get RCVaccession for hgvs_text
@@ -143,7 +184,7 @@ class ClinVarDB(SQLData):
 
         return self.fetchall(_sql)
 
-    def var_citations(self, hgvs_text):
+    def var_citations(self, hgvs_text, row_factory=None):
         """
         Get citations for clinvar entries using an HGVS text label.
 
@@ -162,15 +203,13 @@ class ClinVarDB(SQLData):
         +----------+-------------+-----------+------+-----------------+-------------+
 
         :param hgvs_text: c.DNA, r.RNA, p.Protein, g.Genomic
+        :param row_factory: None for dicts, or 'record' (see medgen.db.rows)
         :return: citations from ClinVar
         """
         if type(hgvs_text) == str:
             hgvs_text = [hgvs_text]
 
-        hgvs_clause = " or ".join(map(lambda x: " H.HGVS = '{}' ".format(x), hgvs_text))
-        sql = "select C.citation_id, C.citation_source, H.RCVaccession, H.HGVS from clinvar_hgvs H, var_citations C where H.VariationID = C.VariationID and ({})".format(hgvs_clause)
-        print(sql)
-        return self.fetchall(sql)
+        return self.fetchall(VAR_CITATIONS_SQL.format(hgvs_clause(hgvs_text)), *hgvs_text, row_factory=row_factory)
 
 
     def molecular_consequences(self, hgvs_text):
@@ -210,10 +249,7 @@ class ClinVarDB(SQLData):
         :param concept:  UMLS or MedGen concept ID
         :return: DiseaseName entry (dictionary, includes VocabSource)
         """
-        return self.fetchall(
-         "select * "
-         "from disease_names "
-         "where ConceptID = '%s'" % Concept(concept).umls_cui)
+        return self.fetchall(DISEASE_NAME_SQL, Concept(concept).umls_cui)
 
     #TODO: @nthmost: refactor with medgen-services
     def gene2condition(self, gene_id):
@@ -237,8 +273,7 @@ class ClinVarDB(SQLData):
         :param gene_id: Entrez Gene ID
         :return: condition information from gene_condition_source_id
         """
-        return self.fetchall(
-            " select * from gene_condition_source_id where GeneID = ?".replace('?',str(Gene(gene_id).id)))
+        return self.fetchall(GENE2CONDITION_SQL, Gene(gene_id).id)
 
     def gene2condition_for_concept(self, concept_id):
         """
@@ -273,7 +308,7 @@ class ClinVarDB(SQLData):
         :param gene: NCBI Gene ID or hugo gene name
         :return: dictionary with counts of Submissions and Alleles
         """
-        return self.fetchrow("select * from gene_specific_summary where GeneID = ? limit 1".replace('?', str(Gene(gene).id)))
+        return self.fetchrow(GENE_SUMMARY_SQL, Gene(gene).id)
 
 
     def gene_to_clinical_significance_type_frequency(self, gene):
@@ -299,13 +334,7 @@ class ClinVarDB(SQLData):
         :param gene: NCBI Gene ID or hugo gene name
         :return: dict containing ClinicalSignificance and the number of variants (cnt_variants)
         """
-        gene = Gene(gene)
-        return self.fetchall(" select ClinicalSignificance, count(*) as cnt_variants "
-                             " from variant_summary "
-                             " where GeneID = ? "
-                             " group by ClinicalSignificance "
-                             " order by cnt_variants    desc "
-                             .replace('?', str(gene.id)) )
+        return self.fetchall(GENE_SIGNIFICANCE_FREQUENCY_SQL, Gene(gene).id)
 
 
     # TODO: deprecated
@@ -0,0 +1,266 @@
+""" Columnar query results: NumPy arrays instead of a dict per row.
+
+    columns = get_db(ClinVarDB).fetchcolumns('select GeneID, ClinicalSignificance from variant_summary')
+    columns['GeneID']                                   # array([672, 672, 675, ...])
+    columns['ClinicalSignificance'].categories          # ['Pathogenic', 'Benign', ...]
+    pathogenic = columns['ClinicalSignificance'] == 'Pathogenic'
+    np.bincount(columns['GeneID'][pathogenic])
+
+Rows are read from a streaming cursor (SQLData.fetchchunks), a chunk at a time, and each chunk
+becomes arrays before the next is read, so a 500k row pull never exists as 500k dicts. Column
+types follow the values:
+
+    integers                    int64 (float64 with NaN if the column has NULLs)
+    other numbers (Decimal)     float64, NULL as NaN
+    strings                     EncodedColumn: int32 codes into a list of distinct values, NULL as -1
+    anything else (dates)       object array
+"""
+from collections import OrderedDict
+from decimal import Decimal
+
+import numpy as np
+
+NULL_CODE = -1
+_MISSING_CODE = -2      # code of a value not in the column: matches nothing
+
+##########################################################################################
+#
+#       Columns
+#
+##########################################################################################
+
+class EncodedColumn(object):
+    """
+    Dictionary-encoded string column: codes[i] indexes categories (NULL_CODE for NULL).
+    Comparisons give boolean masks: column == 'Pathogenic', column.isin(['Benign', 'Likely benign']).
+    """
+    __slots__ = ('codes', 'categories', '_index')
+
+    def __init__(self, codes, categories, index=None):
+        self.codes = codes
+        self.categories = categories
+        self._index = index
+
+    @property
+    def index(self):
+        """
+        :return: dict {category: code}
+        """
+        if self._index is None:
+            self._index = dict((value, code) for code, value in enumerate(self.categories))
+        return self._index
+
+    def code(self, value):
+        if value is None:
+            return NULL_CODE
+        return self.index.get(value, _MISSING_CODE)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            code = self.codes[item]
+            return None if code == NULL_CODE else self.categories[code]
+        return EncodedColumn(self.codes[item], self.categories, self._index)
+
+    def __eq__(self, value):
+        return self.codes == self.code(value)
+
+    def __ne__(self, value):
+        return self.codes != self.code(value)
+
+    __hash__ = None
+
+    def isin(self, values):
+        """
+        :return: boolean mask of the rows whose value is one of values
+        """
+        return np.isin(self.codes, [self.code(value) for value in values])
+
+    def matches(self, predicate):
+        """
+        :param predicate: function of a value -> bool, called once per distinct value
+        :return: boolean mask of the rows whose value satisfies predicate (NULLs never do)
+        """
+        return np.isin(self.codes, [code for code, value in enumerate(self.categories) if predicate(value)])
+
+    def counts(self):
+        """
+        :return: OrderedDict {value: rows}, most frequent first (NULLs not counted)
+        """
+        counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self.categories))
+        order = np.argsort(-counts, kind='stable')
+        return OrderedDict((self.categories[code], int(counts[code])) for code in order if counts[code])
+
+    def decode(self):
+        """
+        :return: object array of the values
+        """
+        values = np.empty(len(self.categories) + 1, dtype=object)
+        values[:-1] = self.categories
+        values[-1] = None
+        return values[self.codes]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + sum(len(value) for value in self.categories)
+
+    def __repr__(self):
+        return 'EncodedColumn(%d rows, %d values)' % (len(self.codes), len(self.categories))
+
+class Columns(OrderedDict):
+    """
+    Column name -> ndarray or EncodedColumn, all of the same length.
+    """
+    @property
+    def rows(self):
+        for column in self.values():
+            return len(column)
+        return 0
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.values())
+
+    def filter(self, mask):
+        """
+        :param mask: boolean array (or index array) of the rows to keep
+        :return: Columns
+        """
+        return Columns((name, column[mask]) for name, column in self.items())
+
+    def to_records(self):
+        """
+        :return: NumPy structured array; encoded columns are decoded to fixed width unicode
+        """
+        fields, arrays = [], []
+        for name, column in self.items():
+            if isinstance(column, EncodedColumn):
+                width = max([len(value) for value in column.categories] or [1])
+                array = np.array(['' if value is None else value for value in column.decode()], dtype='U%d' % width)
+            else:
+                array = column
+            fields.append((name, array.dtype))
+            arrays.append(array)
+        records = np.empty(self.rows, dtype=fields)
+        for (name, _), array in zip(fields, arrays):
+            records[name] = array
+        return records
+
+##########################################################################################
+#
+#       Building
+#
+##########################################################################################
+
+def _kind(values):
+    kind = None
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+            this = 'int'
+        elif isinstance(value, (float, Decimal)):
+            this = 'float'
+        elif isinstance(value, (str, bytes)):
+            this = 'str'
+        else:
+            return 'object'
+        if kind is None or kind == this:
+            kind = this
+        elif {kind, this} == {'int', 'float'}:
+            kind = 'float'
+        else:
+            return 'object'
+    return kind
+
+class _ColumnBuilder(object):
+
+    def __init__(self):
+        self.parts = []         # (kind, values): int64 / float64 array, int32 codes, object array, or n NULLs
+        self.index = {}         # string -> code
+        self.categories = []
+
+    def add(self, values):
+        kind = _kind(values)
+        if kind is None:
+            self.parts.append((None, len(values)))
+        elif kind == 'int' and None not in values:
+            self.parts.append(('int', np.fromiter(values, dtype=np.int64, count=len(values))))
+        elif kind in ('int', 'float'):
+            self.parts.append(('float', np.array([np.nan if value is None else float(value) for value in values],
+                                                 dtype=np.float64)))
+        elif kind == 'str':
+            self.parts.append(('str', np.fromiter((self._code(value) for value in values), dtype=np.int32,
+                                                  count=len(values))))
+        else:
+            self.parts.append(('object', _object_array(values)))
+
+    def _code(self, value):
+        if value is None:
+            return NULL_CODE
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+    def finish(self):
+        kinds = set(kind for kind, _ in self.parts)
+        nulls = None in kinds
+        kinds.discard(None)
+        if not kinds:
+            kind = 'object'
+        elif kinds <= {'int', 'float'}:
+            kind = 'float' if 'float' in kinds or nulls else 'int'
+        elif kinds == {'str'}:
+            kind = 'str'
+        else:
+            kind = 'object'
+
+        arrays = [self._convert(part_kind, values, kind) for part_kind, values in self.parts]
+        if kind == 'str':
+            return EncodedColumn(np.concatenate(arrays) if arrays else np.empty(0, np.int32),
+                                 self.categories, self.index)
+        dtype = {'int': np.int64, 'float': np.float64}.get(kind, object)
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+
+    def _convert(self, part_kind, values, kind):
+        if part_kind is None:
+            if kind == 'str':
+                return np.full(values, NULL_CODE, dtype=np.int32)
+            if kind == 'float':
+                return np.full(values, np.nan)
+            return np.full(values, None, dtype=object)
+        if part_kind == kind:
+            return values
+        if kind == 'float':
+            return values.astype(np.float64)
+        # mixed column: back to Python values
+        if part_kind == 'str':
+            return EncodedColumn(values, self.categories).decode()
+        return _object_array(values.tolist())
+
+def _object_array(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+def columns_from_chunks(chunks):
+    """
+    :param chunks: iterable of (column names, list of row tuples), e.g. SQLData.fetchchunks
+    :return: Columns
+    """
+    names, builders = None, None
+    for chunk_names, rows in chunks:
+        if builders is None:
+            names = chunk_names
+            builders = [_ColumnBuilder() for _ in names]
+        for builder, values in zip(builders, zip(*rows)):
+            builder.add(values)
+    if builders is None:
+        return Columns()
+    return Columns((name, builder.finish()) for name, builder in zip(names, builders))
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
-from pyrfc3339 import parse
-import MySQLdb
-import MySQLdb.cursors as cursors
+
+# MySQLdb and pyrfc3339 are imported where they are used, so that importing
+# medgen.api (and every SQLData subclass) stays cheap until the first query.
 
 # Backup idea -- oracle's connector:
 #import mysql.connector
@@ -9,7 +9,16 @@ import MySQLdb.cursors as cursors
 #TODO: Streaming result set for very large returns
 #      https://techualization.blogspot.com/2011/12/retrieving-million-of-rows-from-mysql.html
 
+import os
+import sys
+import time
+import weakref
+import threading
+from collections import namedtuple
+
 from ..log import log
+from .. import metrics
+from .rows import make_rows
 
 DEFAULT_HOST = 'localhost'
 DEFAULT_USER = 'medgen'
@@ -17,6 +26,145 @@ DEFAULT_PASS = 'medgen'
 DEFAULT_DATASET = 'medgen'
 
 SQLDATE_FMT = '%Y-%m-%d %H:%M:%S'
+
+# Connections inherited from the parent across os.fork(). The child must neither use them
+# nor let them be garbage collected: closing sends COM_QUIT down the parent's socket.
+_inherited_connections = []
+
+##########################################################################################
+#
+#       Hooks
+#
+##########################################################################################
+
+_connection_factory = None
+_query_listeners = []
+
+# passed to every query listener after a query has been executed.
+#   template: 'Class.method' of the SQLData method that issued the query (e.g. 'GeneDB.gene2pubmed')
+QueryEvent = namedtuple('QueryEvent', ['db', 'sql', 'args', 'seconds', 'rows', 'template'])
+
+# SQLData methods which run queries on behalf of another method (skipped when naming a template).
+_PLUMBING = frozenset(['cursor', 'execute', 'fetchall', 'fetchiter', 'fetchrow', 'fetchID', 'fetchlist',
+                       'fetchchunks', 'fetchcolumns', 'insert', 'update', 'delete', 'schema_info', 'ping'])
+
+DEFAULT_CHUNK_SIZE = 10000   # rows per fetchmany of a streaming cursor
+
+def mysql_connection(db):
+    """
+    The default connection factory: MySQLdb, with the SQLData's config and DictCursor rows.
+    """
+    import MySQLdb
+    import MySQLdb.cursors as cursors
+    return MySQLdb.connect(passwd=db._db_pass,
+                           user=db._db_user,
+                           db=db._db_name,
+                           host=db._db_host,
+                           cursorclass=cursors.DictCursor,
+                           charset='utf8',
+                           use_unicode=True,
+                          )
+
+def get_connection_factory():
+    """
+    :return: the function SQLData.connect uses (mysql_connection unless replaced)
+    """
+    return _connection_factory or mysql_connection
+
+def set_connection_factory(factory):
+    """
+    Connect every SQLData with factory(sqldata) instead of MySQLdb.connect (None restores MySQLdb).
+    The factory returns a DB-API connection whose cursor() yields rows as dictionaries
+    (see medgen.db.embedded). Connections opened before the call are kept until closed.
+
+    :param factory: function of SQLData -> connection, or None
+    :return: the factory set before (None for MySQLdb), to restore it later
+    """
+    global _connection_factory
+    previous, _connection_factory = _connection_factory, factory
+    # values cached from the previous databases no longer apply
+    from .registry import clear_caches
+    clear_caches()
+    return previous
+
+class _ConnectionToken(object):
+    # lives as long as one counted connection (see SQLData.connect)
+    __slots__ = ('__weakref__',)
+
+def _uncount_connection(section):
+    metrics.CONNECTIONS_OPEN.labels(section).dec()
+
+class BufferedStreamCursor(object):
+    """
+    Streaming cursor interface (tuple rows, fetchmany) over an ordinary DictCursor, for
+    connections which cannot stream (all rows are fetched by execute).
+    """
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._rows = None
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, sql, args=None):
+        result = self._cursor.execute(sql, args) if args is not None else self._cursor.execute(sql)
+        self.description = self._cursor.description
+        names = [column[0] for column in self.description or ()]
+        self._rows = iter([tuple(row[name] for name in names) for row in self._cursor.fetchall()])
+        self.rowcount = self._cursor.rowcount
+        return result
+
+    def fetchmany(self, size):
+        return [row for _, row in zip(range(size), self._rows)]
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        self._rows = None
+        self._cursor.close()
+
+def stream_cursor(conn):
+    """
+    :return: unbuffered cursor of conn with tuple rows: MySQLdb's SSCursor, conn.stream_cursor()
+             for connections which provide one, else a BufferedStreamCursor
+    """
+    if getattr(conn, 'stream_cursor', None) is not None:
+        return conn.stream_cursor()
+    if type(conn).__module__.startswith('MySQLdb'):
+        import MySQLdb.cursors
+        return conn.cursor(MySQLdb.cursors.SSCursor)
+    return BufferedStreamCursor(conn.cursor())
+
+def tuple_cursor(conn):
+    """
+    :return: buffered cursor of conn with tuple rows (rowcount known after execute): MySQLdb's
+             Cursor, conn.tuple_cursor() for connections which provide one, else a BufferedStreamCursor
+    """
+    if getattr(conn, 'tuple_cursor', None) is not None:
+        return conn.tuple_cursor()
+    if type(conn).__module__.startswith('MySQLdb'):
+        import MySQLdb.cursors
+        return conn.cursor(MySQLdb.cursors.Cursor)
+    return BufferedStreamCursor(conn.cursor())
+
+def add_query_listener(listener):
+    """
+    Call listener(QueryEvent) after every query run through SQLData.cursor, in the thread that ran it.
+    """
+    _query_listeners.append(listener)
+
+def remove_query_listener(listener):
+    if listener in _query_listeners:
+        _query_listeners.remove(listener)
+
+def _template(db):
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_code.co_name not in _PLUMBING and frame.f_locals.get('self') is db:
+            return '%s.%s' % (type(db).__name__, frame.f_code.co_name)
+        frame = frame.f_back
+    return type(db).__name__
+
 def EscapeString(conn, value):
     if type(value) is bytes:
         # assume it's already escaped to hell
@@ -32,6 +180,7 @@ def SQLdatetime(pydatetime_or_string):
         dtobj = pydatetime_or_string
     else:
         # assume pyrfc3339 string
+        from pyrfc3339 import parse
         dtobj = parse(pydatetime_or_string)
     return dtobj.strftime(SQLDATE_FMT)
 
@@ -40,34 +189,88 @@ class SQLData(object):
     MySQL base class for config, select, insert, update, and delete of medgen linked databases.
 
     See https://dev.mysql.com/doc/connector-python/en/connector-python-example-connecting.html
+
+    Connections are owned per thread and per process: one SQLData can be shared by a thread pool,
+    and a child process forked after the first query transparently opens its own connection.
     """
     def __init__(self, *args, **kwargs):
         self._cfg_section = kwargs.get('config_section', 'DEFAULT')
 
-        from ..config import config
+        from ..config import get_config
+        config = get_config()
         self._db_host = kwargs.get('db_host', None) or config.get(self._cfg_section, 'db_host')
         self._db_user = kwargs.get('db_user', None) or config.get(self._cfg_section, 'db_user')
         self._db_pass = kwargs.get('db_pass', None) or config.get(self._cfg_section, 'db_pass')
         self._db_name = kwargs.get('dataset', None) or config.get(self._cfg_section, 'dataset')
 
         # will be connected upon first query, or can be set up "manually" by doing self.connect()
-        self.conn = None
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        """
+        Connection of the calling thread in the current process (None until connected).
+        """
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # first use in this thread, or we are a forked child holding the parent's connection.
+            if getattr(local, 'conn', None) is not None:
+                _inherited_connections.append(local.conn)
+            local.conn = None
+            local.pid = os.getpid()
+            # not this process' connection: uncount it (see connect)
+            local.counted = None
+        return local.conn
+
+    @conn.setter
+    def conn(self, value):
+        self._local.conn = value
+        self._local.pid = os.getpid()
+
+    def close(self):
+        """
+        Close the calling thread's connection (the next query reconnects).
+        """
+        conn = self.conn
+        if conn is not None:
+            self.conn = None
+            self._local.counted = None
+            conn.close()
+
+    def __getstate__(self):
+        # connections don't travel to other processes (e.g. multiprocessing with spawn).
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
 
     def connect(self):
-        self.conn = MySQLdb.connect(passwd=self._db_pass,
-                                    user=self._db_user,
-                                    db=self._db_name,
-                                    host=self._db_host,
-                                    cursorclass=cursors.DictCursor,
-                                    charset='utf8',
-                                    use_unicode=True,
-                                   )
+        self.conn = get_connection_factory()(self)
+        metrics.CONNECTIONS_OPENED.labels(self._cfg_section).inc()
+        # CONNECTIONS_OPEN goes down again when the token is dropped: by close(), in a forked
+        # child, or with the thread-local when its thread ends or this SQLData is collected.
+        metrics.CONNECTIONS_OPEN.labels(self._cfg_section).inc()
+        self._local.counted = _ConnectionToken()
+        weakref.finalize(self._local.counted, _uncount_connection, self._cfg_section)
         return self.conn
 
-    def cursor(self, execute_sql=None, *args):
-        if not self.conn:
-            self.connect()
-        cursor = self.conn.cursor(cursors.DictCursor)
+    def cursor(self, execute_sql=None, *args, streaming=False, tuples=False):
+        conn = self.conn
+        if not conn:
+            conn = self.connect()
+        # DictCursor: connect() made it the connection's cursorclass.
+        # streaming: rows as tuples, read from the server as they are fetched (see fetchchunks).
+        # tuples: rows as tuples, all read by execute (see fetchall's row_factory).
+        if streaming:
+            cursor = stream_cursor(conn)
+        elif tuples:
+            cursor = tuple_cursor(conn)
+        else:
+            cursor = conn.cursor()
+        start = time.perf_counter()
     
         #DEBUG
         #print('@@@@@')
@@ -81,7 +284,7 @@ class SQLData(object):
                 for arg in args:
                     if hasattr(arg, 'lower'):
                         # ^ this covers bytes, str, and whatever else python comes up with for strings.
-                        escaped.append(EscapeString(self.conn, arg))
+                        escaped.append(EscapeString(conn, arg))
                     else:
                         escaped.append(arg)
                 #print('@@@ escaped args:')
@@ -93,23 +296,86 @@ class SQLData(object):
                 # 'where x LIKE "%blah"')
                 cursor.execute(execute_sql)
 
+            if _query_listeners:
+                event = QueryEvent(self, execute_sql, args, time.perf_counter() - start, cursor.rowcount,
+                                   _template(self))
+                for listener in list(_query_listeners):
+                    listener(event)
+
         return cursor
 
-    def fetchall(self, select_sql, *args):
+    def fetchall(self, select_sql, *args, row_factory=None):
         """ For submitted select_sql with interpolation strings meant to match
         with supplied *args, build and execute the statement and fetch all results.
 
-        Results will be returned as a list of dictionaries.
+        Results will be returned as a list of dictionaries, or of the rows made by
+        row_factory ('record', 'namedtuple' or 'tuple'; see medgen.db.rows).
 
         Example:
             DB.fetchall('select HGVS from clinvar where PMID="%s"', ('21129721',))
+            DB.fetchall('select HGVS from clinvar where PMID="%s"', ('21129721',), row_factory='record')
 
         :param select_sql: (str)
+        :param row_factory: None for dictionaries
         :returns: results as list of dictionaries
         :rtype: list
         """
-        results = self.cursor(select_sql, *args).fetchall()
-        return results
+        if row_factory is None:
+            return self.cursor(select_sql, *args).fetchall()
+        cursor = self.cursor(select_sql, *args, tuples=True)
+        try:
+            return make_rows([column[0] for column in cursor.description or ()], cursor.fetchall(), row_factory)
+        finally:
+            cursor.close()
+
+    def fetchiter(self, select_sql, *args, row_factory=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        fetchall for large results: rows are made one chunk at a time from a streaming cursor
+        (see fetchchunks, and finish the iteration before the next query in this thread).
+
+        :param row_factory: None for dictionaries, 'record', 'namedtuple' or 'tuple'
+        :return: generator of rows
+        """
+        for names, rows in self.fetchchunks(select_sql, *args, chunk_size=chunk_size):
+            for row in make_rows(names, rows, row_factory):
+                yield row
+
+    def fetchchunks(self, select_sql, *args, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Stream a large result without holding it: rows are tuples, read from an unbuffered
+        cursor chunk_size at a time. Read to the end (or close the generator) before running
+        another query in this thread: the connection is busy until then.
+
+        Example:
+            for names, rows in DB.fetchchunks('select GeneID, PMID from gene2pubmed'):
+                ...
+
+        :return: generator of (column names, list of row tuples); one empty chunk if no rows
+        """
+        cursor = self.cursor(select_sql, *args, streaming=True)
+        try:
+            names = [column[0] for column in cursor.description or ()]
+            empty = True
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                empty = False
+                yield names, rows
+            if empty:
+                yield names, []
+        finally:
+            cursor.close()
+
+    def fetchcolumns(self, select_sql, *args, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Columnar result: NumPy arrays built chunk by chunk from a streaming cursor, string
+        columns dictionary-encoded (see medgen.db.columnar).
+
+        :return: medgen.db.columnar.Columns
+        """
+        from .columnar import columns_from_chunks
+        return columns_from_chunks(self.fetchchunks(select_sql, *args, chunk_size=chunk_size))
 
     def fetchrow(self, select_sql, *args):
         """
@@ -255,13 +521,16 @@ class SQLData(object):
 
     def ping(self):
         """
-        Same effect as calling 'mysql> call mem'
-        :returns::self.schema_info(()
+        The connection's own ping(), then same effect as calling 'mysql> call mem'
+        :returns::self.schema_info(), or False if the connection is dead
         """
         try:
+            conn = self.conn or self.connect()
+            conn.ping()
             return self.schema_info()
-        except MySQLdb.Error as err:
-            log.error('DB connection is dead %d: %s' % (err.args[0], err.args[1]))
+        except Exception as err:
+            # MySQLdb.Error, sqlite3.Error, ...: whichever driver the connection factory uses
+            log.error('DB connection is dead: %r', err)
             return False
 
     def schema_info(self):
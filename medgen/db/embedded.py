@@ -0,0 +1,295 @@
+""" Embedded (sqlite3) stand-in for medgen-mysql, for benchmarks and tests without a MySQL server.
+
+    from medgen.db import embedded
+    embedded.build('bench-db/', scale=1)    # medgen.synthetic contents, one sqlite file per database
+    embedded.use('bench-db/')               # every SQLData now connects here instead of MySQL
+
+Each connection opens the file of its own database and attaches all of them under their
+database names, so schema-qualified queries ('select * from hugo.hugo_info ...') still work.
+SQL is passed through with MySQLdb's %s placeholders translated; 'call mem' lists the tables and
+'explain <select>' returns sqlite's query plan as MySQL-style EXPLAIN rows.
+"""
+import os
+import re
+import random
+import sqlite3
+from collections import OrderedDict
+
+from ..log import log
+from .dataset import set_connection_factory
+
+DEFAULT_BATCH_SIZE = 5000
+
+def _database(section):
+    from ..config import get_config
+    return get_config().get(section, 'dataset', fallback=section)
+
+def _path(directory, database):
+    return os.path.join(directory, database + '.sqlite')
+
+##########################################################################################
+#
+#       Build
+#
+##########################################################################################
+
+def _column_sql(name, type_):
+    # MySQL's default collation compares strings without case ('c9orf72' = 'C9orf72'): so does sqlite's nocase.
+    if type_.split('(')[0].lower() in ('char', 'varchar', 'text'):
+        return '%s %s collate nocase' % (name, type_)
+    return '%s %s' % (name, type_)
+
+def build(directory, scale=1.0, seed=0, exponent=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Create one sqlite file per medgen-mysql database in directory, filled with a SyntheticDataset.
+
+    :return: OrderedDict {(section, table): rows}
+    """
+    from ..synthetic import SyntheticDataset, TABLES, LOG_COLUMNS, DEFAULT_EXPONENT
+
+    os.makedirs(directory, exist_ok=True)
+    dataset = SyntheticDataset(scale, seed, DEFAULT_EXPONENT if exponent is None else exponent)
+    conns = OrderedDict()
+    for section, tables in TABLES.items():
+        path = _path(directory, _database(section))
+        if os.path.exists(path):
+            os.remove(path)
+        conn = conns[section] = sqlite3.connect(path)
+        conn.execute('pragma journal_mode = off')
+        conn.execute('pragma synchronous = off')
+        for table, (columns, indexes) in list(tables.items()) + [('log', (LOG_COLUMNS, []))]:
+            conn.execute('create table %s (%s)' % (table, ', '.join(_column_sql(name, type_)
+                                                                     for name, type_ in columns.items())))
+
+    buffers = OrderedDict()
+    counts = OrderedDict(((section, table), 0) for section, tables in TABLES.items() for table in tables)
+
+    def flush(section, table):
+        rows = buffers.pop((section, table))
+        conns[section].executemany('insert into %s values (%s)' % (table, ','.join('?' * len(rows[0]))), rows)
+
+    for section, table, row in dataset.rows():
+        buffers.setdefault((section, table), []).append(row)
+        counts[section, table] += 1
+        if len(buffers[section, table]) >= batch_size:
+            flush(section, table)
+    for section, table in list(buffers):
+        flush(section, table)
+
+    for section, conn in conns.items():
+        for table, (columns, indexes) in TABLES[section].items():
+            for column in indexes:
+                conn.execute('create index idx_%s_%s on %s (%s)' % (table, column, table, column))
+        events = [(table, 'rows loaded %d' % counts[section, table]) for table in TABLES[section]]
+        events.append(('load_database.sh', 'done'))
+        conn.executemany("insert into log values (?, datetime('now'), ?, ?)",
+                         [(idx, entity, message) for idx, (entity, message) in enumerate(events, 1)])
+        conn.commit()
+        conn.close()
+    log.info('embedded medgen-mysql (scale %s, seed %s) built in %s', scale, seed, directory)
+    return counts
+
+##########################################################################################
+#
+#       Connection
+#
+##########################################################################################
+
+def _translate(sql, args):
+    # MySQL statement and arguments -> sqlite (placeholders, 'call mem')
+    sql = sql.strip().rstrip(';')
+    if sql.lower() == 'call mem':
+        return "select 'main' as table_schema, type as engine, name as table_name " \
+               "from sqlite_master where type = 'table'", None
+    if args is not None:
+        if isinstance(args, dict):
+            sql = _translate_named(sql)
+        else:
+            sql = sql.replace('%%', '\0').replace('%s', '?').replace('\0', '%')
+            args = tuple(args)
+    return sql, args
+
+class EmbeddedCursor(object):
+    """
+    Just enough of MySQLdb's DictCursor: execute, fetchall, fetchone, rowcount, lastrowid, close.
+    """
+    def __init__(self, conn):
+        self._conn = conn
+        self._rows = []
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def execute(self, sql, args=None):
+        sql, args = _translate(sql, args)
+        if sql[:8].lower() == 'explain ':
+            return self._explain(sql[8:], args)
+        cursor = self._conn.sqlite.execute(sql, args or ())
+        self.description = cursor.description
+        if cursor.description:
+            names = [column[0] for column in cursor.description]
+            self._rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+            self.rowcount = len(self._rows)
+        else:
+            self._rows = []
+            self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid
+        self._conn._last_insert_id = cursor.lastrowid or 0
+        return self.rowcount
+
+    def _explain(self, sql, args):
+        # EXPLAIN QUERY PLAN, as rows shaped like MySQL's EXPLAIN (rows estimates are not available).
+        plan = []
+        for _, _, _, detail in self._conn.sqlite.execute('explain query plan ' + sql, args or ()):
+            row = _plan_row(detail)
+            if row is not None:
+                plan.append(row)
+            elif plan:
+                plan[-1]['Extra'] = '%s; %s' % (plan[-1]['Extra'], detail)
+        self._rows = plan
+        self.rowcount = len(plan)
+        return self.rowcount
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        self._rows = []
+
+class EmbeddedStreamCursor(object):
+    """
+    Unbuffered cursor (like MySQLdb's SSCursor): tuple rows, read from sqlite as they are fetched.
+    """
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = None
+        self.rowcount = -1
+        self.description = None
+
+    def execute(self, sql, args=None):
+        sql, args = _translate(sql, args)
+        self._cursor = self._conn.sqlite.execute(sql, args or ())
+        self.description = self._cursor.description
+        return self.rowcount
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def close(self):
+        if self._cursor is not None:
+            self._cursor.close()
+
+class EmbeddedTupleCursor(EmbeddedStreamCursor):
+    """
+    Buffered cursor with tuple rows (like MySQLdb's Cursor): execute reads them all.
+    """
+    def execute(self, sql, args=None):
+        sql, args = _translate(sql, args)
+        self._cursor = self._conn.sqlite.execute(sql, args or ())
+        self.description = self._cursor.description
+        self._rows = self._cursor.fetchall() if self.description else []
+        self.rowcount = len(self._rows) if self.description else self._cursor.rowcount
+        return self.rowcount
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+_PLAN_STEP = re.compile(r'^(SCAN|SEARCH) (?:TABLE )?(\S+)(?: AS (\S+))?(?: USING (.*))?$')
+_PLAN_INDEX = re.compile(r'(AUTOMATIC )?(?:PARTIAL )?(COVERING )?INDEX (\S+)')
+
+def _plan_row(detail):
+    """
+    One step of sqlite's query plan ('SEARCH gene_info USING INDEX idx_gene_info_GeneID (GeneID=?)')
+    as a MySQL EXPLAIN row. type: ALL (full scan), index (full index scan), ref (index lookup),
+    eq_ref (primary key). Returns None for steps which read no table (temp b-trees, subqueries).
+    """
+    step = _PLAN_STEP.match(detail)
+    if step is None:
+        return None
+    kind, table, alias, using = step.groups()
+    index = _PLAN_INDEX.match(using or '')
+    if using and 'PRIMARY KEY' in using:
+        access, key = 'eq_ref', 'PRIMARY'
+    elif index and not index.group(1):
+        access, key = 'ref' if kind == 'SEARCH' else 'index', index.group(3)
+    else:
+        # automatic indexes are built by scanning the whole table, for this query only.
+        access, key = 'ALL', None
+    return OrderedDict([('id', 1), ('select_type', 'SIMPLE'), ('table', alias or table), ('type', access),
+                        ('possible_keys', key), ('key', key), ('rows', None), ('Extra', detail)])
+
+def _translate_named(sql):
+    # %(name)s -> :name
+    return re.sub(r'%\((\w+)\)s', r':\1', sql)
+
+class EmbeddedConnection(object):
+    """
+    sqlite3 connection with the parts of the MySQLdb connection interface SQLData uses.
+    """
+    def __init__(self, directory, database):
+        path = _path(directory, database)
+        if not os.path.exists(path):
+            raise RuntimeError('no embedded database %s (see medgen.db.embedded.build)' % path)
+        self.sqlite = sqlite3.connect(path)
+        self.sqlite.create_function('rand', 0, random.random)
+        # its own file too, for queries naming their own database ('select * from hugo.hugo_info').
+        for name in os.listdir(directory):
+            if name.endswith('.sqlite'):
+                self.sqlite.execute('attach database ? as %s' % name[:-len('.sqlite')],
+                                    (os.path.join(directory, name),))
+        self._last_insert_id = 0
+
+    def cursor(self, cursorclass=None):
+        return EmbeddedCursor(self)
+
+    def stream_cursor(self):
+        return EmbeddedStreamCursor(self)
+
+    def tuple_cursor(self):
+        return EmbeddedTupleCursor(self)
+
+    def escape_string(self, value):
+        # arguments are bound by sqlite, never spliced into the SQL.
+        return value
+
+    def insert_id(self):
+        return self._last_insert_id
+
+    def commit(self):
+        self.sqlite.commit()
+
+    def ping(self, *args):
+        return True
+
+    def close(self):
+        self.sqlite.close()
+
+def connect(directory, database):
+    return EmbeddedConnection(directory, database)
+
+def use(directory):
+    """
+    Connect every SQLData to the embedded databases in directory (see build).
+    SQLData instances that already hold a connection keep it until closed.
+    """
+    directory = os.path.abspath(directory)
+    set_connection_factory(lambda db: EmbeddedConnection(directory, db._db_name))
+
+def prepare(directory, scale=1.0, seed=0, rebuild=False):
+    """
+    use(directory), building the embedded databases first if any is missing (or rebuild is set).
+    """
+    from ..synthetic import TABLES
+    missing = [section for section in TABLES if not os.path.exists(_path(directory, _database(section)))]
+    if rebuild or missing:
+        build(directory, scale=scale, seed=seed)
+    use(directory)
@@ -0,0 +1,281 @@
+""" Query plan audit: EXPLAIN for the queries of every SQLData method in medgen.db.
+
+    medgen-explain                              # the configured MySQL databases
+    medgen-explain --embedded bench-db/         # offline, sqlite query plans (see medgen.db.embedded)
+
+Each method in SAMPLES is called once with its sample arguments, the queries it runs are
+captured with a query listener (see medgen.db.dataset.QueryEvent) and each distinct statement
+is run again as 'explain <statement>'. For every table it reads the report gives the access
+type, the key used and MySQL's estimate of the rows examined, with findings:
+
+    full scan           type ALL: every row of the table is read
+    full index scan     type index: every entry of an index is read
+    no usable index     no index could be considered for the table at all
+    filesort, temporary the result is sorted / grouped through a temporary table
+
+Templates issued by medgen.api functions (see medgen.benchmark.CASES) are hot: a full scan of a
+hot template (over at least MIN_SCAN_ROWS rows, where the estimate is known) fails the audit
+(exit status 1) unless it is listed in ACCEPTED with the reason it cannot be avoided.
+"""
+import sys
+import json
+import argparse
+from collections import OrderedDict
+
+from ..log import log
+from .dataset import add_query_listener, remove_query_listener
+from .gene import GeneDB, GeneBorg
+from .clinvar import ClinVarDB
+from .medgen import MedGenDB
+from .hugo import HugoDB
+from .pubmed import PubMedDB
+from .personalgenomes import PersonalGenomesDB
+from .registry import get_db
+
+MIN_SCAN_ROWS = 1000    # MySQL full scans estimated below this many rows are not failures
+
+# (SQLData class, method, sample arguments). Only methods which read: nothing here may write.
+SAMPLES = [
+    (GeneDB,    'gene2pubmed',                  (7157,)),
+    (GeneDB,    'get_gene_id_for_gene_name',    ('TP53',)),
+    (GeneDB,    'get_gene_ids_for_gene_names',  (['TP53', 'BRCA2'],)),
+    (GeneDB,    'get_gene_id',                  ('TP53',)),
+    (GeneDB,    'get_gene_ids',                 (['TP53', 675],)),
+    (GeneDB,    'gene2mim',                     (675,)),
+    (GeneDB,    'gene_function',                (7157,)),
+    (GeneDB,    'get_gene_name',                (675,)),
+    (GeneDB,    'get_gene_names',               ([675, 672],)),
+    (GeneDB,    'get_gene_info',                (675,)),
+    (GeneDB,    'get_gene_synonyms',            ('BRCA2',)),
+    (GeneDB,    'get_gene_list_from_mim',       (600185,)),
+
+    (ClinVarDB, 'clinvar_ids',                  ('NM_001232.3:c.919G>C',)),
+    (ClinVarDB, 'clinvar_ids_many',             (['NM_001232.3:c.919G>C', 'NM_000410.3:c.845G>A'],)),
+    (ClinVarDB, 'accession_for_hgvs_text',      ('NM_001232.3:c.919G>C',)),
+    (ClinVarDB, 'allele_id_for_hgvs_text',      ('NM_001232.3:c.919G>C',)),
+    (ClinVarDB, 'variation_id_for_hgvs_text',   ('NM_001232.3:c.919G>C',)),
+    (ClinVarDB, 'hgvs_text_for_variation_id',   (17610,)),
+    (ClinVarDB, 'variant_summary',              ('NM_000410.3:c.845G>A',)),
+    (ClinVarDB, 'var_citations',                ('NM_000410.3:c.845G>A',)),
+    (ClinVarDB, 'molecular_consequences',       ('NM_000410.3:c.845G>A',)),
+    (ClinVarDB, 'random_example_hgvs',          (1,)),
+    (ClinVarDB, 'disease_name',                 ('C0006142',)),
+    (ClinVarDB, 'gene2condition',               (675,)),
+    (ClinVarDB, 'gene2condition_for_concept',   ('C0006142',)),
+    (ClinVarDB, 'gene_summary',                 (675,)),
+    (ClinVarDB, 'gene_to_clinical_significance_type_frequency', (7157,)),
+    (ClinVarDB, 'select_clinvar_gene_list_for_cui', ('C0006142',)),
+    (ClinVarDB, 'get_version',                  ()),
+
+    (MedGenDB,  'disease_subtypes',             ('C0006142',)),
+    (MedGenDB,  'disease_parents',              ('C0007194',)),
+    (MedGenDB,  'concept_name',                 ('C0006142',)),
+    (MedGenDB,  'concept_names',                (['C0006142', 'C0007194'],)),
+    (MedGenDB,  'concept_definition',           ('C0006142',)),
+    (MedGenDB,  'concept_relations',            ('C0006142',)),
+    (MedGenDB,  'concept_sources',              ('C0006142',)),
+    (MedGenDB,  'medgen2umls',                  (651,)),
+    (MedGenDB,  'umls2medgen',                  ('C0006142',)),
+    (MedGenDB,  'get_concept_id',               (651,)),
+    (MedGenDB,  'get_concept_ids',              ([651, 'C0007194'],)),
+    (MedGenDB,  'select_hpo_view_medgen_hpo',   ('C0006142',)),
+    (MedGenDB,  'select_mim_from_cui',          ('C0006142',)),
+
+    (HugoDB,    'hugo_info',                    ('BRCA2',)),
+    (HugoDB,    'get_locus_specific_databases', ('BRCA2',)),
+
+    (PubMedDB,  'abstract_text',                (10000000,)),
+    (PubMedDB,  'medline_xml_select_ids',       ()),
+    (PubMedDB,  'medline_xml_select_by_pmid',   (10000000,)),
+    (PubMedDB,  'medline_xml_select_by_pmid_and_max_tstamp', (10000000, '2016-01-01 00:00:00')),
+    (PubMedDB,  'medline_xml_select_by_id',     (1,)),
+
+    (PersonalGenomesDB, 'bionotate__gene_aa_pos', ('BRCA2', '2722')),
+]
+
+# public methods of the SQLData classes left out of SAMPLES: 'Class.method' -> reason
+SKIPPED = OrderedDict([
+    ('PubMedDB.medline_xml_filename_insert', 'writes'),
+    ('PubMedDB.medline_xml_update',          'writes'),
+])
+
+# hot templates whose full scans are known and accepted: template -> reason
+ACCEPTED = OrderedDict([
+    ('GeneDB.get_gene_synonyms',
+     "Synonyms like '%|X|%' cannot use an index; needs a gene_synonyms (Symbol, Synonym) table"),
+])
+
+##########################################################################################
+#
+#       Audit
+#
+##########################################################################################
+
+def hot_templates():
+    """
+    :return: set of the 'Class.method' templates issued by the medgen.api functions
+    """
+    from ..benchmark import CASES, _api_function
+    templates = set()
+
+    def listener(event):
+        templates.add(event.template)
+
+    add_query_listener(listener)
+    try:
+        for function, label, argument in CASES:
+            try:
+                _api_function(function)(argument)
+            except Exception as err:
+                log.debug('hot_templates: %s(%r) failed: %r', function, argument, err)
+    finally:
+        remove_query_listener(listener)
+    return templates
+
+def capture(db_class, method, args):
+    """
+    Call db_class.method(*args) on the shared instance and capture the queries it runs.
+
+    :return: (list of QueryEvent, error or None)
+    """
+    events = []
+    # GeneDB caches symbol lookups and gene2pubmed: start empty so their queries are seen.
+    GeneBorg.clear()
+    add_query_listener(events.append)
+    try:
+        getattr(get_db(db_class), method)(*args)
+        error = None
+    except Exception as err:
+        error = err
+    finally:
+        remove_query_listener(events.append)
+    return events, error
+
+def explain(db, sql, args=()):
+    """
+    :return: list of EXPLAIN rows (dicts with at least table, type, key, rows, Extra)
+    """
+    return db.fetchall('explain ' + sql.strip(), *args)
+
+def findings(row):
+    """
+    :param row: one EXPLAIN row
+    :return: list of finding names (see module docstring)
+    """
+    found = []
+    access = row.get('type')
+    if access == 'ALL':
+        found.append('full scan')
+    elif access == 'index':
+        found.append('full index scan')
+    if access in ('ALL', 'index') and not row.get('possible_keys'):
+        found.append('no usable index')
+    extra = row.get('Extra') or ''
+    if 'filesort' in extra or 'TEMP B-TREE FOR ORDER BY' in extra:
+        found.append('filesort')
+    if 'temporary' in extra or 'TEMP B-TREE FOR GROUP BY' in extra or 'TEMP B-TREE FOR DISTINCT' in extra:
+        found.append('temporary')
+    return found
+
+def _failing(row):
+    return row.get('type') == 'ALL' and (row.get('rows') is None or row['rows'] >= MIN_SCAN_ROWS)
+
+def audit(samples=None, hot=None, select=None):
+    """
+    Run EXPLAIN for the queries of every sample method.
+
+    :param samples: list of (SQLData class, method, args), default SAMPLES
+    :param hot: set of hot templates, default hot_templates()
+    :param select: optional substring; only templates containing it are audited
+    :return: list of OrderedDict {template, hot, accepted, error, statements: [{sql, args, plan}], findings, failed}
+    """
+    samples = SAMPLES if samples is None else samples
+    hot = hot_templates() if hot is None else hot
+    report = []
+    for db_class, method, args in samples:
+        template = '%s.%s' % (db_class.__name__, method)
+        if select and select not in template:
+            continue
+        entry = OrderedDict([('template', template), ('hot', template in hot),
+                             ('accepted', ACCEPTED.get(template)), ('error', None),
+                             ('statements', []), ('findings', []), ('failed', False)])
+        events, error = capture(db_class, method, args)
+        if error is not None:
+            entry['error'] = repr(error)
+
+        seen = set()
+        for event in events:
+            key = (event.sql, repr(event.args))
+            if key in seen:
+                continue
+            seen.add(key)
+            statement = OrderedDict([('sql', ' '.join(event.sql.split())), ('args', list(event.args)),
+                                     ('template', event.template), ('plan', [])])
+            try:
+                statement['plan'] = [dict(row) for row in explain(event.db, event.sql, event.args)]
+            except Exception as err:
+                statement['error'] = repr(err)
+            for row in statement['plan']:
+                for finding in findings(row):
+                    note = '%s: %s' % (row.get('table'), finding)
+                    if note not in entry['findings']:
+                        entry['findings'].append(note)
+                if entry['hot'] and not entry['accepted'] and _failing(row):
+                    entry['failed'] = True
+            entry['statements'].append(statement)
+        report.append(entry)
+    return report
+
+def format_audit(report):
+    lines = []
+    for entry in report:
+        status = 'FAIL' if entry['failed'] else ('error' if entry['error'] and not entry['statements'] else 'ok')
+        lines.append('%-5s %-4s %s' % (status, 'hot' if entry['hot'] else '', entry['template']))
+        for statement in entry['statements']:
+            lines.append('        %s' % statement['sql'][:160])
+            for row in statement['plan']:
+                lines.append('          %-26s %-7s key=%-28s rows=%s' % (
+                    row.get('table'), row.get('type'), row.get('key'), row.get('rows')))
+            if statement.get('error'):
+                lines.append('          explain failed: %s' % statement['error'])
+        for finding in entry['findings']:
+            lines.append('        - %s' % finding)
+        if entry['accepted'] and entry['findings']:
+            lines.append('        accepted: %s' % entry['accepted'])
+        if entry['error']:
+            lines.append('        error: %s' % entry['error'])
+    failed = [entry['template'] for entry in report if entry['failed']]
+    lines.append('%d templates, %d hot, %d failed%s' % (
+        len(report), sum(entry['hot'] for entry in report), len(failed),
+        (': ' + ', '.join(failed)) if failed else ''))
+    return '\n'.join(lines)
+
+##########################################################################################
+#
+#       CLI
+#
+##########################################################################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='medgen-explain', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--embedded', metavar='DIRECTORY',
+                        help='audit embedded synthetic databases in DIRECTORY (built if needed)')
+    parser.add_argument('--scale', type=float, default=1.0, help='synthetic scale of a new embedded build')
+    parser.add_argument('-k', '--select', help='only templates containing this, e.g. ClinVarDB.')
+    parser.add_argument('--json', action='store_true', help='write the report as JSON to stdout')
+    args = parser.parse_args(argv)
+
+    if args.embedded:
+        from . import embedded
+        embedded.prepare(args.embedded, args.scale)
+    report = audit(select=args.select)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, default=str)
+        sys.stdout.write('\n')
+    else:
+        sys.stdout.write(format_audit(report) + '\n')
+    return 1 if any(entry['failed'] for entry in report) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,27 @@
+from .. import metrics
 from .dataset import SQLData
 
+##########################################################################################
+#
+#       SQL (shared with medgen.db.aio)
+#
+##########################################################################################
+
+GENE_ID_SQL       = 'select GeneID as ID from gene_info where Symbol = %s limit 1'
+GENE_NAME_SQL     = 'select Symbol as ID from gene_info where GeneID = %s limit 1'
+GENE_INFO_SQL     = 'select * from gene_info where GeneID = %s limit 1'
+GENE2PUBMED_SQL   = 'select PMID from gene2pubmed where GeneID = %s'
+GENE2MIM_SQL      = 'select * from mim2gene_medgen where GeneID = %s'
+GENE_FUNCTION_SQL = 'select distinct pubmeds, GeneRIF from generifs_basic where GeneID = %s'
+GENE_SYNONYMS_SQL = """select Synonyms, Symbol, GeneID from gene_info where
+            Symbol = %s OR
+            (Synonyms   = %s or
+            Synonyms like %s or
+            Synonyms like %s or
+            Synonyms like %s) OR
+        Nomen_symbol = %s
+        """
+
 ##########################################################################################
 #
 #       SQLData Class
@@ -16,6 +38,16 @@ class GeneBorg:
         self.__dict__ = self.__shared_state
         self._db = db
 
+    @classmethod
+    def clear(cls):
+        """
+        Forget the cached gene2pubmed lists and gene ids (e.g. after switching databases),
+        and the GeneDB they came from.
+        """
+        cls.__gene2pubmed.clear()
+        cls.__gene2id.clear()
+        cls.__shared_state.pop('_db', None)
+
     def gene2pubmed(self, ncbi_gene_id):
         """
         mysql> desc gene.gene2pubmed;
@@ -26,18 +58,46 @@ class GeneBorg:
         +--------+------------------+------+-----+---------+-------+
         """
         ncbi_gene_id = self._db.get_gene_id(ncbi_gene_id)
+        metrics.cache_lookup('gene2pubmed', ncbi_gene_id in self.__gene2pubmed)
         if ncbi_gene_id not in self.__gene2pubmed:
-            self.__gene2pubmed[ncbi_gene_id] = self._db.fetchall('select PMID from gene2pubmed where GeneID = "{}"'.format(ncbi_gene_id))
+            self.__gene2pubmed[ncbi_gene_id] = self._db.fetchall(GENE2PUBMED_SQL, ncbi_gene_id)
             self.cnt += 1
         return self.__gene2pubmed[ncbi_gene_id]
 
     def get_gene_id_for_gene_name(self, hgnc_gene_name_symbol):
+        metrics.cache_lookup('gene2id', hgnc_gene_name_symbol in self.__gene2id)
         if hgnc_gene_name_symbol not in self.__gene2id:
-            self.__gene2id[hgnc_gene_name_symbol] = self._db.fetchID('select GeneID as ID from gene_info where Symbol = "{}" limit 1'.format(hgnc_gene_name_symbol.upper()))
+            gene_id = self._db.fetchID(GENE_ID_SQL, hgnc_gene_name_symbol.upper())
             self.cnt += 1
+            if gene_id is None:
+                # not cached, as in get_gene_ids_for_gene_names
+                return None
+            self.__gene2id[hgnc_gene_name_symbol] = gene_id
 
         return self.__gene2id[hgnc_gene_name_symbol]
 
+    def get_gene_ids_for_gene_names(self, hgnc_gene_name_symbols):
+        """
+        Batch of get_gene_id_for_gene_name: one query for all symbols not already cached.
+        """
+        missing = [symbol for symbol in set(hgnc_gene_name_symbols) if symbol not in self.__gene2id]
+        metrics.CACHE_REQUESTS.labels('gene2id', 'miss').inc(len(missing))
+        metrics.CACHE_REQUESTS.labels('gene2id', 'hit').inc(len(set(hgnc_gene_name_symbols)) - len(missing))
+        if missing:
+            rows = self._db.fetchall('select Symbol, GeneID from gene_info where Symbol in ({})'.format(
+                                     ','.join(['%s'] * len(missing))), *[symbol.upper() for symbol in missing])
+            # gene_info keeps the official case (C9orf72): match as MySQL's collation does.
+            found = {}
+            for row in rows:
+                found.setdefault(row['Symbol'].upper(), row['GeneID'])
+            for symbol in missing:
+                # misses are not cached: a later single lookup asks the database again.
+                if found.get(symbol.upper()) is not None:
+                    self.__gene2id[symbol] = found[symbol.upper()]
+            self.cnt += 1
+
+        return dict((symbol, self.__gene2id.get(symbol)) for symbol in hgnc_gene_name_symbols)
+
 class GeneDB(SQLData):
     """
     NCBI Entrez Gene contains links to pubmed (gene2pubmed), MedGen, OMIM, and other sources.
@@ -62,6 +122,14 @@ class GeneDB(SQLData):
         """
         return GeneBorg(self).get_gene_id_for_gene_name(hgnc_gene_name_symbol)
 
+    def get_gene_ids_for_gene_names(self, hgnc_gene_name_symbols):
+        """
+        cached: Get GeneID (ncbi entrez) for many GeneNames (hugo hgnc) in one query
+        :param hgnc_gene_name_symbols: list of gene symbols
+        :return: dict {symbol: GeneID or None}
+        """
+        return GeneBorg(self).get_gene_ids_for_gene_names(hgnc_gene_name_symbols)
+
     def gene2mim(self, ncbi_gene_id):
         """
         Online Mendelian Inheritance in Man (OMIM) is a standard reference
@@ -81,18 +149,19 @@ class GeneDB(SQLData):
         :return: OMIM identifiers with links to MedGen.
         """
         ncbi_gene_id = self.get_gene_id(ncbi_gene_id)
-        return self.fetchall('select * from mim2gene_medgen where GeneID = {}'.format(ncbi_gene_id))
+        return self.fetchall(GENE2MIM_SQL, ncbi_gene_id)
 
-    def gene_function(self, ncbi_gene_id):
+    def gene_function(self, ncbi_gene_id, row_factory=None):
         """
         get gene-reference-in-function (RIF) for a given gene id.
         This is a textual description of what the gene actually DOES.
 
         :param ncbi_gene_id:  int
+        :param row_factory: None for dicts, or 'record' (see medgen.db.rows)
         :return: SQL result GeneRIF with list of pubmeds
         """
         ncbi_gene_id = self.get_gene_id(ncbi_gene_id)
-        return self.fetchall('select distinct pubmeds, GeneRIF from generifs_basic where GeneID = {}'.format(ncbi_gene_id))
+        return self.fetchall(GENE_FUNCTION_SQL, ncbi_gene_id, row_factory=row_factory)
 
     def get_gene_id(self, gene):
         """
@@ -110,6 +179,25 @@ class GeneDB(SQLData):
         else:
             return gene
 
+    def get_gene_ids(self, genes):
+        """
+        Batch of get_gene_id: gene names are resolved with one query, gene ids are passed through.
+        :param genes: list of Entrez gene ids and/or HGNC gene names
+        :return: dict {gene: GeneID}
+        """
+        names = []
+        found = {}
+        for gene in genes:
+            try:
+                int(gene)
+            except ValueError:
+                names.append(gene)
+            else:
+                found[gene] = gene
+        if names:
+            found.update(self.get_gene_ids_for_gene_names(names))
+        return found
+
     def get_gene_name(self, ncbi_gene_id):
         """
         Get HUGO Gene Name (Symbol) for Entrez gene ID
@@ -117,7 +205,24 @@ class GeneDB(SQLData):
         :return: string
         """
         ncbi_gene_id = self.get_gene_id(ncbi_gene_id)
-        return self.fetchID('select Symbol as ID from gene_info where GeneID = {} limit 1'.format(ncbi_gene_id))
+        return self.fetchID(GENE_NAME_SQL, ncbi_gene_id)
+
+    def get_gene_names(self, genes):
+        """
+        Batch of get_gene_name: one query for many genes.
+        :param genes: list of Entrez gene ids (or HGNC gene names)
+        :return: dict {gene: Symbol or None}
+        """
+        gene_ids = self.get_gene_ids(genes)
+        wanted = set(int(gene_id) for gene_id in gene_ids.values() if gene_id is not None)
+        symbols = {}
+        if wanted:
+            rows = self.fetchall('select GeneID, Symbol from gene_info where GeneID in ({})'.format(
+                                 ','.join(str(gene_id) for gene_id in sorted(wanted))))
+            for row in rows:
+                symbols.setdefault(row['GeneID'], row['Symbol'])
+        return dict((gene, None if gene_id is None else symbols.get(int(gene_id)))
+                    for gene, gene_id in gene_ids.items())
 
     def get_gene_info(self, ncbi_gene_id):
         """
@@ -147,7 +252,9 @@ class GeneDB(SQLData):
         +--------------+------------------+------+-----+---------+-------+
         """
         ncbi_gene_id = self.get_gene_id(ncbi_gene_id)
-        return self.fetchrow('select * from gene_info where GeneID = %s limit 1'.format(ncbi_gene_id))
+        if ncbi_gene_id is None:
+            return None
+        return self.fetchrow(GENE_INFO_SQL, int(ncbi_gene_id))
 
     def get_gene_synonyms(self, symbol):
         """
@@ -162,15 +269,7 @@ class GeneDB(SQLData):
                         '%|' + symbol + '|%', # symbol in middle of list
                         symbol                # identity Nomen_symbol placement
                        )
-        _sql = """select Synonyms, Symbol, GeneID from gene_info where 
-            Symbol = %s OR
-            (Synonyms   = %s or
-            Synonyms like %s or
-            Synonyms like %s or
-            Synonyms like %s) OR
-        Nomen_symbol = %s
-        """
-        return self.fetchall(_sql, *permutations)
+        return self.fetchall(GENE_SYNONYMS_SQL, *permutations)
 
     def get_gene_list_from_mim(self, mim):
         mim = str(mim)
@@ -1,6 +1,15 @@
 from .dataset import SQLData
 from ..parse.gene import Gene
 
+##########################################################################################
+#
+#       SQL (shared with medgen.db.aio)
+#
+##########################################################################################
+
+LOCUS_SPECIFIC_DATABASES_SQL = ('select LocusSpecificDatabases, GeneFamilyTag, pubmeds '
+                                'from hugo_info where Symbol = %s')
+
 ##########################################################################################
 #
 #       SQLData Class
@@ -62,7 +71,4 @@ class HugoDB(SQLData):
         """
         gene = Gene(gene_symbol)
 
-        return self.fetchrow(
-            "select LocusSpecificDatabases, GeneFamilyTag, pubmeds "
-            "from hugo_info where Symbol = '?' ".
-            replace('?', str(gene.name)))
+        return self.fetchrow(LOCUS_SPECIFIC_DATABASES_SQL, gene.name)
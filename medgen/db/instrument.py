@@ -0,0 +1,96 @@
+""" Query counting: how many queries a block of code runs, and which of them repeat.
+
+    with QueryCounter(budget=2) as queries:
+        GeneInfo('BRCA2')
+    queries.count           # 2
+    queries.by_template()   # Counter({'GeneDB.get_gene_id_for_gene_name': 1, 'GeneDB.get_gene_info': 1})
+
+Leaving the block raises QueryBudgetExceeded (an AssertionError, so tests report it as a failure)
+if more than budget queries ran. The same statement with the same arguments running warn_repeats
+times inside one block is logged as a warning: it is usually an N+1 pattern or a missing cache.
+"""
+import threading
+from collections import OrderedDict, Counter
+
+from ..log import log
+from .dataset import add_query_listener, remove_query_listener
+
+DEFAULT_WARN_REPEATS = 2
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class QueryCounter(object):
+    """
+    Context manager collecting the QueryEvents (see medgen.db.dataset) run inside the block.
+
+    :param budget: maximum number of queries, or None for no limit
+    :param warn_repeats: log a warning when one (sql, args) runs this many times (None: never)
+    :param all_threads: also count queries run by other threads (e.g. AnnotatePanel's thread pool);
+                        by default only the thread which entered the block is counted
+    :param label: names the block in warnings and errors
+    """
+    def __init__(self, budget=None, warn_repeats=DEFAULT_WARN_REPEATS, all_threads=False, label=None):
+        self.budget = budget
+        self.warn_repeats = warn_repeats
+        self.all_threads = all_threads
+        self.label = label or 'block'
+        self.events = []
+        self._repeats = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.get_ident()
+        add_query_listener(self._on_query)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        remove_query_listener(self._on_query)
+        if exc_type is None and self.budget is not None and self.count > self.budget:
+            raise QueryBudgetExceeded('%s ran %d queries (budget %d):\n%s' % (
+                self.label, self.count, self.budget, self.report()))
+        return False
+
+    def _on_query(self, event):
+        if not self.all_threads and threading.get_ident() != self._thread:
+            return
+        with self._lock:
+            self.events.append(event)
+            key = (event.sql, repr(event.args))
+            self._repeats[key] += 1
+            repeats = self._repeats[key]
+        if repeats == self.warn_repeats:
+            log.warning('%s: same query run %d times by %s: %s %s', self.label, repeats, event.template,
+                        ' '.join(event.sql.split()), event.args or '')
+
+    @property
+    def count(self):
+        return len(self.events)
+
+    @property
+    def seconds(self):
+        return sum(event.seconds for event in self.events)
+
+    @property
+    def rows(self):
+        return sum(max(event.rows, 0) for event in self.events)
+
+    def by_template(self):
+        """
+        :return: Counter {'Class.method': queries}
+        """
+        return Counter(event.template for event in self.events)
+
+    def duplicates(self):
+        """
+        :return: OrderedDict {(sql, repr(args)): times run} of the statements run more than once
+        """
+        with self._lock:
+            return OrderedDict((key, count) for key, count in self._repeats.items() if count > 1)
+
+    def report(self):
+        lines = ['%5d  %s' % (count, template) for template, count in self.by_template().most_common()]
+        for (sql, args), count in self.duplicates().items():
+            lines.append('%5dx duplicate: %s %s' % (count, ' '.join(sql.split()), args))
+        return '\n'.join(lines)
@@ -0,0 +1,194 @@
+""" Request coalescing (the "DataLoader" pattern) for point lookups.
+
+Point lookups such as GeneID('BRCA2') issued concurrently from many threads (or coroutines)
+are collected for a short window and answered by one batched query per window.
+Callers asking for a key that is already queued or being fetched share that fetch.
+
+This layer is opt-in:
+
+    from medgen.db.loader import coalesced
+    GeneID = coalesced('GeneID')
+    GeneID('BRCA2')   # same result as medgen.api.GeneID('BRCA2')
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from .gene    import GeneDB
+from .medgen  import MedGenDB
+from .clinvar import ClinVarDB
+from .registry import get_db
+from ..log import log
+
+DEFAULT_WINDOW = 0.002          # seconds to wait for more keys before querying
+DEFAULT_MAX_BATCH_SIZE = 500    # dispatch immediately once this many keys are waiting
+
+##########################################################################################
+#
+#       BatchLoader
+#
+##########################################################################################
+
+class BatchLoader(object):
+    """
+    Coalesces concurrent load(key) calls into calls of batch_fn(keys).
+
+    batch_fn takes a list of distinct keys and returns a dict {key: value};
+    keys missing from that dict load as None. If batch_fn raises, each key of
+    that batch is tried again on its own, so only the callers of the keys
+    which fail by themselves get an exception.
+    """
+    def __init__(self, batch_fn, window=DEFAULT_WINDOW, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch_size = max_batch_size
+
+        self.batches = 0     # number of batch_fn calls
+        self.requests = 0    # number of load() calls
+        self.keys = 0        # number of keys sent to batch_fn
+
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()   # key -> Future, waiting for the next dispatch
+        self._inflight = {}             # key -> Future, until its batch completes
+        self._timer = None
+
+    def submit(self, key):
+        """
+        :param key: hashable lookup key
+        :return: concurrent.futures.Future for the value of key
+        """
+        batch = None
+        with self._lock:
+            self.requests += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+
+            future = Future()
+            self._inflight[key] = future
+            self._pending[key] = future
+
+            if len(self._pending) >= self.max_batch_size:
+                batch = self._take_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self._dispatch_pending)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch:
+            self._run(batch)
+        return future
+
+    def load(self, key, timeout=None):
+        """
+        Blocking load of one key.
+        """
+        return self.submit(key).result(timeout)
+
+    def load_many(self, keys, timeout=None):
+        """
+        Blocking load of several keys (all queued in the same window).
+        :return: list of values in the order of keys
+        """
+        futures = [self.submit(key) for key in keys]
+        return [future.result(timeout) for future in futures]
+
+    async def aload(self, key):
+        """
+        Coroutine version of load(); the event loop is not blocked while the batch runs.
+        """
+        return await asyncio.wrap_future(self.submit(key))
+
+    def _take_pending(self):
+        # caller holds self._lock
+        batch = self._pending
+        self._pending = OrderedDict()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _dispatch_pending(self):
+        with self._lock:
+            self._timer = None
+            batch = self._take_pending()
+        if batch:
+            self._run(batch)
+
+    def _run(self, batch):
+        keys = list(batch.keys())
+        self._count(keys)
+        try:
+            try:
+                results = self.batch_fn(keys)
+            except Exception as err:
+                log.debug('BatchLoader batch of %d keys failed: %r', len(keys), err)
+                if len(keys) == 1:
+                    batch[keys[0]].set_exception(err)
+                    return
+                # one bad key must not fail the others: ask for each on its own
+                for key, future in batch.items():
+                    self._count([key])
+                    try:
+                        future.set_result(self.batch_fn([key]).get(key))
+                    except Exception as key_err:
+                        future.set_exception(key_err)
+            else:
+                for key, future in batch.items():
+                    future.set_result(results.get(key))
+        finally:
+            with self._lock:
+                for key, future in batch.items():
+                    if self._inflight.get(key) is future:
+                        del self._inflight[key]
+
+    def _count(self, keys):
+        with self._lock:
+            self.batches += 1
+            self.keys += len(keys)
+
+##########################################################################################
+#
+#       Loaders for the point-lookup API functions
+#
+##########################################################################################
+
+def _clinvar_ids(id_column):
+    return lambda hgvs_texts: get_db(ClinVarDB).clinvar_ids_many(hgvs_texts, id_column)
+
+# API function name -> batch function (list of keys -> dict)
+BATCH_FUNCTIONS = {
+    'GeneID':             lambda genes: get_db(GeneDB).get_gene_ids(genes),
+    'GeneName':           lambda genes: get_db(GeneDB).get_gene_names(genes),
+    'ConceptName':        lambda cuis:  get_db(MedGenDB).concept_names(cuis),
+    'ClinvarVariationID': _clinvar_ids('VariationID'),
+    'ClinvarAlleleID':    _clinvar_ids('AlleleID'),
+    'ClinvarAccession':   _clinvar_ids('RCVaccession'),
+}
+
+_loaders = {}
+_loaders_lock = threading.Lock()
+
+def get_loader(name):
+    """
+    Shared BatchLoader for one of the BATCH_FUNCTIONS (e.g. 'GeneID').
+    """
+    with _loaders_lock:
+        if name not in _loaders:
+            _loaders[name] = BatchLoader(BATCH_FUNCTIONS[name])
+        return _loaders[name]
+
+def coalesced(name):
+    """
+    Drop-in replacement for the medgen.api point lookup of the same name,
+    which coalesces concurrent calls through get_loader(name).
+
+    :param name: key of BATCH_FUNCTIONS, e.g. 'ConceptName'
+    :return: function(key)
+    """
+    def api_function(key):
+        return get_loader(name).load(key)
+    api_function.__name__ = name
+    api_function.__doc__ = 'Coalesced %s (see medgen.db.loader).' % name
+    return api_function
@@ -1,5 +1,25 @@
 from .dataset import SQLData
 
+##########################################################################################
+#
+#       SQL (shared with medgen.db.aio)
+#
+##########################################################################################
+
+MEDGEN2UMLS_SQL        = 'select ConceptID as ID from view_medgen_uid where MedGenUID = %s'
+UMLS2MEDGEN_SQL        = 'select MedGenUID as ID from view_medgen_uid where ConceptID = %s'
+CONCEPT_NAME_SQL       = 'select * from NAMES where CUI = %s'
+CONCEPT_DEFINITION_SQL = 'select * from MGDEF where CUI = %s'
+CONCEPT_RELATIONS_SQL  = 'select * from MGREL where CUI1 = %s or CUI2 = %s'
+CONCEPT_SOURCES_SQL    = 'select distinct SourceVocab from view_concept where ConceptID = %s'
+DISEASE_SUBTYPES_SQL   = '''
+        select distinct
+        SubtypeID     as DiseaseID,
+        SubtypeName   as DiseaseName,
+        SubtypeSource as DiseaseSource
+        from view_disease_subtype where DiseaseID = %s'''
+DISEASE_PARENTS_SQL    = 'select distinct DiseaseID, DiseaseName, DiseaseSource from view_disease_subtype where SubTypeID = %s'
+
 ################################################################################
 #
 # Formatting helper functions
@@ -49,14 +69,7 @@ class MedGenDB(SQLData):
         :param cui: MedGen concept ID
         :return: id, name, and source of the disease concept
         """
-        cui = self.get_concept_id(cui)
-        select_template = '''
-        select distinct
-        SubtypeID     as DiseaseID,
-        SubtypeName   as DiseaseName,
-        SubtypeSource as DiseaseSource
-        from view_disease_subtype where DiseaseID="%s";'''
-        return self.fetchall(select_template % cui)
+        return self.fetchall(DISEASE_SUBTYPES_SQL, self.get_concept_id(cui))
 
     def disease_parents(self, cui):
         """
@@ -66,9 +79,7 @@ class MedGenDB(SQLData):
         :param cui: MedGen concept
         :return: id, name, and source of the disease
         """
-        cui = self.get_concept_id(cui)
-        select_template = '''select distinct DiseaseID, DiseaseName, DiseaseSource from view_disease_subtype where SubTypeID="%s";'''
-        return self.fetchall(select_template % cui)
+        return self.fetchall(DISEASE_PARENTS_SQL, self.get_concept_id(cui))
 
     def concept_name(self, cui):
         """
@@ -85,8 +96,22 @@ class MedGenDB(SQLData):
         :param cui: medgen concept
         :return: conept name
         """
-        return self.fetchrow("select * from NAMES where CUI = '?' "
-                             .replace('?', str(self.get_concept_id(cui))))
+        return self.fetchrow(CONCEPT_NAME_SQL, self.get_concept_id(cui))
+
+    def concept_names(self, cuis):
+        """
+        Batch of concept_name: one query for many concepts.
+        :param cuis: list of medgen concepts (CUI or UID)
+        :return: dict {cui: NAMES row or None}
+        """
+        concept_ids = self.get_concept_ids(cuis)
+        wanted = sorted(set(cui for cui in concept_ids.values() if cui is not None))
+        names = {}
+        if wanted:
+            rows = self.fetchall("select * from NAMES where CUI in ({})".format(','.join(['%s'] * len(wanted))), *wanted)
+            for row in rows:
+                names.setdefault(row['CUI'], row)
+        return dict((cui, names.get(concept_id)) for cui, concept_id in concept_ids.items())
 
 
     def concept_definition(self, cui):
@@ -104,11 +129,10 @@ class MedGenDB(SQLData):
         :param cui: medgen concept
         :return: dict(CUI, DEF, SAB)
         """
-        return self.fetchrow("select * from MGDEF where CUI = '?' "
-                             .replace('?', str(self.get_concept_id(cui))))
+        return self.fetchrow(CONCEPT_DEFINITION_SQL, self.get_concept_id(cui))
 
 
-    def concept_relations(self, cui):
+    def concept_relations(self, cui, row_factory=None):
         """
         Relate concepts.
         Relationships were sources from UMLS, the Unified Medical Language System.
@@ -171,10 +195,11 @@ class MedGenDB(SQLData):
         +----------+--------------+------+-----+---------+-------+
 
         :param cui: concept id
+        :param row_factory: None for dicts, or 'record' (see medgen.db.rows)
         :return: relationships defined in MGREL table
         """
-        return self.fetchall("select * from MGREL where CUI1 = '?' or CUI2 = '?' "
-                             .replace('?', str(self.get_concept_id(cui))))
+        cui = self.get_concept_id(cui)
+        return self.fetchall(CONCEPT_RELATIONS_SQL, cui, cui, row_factory=row_factory)
 
     def concept_sources(self, cui):
         """
@@ -182,8 +207,7 @@ class MedGenDB(SQLData):
         :param cui: MedGen concept
         :return: list of dictionary names (SourceVocab)
         """
-        return self.fetchall("select distinct SourceVocab from view_concept where ConceptID = '?' "
-                             .replace('?', str(self.get_concept_id(cui))))
+        return self.fetchall(CONCEPT_SOURCES_SQL, self.get_concept_id(cui))
 
     def medgen2umls(self, medgen_uid):
         """
@@ -192,8 +216,7 @@ class MedGenDB(SQLData):
         :param medgen_uid: int like 651, which points to C0006142
         :return: concept code like "C0006142"
         """
-        select_template = '''select ConceptID as ID from view_medgen_uid where MedGenUID = "%s";'''
-        return self.fetchID(select_template % medgen_uid)
+        return self.fetchID(MEDGEN2UMLS_SQL, medgen_uid)
 
     def umls2medgen(self, cui):
         """
@@ -202,8 +225,7 @@ class MedGenDB(SQLData):
         :param cui: concept code like "C0006142"
         :return: int like 651, which points to C0006142
         """
-        select_template = '''select MedGenUID as ID from view_medgen_uid where ConceptID = "%s";'''
-        return self.fetchID(select_template % cui)
+        return self.fetchID(UMLS2MEDGEN_SQL, cui)
 
     def get_concept_id(self, unique_id):
         """
@@ -220,6 +242,31 @@ class MedGenDB(SQLData):
 
         raise Exception('Unknown concept unique identifier format for %s' + unique_id)
 
+    def get_concept_ids(self, unique_ids):
+        """
+        Batch of get_concept_id: UIDs are converted to CUIs with one query.
+
+        :param unique_ids: list of CUIs and/or UIDs
+        :return: dict {unique_id: CUI}
+        """
+        found = {}
+        uids = []
+        for unique_id in unique_ids:
+            if is_format_umls(unique_id):
+                found[unique_id] = unique_id
+            elif is_format_medgen(unique_id):
+                uids.append(unique_id)
+            else:
+                raise Exception('Unknown concept unique identifier format for %s' % unique_id)
+
+        if uids:
+            rows = self.fetchall('select MedGenUID, ConceptID from view_medgen_uid where MedGenUID in ({})'.format(
+                                 ','.join(str(int(uid)) for uid in sorted(set(uids), key=int))))
+            cuis = dict((int(row['MedGenUID']), row['ConceptID']) for row in rows)
+            for uid in uids:
+                found[uid] = cuis.get(int(uid))
+        return found
+
     def select_hpo_view_medgen_hpo(self, cui):
         """
         HPO Human Phenotype Ontology
@@ -0,0 +1,89 @@
+import threading
+from functools import wraps
+
+##########################################################################################
+#
+#       Shared SQLData instances
+#
+##########################################################################################
+
+_instances = {}
+_lock = threading.Lock()
+_reset_hooks = []
+
+def get_db(db_class):
+    """
+    Shared instance of db_class (e.g. GeneDB), created on first use.
+    API functions and parse types resolve their databases here instead of
+    constructing a new SQLData (and reading config) on every import or call.
+
+    :param db_class: SQLData subclass
+    :return: the one db_class instance for this process
+    """
+    try:
+        return _instances[db_class]
+    except KeyError:
+        with _lock:
+            if db_class not in _instances:
+                _instances[db_class] = db_class()
+            return _instances[db_class]
+
+def set_db(db_class, instance):
+    """
+    Use instance as the shared db_class (e.g. one configured with a different host, or a stand-in),
+    and clear the caches of values read through the previous one (see on_reset).
+    """
+    with _lock:
+        _instances[db_class] = instance
+    clear_caches()
+
+def instances():
+    """
+    :return: list of the shared instances created so far
+    """
+    with _lock:
+        return list(_instances.values())
+
+def reset():
+    """
+    Forget all shared instances (the next get_db builds fresh ones) and clear the caches
+    of values read through them (see on_reset).
+    """
+    with _lock:
+        _instances.clear()
+    clear_caches()
+
+def on_reset(hook):
+    """
+    Call hook() on every reset(), set_db() and connection factory change, e.g. to drop values
+    resolved against the previous database.
+    """
+    _reset_hooks.append(hook)
+    return hook
+
+def clear_caches():
+    """
+    Run the on_reset hooks (the shared instances are kept).
+    """
+    for hook in list(_reset_hooks):
+        hook()
+
+def db_method(db_class, method_name):
+    """
+    API function which calls db_class.method_name on the shared instance.
+    Nothing is constructed until the function is called.
+
+    Example:
+        GeneID = db_method(GeneDB, 'get_gene_id')
+
+    :param db_class: SQLData subclass
+    :param method_name: name of method on db_class
+    :return: function with the docstring of the wrapped method
+    """
+    method = getattr(db_class, method_name)
+
+    @wraps(method)
+    def api_function(*args, **kwargs):
+        return getattr(get_db(db_class), method_name)(*args, **kwargs)
+
+    return api_function
@@ -0,0 +1,320 @@
+""" Record / replay of SQLData queries, for offline and deterministic performance tests.
+
+Record a workload against the real databases (or any connection factory, e.g. medgen.db.embedded):
+
+    from medgen.db import replay
+    with replay.Recorder('workload.json.gz'):
+        for gene in panel:
+            GeneInfo(gene)
+
+then serve the same answers in-process, with no database at all:
+
+    replay.use('workload.json.gz', latency=0.002)    # or latency='recorded'
+    GeneInfo('BRCA2')
+
+A recording maps (database, statement, arguments) to the result set: column names once, rows as
+lists, in a gzipped JSON file. Replay raises ReplayMiss for a query that was not recorded.
+Connections opened before Recorder.start() or use() keep talking to their old backend until
+closed (see medgen.db.registry.reset).
+"""
+import gzip
+import json
+import time
+import base64
+import datetime
+import threading
+from decimal import Decimal
+
+from ..log import log
+from .dataset import get_connection_factory, set_connection_factory
+
+FORMAT = 'medgen-replay'
+VERSION = 1
+
+class ReplayMiss(LookupError):
+    pass
+
+##########################################################################################
+#
+#       Values
+#
+##########################################################################################
+
+# MySQL result values which JSON has no type for are written as {'$type': text}.
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'$date': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'$decimal': str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {'$bytes': base64.b64encode(bytes(value)).decode('ascii')}
+    raise TypeError('cannot record %r' % (value,))
+
+_DECODERS = {
+    '$datetime': datetime.datetime.fromisoformat,
+    '$date':     datetime.date.fromisoformat,
+    '$decimal':  Decimal,
+    '$bytes':    base64.b64decode,
+}
+
+def _decode(obj):
+    if len(obj) == 1:
+        tag, text = next(iter(obj.items()))
+        if tag in _DECODERS:
+            return _DECODERS[tag](text)
+    return obj
+
+def _key(database, sql, args):
+    return json.dumps([database, sql, list(args) if args else []], default=_encode)
+
+# escaping of arguments, as done by MySQLdb's connection.escape_string
+_MYSQL_ESCAPES = {0: b'\\0', 10: b'\\n', 13: b'\\r', 26: b'\\Z', 34: b'\\"', 39: b"\\'", 92: b'\\\\'}
+
+def _mysql_escape_string(value):
+    return b''.join(_MYSQL_ESCAPES.get(byte, bytes((byte,))) for byte in value)
+
+##########################################################################################
+#
+#       Recording
+#
+##########################################################################################
+
+class Recording(object):
+    """
+    Result sets by (database, statement, arguments); the first result of a repeated query is kept.
+
+    :param escaping: 'mysql' or 'none': how the recorded connections escaped string arguments
+                     (SQLData.cursor escapes them before they reach the driver, so replay must too)
+    """
+    def __init__(self, escaping='mysql'):
+        self.escaping = escaping
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, database, sql, args, columns, rows, rowcount=None, lastrowid=None, seconds=0.0):
+        key = _key(database, sql, args)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.entries[key] = {'database': database, 'sql': sql, 'args': list(args) if args else [],
+                                     'columns': columns, 'rows': rows, 'rowcount': rowcount,
+                                     'lastrowid': lastrowid, 'seconds': seconds, 'calls': 1}
+            else:
+                entry['calls'] += 1
+
+    def lookup(self, database, sql, args):
+        """
+        :return: entry dict {columns, rows, rowcount, lastrowid, seconds, ...}
+        :raises: ReplayMiss
+        """
+        entry = self.entries.get(_key(database, sql, args))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            raise ReplayMiss('query not recorded (%s): %s %r' % (database, ' '.join(sql.split()), args))
+        return entry
+
+    def save(self, path):
+        with gzip.open(path, 'wt', encoding='utf-8') as fh:
+            json.dump({'format': FORMAT, 'version': VERSION, 'escaping': self.escaping,
+                       'queries': list(self.entries.values())}, fh, default=_encode, separators=(',', ':'))
+        log.info('recorded %d queries to %s', len(self.entries), path)
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as fh:
+            state = json.load(fh, object_hook=_decode)
+        if state.get('format') != FORMAT or state.get('version') != VERSION:
+            raise ValueError('%s is not a %s v%d recording' % (path, FORMAT, VERSION))
+        recording = cls(state['escaping'])
+        for entry in state['queries']:
+            recording.entries[_key(entry['database'], entry['sql'], entry['args'])] = entry
+        return recording
+
+##########################################################################################
+#
+#       Record
+#
+##########################################################################################
+
+class RecordingCursor(object):
+
+    def __init__(self, conn, cursor):
+        self._conn = conn
+        self._cursor = cursor
+        self._rows = []
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def execute(self, sql, args=None):
+        start = time.perf_counter()
+        result = self._cursor.execute(sql, args) if args is not None else self._cursor.execute(sql)
+        self.description = self._cursor.description
+        self._rows = list(self._cursor.fetchall()) if self._cursor.description else []
+        seconds = time.perf_counter() - start
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+
+        columns = [column[0] for column in self._cursor.description] if self._cursor.description else []
+        self._conn.recording.add(self._conn.database, sql, args, columns,
+                                 [[row[column] for column in columns] for row in self._rows],
+                                 self.rowcount, self.lastrowid, seconds)
+        return result
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        self._cursor.close()
+
+class RecordingConnection(object):
+    """
+    Wraps a DB-API connection (DictCursor rows): every query run through it is added to recording.
+    """
+    def __init__(self, conn, database, recording):
+        self._conn = conn
+        self.database = database
+        self.recording = recording
+
+    # streaming and tuple row queries are recorded through a BufferedStreamCursor over cursor()
+    stream_cursor = None
+    tuple_cursor = None
+
+    def cursor(self, *args):
+        return RecordingCursor(self, self._conn.cursor(*args))
+
+    def __getattr__(self, name):
+        # escape_string, insert_id, commit, ping, close, ...
+        return getattr(self._conn, name)
+
+class Recorder(object):
+    """
+    Record every query of SQLData connections opened between start() and stop()
+    (or inside a with block), and save them to path if given.
+    """
+    def __init__(self, path=None, recording=None):
+        self.path = path
+        self.recording = recording
+        self._previous = None
+        self._restore = None
+
+    def _connect(self, db):
+        conn = self._previous(db)
+        if self.recording is None:
+            escaped = conn.escape_string(b"'")
+            self.recording = Recording('none' if escaped == b"'" else 'mysql')
+        return RecordingConnection(conn, db._db_name, self.recording)
+
+    def start(self):
+        self._previous = get_connection_factory()
+        self._restore = set_connection_factory(self._connect)
+        return self
+
+    def stop(self):
+        set_connection_factory(self._restore)
+        if self.path and self.recording is not None:
+            self.recording.save(self.path)
+        return self.recording
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+##########################################################################################
+#
+#       Replay
+#
+##########################################################################################
+
+class ReplayCursor(object):
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._rows = []
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def execute(self, sql, args=None):
+        entry = self._conn.recording.lookup(self._conn.database, sql, args)
+        latency = entry['seconds'] if self._conn.latency == 'recorded' else self._conn.latency
+        if latency:
+            time.sleep(latency)
+        columns = entry['columns']
+        self.description = [(column,) + (None,) * 6 for column in columns] or None
+        self._rows = [dict(zip(columns, row)) for row in entry['rows']]
+        self.rowcount = entry['rowcount']
+        self.lastrowid = entry['lastrowid']
+        self._conn._last_insert_id = self.lastrowid or 0
+        return self.rowcount
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        self._rows = []
+
+class ReplayConnection(object):
+    """
+    Serves the queries of one database from a Recording.
+
+    :param latency: seconds added to every query, or 'recorded' for the time each query took when recorded
+    """
+    def __init__(self, recording, database, latency=None):
+        self.recording = recording
+        self.database = database
+        self.latency = latency
+        self._last_insert_id = 0
+
+    def cursor(self, *args):
+        return ReplayCursor(self)
+
+    def escape_string(self, value):
+        return _mysql_escape_string(value) if self.recording.escaping == 'mysql' else value
+
+    def insert_id(self):
+        return self._last_insert_id
+
+    def commit(self):
+        pass
+
+    def ping(self, *args):
+        return True
+
+    def close(self):
+        pass
+
+def use(recording, latency=None):
+    """
+    Connect every SQLData to a recording instead of a database.
+
+    :param recording: Recording, or path of a saved one
+    :param latency: seconds added to every query, or 'recorded'
+    :return: the Recording (hits and misses are counted on it)
+    """
+    if not isinstance(recording, Recording):
+        recording = Recording.load(recording)
+    set_connection_factory(lambda db: ReplayConnection(recording, db._db_name, latency))
+    return recording
@@ -0,0 +1,159 @@
+""" Compact result rows: one __slots__ class per column list instead of a dict per row.
+
+    rows = DB.fetchall('select pubmeds, GeneRIF from generifs_basic where GeneID = %s', 7157,
+                       row_factory='record')
+    rows[0].GeneRIF                 # attribute access
+    rows[0]['GeneRIF']              # the read-only dict interface works too: get, keys, items, in
+    rows[0] == {'pubmeds': '...', 'GeneRIF': '...'}
+
+A Record stores its values in slots (no per-row __dict__ and no copy of the column names), so a
+row costs roughly a tuple of the same length. json.dumps needs record._asdict(), or
+json.dumps(rows, default=json_default).
+
+Row factories (the row_factory argument of SQLData.fetchall / fetchiter):
+
+    None            dicts (the default)
+    'record'        Record subclass for the column list (falls back to dicts for column names
+                    which cannot be attributes, e.g. 'count(*)')
+    'namedtuple'    collections.namedtuple for the column list (rename=True)
+    'tuple'         plain tuples in column order
+"""
+import keyword
+import threading
+from collections import OrderedDict, namedtuple
+from itertools import starmap
+
+ROW_FACTORIES = (None, 'record', 'namedtuple', 'tuple')
+
+class Record(object):
+    """
+    Base of the generated record classes; _fields holds the column names in order.
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def keys(self):
+        return list(self._fields)
+
+    def values(self):
+        return [getattr(self, field) for field in self._fields]
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self._fields]
+
+    def _asdict(self):
+        return OrderedDict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return self.items() == other.items()
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # generated classes are not importable by name: rebuild from the column names.
+        return _record, (self._fields, tuple(self.values()))
+
+    def __repr__(self):
+        return 'Record(%s)' % ', '.join('%s=%r' % item for item in self.items())
+
+_classes = {}
+_lock = threading.Lock()
+
+def _valid(names):
+    return all(name.isidentifier() and not keyword.iskeyword(name) and not name.startswith('_')
+               for name in names) and len(set(names)) == len(names)
+
+def _new_class(names):
+    # a generated __init__ (as namedtuple does) is several times faster than setting slots in a loop.
+    namespace = {}
+    exec('def __init__(self, %s):\n    %s\n' % (', '.join(names),
+                                                  '\n    '.join('self.%s = %s' % (name, name) for name in names)),
+         namespace)
+    return type('Record', (Record,), {'__slots__': names, '_fields': names, '__init__': namespace['__init__']})
+
+def record_class(names):
+    """
+    :param names: column names
+    :return: the Record subclass for these columns (made once), or None if a name can't be an attribute
+    """
+    names = tuple(names)
+    cls = _classes.get(names)
+    if cls is None:
+        if not _valid(names):
+            return None
+        with _lock:
+            cls = _classes.get(names)
+            if cls is None:
+                cls = _classes[names] = _new_class(names)
+    return cls
+
+def _record(fields, values):
+    return record_class(fields)(*values)
+
+_namedtuples = {}
+
+def _namedtuple_class(names):
+    names = tuple(names)
+    cls = _namedtuples.get(names)
+    if cls is None:
+        cls = _namedtuples.setdefault(names, namedtuple('Row', names, rename=True))
+    return cls
+
+def make_rows(names, rows, row_factory):
+    """
+    :param names: column names
+    :param rows: row tuples
+    :param row_factory: see ROW_FACTORIES
+    :return: list of rows
+    """
+    if row_factory == 'tuple':
+        return rows if isinstance(rows, list) else list(rows)
+    if row_factory == 'namedtuple':
+        return list(map(_namedtuple_class(names)._make, rows))
+    if row_factory == 'record':
+        cls = record_class(names)
+        if cls is not None:
+            return list(starmap(cls, rows))
+    if row_factory not in ROW_FACTORIES:
+        raise ValueError('row_factory must be one of %r' % (ROW_FACTORIES,))
+    names = list(names)
+    return [dict(zip(names, row)) for row in rows]
+
+def json_default(obj):
+    """
+    json.dumps default= for annotation results: Records as dicts, sets as sorted lists, else str.
+    """
+    if isinstance(obj, (set, frozenset)):
+        try:
+            return sorted(obj)
+        except TypeError:
+            return list(obj)
+    if hasattr(obj, '_asdict'):
+        # Records and namedtuple rows
+        return obj._asdict()
+    return str(obj)
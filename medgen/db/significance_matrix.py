@@ -0,0 +1,266 @@
+""" Gene x clinical significance variant counts, precomputed once per ClinVar version.
+
+    matrix = get_significance_matrix()      # cache file for this ClinVar version, else two queries
+    matrix.gene('BRCA2')                    # {'Uncertain significance': 1204, 'Pathogenic': 812, ...}
+    matrix.panel(['BRCA1', 'BRCA2', 675])   # summed over the genes
+    matrix.genome()                         # every gene
+    matrix.summary('BRCA2')                 # the gene_specific_summary row (Submissions, Alleles)
+
+Nothing touches the database after the matrix is loaded. The counts are kept sparse, compressed
+by gene row (CSR: indptr, significance codes, counts), because real ClinVar has tens of
+thousands of genes and hundreds of (compound) significance values, and most genes have few.
+
+The matrix is saved as <directory>/clinvar-significance-<version>.npz, keyed by
+ClinVarDB.get_version(), so a ClinVar reload makes a new one. The directory is
+$MEDGEN_CACHE_DIR, or ~/.cache/medgen. Without a version the matrix is built but not saved.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ..log import log
+from .clinvar import ClinVarDB
+from .columnar import EncodedColumn
+from .registry import get_db, on_reset
+
+CACHE_DIR = os.getenv('MEDGEN_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'medgen'))
+
+class SignificanceMatrix(object):
+    """
+    Variant counts per (gene, ClinicalSignificance) with the ClinVar gene_specific_summary totals.
+    """
+    def __init__(self, version, gene_ids, symbols, significances, indptr, codes, counts, submissions, alleles):
+        """
+        :param gene_ids: int64 array, sorted
+        :param symbols: list of gene symbols, by gene index (None if unknown)
+        :param significances: list of ClinicalSignificance values, by code
+        :param indptr: gene i's entries are codes[indptr[i]:indptr[i + 1]], counts[...]
+        :param submissions: int64 array by gene index (gene_specific_summary.Submissions, -1 if absent)
+        :param alleles: int64 array by gene index (gene_specific_summary.Alleles, -1 if absent)
+        """
+        self.version = version
+        self.gene_ids = gene_ids
+        self.symbols = symbols
+        self.significances = significances
+        self.indptr = indptr
+        self.codes = codes
+        self.counts = counts
+        self.submissions = submissions
+        self.alleles = alleles
+        self._symbol_index = dict((symbol, i) for i, symbol in enumerate(symbols) if symbol is not None)
+
+    @classmethod
+    def build(cls, db=None):
+        """
+        :param db: ClinVarDB (the shared one by default)
+        """
+        db = db or get_db(ClinVarDB)
+        version = db.get_version()
+        cells = db.fetchcolumns('select GeneID, ClinicalSignificance, min(Symbol) as Symbol, count(*) as n '
+                                'from variant_summary where GeneID is not null '
+                                'group by GeneID, ClinicalSignificance')
+        summary = db.fetchcolumns('select GeneID, Symbol, Submissions, Alleles from gene_specific_summary '
+                                  'where GeneID is not null')
+
+        gene_ids = np.union1d(cells['GeneID'].astype(np.int64), summary['GeneID'].astype(np.int64))
+        symbols = [None] * len(gene_ids)
+        for table in (cells, summary):
+            if not table.rows:
+                continue
+            rows = np.searchsorted(gene_ids, table['GeneID'].astype(np.int64))
+            for row, symbol in zip(rows.tolist(), _values(table['Symbol'])):
+                if symbol is not None and symbols[row] is None:
+                    symbols[row] = symbol
+
+        if cells.rows:
+            significance = cells['ClinicalSignificance']
+            rows = np.searchsorted(gene_ids, cells['GeneID'].astype(np.int64))
+            order = np.lexsort((significance.codes, rows))
+            rows, codes = rows[order], significance.codes[order]
+            counts = cells['n'].astype(np.int64)[order]
+            significances = list(significance.categories)
+            if (codes == -1).any():
+                # NULL significance: a value of its own
+                codes = np.where(codes == -1, len(significances), codes)
+                significances.append(None)
+        else:
+            rows, codes, counts = np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.int64)
+            significances = []
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(gene_ids)))]).astype(np.int64)
+
+        submissions = np.full(len(gene_ids), -1, dtype=np.int64)
+        alleles = np.full(len(gene_ids), -1, dtype=np.int64)
+        if summary.rows:
+            rows = np.searchsorted(gene_ids, summary['GeneID'].astype(np.int64))
+            submissions[rows] = np.nan_to_num(summary['Submissions'], nan=-1).astype(np.int64)
+            alleles[rows] = np.nan_to_num(summary['Alleles'], nan=-1).astype(np.int64)
+
+        matrix = cls(version, gene_ids, symbols, significances, indptr, codes.astype(np.int32), counts,
+                     submissions, alleles)
+        log.info('ClinVar significance matrix %s: %d genes x %d values, %d cells',
+                 version, len(gene_ids), len(significances), len(counts))
+        return matrix
+
+    ##########################################################################################
+    #       Storage
+
+    def save(self, path):
+        """
+        Write to path (.npz) through a temporary file, so readers never see a partial matrix.
+        """
+        partial = '%s.%d.partial.npz' % (path[:-len('.npz')] if path.endswith('.npz') else path, os.getpid())
+        np.savez_compressed(partial, version=np.array(self.version or ''), gene_ids=self.gene_ids,
+                            symbols=np.array(['' if symbol is None else symbol for symbol in self.symbols]),
+                            significances=np.array(['' if value is None else value for value in self.significances]),
+                            null_significance=np.array([value is None for value in self.significances], dtype=bool),
+                            indptr=self.indptr, codes=self.codes, counts=self.counts,
+                            submissions=self.submissions, alleles=self.alleles)
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            significances = [None if null else str(value)
+                             for value, null in zip(data['significances'], data['null_significance'])]
+            return cls(str(data['version']) or None, data['gene_ids'],
+                       [str(symbol) or None for symbol in data['symbols']], significances,
+                       data['indptr'], data['codes'], data['counts'], data['submissions'], data['alleles'])
+
+    ##########################################################################################
+    #       Lookups
+
+    def __len__(self):
+        return len(self.gene_ids)
+
+    def __contains__(self, gene):
+        return self._row(gene) is not None
+
+    def _row(self, gene):
+        if isinstance(gene, (int, np.integer)) or str(gene).isdigit():
+            row = int(np.searchsorted(self.gene_ids, int(gene)))
+            return row if row < len(self.gene_ids) and self.gene_ids[row] == int(gene) else None
+        return self._symbol_index.get(gene)
+
+    def _totals(self, rows):
+        if rows is None:
+            codes, counts = self.codes, self.counts
+        else:
+            entries = [np.arange(self.indptr[row], self.indptr[row + 1]) for row in rows]
+            entries = np.concatenate(entries) if entries else np.empty(0, np.int64)
+            codes, counts = self.codes[entries], self.counts[entries]
+        totals = np.bincount(codes, weights=counts, minlength=len(self.significances)).astype(np.int64)
+        order = np.argsort(-totals, kind='stable')
+        return OrderedDict((self.significances[code], int(totals[code])) for code in order if totals[code])
+
+    def gene(self, gene):
+        """
+        :param gene: GeneID or symbol
+        :return: OrderedDict {ClinicalSignificance: variants}, most first (empty for genes not in ClinVar)
+        """
+        row = self._row(gene)
+        return self._totals([] if row is None else [row])
+
+    def frequency(self, gene):
+        """
+        :return: the rows of ClinVarDB.gene_to_clinical_significance_type_frequency for gene
+        """
+        return [{'ClinicalSignificance': significance, 'cnt_variants': count}
+                for significance, count in self.gene(gene).items()]
+
+    def panel(self, genes):
+        """
+        :param genes: GeneIDs and / or symbols (unknown genes count nothing)
+        :return: OrderedDict {ClinicalSignificance: variants} summed over the genes
+        """
+        rows = set(self._row(gene) for gene in genes)
+        rows.discard(None)
+        return self._totals(sorted(rows))
+
+    def genome(self):
+        """
+        :return: OrderedDict {ClinicalSignificance: variants} over every gene
+        """
+        return self._totals(None)
+
+    def dense(self, genes=None):
+        """
+        :param genes: GeneIDs and / or symbols (every gene by default)
+        :return: int64 array, one row per gene (zeros for unknown genes), one column per significances entry
+        """
+        rows = range(len(self.gene_ids)) if genes is None else [self._row(gene) for gene in genes]
+        dense = np.zeros((len(rows), len(self.significances)), dtype=np.int64)
+        for i, row in enumerate(rows):
+            if row is not None:
+                start, end = self.indptr[row], self.indptr[row + 1]
+                dense[i, self.codes[start:end]] = self.counts[start:end]
+        return dense
+
+    def summary(self, gene):
+        """
+        :return: the gene_specific_summary row of gene (as ClinVarDB.gene_summary), or None
+        """
+        row = self._row(gene)
+        if row is None or self.submissions[row] < 0:
+            return None
+        return {'Symbol': self.symbols[row], 'GeneID': int(self.gene_ids[row]),
+                'Submissions': int(self.submissions[row]), 'Alleles': int(self.alleles[row])}
+
+def _values(column):
+    return (column.decode() if isinstance(column, EncodedColumn) else column).tolist()
+
+##########################################################################################
+#
+#       Shared matrix
+#
+##########################################################################################
+
+_matrix = None
+_lock = threading.Lock()
+
+def matrix_path(version, directory=None):
+    return os.path.join(directory or CACHE_DIR,
+                        'clinvar-significance-%s.npz' % re.sub(r'[^\w.-]+', '_', version))
+
+def get_significance_matrix(directory=None):
+    """
+    The process' SignificanceMatrix: loaded from the cache file of the current ClinVar version,
+    or built (and saved there) on first use. Later calls don't ask the database for the version:
+    call clear_significance_matrix after a ClinVar reload.
+    """
+    global _matrix
+    if _matrix is None:
+        with _lock:
+            if _matrix is None:
+                _matrix = _load_or_build(directory)
+    return _matrix
+
+def _load_or_build(directory):
+    db = get_db(ClinVarDB)
+    version = db.get_version()
+    path = matrix_path(version, directory) if version else None
+    if path and os.path.exists(path):
+        try:
+            return SignificanceMatrix.load(path)
+        except (OSError, ValueError, KeyError) as err:
+            log.warning('ignoring unreadable significance matrix %s: %r', path, err)
+    matrix = SignificanceMatrix.build(db)
+    if path:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            matrix.save(path)
+        except OSError as err:
+            log.warning('could not save significance matrix %s: %r', path, err)
+    return matrix
+
+def clear_significance_matrix():
+    """
+    Drop the shared SignificanceMatrix (also done by medgen.db.registry.reset and set_db).
+    """
+    global _matrix
+    with _lock:
+        _matrix = None
+
+on_reset(clear_significance_matrix)
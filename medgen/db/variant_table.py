@@ -0,0 +1,227 @@
+""" ClinVar's variant_summary in memory, as columns, for questions over many genes at once.
+
+    table = get_variant_table()             # GRCh38 rows, loaded once per process (~40 bytes/variant)
+    table.count(genes=panel, consequence='missense variant', min_submitters=2,
+                significance=['Pathogenic', 'Likely pathogenic'])
+    table.count_by('GeneID', significance='Pathogenic')
+    table.rows(genes=['BRCA2'], chromosome='13', start=32315000, stop=32316000)
+
+variant_summary has a row per assembly a variant is mapped to (GRCh37 and GRCh38, for most), so a
+table holds one assembly: get_variant_table('GRCh37') for the other, or assembly=None for every row
+(then counts include each variant once per assembly, and an 'assembly' criterion picks one).
+
+Every question is a boolean mask over the arrays (see medgen.db.columnar): no SQL after the load.
+Criteria, all optional and combined with "and":
+
+    genes               GeneIDs and / or symbols
+    significance        ClinicalSignificance
+    variant_type        e.g. 'single nucleotide variant'
+    review_status       ReviewStatus
+    consequence         molecular consequence of the c. HGVS (molecular_consequences), e.g. 'missense variant'
+    assembly            e.g. 'GRCh38' (only useful for a table loaded with assembly=None)
+    chromosome          Chromosome
+    min_submitters      NumberSubmitters at least
+    start, stop         variants overlapping [start, stop] (Start <= stop and Stop >= start)
+
+String criteria take a value, a list of values, or a function of a value -> bool, which is called
+once per distinct value (significance=lambda value: 'pathogenic' in value.lower()).
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ..log import log
+from .clinvar import ClinVarDB
+from .columnar import EncodedColumn
+from .dataset import DEFAULT_CHUNK_SIZE
+from .registry import get_db, on_reset
+
+DEFAULT_ASSEMBLY = 'GRCh38'
+
+COLUMNS = ['AlleleID', 'GeneID', 'Symbol', 'variant_type', 'ClinicalSignificance', 'ReviewStatus',
+           'NumberSubmitters', 'rs', 'Assembly', 'Chromosome', 'Start', 'Stop']
+
+_INTEGER_COLUMNS = frozenset(['AlleleID', 'GeneID', 'NumberSubmitters', 'rs', 'Start', 'Stop'])
+
+# criterion -> column
+_STRING_CRITERIA = OrderedDict([('significance', 'ClinicalSignificance'), ('variant_type', 'variant_type'),
+                                ('review_status', 'ReviewStatus'), ('consequence', 'Consequence'),
+                                ('assembly', 'Assembly'), ('chromosome', 'Chromosome')])
+
+# one consequence per variant (the first by name), so the load returns exactly one row per variant.
+_CONSEQUENCE_SQL = ('(select min(M.Consequence) from molecular_consequences M '
+                    'where M.HGVS = V.HGVS_c) as Consequence')
+
+class VariantTable(object):
+    """
+    variant_summary columns with filter / aggregate methods (see the module docstring).
+    """
+    def __init__(self, columns):
+        """
+        :param columns: medgen.db.columnar.Columns with (at least) the COLUMNS
+        """
+        self.columns = columns
+
+    @classmethod
+    def load(cls, db=None, assembly=DEFAULT_ASSEMBLY, consequences=True, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        :param db: ClinVarDB (the shared one by default)
+        :param assembly: variant_summary Assembly to load, or None for the rows of every assembly
+        :param consequences: also load the Consequence column from molecular_consequences
+        :return: VariantTable
+        """
+        db = db or get_db(ClinVarDB)
+        select = ', '.join('V.%s' % name for name in COLUMNS)
+        if consequences:
+            select += ', ' + _CONSEQUENCE_SQL
+        sql = 'select %s from variant_summary V' % select
+        args = ()
+        if assembly is not None:
+            sql += ' where V.Assembly = %s'
+            args = (assembly,)
+        table = cls(db.fetchcolumns(sql, *args, chunk_size=chunk_size))
+        log.info('ClinVar variant table (%s): %d variants, %.1f MB', assembly or 'all assemblies',
+                 len(table), table.nbytes / 1e6)
+        return table
+
+    def __len__(self):
+        return self.columns.rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def nbytes(self):
+        return self.columns.nbytes
+
+    def categories(self, name):
+        """
+        :return: distinct values of a string column (e.g. 'ClinicalSignificance'), in load order
+        """
+        return list(self.columns[name].categories)
+
+    def mask(self, genes=None, min_submitters=None, start=None, stop=None, **criteria):
+        """
+        :return: boolean array, True for the variants matching all criteria
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if genes is not None:
+            mask &= self._gene_mask(genes)
+        for criterion, value in criteria.items():
+            if criterion not in _STRING_CRITERIA:
+                raise TypeError('unknown variant criterion %s' % criterion)
+            if value is not None:
+                mask &= _string_mask(self.columns[_STRING_CRITERIA[criterion]], value)
+        if min_submitters is not None:
+            mask &= self.columns['NumberSubmitters'] >= min_submitters
+        if stop is not None:
+            mask &= self.columns['Start'] <= stop
+        if start is not None:
+            mask &= self.columns['Stop'] >= start
+        return mask
+
+    def _gene_mask(self, genes):
+        ids, symbols = [], []
+        for gene in genes:
+            if isinstance(gene, (int, np.integer)) or str(gene).isdigit():
+                ids.append(int(gene))
+            else:
+                symbols.append(gene)
+        mask = np.isin(self.columns['GeneID'], ids)
+        if symbols:
+            mask |= self.columns['Symbol'].isin(symbols)
+        return mask
+
+    def where(self, **criteria):
+        """
+        :return: VariantTable of the matching variants
+        """
+        return VariantTable(self.columns.filter(self.mask(**criteria)))
+
+    def count(self, **criteria):
+        """
+        :return: number of matching variants
+        """
+        return int(np.count_nonzero(self.mask(**criteria)))
+
+    def count_by(self, name, **criteria):
+        """
+        :param name: column to group by, e.g. 'GeneID' or 'ClinicalSignificance'
+        :return: OrderedDict {value: matching variants}, most first (NULLs not counted)
+        """
+        column = self.columns[name][self.mask(**criteria)]
+        if isinstance(column, EncodedColumn):
+            return column.counts()
+        if column.dtype.kind == 'f':
+            column = column[~np.isnan(column)]
+        values, counts = np.unique(column, return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        return OrderedDict((_python_value(name, values[i]), int(counts[i])) for i in order)
+
+    def rows(self, **criteria):
+        """
+        :return: list of dicts of the matching variants (NULLs as None)
+        """
+        return _dicts(self.columns.filter(self.mask(**criteria)))
+
+    def take(self, index):
+        """
+        :param index: row numbers (e.g. from medgen.intervals.GenomeIntervals)
+        :return: list of dicts of those variants, in index order
+        """
+        return _dicts(self.columns.filter(np.asarray(index, dtype=np.int64)))
+
+def _dicts(columns):
+    values = [[_python_value(name, value) for value in (column.decode() if isinstance(column, EncodedColumn)
+                                                        else column)]
+              for name, column in columns.items()]
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+def _string_mask(column, value):
+    if callable(value):
+        return column.matches(value)
+    if isinstance(value, (str, bytes)):
+        return column == value
+    return column.isin(value)
+
+def _python_value(name, value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if name in _INTEGER_COLUMNS:
+        return int(value)
+    return value
+
+##########################################################################################
+#
+#       Shared table
+#
+##########################################################################################
+
+_tables = {}
+_lock = threading.Lock()
+
+def get_variant_table(assembly=DEFAULT_ASSEMBLY):
+    """
+    The process' VariantTable of one assembly (None: all), loaded from the shared ClinVarDB on first use.
+    """
+    table = _tables.get(assembly)
+    if table is None:
+        with _lock:
+            table = _tables.get(assembly)
+            if table is None:
+                table = _tables[assembly] = VariantTable.load(assembly=assembly)
+    return table
+
+def clear_variant_table():
+    """
+    Drop the shared VariantTables (e.g. after a ClinVar reload); the next get_variant_table loads again.
+    Also done by medgen.db.registry.reset and set_db.
+    """
+    with _lock:
+        _tables.clear()
+
+on_reset(clear_variant_table)
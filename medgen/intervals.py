@@ -0,0 +1,231 @@
+""" Genomic interval index: which ClinVar variants overlap these regions.
+
+    intervals = get_clinvar_intervals()                     # GRCh38, per chromosome, built once
+    rows = intervals.overlapping('13', 32315000, 32400000)  # row numbers of the variant table
+    intervals.table.take(rows)                              # the variants, as dicts
+
+    regions = read_bed(open('panel.bed'))
+    region_index, rows = intervals.overlapping_regions(regions)   # every (region, variant) pair
+
+Each chromosome is an IntervalIndex: the variants sorted by Start, with their Stop and the running
+maximum of Stop over that order (max_end). Every interval overlapping [start, stop] lies between
+
+    lo = first i with max_end[i] >= start       (everything before it ends before start)
+    hi = first i with starts[i] > stop          (everything from it starts after stop)
+
+so a region is two binary searches and a check of Stop over [lo, hi). For a batch of regions the
+searches are one np.searchsorted each and the candidate ranges are expanded and filtered as
+arrays, so a BED file of thousands of regions is a handful of NumPy calls per chromosome.
+
+Candidates between lo and hi which end before start are wasted work, and one long interval (a
+ClinVar CNV can span megabases) would pull lo back for every region after it. So intervals longer
+than LONG_INTERVAL are kept in a second, small list with a max_end of its own: the short list's
+max_end then trails its starts by at most LONG_INTERVAL, and the long list is nearly brute force
+over the few long intervals.
+
+Coordinates are ClinVar's: 1-based and inclusive. read_bed converts BED's 0-based, half-open
+regions. Chromosome names are compared without a 'chr' prefix ('chrX' = 'X', 'chrM' = 'MT').
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .db.registry import on_reset
+from .db.variant_table import DEFAULT_ASSEMBLY, get_variant_table
+
+LONG_INTERVAL = 1000        # bp; longer intervals are searched apart from the rest (see above)
+
+# BED regions in ClinVar coordinates; chromosomes is a list, the rest are arrays.
+Regions = namedtuple('Regions', ['chromosomes', 'starts', 'stops', 'names'])
+
+def normalize_chromosome(name):
+    """
+    :return: chromosome name without a 'chr' prefix ('M' -> 'MT')
+    """
+    name = str(name)
+    if name[:3].lower() == 'chr':
+        name = name[3:]
+    return 'MT' if name == 'M' else name
+
+def read_bed(lines):
+    """
+    :param lines: BED lines (chrom, 0-based start, end, optional name); track / browser / # lines skipped
+    :return: Regions, 1-based inclusive
+    """
+    chromosomes, starts, stops, names = [], [], [], []
+    for line in lines:
+        if not line.strip() or line.startswith(('#', 'track', 'browser')):
+            continue
+        fields = line.rstrip('\r\n').split('\t')
+        chromosomes.append(normalize_chromosome(fields[0]))
+        starts.append(int(fields[1]) + 1)
+        stops.append(int(fields[2]))
+        names.append(fields[3] if len(fields) > 3 else None)
+    return Regions(chromosomes, np.array(starts, dtype=np.int64), np.array(stops, dtype=np.int64), names)
+
+##########################################################################################
+#
+#       IntervalIndex
+#
+##########################################################################################
+
+class IntervalIndex(object):
+    """
+    Intervals of one chromosome, sorted by start; the short and the long ones (see LONG_INTERVAL)
+    each with the running max of their ends.
+    """
+    def __init__(self, starts, stops, ids=None, long_interval=LONG_INTERVAL):
+        """
+        :param starts: interval starts
+        :param stops: interval ends (inclusive)
+        :param ids: id of each interval (default: its position in starts)
+        :param long_interval: length from which an interval goes in the long list
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        order = np.argsort(starts, kind='stable')
+        self.starts = starts[order]
+        self.stops = np.asarray(stops, dtype=np.int64)[order]
+        self.ids = order if ids is None else np.asarray(ids)[order]
+        is_long = self.stops - self.starts + 1 > long_interval
+        # (positions in starts, their starts, running max of their stops) of the short and the long intervals
+        self.groups = []
+        for positions in (np.flatnonzero(~is_long), np.flatnonzero(is_long)):
+            if len(positions):
+                self.groups.append((positions, self.starts[positions],
+                                    np.maximum.accumulate(self.stops[positions])))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _pairs(self, starts, stops):
+        # (region numbers, positions in self.starts) of every overlapping pair, by region then start.
+        found_regions, found_positions = [], []
+        for positions, group_starts, max_end in self.groups:
+            lo = np.searchsorted(max_end, starts, 'left')
+            hi = np.maximum(np.searchsorted(group_starts, stops, 'right'), lo)
+            lengths = hi - lo
+            regions = np.repeat(np.arange(len(starts)), lengths)
+            # position within each region's candidate range, added to its lo.
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            candidates = positions[np.repeat(lo, lengths) + offsets]
+            keep = self.stops[candidates] >= starts[regions]
+            found_regions.append(regions[keep])
+            found_positions.append(candidates[keep])
+        if not found_regions:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if len(found_regions) == 1:
+            return found_regions[0], found_positions[0]
+        regions, positions = np.concatenate(found_regions), np.concatenate(found_positions)
+        order = np.lexsort((positions, regions))
+        return regions[order], positions[order]
+
+    def overlapping(self, start, stop):
+        """
+        :return: ids of the intervals overlapping [start, stop], by start
+        """
+        _, positions = self._pairs(np.array([start], dtype=np.int64), np.array([stop], dtype=np.int64))
+        return self.ids[positions]
+
+    def overlapping_many(self, starts, stops):
+        """
+        Overlaps of a batch of regions in one pass.
+
+        :return: (region numbers, ids) arrays: every overlapping pair, by region then interval start
+        """
+        regions, positions = self._pairs(np.asarray(starts, dtype=np.int64), np.asarray(stops, dtype=np.int64))
+        return regions, self.ids[positions]
+
+##########################################################################################
+#
+#       ClinVar
+#
+##########################################################################################
+
+class GenomeIntervals(object):
+    """
+    IntervalIndex per (assembly, chromosome) over the rows of a medgen.db.variant_table.VariantTable.
+    Variants without a Start are left out; a missing Stop is taken to be Start.
+    """
+    def __init__(self, table):
+        self.table = table
+        self.indexes = {}
+        starts = np.asarray(table['Start'], dtype=np.float64)
+        stops = np.asarray(table['Stop'], dtype=np.float64)
+        stops = np.where(np.isnan(stops), starts, stops)
+        rows = np.flatnonzero(~np.isnan(starts))
+
+        assemblies, chromosomes = table['Assembly'], table['Chromosome']
+        names = [normalize_chromosome(name) for name in chromosomes.categories]
+        keys = assemblies.codes[rows].astype(np.int64) * (len(names) + 1) + chromosomes.codes[rows]
+        order = np.argsort(keys, kind='stable')
+        keys, rows = keys[order], rows[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        for group in np.split(rows, bounds):
+            if not len(group):
+                continue
+            assembly = assemblies[int(group[0])]
+            chromosome = chromosomes.codes[group[0]]
+            if chromosome < 0:
+                continue
+            key = (assembly, names[chromosome])
+            index = IntervalIndex(starts[group], stops[group], group)
+            if key in self.indexes:
+                # 'chr1' and '1' in the same table
+                previous = self.indexes[key]
+                index = IntervalIndex(np.concatenate([previous.starts, index.starts]),
+                                      np.concatenate([previous.stops, index.stops]),
+                                      np.concatenate([previous.ids, index.ids]))
+            self.indexes[key] = index
+
+    def chromosomes(self, assembly=DEFAULT_ASSEMBLY):
+        return sorted(chromosome for key_assembly, chromosome in self.indexes if key_assembly == assembly)
+
+    def overlapping(self, chromosome, start, stop, assembly=DEFAULT_ASSEMBLY):
+        """
+        :return: variant table row numbers of the variants overlapping chromosome:start-stop
+        """
+        index = self.indexes.get((assembly, normalize_chromosome(chromosome)))
+        if index is None:
+            return np.empty(0, dtype=np.int64)
+        return index.overlapping(start, stop)
+
+    def overlapping_regions(self, regions, assembly=DEFAULT_ASSEMBLY):
+        """
+        :param regions: Regions (see read_bed)
+        :return: (region numbers, variant table row numbers) of every overlapping pair, by region
+        """
+        chromosomes = np.array([normalize_chromosome(name) for name in regions.chromosomes], dtype=object)
+        found_regions, found_rows = [], []
+        for chromosome in sorted(set(chromosomes.tolist())):
+            index = self.indexes.get((assembly, chromosome))
+            if index is None:
+                continue
+            numbers = np.flatnonzero(chromosomes == chromosome)
+            region, rows = index.overlapping_many(regions.starts[numbers], regions.stops[numbers])
+            found_regions.append(numbers[region])
+            found_rows.append(rows)
+        if not found_regions:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        region, rows = np.concatenate(found_regions), np.concatenate(found_rows)
+        order = np.argsort(region, kind='stable')
+        return region[order], rows[order]
+
+_intervals = {}
+
+def get_clinvar_intervals(assembly=DEFAULT_ASSEMBLY):
+    """
+    GenomeIntervals of the shared variant table of assembly (medgen.db.variant_table.get_variant_table).
+    """
+    table = get_variant_table(assembly)
+    intervals = _intervals.get(assembly)
+    if intervals is None or intervals.table is not table:
+        intervals = _intervals[assembly] = GenomeIntervals(table)
+    return intervals
+
+def clear_clinvar_intervals():
+    """
+    Drop the shared GenomeIntervals (with the variant tables, on medgen.db.registry.reset and set_db).
+    """
+    _intervals.clear()
+
+on_reset(clear_clinvar_intervals)
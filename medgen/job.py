@@ -0,0 +1,316 @@
+""" Checkpointed, resumable and shardable annotation jobs.
+
+Input items are numbered by their position (offset) in the input. A stable hash of each item
+assigns it to one of N shards, so N nodes can each run one shard of the same input:
+
+    medgen-job run  --function medgen.api:ClinvarPubmeds --shard 3 --num-shards 10 -w out/ variants.txt
+    medgen-job merge -w out/ -o annotated.jsonl
+
+Each shard writes JSON lines to numbered part files and, every --checkpoint-every items, a
+checkpoint of the last completed offset and the size of its part file. Rerunning the same
+command after a crash (or a MySQL restart) truncates the part back to the checkpoint and resumes
+from the next offset, so every item is written exactly once. Results are streamed to disk;
+only the in-flight window is held in memory (unlike medgen.log.LogContainer).
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import heapq
+import argparse
+from collections import deque
+from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
+
+from .log import log
+from .db.rows import json_default
+from .stats import StreamingHistogram
+
+DEFAULT_WORKERS = 8
+DEFAULT_CHECKPOINT_EVERY = 1000
+DEFAULT_PART_SIZE = 100000      # items per output part file
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0           # seconds, doubled per retry
+
+CHECKPOINT_FILENAME = 'checkpoint.json'
+
+##########################################################################################
+#
+#       Sharding
+#
+##########################################################################################
+
+def stable_shard(key, num_shards):
+    """
+    Shard of key; the same on every node, process and Python version (unlike hash()).
+    :param key: str
+    :param num_shards: int
+    :return: int in range(num_shards)
+    """
+    return zlib.crc32(str(key).encode('utf-8')) % num_shards
+
+def shard_dir(workdir, shard, num_shards):
+    return os.path.join(workdir, 'shard-%05d-of-%05d' % (shard, num_shards))
+
+def _part_path(directory, part):
+    return os.path.join(directory, 'part-%05d.jsonl' % part)
+
+##########################################################################################
+#
+#       Job
+#
+##########################################################################################
+
+class AnnotationJob(object):
+    """
+    Run func over the items of one shard, with checkpoints and exactly-once output.
+    """
+    def __init__(self, func, workdir, shard=0, num_shards=1, workers=DEFAULT_WORKERS,
+                 checkpoint_every=DEFAULT_CHECKPOINT_EVERY, part_size=DEFAULT_PART_SIZE,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, key=str):
+        """
+        :param func: function of one item (e.g. medgen.api.ClinvarPubmeds)
+        :param workdir: output directory shared by all shards
+        :param shard: which shard this job runs
+        :param num_shards: total number of shards
+        :param workers: threads calling func
+        :param checkpoint_every: items between checkpoints
+        :param part_size: items per output part file
+        :param retries: attempts after a failed func(item) before recording the error
+        :param backoff: seconds to sleep before the first retry (doubled each time)
+        :param key: function of item -> str, hashed to pick the shard
+        """
+        if not 0 <= shard < num_shards:
+            raise ValueError('shard must be in range(num_shards)')
+        self.func = func
+        self.shard = shard
+        self.num_shards = num_shards
+        self.workers = workers
+        self.checkpoint_every = checkpoint_every
+        self.part_size = part_size
+        self.retries = retries
+        self.backoff = backoff
+        self.key = key
+
+        self.directory = shard_dir(workdir, shard, num_shards)
+        self.checkpoint_path = os.path.join(self.directory, CHECKPOINT_FILENAME)
+        self.state = self._load_checkpoint()
+        self.latency = StreamingHistogram.from_dict(self.state['latency']) if self.state.get('latency') \
+            else StreamingHistogram()
+
+    def _load_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as fh:
+                state = json.load(fh)
+            if state['num_shards'] != self.num_shards:
+                raise ValueError('checkpoint in %s was written for %d shards' % (self.directory, state['num_shards']))
+            log.info('resuming shard %d/%d after offset %d', self.shard, self.num_shards, state['offset'])
+            return state
+        return {'shard': self.shard, 'num_shards': self.num_shards, 'offset': -1,
+                'part': 0, 'part_items': 0, 'part_bytes': 0, 'done': 0, 'errors': 0, 'finished': False}
+
+    def _write_checkpoint(self, output):
+        output.flush()
+        os.fsync(output.fileno())
+        self.state['part_bytes'] = output.tell()
+        self.state['latency'] = self.latency.to_dict()
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(self.state, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def _open_part(self):
+        path = _part_path(self.directory, self.state['part'])
+        output = open(path, 'a+')
+        # drop anything written after the last checkpoint
+        output.truncate(self.state['part_bytes'])
+        output.seek(self.state['part_bytes'])
+        return output
+
+    def _call(self, offset, item):
+        start = time.perf_counter()
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                result = self.func(item)
+                return {'offset': offset, 'input': item, 'result': result}, time.perf_counter() - start
+            except Exception as err:
+                if attempt == self.retries:
+                    return {'offset': offset, 'input': item, 'error': repr(err)}, time.perf_counter() - start
+                log.debug('offset %d failed (%r); retrying in %.1fs', offset, err, delay)
+                time.sleep(delay)
+                delay *= 2
+
+    def _items(self, items):
+        for offset, item in enumerate(items):
+            if offset <= self.state['offset']:
+                continue
+            if stable_shard(self.key(item), self.num_shards) == self.shard:
+                yield offset, item
+
+    def run(self, items):
+        """
+        Process (or resume processing) this shard of items.
+
+        :param items: the complete input, in the same order on every run and every node
+        :return: dict state {offset, done, errors, part, ..., finished}
+        """
+        if self.state['finished']:
+            return self.state
+
+        os.makedirs(self.directory, exist_ok=True)
+        output = self._open_part()
+        pending = deque()
+        since_checkpoint = 0
+
+        def drain_one():
+            record, seconds = pending[0].result()
+            pending.popleft()
+            output.write(json.dumps(record, default=json_default) + '\n')
+            self.latency.add(seconds)
+            self.state['offset'] = record['offset']
+            self.state['done'] += 1
+            self.state['errors'] += 1 if 'error' in record else 0
+            self.state['part_items'] += 1
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for offset, item in self._items(items):
+                    pending.append(pool.submit(self._call, offset, item))
+                    if len(pending) < 2 * self.workers:
+                        continue
+
+                    drain_one()
+                    since_checkpoint += 1
+                    if self.state['part_items'] >= self.part_size:
+                        self._write_checkpoint(output)
+                        output.close()
+                        self.state.update(part=self.state['part'] + 1, part_items=0, part_bytes=0)
+                        output = self._open_part()
+                        self._write_checkpoint(output)
+                        since_checkpoint = 0
+                    elif since_checkpoint >= self.checkpoint_every:
+                        self._write_checkpoint(output)
+                        since_checkpoint = 0
+
+                while pending:
+                    drain_one()
+            self.state['finished'] = True
+        finally:
+            # on a crash, keep everything that completed (in order) before the failure.
+            while pending and pending[0].done() and not pending[0].cancelled() and not pending[0].exception():
+                drain_one()
+            self._write_checkpoint(output)
+            output.close()
+
+        log.info('shard %d/%d finished: %d items, %d errors', self.shard, self.num_shards,
+                 self.state['done'], self.state['errors'])
+        return self.state
+
+##########################################################################################
+#
+#       Merge
+#
+##########################################################################################
+
+def _read_shard(directory):
+    part = 0
+    while os.path.exists(_part_path(directory, part)):
+        with open(_part_path(directory, part)) as fh:
+            for line in fh:
+                yield json.loads(line)
+        part += 1
+
+def merge_parts(workdir, output):
+    """
+    Merge the part files of all shards in workdir into output, ordered by input offset.
+    The result does not depend on how many shards there were, or which ran when.
+
+    :param workdir: directory given to AnnotationJob
+    :param output: writable text file
+    :return: number of records written
+    """
+    directories = sorted(os.path.join(workdir, name) for name in os.listdir(workdir)
+                         if name.startswith('shard-'))
+    unfinished = []
+    for directory in directories:
+        checkpoint = os.path.join(directory, CHECKPOINT_FILENAME)
+        finished = False
+        if os.path.exists(checkpoint):
+            with open(checkpoint) as fh:
+                finished = json.load(fh).get('finished')
+        if not finished:
+            unfinished.append(directory)
+    if unfinished:
+        log.warn('merging unfinished shards: %s', ', '.join(unfinished))
+
+    count = 0
+    for record in heapq.merge(*[_read_shard(directory) for directory in directories],
+                              key=lambda record: record['offset']):
+        output.write(json.dumps(record, default=json_default) + '\n')
+        count += 1
+    return count
+
+##########################################################################################
+#
+#       main
+#
+##########################################################################################
+
+def _import_function(path):
+    module, _, name = path.partition(':')
+    return getattr(import_module(module), name)
+
+def _read_lines(path):
+    infile = sys.stdin if path == '-' else open(path)
+    for line in infile:
+        line = line.rstrip('\r\n')
+        if line:
+            yield line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='medgen-job', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command')
+
+    run = commands.add_parser('run', help='run (or resume) one shard')
+    run.add_argument('input', help='input file, one item per line (the same file on every node)')
+    run.add_argument('-f', '--function', required=True, help='module:function, e.g. medgen.api:ClinvarPubmeds')
+    run.add_argument('-w', '--workdir', required=True)
+    run.add_argument('--shard', type=int, default=0)
+    run.add_argument('--num-shards', type=int, default=1)
+    run.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    run.add_argument('--checkpoint-every', type=int, default=DEFAULT_CHECKPOINT_EVERY)
+    run.add_argument('--part-size', type=int, default=DEFAULT_PART_SIZE)
+
+    merge = commands.add_parser('merge', help='merge the output of all shards in input order')
+    merge.add_argument('-w', '--workdir', required=True)
+    merge.add_argument('-o', '--output', default='-')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        job = AnnotationJob(_import_function(args.function), args.workdir, shard=args.shard,
+                            num_shards=args.num_shards, workers=args.workers,
+                            checkpoint_every=args.checkpoint_every, part_size=args.part_size)
+        state = job.run(_read_lines(args.input))
+        lat = job.latency.summary()
+        sys.stderr.write('shard %d/%d: %d items, %d errors; latency p50=%s p99=%s\n' % (
+            args.shard, args.num_shards, state['done'], state['errors'], lat['p50'], lat['p99']))
+        return 0
+    elif args.command == 'merge':
+        output = sys.stdout if args.output == '-' else open(args.output, 'w')
+        try:
+            count = merge_parts(args.workdir, output)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        sys.stderr.write('merged %d records\n' % count)
+        return 0
+    parser.print_help()
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,356 @@
+""" Capture the medgen.api calls of a running process, and replay them as a load test.
+
+Capture (one JSON line per call: time, function, arguments):
+
+    MEDGEN_CAPTURE=calls.jsonl medgen-annotate genes.txt > /dev/null
+    # or in-process: medgen.loadtest.start_capture('calls.jsonl') ... stop_capture()
+
+Replay at 1x, Nx or full speed (--speed 0) with a fixed number of concurrent callers:
+
+    medgen-loadtest calls.jsonl --speed 4 --concurrency 32 --target staging
+    medgen-loadtest calls.jsonl --speed 0 --embedded bench-db/ --json report.json
+
+--target names a config section whose db_host / db_user / db_pass replace those of every
+database section, to aim a capture from production at another server. --embedded and
+--replay-db run offline (medgen.db.embedded, medgen.db.replay).
+
+The replay is open loop: each call is due at its captured time (divided by --speed) whether or
+not earlier calls are done, so latency is measured from when the call was due and includes
+waiting for a free caller. The report has throughput, latency percentiles, error rates per
+function, and per --interval window: calls, errors, latency, callers busy (saturation of the
+caller pool: every caller holds one connection per database) and calls waiting for a caller.
+
+For load tests of medgen-service over HTTP see medgen.service.loadtest.
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .log import log
+from .stats import StreamingHistogram
+
+DEFAULT_SPEED = 1.0
+DEFAULT_CONCURRENCY = 16
+DEFAULT_INTERVAL = 1.0
+
+##########################################################################################
+#
+#       Capture
+#
+##########################################################################################
+
+class CallLog(object):
+    """
+    Appends {"t": epoch seconds, "function": name, "args": [...], "kwargs": {...}} lines to path.
+    Arguments JSON cannot hold are written as {"$repr": repr(value)}; replay skips those calls.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+        self._file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def write(self, function, args, kwargs):
+        line = json.dumps({'t': time.time(), 'function': function, 'args': list(args), 'kwargs': kwargs},
+                          default=lambda value: {'$repr': repr(value)})
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.calls += 1
+
+    def wrap(self, name, function):
+        if isinstance(function, type) or not callable(function):
+            return function
+
+        def captured(*args, **kwargs):
+            self.write(name, args, kwargs)
+            return function(*args, **kwargs)
+
+        captured.captured_function = function
+        captured.__name__ = name
+        captured.__doc__ = function.__doc__
+        return captured
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+_call_log = None
+
+def start_capture(path):
+    """
+    Log every medgen.api function call to path (appending). Covers calls through the medgen.api
+    module (medgen.api.GeneID(...), getattr(api, name)), and names imported from it after this.
+
+    :return: CallLog
+    """
+    global _call_log
+    from . import api
+    stop_capture()
+    _call_log = CallLog(path)
+    api._wrap = _call_log.wrap
+    for name in api.__all__:
+        if name in vars(api):
+            setattr(api, name, _call_log.wrap(name, vars(api)[name]))
+    log.info('capturing medgen.api calls to %s', path)
+    return _call_log
+
+def stop_capture():
+    """
+    Stop logging medgen.api calls; the functions are unwrapped.
+    """
+    global _call_log
+    from . import api
+    if _call_log is None:
+        return
+    api._wrap = None
+    for name in api.__all__:
+        function = vars(api).get(name)
+        if hasattr(function, 'captured_function'):
+            setattr(api, name, function.captured_function)
+    _call_log.close()
+    _call_log = None
+
+def read_calls(lines):
+    """
+    :param lines: captured JSON lines
+    :return: list of call dicts, in time order
+    """
+    calls = [json.loads(line) for line in lines if line.strip()]
+    calls.sort(key=lambda call: call['t'])
+    return calls
+
+def _replayable(value):
+    if isinstance(value, dict):
+        return '$repr' not in value and all(_replayable(item) for item in value.values())
+    if isinstance(value, list):
+        return all(_replayable(item) for item in value)
+    return True
+
+##########################################################################################
+#
+#       Replay
+#
+##########################################################################################
+
+class _Window(object):
+
+    def __init__(self, start):
+        self.start = start
+        self.calls = 0
+        self.errors = 0
+        self.latency = StreamingHistogram()
+        self.busy = 0
+        self.waiting = 0
+
+    def report(self, interval, concurrency):
+        lat = self.latency.summary((50, 95, 99))
+        return OrderedDict([('t', round(self.start, 3)), ('calls', self.calls), ('errors', self.errors),
+                            ('calls_per_sec', self.calls / interval),
+                            ('p50', lat['p50']), ('p95', lat['p95']), ('p99', lat['p99']), ('max', lat['max']),
+                            ('busy', self.busy), ('saturation', self.busy / float(concurrency)),
+                            ('waiting', self.waiting)])
+
+class LoadReplay(object):
+    """
+    Replay captured calls against whichever databases SQLData connects to.
+
+    :param calls: call dicts (see read_calls)
+    :param speed: 1 = captured pace, 4 = four times faster, 0 = every call due at once
+    :param concurrency: concurrent callers (threads)
+    :param interval: seconds per window of the time series
+    :param functions: {name: function}, default the medgen.api functions
+    """
+    def __init__(self, calls, speed=DEFAULT_SPEED, concurrency=DEFAULT_CONCURRENCY, interval=DEFAULT_INTERVAL,
+                 functions=None):
+        self.calls = calls
+        self.speed = speed
+        self.concurrency = concurrency
+        self.interval = interval
+        self.functions = functions
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._waiting = 0
+
+    def _function(self, name):
+        if self.functions is not None:
+            return self.functions[name]
+        from . import api
+        function = getattr(api, name)
+        return getattr(function, 'captured_function', function)
+
+    def _window(self, now):
+        index = int((now - self._start) / self.interval)
+        while len(self._windows) <= index:
+            self._windows.append(_Window(len(self._windows) * self.interval))
+        return self._windows[index]
+
+    def _gauge(self, busy=0, waiting=0):
+        with self._lock:
+            self._busy += busy
+            self._waiting += waiting
+            window = self._window(time.perf_counter())
+            window.busy = max(window.busy, self._busy)
+            window.waiting = max(window.waiting, self._waiting)
+
+    def _call(self, call, due):
+        self._gauge(busy=1, waiting=-1)
+        started = time.perf_counter()
+        error = None
+        try:
+            result = self._function(call['function'])(*call['args'], **call['kwargs'])
+            if hasattr(result, '__next__'):
+                # generators (AnnotatePanel) do their work as they are consumed
+                for _ in result:
+                    pass
+        except Exception as err:
+            error = type(err).__name__
+        done = time.perf_counter()
+        self._gauge(busy=-1)
+
+        with self._lock:
+            window = self._window(done)
+            window.calls += 1
+            window.latency.add(done - due)
+            self.latency.add(done - due)
+            self.service.add(done - started)
+            self.lag.add(started - due)
+            stats = self.by_function.setdefault(call['function'], {'calls': 0, 'errors': 0,
+                                                                   'latency': StreamingHistogram()})
+            stats['calls'] += 1
+            stats['latency'].add(done - due)
+            if error is not None:
+                window.errors += 1
+                stats['errors'] += 1
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def run(self):
+        """
+        :return: report dict (see module docstring)
+        """
+        self.latency = StreamingHistogram()
+        self.service = StreamingHistogram()
+        self.lag = StreamingHistogram()
+        self.by_function = OrderedDict()
+        self.errors = {}
+        self._windows = []
+        skipped = 0
+
+        calls = [call for call in self.calls if _replayable(call['args']) and _replayable(call['kwargs'])]
+        skipped = len(self.calls) - len(calls)
+        t0 = calls[0]['t'] if calls else 0
+
+        self._start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for call in calls:
+                due = self._start + ((call['t'] - t0) / self.speed if self.speed else 0)
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self._gauge(waiting=1)
+                pool.submit(self._call, call, due)
+        seconds = time.perf_counter() - self._start
+
+        report = OrderedDict()
+        report['calls'] = len(calls)
+        report['skipped'] = skipped
+        report['seconds'] = seconds
+        report['calls_per_sec'] = len(calls) / seconds if seconds else None
+        report['speed'] = self.speed
+        report['concurrency'] = self.concurrency
+        report['errors'] = sum(self.errors.values())
+        report['error_rate'] = report['errors'] / float(len(calls)) if calls else 0.0
+        report['error_types'] = self.errors
+        report['latency'] = self.latency.summary((50, 95, 99))
+        report['service'] = self.service.summary((50, 95, 99))
+        report['lag'] = self.lag.summary((50, 95, 99))
+        report['functions'] = OrderedDict(
+            (name, OrderedDict([('calls', stats['calls']), ('errors', stats['errors']),
+                                ('error_rate', stats['errors'] / float(stats['calls'])),
+                                ('latency', stats['latency'].summary((50, 95, 99)))]))
+            for name, stats in sorted(self.by_function.items()))
+        report['windows'] = [window.report(self.interval, self.concurrency) for window in self._windows]
+        return report
+
+def format_report(report):
+    ms = lambda value: '%.1f' % (value * 1000) if value is not None else '-'
+    lat = report['latency']
+    lines = ['%d calls in %.1fs (%.1f/s, speed %s, %d callers), %d errors (%.2f%%), %d skipped' % (
+                 report['calls'], report['seconds'], report['calls_per_sec'] or 0, '%gx' % report['speed'] if report['speed'] else 'max',
+                 report['concurrency'], report['errors'], 100 * report['error_rate'], report['skipped']),
+             'latency ms: p50 %s  p95 %s  p99 %s  max %s   (waiting for a caller: p99 %s)' % (
+                 ms(lat['p50']), ms(lat['p95']), ms(lat['p99']), ms(lat['max']), ms(report['lag']['p99'])),
+             '',
+             '%-28s %8s %8s %9s %9s' % ('function', 'calls', 'errors', 'p50 ms', 'p99 ms')]
+    for name, stats in report['functions'].items():
+        lines.append('%-28s %8d %8d %9s %9s' % (name, stats['calls'], stats['errors'],
+                                                ms(stats['latency']['p50']), ms(stats['latency']['p99'])))
+    lines += ['', '%8s %7s %7s %9s %9s %9s %6s %8s' % ('t', 'calls', 'errors', 'p50 ms', 'p99 ms', 'max ms',
+                                                          'busy', 'waiting')]
+    for window in report['windows']:
+        lines.append('%8.1f %7d %7d %9s %9s %9s %5.0f%% %8d' % (
+            window['t'], window['calls'], window['errors'], ms(window['p50']), ms(window['p99']),
+            ms(window['max']), 100 * window['saturation'], window['waiting']))
+    return '\n'.join(lines)
+
+##########################################################################################
+#
+#       CLI
+#
+##########################################################################################
+
+def use_target(section):
+    """
+    Point every database config section at the server of config section (db_host, db_user,
+    db_pass); each keeps its own dataset. Shared SQLData instances are rebuilt on next use.
+    """
+    from .config import get_config
+    from .db import registry
+    config = get_config()
+    server = dict((key, config.get(section, key)) for key in ('db_host', 'db_user', 'db_pass'))
+    for name in ['DEFAULT'] + config.sections():
+        for key, value in server.items():
+            config.set(name, key, value)
+    registry.reset()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='medgen-loadtest', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('calls', help='captured calls (JSON lines)')
+    parser.add_argument('--speed', type=float, default=DEFAULT_SPEED, help='replay speed; 0 = as fast as possible')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='seconds per report window')
+    parser.add_argument('--limit', type=int, help='replay only the first LIMIT calls')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--target', metavar='SECTION', help='config section with db_host/db_user/db_pass to use')
+    target.add_argument('--embedded', metavar='DIRECTORY', help='embedded synthetic databases (medgen.db.embedded)')
+    target.add_argument('--replay-db', metavar='FILE', help='recorded query results (medgen.db.replay)')
+    parser.add_argument('--json', metavar='FILE', help='also write the report as JSON')
+    args = parser.parse_args(argv)
+
+    if args.target:
+        use_target(args.target)
+    elif args.embedded:
+        from .db import embedded
+        embedded.prepare(args.embedded)
+    elif args.replay_db:
+        from .db import replay
+        replay.use(args.replay_db)
+
+    with open(args.calls) as fh:
+        calls = read_calls(fh)
+    if args.limit:
+        calls = calls[:args.limit]
+    report = LoadReplay(calls, args.speed, args.concurrency, args.interval).run()
+    sys.stderr.write(format_report(report) + '\n')
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
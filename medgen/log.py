@@ -1,8 +1,13 @@
 import sys
+import time
+import random
 import logging
 import datetime
+import threading
 from  collections import OrderedDict
 
+from .stats import StreamingHistogram
+
 log = logging.getLogger('medgen')
 
 ##########################################################################
@@ -75,3 +80,127 @@ def LogContainer(_func, _collection):
     t.elapsed()
     return t
 
+
+##########################################################################
+# PARALLEL LOGGING
+#
+# LogContainer keeps every item and result. ParallelLogContainer keeps counters,
+# a bounded sample of failures, and a latency histogram, so memory stays flat.
+
+DEFAULT_LOG_WORKERS = 8
+DEFAULT_MAX_FAILURES = 100   # failures kept (reservoir sample) for inspection
+
+class LogStats:
+
+    def __init__(self, max_failures=DEFAULT_MAX_FAILURES):
+        self.passed = 0
+        self.failed = 0
+        self.max_failures = max_failures
+        self.failures = []           # sample of (item, error)
+        self.latency = StreamingHistogram()
+        self._lock = threading.Lock()
+        self._start_time = time.perf_counter()
+        self._stop_time = None
+
+    def log_passed(self, item, seconds):
+        self.latency.add(seconds)
+        with self._lock:
+            self.passed += 1
+
+    def log_failed(self, item, error, seconds):
+        self.latency.add(seconds)
+        with self._lock:
+            self.failed += 1
+            if len(self.failures) < self.max_failures:
+                self.failures.append((item, error))
+            else:
+                slot = random.randrange(self.failed)
+                if slot < self.max_failures:
+                    self.failures[slot] = (item, error)
+
+    def stop(self):
+        self._stop_time = time.perf_counter()
+
+    def seconds(self):
+        return (self._stop_time or time.perf_counter()) - self._start_time
+
+    def summary(self):
+        """
+        :return: OrderedDict {passed, failed, seconds, items_per_sec, p50, p95, p99, max} (latencies in seconds)
+        """
+        seconds = self.seconds()
+        items = self.passed + self.failed
+        report = OrderedDict([('passed', self.passed),
+                              ('failed', self.failed),
+                              ('seconds', seconds),
+                              ('items_per_sec', items / seconds if seconds else None)])
+        for pct in (50, 95, 99):
+            report['p%d' % pct] = self.latency.percentile(pct)
+        report['max'] = self.latency.max
+        return report
+
+    def elapsed(self):
+        summary = self.summary()
+        log.info('elapsed: %.3fs  passed: %d  failed: %d  items/sec: %s',
+                 summary['seconds'], summary['passed'], summary['failed'], summary['items_per_sec'])
+        log.info('latency p50: %s  p95: %s  p99: %s  max: %s',
+                 summary['p50'], summary['p95'], summary['p99'], summary['max'])
+        return summary
+
+    def __str__(self):
+        return '@LogStats ' + str(dict(self.summary()))
+
+
+def _timed_call(_func, item):
+    # runs in the worker (thread or process); errors travel back as text.
+    start = time.perf_counter()
+    try:
+        _func(item)
+        return True, None, time.perf_counter() - start
+    except Exception as e:
+        return False, repr(e), time.perf_counter() - start
+
+
+def ParallelLogContainer(_func, _collection, workers=DEFAULT_LOG_WORKERS, processes=False,
+                         queue_size=None, max_failures=DEFAULT_MAX_FAILURES):
+    """
+    LogContainer over a thread (or process) pool. Results are discarded; only counters,
+    a sample of failures and the latency distribution are kept.
+
+    :param _func: function of one item (must be picklable if processes=True)
+    :param _collection: iterable of items (consumed lazily)
+    :param workers: pool size
+    :param processes: use a process pool instead of threads
+    :param queue_size: max items submitted but not finished (default 4 * workers)
+    :param max_failures: number of (item, error) failures to keep
+    :return: LogStats
+    """
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    stats = LogStats(max_failures)
+    queue_size = queue_size or 4 * workers
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+
+    def collect(done):
+        for future in done:
+            item = pending.pop(future)
+            ok, error, seconds = future.result()
+            if ok:
+                stats.log_passed(item, seconds)
+            else:
+                log.debug(str(item)+':'+str(error))
+                stats.log_failed(item, error, seconds)
+
+    pending = {}
+    with executor(max_workers=workers) as pool:
+        for item in _collection:
+            if len(pending) >= queue_size:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[pool.submit(_timed_call, _func, item)] = item
+        collect(list(pending))
+
+    stats.stop()
+    stats.elapsed()
+    return stats
+
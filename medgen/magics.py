@@ -0,0 +1,207 @@
+""" IPython magics for profiling medgen API calls interactively (loaded by api-shell).
+
+    In [1]: %load_ext medgen.magics
+    In [2]: %medgen_queries GeneInfo('BRCA2')
+    In [3]: %medgen_profile Gene2ConditionSource('BRCA2')
+
+%medgen_queries runs the expression and lists every SQL statement it issued, with its time,
+rows and 'Class.method' template. %medgen_profile also prints the wall time, the span tree
+(see medgen.trace), cache hits and misses (see medgen.metrics) and the memory allocated while
+it ran. Both return the value of the expression (generators, e.g. AnnotatePanel, are consumed
+into a list), so Out[n] holds it as usual.
+
+warm() / read_warm_file() fill the gene and concept caches before the first call (api-shell --warm).
+"""
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from .log import log
+
+##########################################################################################
+#
+#       Profile
+#
+##########################################################################################
+
+class Profile(object):
+    """
+    What one evaluated expression did: result (or error), seconds, queries (QueryEvents),
+    cache {(cache, result): lookups}, allocated / peak bytes, and the trace.Tracer of its spans.
+    """
+    def __init__(self, expression):
+        self.expression = expression
+        self.result = None
+        self.error = None
+        self.seconds = 0.0
+        self.queries = []
+        self.cache = OrderedDict()
+        self.allocated = 0
+        self.peak = 0
+        self.tracer = None
+
+def run(expression, namespace=None):
+    """
+    Evaluate expression in namespace (default: the medgen.api names) and record what it did.
+
+    :return: Profile
+    """
+    from . import metrics, trace
+    from .db.instrument import QueryCounter
+    if namespace is None:
+        from . import api
+        namespace = dict((name, getattr(api, name)) for name in api.__all__)
+
+    profile = Profile(expression)
+    code = compile(expression, '<%s>' % expression, 'eval')
+    cache_before = metrics.CACHE_REQUESTS.values()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    memory_before = tracemalloc.get_traced_memory()[0]
+
+    with trace.Tracer() as profile.tracer, QueryCounter(all_threads=True, warn_repeats=None) as queries:
+        start = time.perf_counter()
+        try:
+            result = eval(code, namespace)
+            if hasattr(result, '__next__'):
+                result = list(result)
+            profile.result = result
+        except Exception as err:
+            profile.error = err
+        profile.seconds = time.perf_counter() - start
+
+    current, profile.peak = tracemalloc.get_traced_memory()
+    profile.allocated = current - memory_before
+    profile.peak -= memory_before
+    if not tracing:
+        tracemalloc.stop()
+
+    profile.queries = queries.events
+    for key, value in sorted(metrics.CACHE_REQUESTS.values().items()):
+        if value != cache_before.get(key, 0):
+            profile.cache[key] = value - cache_before.get(key, 0)
+    return profile
+
+def _ms(seconds):
+    return '%.2fms' % (1000 * seconds)
+
+def _bytes(size):
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024 or unit == 'MiB':
+            return ('%d %s' if unit == 'B' else '%.1f %s') % (size, unit)
+        size /= 1024.0
+
+def _query_lines(events):
+    return ['%10s  rows=%-5s %-40s %s %s' % (_ms(event.seconds), event.rows, event.template,
+                                            ' '.join(event.sql.split()), list(event.args) or '')
+            for event in events]
+
+def format_queries(profile):
+    lines = ['%d queries, %s in SQL' % (len(profile.queries), _ms(sum(event.seconds for event in profile.queries)))]
+    lines += _query_lines(profile.queries)
+    if profile.error is not None:
+        lines.append('error: %r' % profile.error)
+    return '\n'.join(lines)
+
+def format_profile(profile):
+    lines = ['%s: %s wall, %d queries (%s in SQL)' % (
+        profile.expression, _ms(profile.seconds), len(profile.queries),
+        _ms(sum(event.seconds for event in profile.queries)))]
+    tree = profile.tracer.format_tree()
+    if tree:
+        lines += ['', tree]
+    if profile.queries:
+        lines += [''] + _query_lines(profile.queries)
+    lines.append('')
+    if profile.cache:
+        caches = OrderedDict()
+        for (cache, result), count in profile.cache.items():
+            caches.setdefault(cache, {'hit': 0, 'miss': 0})[result] = count
+        lines.append('cache: ' + ', '.join('%s %d hit / %d miss' % (cache, counts['hit'], counts['miss'])
+                                           for cache, counts in caches.items()))
+    else:
+        lines.append('cache: no lookups')
+    lines.append('memory: %s allocated and kept, %s peak' % (_bytes(profile.allocated), _bytes(profile.peak)))
+    if profile.error is not None:
+        lines.append('error: %r' % profile.error)
+    return '\n'.join(lines)
+
+##########################################################################################
+#
+#       Warm-up
+#
+##########################################################################################
+
+def read_warm_file(path):
+    """
+    :param path: text file of gene symbols / Entrez ids and UMLS CUIs, whitespace or comma
+                 separated, '#' starts a comment
+    :return: (genes, cuis)
+    """
+    from .db.medgen import is_format_umls
+    genes, cuis = [], []
+    with open(path) as fh:
+        for line in fh:
+            for token in line.split('#')[0].replace(',', ' ').split():
+                (cuis if is_format_umls(token) else genes).append(token)
+    return genes, cuis
+
+def warm(genes=(), cuis=()):
+    """
+    Resolve genes (ids and symbols, their gene2pubmed lists) and concepts (CUI <-> MedGen UID),
+    so the first calls on them are answered from cache.
+
+    :return: (genes warmed, concepts warmed)
+    """
+    from .db.gene import GeneDB
+    from .db.registry import get_db
+    from .parse.gene import Gene
+    from .parse.concept import Concept
+
+    db = get_db(GeneDB)
+    symbols = [gene for gene in genes if not str(gene).isdigit()]
+    if symbols:
+        db.get_gene_ids_for_gene_names(symbols)
+
+    warmed = [0, 0]
+    for gene in genes:
+        try:
+            gene = Gene(gene)
+            gene.id, gene.name
+            db.gene2pubmed(gene.id)
+            warmed[0] += 1
+        except Exception as err:
+            log.warning('could not warm gene %s: %r', gene, err)
+    for cui in cuis:
+        try:
+            Concept(cui).medgen_uid
+            warmed[1] += 1
+        except Exception as err:
+            log.warning('could not warm concept %s: %r', cui, err)
+    return tuple(warmed)
+
+##########################################################################################
+#
+#       IPython
+#
+##########################################################################################
+
+def load_ipython_extension(ipython):
+
+    def medgen_queries(line):
+        """%medgen_queries <expression>: run it, list the SQL statements issued and their timings."""
+        profile = run(line, ipython.user_ns)
+        sys.stdout.write(format_queries(profile) + '\n')
+        return profile.result
+
+    def medgen_profile(line):
+        """%medgen_profile <expression>: run it, print timings, spans, SQL, cache hits and memory."""
+        profile = run(line, ipython.user_ns)
+        sys.stdout.write(format_profile(profile) + '\n')
+        return profile.result
+
+    ipython.register_magic_function(medgen_queries, 'line')
+    ipython.register_magic_function(medgen_profile, 'line')
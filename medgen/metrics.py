@@ -0,0 +1,354 @@
+""" Counters, gauges and histograms of the library's internals, in Prometheus text format.
+
+    from medgen import metrics
+    metrics.enable()                # also time every SQL query (by config section and template)
+    metrics.serve(9108)             # optional: GET http://host:9108/metrics from a daemon thread
+    print(metrics.exposition())     # or expose the text from your own HTTP handler
+
+Always counted (a dict lookup and an addition each):
+
+    medgen_connections_opened_total{section}        SQLData connections opened
+    medgen_connections_open{section}                SQLData connections open now
+    medgen_pool_wait_seconds{section}               waiting for a medgen.db.aio pool connection
+    medgen_cache_requests_total{cache,result}       hit / miss of GeneDB, interning and service caches
+    medgen_eutils_requests_total{call,result}       NCBI eutils requests (metapub), ok / error
+    medgen_eutils_seconds{call}
+
+Counted after enable() (naming the template walks the stack, so it is opt-in):
+
+    medgen_queries_total{section,template}
+    medgen_query_seconds{section,template}
+    medgen_query_rows_total{section,template}
+
+Labels only take bounded values: config sections, 'Class.method' templates, cache and call
+names -- never query arguments.
+"""
+import time
+import bisect
+import threading
+from collections import OrderedDict
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_PORT = 9108
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+##########################################################################################
+#
+#       Metrics
+#
+##########################################################################################
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return '%d' % value
+    return repr(float(value))
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{%s}' % ','.join('%s="%s"' % (name, escape(value)) for name, value in zip(names, values))
+
+class _Metric(object):
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """
+        :return: the metric for these label values (in labelnames order), created on first use
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError('%s takes labels %r, got %r' % (self.name, self.labelnames, values))
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+    def values(self):
+        """
+        :return: dict {label values: value} (counters and gauges)
+        """
+        with self._lock:
+            return dict((values, child.value) for values, child in self._children.items())
+
+    def expose(self):
+        lines = ['# HELP %s %s' % (self.name, self.documentation), '# TYPE %s %s' % (self.name, self.kind)]
+        with self._lock:
+            children = sorted(self._children.items(), key=lambda item: [str(value) for value in item[0]])
+        for values, child in children:
+            for suffix, extra, value in child.samples():
+                names = self.labelnames + tuple(name for name, _ in extra)
+                labels = values + tuple(label for _, label in extra)
+                lines.append('%s%s%s %s' % (self.name, suffix, _format_labels(names, labels), _format_value(value)))
+        return '\n'.join(lines)
+
+class _CounterValue(object):
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [('', (), self.value)]
+
+class _GaugeValue(_CounterValue):
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self.value = value
+
+class _HistogramValue(object):
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def samples(self):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            samples.append(('_bucket', (('le', _format_value(bound)),), cumulative))
+        samples.append(('_sum', (), total))
+        samples.append(('_count', (), cumulative))
+        return samples
+
+class Counter(_Metric):
+    """
+    Value which only goes up: counter.labels('gene').inc()
+    """
+    kind = 'counter'
+
+    def _child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+class Gauge(_Metric):
+    """
+    Value which goes up and down: gauge.labels('gene').inc() / .dec() / .set(value)
+    """
+    kind = 'gauge'
+
+    def _child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self.labels().set(value)
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets: histogram.labels('gene').observe(seconds)
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+class Registry(object):
+    """
+    Metrics by name; counter() / gauge() / histogram() return the existing metric of that name.
+    """
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError('metric %s is already registered as a %s%r' % (
+                    name, metric.kind, metric.labelnames))
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def clear(self):
+        """
+        Forget all recorded values (the metrics stay registered).
+        """
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def exposition(self):
+        """
+        :return: all metrics in the Prometheus text exposition format
+        """
+        return ''.join(metric.expose() + '\n' for metric in list(self._metrics.values()))
+
+REGISTRY = Registry()
+
+def exposition(registry=None):
+    return (registry or REGISTRY).exposition()
+
+##########################################################################################
+#
+#       medgen metrics
+#
+##########################################################################################
+
+CONNECTIONS_OPENED = REGISTRY.counter('medgen_connections_opened_total', 'SQLData connections opened',
+                                      ('section',))
+CONNECTIONS_OPEN = REGISTRY.gauge('medgen_connections_open', 'SQLData connections open', ('section',))
+POOL_WAIT_SECONDS = REGISTRY.histogram('medgen_pool_wait_seconds',
+                                       'Seconds waiting for a connection of a medgen.db.aio pool', ('section',))
+CACHE_REQUESTS = REGISTRY.counter('medgen_cache_requests_total', 'Cache lookups by cache and hit / miss',
+                                  ('cache', 'result'))
+EUTILS_REQUESTS = REGISTRY.counter('medgen_eutils_requests_total', 'NCBI eutils requests made through metapub',
+                                   ('call', 'result'))
+EUTILS_SECONDS = REGISTRY.histogram('medgen_eutils_seconds', 'Seconds per NCBI eutils request', ('call',))
+QUERIES = REGISTRY.counter('medgen_queries_total', 'SQL queries run', ('section', 'template'))
+QUERY_SECONDS = REGISTRY.histogram('medgen_query_seconds', 'Seconds per SQL query', ('section', 'template'))
+QUERY_ROWS = REGISTRY.counter('medgen_query_rows_total', 'Rows returned or changed by SQL queries',
+                              ('section', 'template'))
+
+def cache_lookup(cache, hit):
+    """
+    Count one lookup of the cache named cache.
+    """
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+class eutils_request(object):
+    """
+    Times and counts the NCBI eutils request made inside the block (a span while tracing,
+    see medgen.trace):
+
+        with metrics.eutils_request('article_by_pmid'):
+            article = fetch.article_by_pmid(pmid)
+    """
+    def __init__(self, call):
+        self.call = call
+
+    def __enter__(self):
+        from . import trace
+        self._span = trace.span(self.call, 'eutils')
+        self._span.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._span.__exit__(exc_type, exc_value, traceback)
+        EUTILS_SECONDS.labels(self.call).observe(time.perf_counter() - self._start)
+        EUTILS_REQUESTS.labels(self.call, 'ok' if exc_type is None else 'error').inc()
+        return False
+
+def observe_query(section, template, seconds, rows):
+    QUERIES.labels(section, template).inc()
+    QUERY_SECONDS.labels(section, template).observe(seconds)
+    if rows and rows > 0:
+        QUERY_ROWS.labels(section, template).inc(rows)
+
+def _on_query(event):
+    observe_query(event.db._cfg_section, event.template, event.seconds, event.rows)
+
+enabled = False
+
+def enable():
+    """
+    Also record every SQL query (medgen_queries_total, medgen_query_seconds, medgen_query_rows_total).
+    """
+    global enabled
+    from .db.dataset import add_query_listener
+    if not enabled:
+        add_query_listener(_on_query)
+        enabled = True
+
+def disable():
+    global enabled
+    from .db.dataset import remove_query_listener
+    remove_query_listener(_on_query)
+    enabled = False
+
+##########################################################################################
+#
+#       HTTP
+#
+##########################################################################################
+
+def serve(port=DEFAULT_PORT, host='', registry=None):
+    """
+    Serve the exposition at http://host:port/metrics from a daemon thread.
+
+    :return: the http.server.HTTPServer (server.shutdown() stops it; port 0 picks a free port,
+             see server.server_address)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    registry = registry or REGISTRY
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.exposition().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='medgen-metrics', daemon=True)
+    thread.start()
+    return server
@@ -1,6 +1,11 @@
 import re
+import weakref
+import threading
 from collections import OrderedDict
 
+from .. import metrics
+from ..db import registry
+
 ##########################################################################################
 #
 #       Functions
@@ -21,6 +26,69 @@ def split_csv_tsv(text):
 
     return res
 
+##########################################################################################
+#
+#       Interning
+#
+##########################################################################################
+
+DEFAULT_IDENTITY_MAP_SIZE = 10000
+
+class IdentityMap(object):
+    """
+    Bounded (least recently used) map of key -> instance, so that constructing the
+    same value twice returns the same object instead of allocating (and resolving) it again.
+
+    Every IdentityMap is cleared by medgen.db.registry.reset() and set_connection_factory(),
+    since its instances hold values resolved against the databases in use.
+    """
+    _all = weakref.WeakSet()
+
+    def __init__(self, maxsize=DEFAULT_IDENTITY_MAP_SIZE, name=None):
+        self.maxsize = maxsize
+        self.name = name    # cache label of medgen_cache_requests_total (None: not counted)
+        self._map = OrderedDict()
+        self._lock = threading.Lock()
+        IdentityMap._all.add(self)
+
+    def get_or_create(self, key, factory):
+        """
+        :param key: hashable key
+        :param factory: called with no arguments to build the instance on a miss
+        :return: interned instance for key
+        """
+        with self._lock:
+            obj = self._map.get(key)
+            if self.name is not None:
+                metrics.cache_lookup(self.name, obj is not None)
+            if obj is not None:
+                self._map.move_to_end(key)
+                return obj
+
+            obj = factory()
+            self._map[key] = obj
+            if len(self._map) > self.maxsize:
+                self._map.popitem(last=False)
+            return obj
+
+    def discard(self, key, obj):
+        """
+        Forget key if it still maps to obj (e.g. obj failed to resolve): the next get_or_create builds a new one.
+        """
+        with self._lock:
+            if self._map.get(key) is obj:
+                del self._map[key]
+
+    def clear(self):
+        with self._lock:
+            self._map.clear()
 
+    @classmethod
+    def clear_all(cls):
+        for identity_map in list(cls._all):
+            identity_map.clear()
 
+    def __len__(self):
+        return len(self._map)
 
+registry.on_reset(IdentityMap.clear_all)
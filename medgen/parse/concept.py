@@ -1,5 +1,8 @@
 from ..db.medgen import MedGenDB
+from ..db.registry import get_db
 from ..vocab import Vocab
+from .. import trace
+from .common import IdentityMap
 
 ###########################################################################
 #
@@ -7,32 +10,91 @@ from ..vocab import Vocab
 #
 ###########################################################################
 
-class Concept:
+_UNRESOLVED = object()
+
+_concepts = IdentityMap(name='concept')
+
+def _concept_key(concept):
+    if not concept:
+        return ('none', None)
+    try:
+        return ('uid', int(concept))
+    except ValueError:
+        return ('cui', str(concept))
+
+class Concept(object):
     """
     MedGen
     The NCBI Handbook [Internet]. 2nd edition.
     http://www.ncbi.nlm.nih.gov/books/NBK159970/
+
+    Concepts are interned: Concept(2881) is Concept('2881'), so repeated construction allocates nothing.
+    Only the identifier passed in is known up front; the other is looked up on first access.
+    Concepts are equal when they are the same concept (Concept(2881) == Concept('C0007194'));
+    comparing or hashing a Concept made from a MedGen UID looks up its CUI.
     """
-    def __init__(self, concept):
+    __slots__ = ('_key', '_umls_cui', '_medgen_uid')
+
+    def __new__(cls, concept):
         """
         MedGen concept
         :param concept: either umls_cui (UMLS unique concept) or medgen_uid (MedGen defined ID)
         :return: concept with both UMLS and MedGen defined IDs available.
         """
-        try:
-            self.umls_cui  = None
-            self.medgen_uid= None
+        if isinstance(concept, Concept):
+            return concept
 
-            if concept:
-                self.medgen_uid = int(concept)
-                self.umls_cui= str(MedGenDB().medgen2umls(concept))
+        key = _concept_key(concept)
+        return _concepts.get_or_create(key, lambda: cls._create(key))
 
-        except ValueError:
-            self.umls_cui  = str(concept)
-            self.medgen_uid= int(MedGenDB().umls2medgen(concept))
+    @classmethod
+    def _create(cls, key):
+        self = object.__new__(cls)
+        self._key = key
+        kind, value = key
+        self._umls_cui   = value if kind == 'cui' else _UNRESOLVED
+        self._medgen_uid = value if kind == 'uid' else _UNRESOLVED
+        if kind == 'none':
+            self._umls_cui = self._medgen_uid = None
+        return self
+
+    @property
+    def umls_cui(self):
+        if self._umls_cui is _UNRESOLVED:
+            with trace.span('Concept.umls_cui', 'resolve', medgen_uid=self._medgen_uid):
+                umls_cui = get_db(MedGenDB).medgen2umls(self._medgen_uid)
+                self._umls_cui = None if umls_cui is None else str(umls_cui)
+            if self._umls_cui is None:
+                # unknown today, maybe not after a reload: don't keep this Concept interned
+                _concepts.discard(self._key, self)
+        return self._umls_cui
+
+    @property
+    def medgen_uid(self):
+        if self._medgen_uid is _UNRESOLVED:
+            with trace.span('Concept.medgen_uid', 'resolve', umls_cui=self._umls_cui):
+                medgen_uid = get_db(MedGenDB).umls2medgen(self._umls_cui)
+                self._medgen_uid = None if medgen_uid is None else int(medgen_uid)
+            if self._medgen_uid is None:
+                _concepts.discard(self._key, self)
+        return self._medgen_uid
+
+    def __reduce__(self):
+        return (Concept, (self._key[1],))
+
+    def _identity(self):
+        # the CUI; the MedGen UID only tells apart concepts without one
+        return (self.umls_cui, None) if self.umls_cui is not None else (None, self.medgen_uid)
 
     def __eq__(self, other):
-        return (self.__dict__ == other.__dict__)
+        if self is other:
+            return True
+        if not isinstance(other, Concept):
+            return False
+        return self._key == other._key or self._identity() == other._identity()
+
+    def __hash__(self):
+        return hash(self._identity())
 
     def __str__(self):
         return str([
@@ -1,5 +1,8 @@
 from ..db.gene import GeneDB
+from ..db.registry import get_db
 from ..vocab import Vocab, NCBI_GeneID, HGNC_GeneName
+from .. import trace
+from .common import IdentityMap
 
 ###########################################################################
 #
@@ -7,27 +10,82 @@ from ..vocab import Vocab, NCBI_GeneID, HGNC_GeneName
 #
 ###########################################################################
 
-class Gene:
-    def __init__(self, gene):
+_UNRESOLVED = object()
+
+_genes = IdentityMap(name='gene')
+
+def _gene_key(gene):
+    try:
+        return ('id', int(gene))
+    except ValueError:
+        return ('name', gene)
+
+class Gene(object):
+    """
+    Gene defines both the Entrez GeneID and Hugo GeneName.
+
+    Genes are interned: Gene(675) is Gene('675'), so repeated construction allocates nothing.
+    Only the identifier passed in is known up front; the other is looked up on first access.
+    Genes are equal when they are the same gene (Gene(675) == Gene('BRCA2')); comparing or
+    hashing a Gene made from a name looks up its GeneID.
+    """
+    __slots__ = ('_key', '_id', '_name')
+
+    def __new__(cls, gene):
         """
-         Gene defines both the Entrez GeneID and Hugo GeneName.
         :param gene: gene_id (GeneID) or hgnc (GeneName)
-        :return:
+        :return: Gene
         """
-        self.id = None
-        self.name = None
+        if isinstance(gene, Gene):
+            return gene
 
-        # parse gene arg as gene_id (int) or hgnc (str)
-        try:
-           self.id = int(gene)
-           self.name = GeneDB().get_gene_name(gene)
+        key = _gene_key(gene)
+        return _genes.get_or_create(key, lambda: cls._create(key))
 
-        except ValueError:
-            self.name = gene
-            self.id = GeneDB().get_gene_id_for_gene_name(gene)
+    @classmethod
+    def _create(cls, key):
+        self = object.__new__(cls)
+        self._key = key
+        kind, value = key
+        self._id = value if kind == 'id' else _UNRESOLVED
+        self._name = value if kind == 'name' else _UNRESOLVED
+        return self
+
+    @property
+    def id(self):
+        if self._id is _UNRESOLVED:
+            with trace.span('Gene.id', 'resolve', symbol=self._name):
+                self._id = get_db(GeneDB).get_gene_id_for_gene_name(self._name)
+            if self._id is None:
+                # unknown today, maybe not after a reload: don't keep this Gene interned
+                _genes.discard(self._key, self)
+        return self._id
+
+    @property
+    def name(self):
+        if self._name is _UNRESOLVED:
+            with trace.span('Gene.name', 'resolve', gene_id=self._id):
+                self._name = get_db(GeneDB).get_gene_name(self._id)
+            if self._name is None:
+                _genes.discard(self._key, self)
+        return self._name
+
+    def __reduce__(self):
+        return (Gene, (self._key[1],))
+
+    def _identity(self):
+        # the GeneID; the name only tells apart genes without one
+        return (self.id, None) if self.id is not None else (None, self.name)
 
     def __eq__(self, other):
-        return (self.__dict__ == other.__dict__)
+        if self is other:
+            return True
+        if not isinstance(other, Gene):
+            return False
+        return self._key == other._key or self._identity() == other._identity()
+
+    def __hash__(self):
+        return hash(self._identity())
 
     def __str__(self):
         return str([
@@ -0,0 +1 @@
+""" Asyncio HTTP annotation service (medgen-service); see medgen.service.app. """
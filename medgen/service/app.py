@@ -0,0 +1,357 @@
+""" medgen-service: asyncio HTTP service for the gene, concept, disease and variant annotations.
+
+    medgen-service --port 8080
+    curl localhost:8080/gene/BRCA2
+    curl localhost:8080/variant/NM_000059.3:c.68-7T%3EA
+    curl -d '["BRCA1", "BRCA2", "675"]' localhost:8080/gene
+    curl localhost:8080/health
+    curl localhost:8080/metrics
+    medgen-service --metrics-port 9108     # Prometheus text format on :9108/metrics
+
+GET /<kind>/<query> returns one annotation (404 for an unknown gene); POST /<kind> with a JSON
+list of queries (or {"queries": [...]}) returns {"results": [{"query", "result" | "error"}, ...]}
+in request order, with a null result for an unknown gene.
+Lookups run on the medgen.db.aio connection pools, so one process serves many concurrent
+requests; results are kept in an in-process LRU/TTL cache, and concurrent requests for the same
+query share one lookup.
+
+The server is built on asyncio streams (HTTP/1.1 with keep-alive), so it needs nothing beyond
+the 'async' extra (aiomysql).
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict
+from urllib.parse import unquote
+
+from ..log import log
+from .. import metrics
+from ..stats import StreamingHistogram
+from ..db.aio import AsyncGeneDB, AsyncClinVarDB, AsyncMedGenDB, AsyncHugoDB
+from ..db.registry import get_db, set_db
+from ..db.rows import json_default
+from ..annotate import aio
+from .cache import ResultCache, DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_MAX_BATCH = 1000
+DEFAULT_MAX_CONCURRENCY = 256   # annotations in progress at once (each may issue several queries)
+DEFAULT_POOL_SIZE = 20          # connections per DB section
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+DB_CLASSES = (AsyncGeneDB, AsyncClinVarDB, AsyncMedGenDB, AsyncHugoDB)
+
+# kind -> coroutine function of one query
+ANNOTATORS = OrderedDict([
+    ('gene',    aio.annotate_gene),
+    ('concept', aio.annotate_concept),
+    ('disease', aio.annotate_disease),
+    ('variant', aio.annotate_variant),
+])
+
+STATUS_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                  413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super(HTTPError, self).__init__(message)
+        self.status = status
+
+##########################################################################################
+#
+#       Service
+#
+##########################################################################################
+
+class AnnotationService(object):
+    """
+    Request handling, independent of the transport: handle(method, path, body) -> (status, payload).
+    """
+    def __init__(self, annotators=None, cache=None, max_batch=DEFAULT_MAX_BATCH,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """
+        :param annotators: OrderedDict {kind: coroutine function}, default ANNOTATORS
+        :param cache: ResultCache (default: DEFAULT_CACHE_SIZE entries for DEFAULT_CACHE_TTL seconds)
+        :param max_batch: most queries accepted in one POST
+        :param max_concurrency: most annotations running at once; the rest wait their turn
+        """
+        self.annotators = ANNOTATORS if annotators is None else annotators
+        self.cache = ResultCache() if cache is None else cache
+        self.max_batch = max_batch
+        self.max_concurrency = max_concurrency
+        self._slots = None
+        self.started = time.time()
+        self.in_flight = 0
+        self.requests = OrderedDict()   # route -> {'count', 'errors', 'latency'}
+
+    async def annotate(self, kind, query):
+        """
+        :return: annotation of query (cached)
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        annotator = self.annotators[kind]
+
+        async def load():
+            async with self._slots:
+                return await annotator(query)
+
+        return await self.cache.get_or_load((kind, query), load)
+
+    async def annotate_many(self, kind, queries):
+        """
+        :return: list of OrderedDict {'query', 'result'} or {'query', 'error'}, in the order of queries
+        """
+        unique = list(OrderedDict.fromkeys(queries))
+        results = await asyncio.gather(*[self.annotate(kind, query) for query in unique], return_exceptions=True)
+        by_query = dict(zip(unique, results))
+
+        response = []
+        for query in queries:
+            result = by_query[query]
+            if isinstance(result, Exception):
+                response.append(OrderedDict([('query', query), ('error', repr(result))]))
+            else:
+                response.append(OrderedDict([('query', query), ('result', result)]))
+        return response
+
+    async def health(self):
+        """
+        :return: (healthy, {config section: ping ok})
+        """
+        dbs = [get_db(db_class) for db_class in DB_CLASSES]
+        pings = await asyncio.gather(*[db.ping() for db in dbs], return_exceptions=True)
+        report = OrderedDict((db._cfg_section, bool(ping) and not isinstance(ping, Exception))
+                             for db, ping in zip(dbs, pings))
+        return all(report.values()), report
+
+    def metrics(self):
+        """
+        :return: OrderedDict {uptime, in_flight, requests: {route: {count, errors, latency}}, cache, pools}
+        """
+        pools = OrderedDict()
+        for db_class in DB_CLASSES:
+            db = get_db(db_class)
+            pool = getattr(db, '_pool', None)
+            if pool is not None:
+                pools[db._cfg_section] = OrderedDict((attr, getattr(pool, attr, None))
+                                                     for attr in ('size', 'freesize', 'maxsize'))
+
+        requests = OrderedDict()
+        for route, entry in self.requests.items():
+            requests[route] = OrderedDict([('count', entry['count']), ('errors', entry['errors']),
+                                           ('latency', entry['latency'].summary())])
+
+        return OrderedDict([('uptime', time.time() - self.started),
+                            ('in_flight', self.in_flight),
+                            ('requests', requests),
+                            ('cache', self.cache.stats()),
+                            ('pools', pools)])
+
+    def _record(self, route, status, seconds):
+        entry = self.requests.get(route)
+        if entry is None:
+            entry = self.requests[route] = {'count': 0, 'errors': 0, 'latency': StreamingHistogram()}
+        entry['count'] += 1
+        entry['errors'] += 1 if status >= 500 else 0
+        entry['latency'].add(seconds)
+
+    async def handle(self, method, path, body=b''):
+        """
+        :param method: 'GET' or 'POST'
+        :param path: request path (percent-encoded; any query string is ignored)
+        :param body: request body (bytes)
+        :return: (status, payload)
+        """
+        start = time.perf_counter()
+        self.in_flight += 1
+        route = 'other'
+        try:
+            parts = [unquote(part) for part in path.split('?', 1)[0].strip('/').split('/', 1)]
+            route = parts[0] if parts[0] in self.annotators or parts[0] in ('health', 'metrics') else 'other'
+            status, payload = await self._dispatch(method, parts, body)
+        except HTTPError as err:
+            status, payload = err.status, {'error': str(err)}
+        except Exception as err:
+            log.error('%s %s failed: %r', method, path, err)
+            status, payload = 500, {'error': repr(err)}
+        finally:
+            self.in_flight -= 1
+        self._record(route, status, time.perf_counter() - start)
+        return status, payload
+
+    async def _dispatch(self, method, parts, body):
+        name = parts[0]
+        if name == 'health' and len(parts) == 1:
+            healthy, report = await self.health()
+            return (200 if healthy else 503), report
+        if name == 'metrics' and len(parts) == 1:
+            return 200, self.metrics()
+        if name not in self.annotators:
+            raise HTTPError(404, 'no such endpoint: /%s' % '/'.join(parts))
+
+        if method == 'GET' and len(parts) == 2 and parts[1]:
+            result = await self.annotate(name, parts[1])
+            if result is None:
+                raise HTTPError(404, 'no %s %s' % (name, parts[1]))
+            return 200, OrderedDict([('query', parts[1]), ('result', result)])
+
+        if method == 'POST' and len(parts) == 1:
+            queries = self._parse_batch(body)
+            return 200, {'results': await self.annotate_many(name, queries)}
+
+        raise HTTPError(405, 'use GET /%s/<query> or POST /%s' % (name, name))
+
+    def _parse_batch(self, body):
+        try:
+            queries = json.loads(body.decode('utf-8') if body else 'null')
+        except ValueError as err:
+            raise HTTPError(400, 'body is not JSON: %s' % err)
+        if isinstance(queries, dict):
+            queries = queries.get('queries')
+        if not isinstance(queries, list):
+            raise HTTPError(400, 'expected a JSON list of queries, or {"queries": [...]}')
+        if len(queries) > self.max_batch:
+            raise HTTPError(413, 'at most %d queries per request' % self.max_batch)
+        return [str(query).strip() for query in queries]
+
+    ##########################################################################################
+    #
+    #       HTTP
+    #
+    ##########################################################################################
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, **kwargs):
+        """
+        :return: asyncio.Server (already listening)
+        """
+        return await asyncio.start_server(self._connection, host, port, **kwargs)
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, version, headers, body = request
+
+                status, payload = await self.handle(method, path, body)
+                keep_alive = _keep_alive(version, headers)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as err:
+            writer.write(_response(err.status, {'error': str(err)}, False))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _read_request(reader):
+    """
+    :return: (method, path, version, headers, body), or None when the client has closed the connection
+    """
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, path, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, 'malformed request line')
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, 'request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path, version, headers, body
+
+def _keep_alive(version, headers):
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload, default=json_default).encode('utf-8')
+    head = ('HTTP/1.1 %d %s\r\n'
+            'Content-Type: application/json\r\n'
+            'Content-Length: %d\r\n'
+            'Connection: %s\r\n\r\n' % (status, STATUS_REASONS.get(status, ''), len(body),
+                                         'keep-alive' if keep_alive else 'close'))
+    return head.encode('latin-1') + body
+
+##########################################################################################
+#
+#       main
+#
+##########################################################################################
+
+def configure_pools(pool_size=DEFAULT_POOL_SIZE, pool=None):
+    """
+    Register the shared async databases with a connection pool of pool_size per section
+    (or all sharing one given pool, e.g. a medgen.service.standin.StandinPool).
+    """
+    for db_class in DB_CLASSES:
+        if pool is not None:
+            set_db(db_class, db_class(pool=pool))
+        else:
+            set_db(db_class, db_class(maxsize=pool_size))
+
+async def _serve_forever(service, host, port):
+    server = await service.serve(host, port)
+    log.info('medgen-service listening on %s', ', '.join(str(sock.getsockname()) for sock in server.sockets))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await aio.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='medgen-service', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, help='results kept (0 disables)')
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_CACHE_TTL, help='seconds a result is kept')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE, help='connections per DB section')
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY)
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--metrics-port', type=int,
+                        help='also serve Prometheus metrics on this port (see medgen.metrics)')
+    parser.add_argument('--standin', action='store_true',
+                        help='answer from a local stand-in instead of MySQL (see medgen.service.standin)')
+    args = parser.parse_args(argv)
+
+    pool = None
+    if args.standin:
+        from .standin import StandinPool
+        pool = StandinPool(maxsize=args.pool_size)
+    configure_pools(args.pool_size, pool)
+    if args.metrics_port:
+        metrics.enable()
+        metrics.serve(args.metrics_port, args.host)
+
+    service = AnnotationService(cache=ResultCache(args.cache_size, args.cache_ttl),
+                                max_batch=args.max_batch, max_concurrency=args.max_concurrency)
+    try:
+        asyncio.run(_serve_forever(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+""" In-process result cache for the annotation service. """
+import time
+import asyncio
+import functools
+from collections import OrderedDict
+
+from .. import metrics
+
+DEFAULT_CACHE_SIZE = 100000
+DEFAULT_CACHE_TTL = 3600        # seconds
+
+_MISSING = object()
+
+class ResultCache(object):
+    """
+    LRU cache with a time-to-live, for use from one event loop.
+
+    Concurrent misses on the same key share one load: the first caller starts it as a task and
+    every caller awaits it, so a burst of identical requests costs one round of queries. A caller
+    which is cancelled (e.g. its client went away) stops waiting, but not the load, so the
+    others still get the value. Failed loads are not cached.
+
+        cache = ResultCache(maxsize=10000, ttl=600)
+        record = await cache.get_or_load(('gene', 'BRCA2'), lambda: annotate_gene('BRCA2'))
+    """
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0     # misses that awaited another caller's load
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self._loading = {}             # key -> Task
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires < self.clock():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_load(self, key, load):
+        """
+        :param key: hashable
+        :param load: function returning an awaitable of the value (called on a miss)
+        :return: value
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            metrics.cache_lookup('service', True)
+            return value
+
+        self.misses += 1
+        metrics.cache_lookup('service', False)
+        task = self._loading.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(load())
+            self._loading[key] = task
+            task.add_done_callback(functools.partial(self._loaded, key))
+        return await asyncio.shield(task)
+
+    def _loaded(self, key, task):
+        if self._loading.get(key) is task:
+            del self._loading[key]
+        if task.cancelled():
+            return
+        # retrieved here, so a failure nobody awaits any more is not warned about.
+        if task.exception() is None:
+            self.put(key, task.result())
+
+    def stats(self):
+        """
+        :return: dict {size, maxsize, ttl, hits, misses, shared}
+        """
+        return {'size': len(self._entries), 'maxsize': self.maxsize, 'ttl': self.ttl,
+                'hits': self.hits, 'misses': self.misses, 'shared': self.shared}
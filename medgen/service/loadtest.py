@@ -0,0 +1,176 @@
+""" Load test for medgen-service.
+
+    python -m medgen.service.loadtest --connections 200 --duration 10
+    python -m medgen.service.loadtest --url 127.0.0.1:8080 --connections 500 --distinct 5000
+
+Without --url, the service is started in this process on a free port, answering from a local DB
+stand-in (medgen.service.standin) with --latency seconds per query, so the numbers measure the
+service itself: HTTP handling, caching, batching and pool contention.
+
+Each client connection issues requests back-to-back over keep-alive: a mix of GETs over the four
+kinds and --batch-fraction POSTs of --batch-size queries, drawn from --distinct distinct queries
+per kind (fewer distinct queries = more cache hits).
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter, OrderedDict
+from urllib.parse import quote
+
+from ..stats import StreamingHistogram
+
+DEFAULT_CONNECTIONS = 100
+DEFAULT_DURATION = 10.0
+DEFAULT_DISTINCT = 1000
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_BATCH_FRACTION = 0.1
+
+def _queries(kind, count):
+    if kind == 'gene':
+        return ['%d' % (1000 + n) for n in range(count)]
+    if kind in ('concept', 'disease'):
+        return ['C%07d' % (100000 + n) for n in range(count)]
+    return ['NM_%06d.1:c.%dG>A' % (n % 997, 100 + n) for n in range(count)]
+
+def _request(method, path, body=b''):
+    head = '%s %s HTTP/1.1\r\nHost: medgen\r\nContent-Length: %d\r\n\r\n' % (method, path, len(body))
+    return head.encode('latin-1') + body
+
+async def _read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+class LoadTest(object):
+
+    def __init__(self, host, port, connections=DEFAULT_CONNECTIONS, duration=DEFAULT_DURATION,
+                 distinct=DEFAULT_DISTINCT, batch_size=DEFAULT_BATCH_SIZE, batch_fraction=DEFAULT_BATCH_FRACTION,
+                 kinds=('gene', 'concept', 'disease', 'variant'), seed=0):
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.duration = duration
+        self.batch_size = batch_size
+        self.batch_fraction = batch_fraction
+        self.queries = OrderedDict((kind, _queries(kind, distinct)) for kind in kinds)
+        self.random = random.Random(seed)
+
+        self.latency = StreamingHistogram()
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    def _next_request(self):
+        kind = self.random.choice(list(self.queries))
+        if self.random.random() < self.batch_fraction:
+            batch = [self.random.choice(self.queries[kind]) for _ in range(self.batch_size)]
+            return _request('POST', '/' + kind, json.dumps(batch).encode('utf-8'))
+        return _request('GET', '/%s/%s' % (kind, quote(self.random.choice(self.queries[kind]), safe='')))
+
+    async def _client(self, deadline):
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError as err:
+            self.errors[type(err).__name__] += 1
+            return
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                writer.write(self._next_request())
+                await writer.drain()
+                status = await _read_response(reader)
+                self.latency.add(time.perf_counter() - start)
+                self.statuses[status] += 1
+        except (OSError, asyncio.IncompleteReadError, ValueError) as err:
+            self.errors[type(err).__name__] += 1
+        finally:
+            writer.close()
+
+    async def run(self):
+        """
+        :return: OrderedDict {requests, seconds, requests_per_sec, statuses, errors, latency}
+        """
+        start = time.perf_counter()
+        deadline = start + self.duration
+        await asyncio.gather(*[self._client(deadline) for _ in range(self.connections)])
+        seconds = time.perf_counter() - start
+        return OrderedDict([('requests', self.latency.count),
+                            ('seconds', seconds),
+                            ('requests_per_sec', self.latency.count / seconds if seconds else None),
+                            ('statuses', dict(self.statuses)),
+                            ('errors', dict(self.errors)),
+                            ('latency', self.latency.summary())])
+
+async def _run_local(args):
+    from .app import AnnotationService, configure_pools
+    from .cache import ResultCache
+    from .standin import StandinPool
+    from ..annotate import aio
+    from ..db import registry
+
+    pool = StandinPool(latency=args.latency, maxsize=args.pool_size)
+    configure_pools(pool=pool)
+    service = AnnotationService(cache=ResultCache(args.cache_size))
+    server = await service.serve('127.0.0.1', 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    try:
+        report = await LoadTest(host, port, args.connections, args.duration, args.distinct,
+                                args.batch_size, args.batch_fraction).run()
+        report['queries'] = pool.queries
+        report['service'] = service.metrics()
+    finally:
+        server.close()
+        await server.wait_closed()
+        await aio.close()
+        registry.reset()
+    return report
+
+def format_report(report):
+    lat = report['latency']
+    if not report['requests']:
+        return 'no requests completed; errors: %s' % report['errors']
+    return ('%d requests in %.1fs = %.0f req/s; latency p50=%.1fms p95=%.1fms p99=%.1fms max=%.1fms; '
+            'statuses %s; errors %s' % (report['requests'], report['seconds'], report['requests_per_sec'],
+                                        lat['p50'] * 1000, lat['p95'] * 1000, lat['p99'] * 1000, lat['max'] * 1000,
+                                        report['statuses'], report['errors']))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m medgen.service.loadtest', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='host:port of a running medgen-service (default: start one on a stand-in)')
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS)
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='seconds')
+    parser.add_argument('--distinct', type=int, default=DEFAULT_DISTINCT, help='distinct queries per kind')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--batch-fraction', type=float, default=DEFAULT_BATCH_FRACTION)
+    parser.add_argument('--latency', type=float, default=0.002, help='stand-in seconds per query')
+    parser.add_argument('--pool-size', type=int, default=20, help='stand-in connections')
+    parser.add_argument('--cache-size', type=int, default=100000, help='service cache size (0 disables)')
+    parser.add_argument('--json', action='store_true', help='print the full report as JSON')
+    args = parser.parse_args(argv)
+
+    if args.url:
+        host, _, port = args.url.replace('http://', '').rstrip('/').partition(':')
+        report = asyncio.run(LoadTest(host, int(port or 80), args.connections, args.duration, args.distinct,
+                                      args.batch_size, args.batch_fraction).run())
+    else:
+        report = asyncio.run(_run_local(args))
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print(format_report(report))
+    return 0 if report['requests'] and not report['errors'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+""" Local stand-in for an aiomysql pool, so the service can be run and load-tested without MySQL.
+
+    pool = StandinPool(latency=0.002, maxsize=10)
+    for db_class in (AsyncGeneDB, AsyncClinVarDB, AsyncMedGenDB, AsyncHugoDB):
+        set_db(db_class, db_class(pool=pool))
+
+Every query sleeps for `latency` seconds while holding one of `maxsize` connections, and answers
+with canned rows chosen by the table it selects from.
+"""
+import asyncio
+
+DEFAULT_LATENCY = 0.002     # seconds per query
+DEFAULT_MAXSIZE = 10
+
+# SQL fragment -> rows
+ROWS = [
+    ('from gene_info where Symbol',   [{'ID': 675}]),
+    ('select * from gene_info',       [{'GeneID': 675, 'Symbol': 'BRCA2', 'Synonyms': 'BRCC2|FACD|FANCD1',
+                                        'chromosome': '13', 'map_location': '13q13.1',
+                                        'description': 'BRCA2 DNA repair associated'}]),
+    ('from gene_info where GeneID',   [{'ID': 'BRCA2'}]),
+    ('from gene_info where',          [{'Synonyms': 'BRCC2|FACD|FANCD1', 'Symbol': 'BRCA2', 'GeneID': 675}]),
+    ('from gene2pubmed',              [{'PMID': pmid} for pmid in range(10000000, 10000100)]),
+    ('from mim2gene_medgen',          [{'MIM': 600185, 'GeneID': 675, 'type': 'gene'}]),
+    ('from generifs_basic',           [{'pubmeds': '10000001', 'GeneRIF': 'BRCA2 is involved in DNA repair.'}]),
+    ('from gene_condition_source_id', [{'GeneID': 675, 'ConceptID': 'C0677776',
+                                        'DiseaseName': 'Hereditary breast and ovarian cancer syndrome'}]),
+    ('from gene_specific_summary',    [{'GeneID': 675, 'Total_submissions': 12000}]),
+    ('from variant_summary',          [{'ClinicalSignificance': 'Pathogenic', 'cnt_variants': 3000},
+                                       {'ClinicalSignificance': 'Benign', 'cnt_variants': 800}]),
+    ('var_citations',                 [{'citation_id': 'NBK1247', 'citation_source': 'NCBIBookShelf',
+                                        'RCVaccession': 'RCV000017610', 'HGVS': 'NM_000059.3:c.68-7T>A'}]),
+    ('from clinvar_hgvs where HGVS',  [{'ID': 17610}]),
+    ('from disease_names',            [{'ConceptID': 'C0677776', 'DiseaseName': 'Hereditary breast and ovarian cancer syndrome'}]),
+    ('from hugo_info',                [{'LocusSpecificDatabases': 'LOVD|http://lovd,BIC|http://bic',
+                                        'GeneFamilyTag': None, 'pubmeds': '10000001, 10000002'}]),
+    ('from view_medgen_uid',          [{'ID': 'C0677776'}]),
+    ('from NAMES',                    [{'CUI': 'C0677776', 'name': 'Hereditary breast and ovarian cancer syndrome',
+                                        'source': 'MSH', 'SUPPRESS': 'N'}]),
+    ('from MGDEF',                    [{'CUI': 'C0677776', 'DEF': 'A cancer predisposition syndrome.', 'source': 'GTR'}]),
+    ('from MGREL',                    [{'CUI1': 'C0677776', 'REL': 'RN', 'CUI2': 'C0006142'}]),
+    ('from view_concept',             [{'SourceVocab': 'MSH'}, {'SourceVocab': 'OMIM'}]),
+    ('from view_disease_subtype',     [{'DiseaseID': 'C0006142', 'DiseaseName': 'Malignant tumor of breast',
+                                        'DiseaseSource': 'MSH'}]),
+    ('call mem',                      [{'Table': 'gene_info', 'Rows': 1}]),
+]
+
+class StandinCursor(object):
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, args=None):
+        self.pool.queries += 1
+        if self.pool.latency:
+            await asyncio.sleep(self.pool.latency)
+        self.rows = []
+        for fragment, rows in ROWS:
+            if fragment in sql:
+                self.rows = [dict(row) for row in rows]
+                break
+
+    async def fetchall(self):
+        return self.rows
+
+class StandinConnection(object):
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        await self.pool._slots.acquire()
+        self.pool.used += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.pool.used -= 1
+        self.pool._slots.release()
+        return False
+
+    def cursor(self):
+        return StandinCursor(self.pool)
+
+class StandinPool(object):
+    """
+    Same acquire()/cursor() interface (and size/freesize/maxsize attributes) as an aiomysql pool.
+    """
+    def __init__(self, latency=DEFAULT_LATENCY, maxsize=DEFAULT_MAXSIZE):
+        self.latency = latency
+        self.maxsize = maxsize
+        self.queries = 0
+        self.used = 0
+        self._slots = asyncio.Semaphore(maxsize)
+
+    @property
+    def size(self):
+        return self.maxsize
+
+    @property
+    def freesize(self):
+        return self.maxsize - self.used
+
+    def acquire(self):
+        return StandinConnection(self)
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
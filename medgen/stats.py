@@ -0,0 +1,121 @@
+""" Streaming latency statistics (constant memory, mergeable across threads and processes). """
+import math
+import threading
+
+DEFAULT_PRECISION = 0.01    # relative bucket width: percentiles are accurate to ~1%
+DEFAULT_MIN_VALUE = 1e-6    # values below this (seconds) share the lowest bucket
+
+##########################################################################################
+#
+#       StreamingHistogram
+#
+##########################################################################################
+
+class StreamingHistogram(object):
+    """
+    Log-bucketed histogram: memory is bounded by the dynamic range of the values,
+    not by how many were recorded.
+
+        hist = StreamingHistogram()
+        hist.add(0.0123)
+        hist.percentile(99)
+    """
+    def __init__(self, precision=DEFAULT_PRECISION, min_value=DEFAULT_MIN_VALUE):
+        self.precision = precision
+        self.min_value = min_value
+        self._log_base = math.log1p(precision)
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+        if value <= self.min_value:
+            return 0
+        return int(math.log(value / self.min_value) / self._log_base) + 1
+
+    def _bucket_value(self, bucket):
+        # midpoint of the bucket
+        if bucket == 0:
+            return self.min_value
+        return self.min_value * (1 + self.precision) ** (bucket - 0.5)
+
+    def add(self, value):
+        bucket = self._bucket(value)
+        with self._lock:
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """
+        Add the counts of another StreamingHistogram (same precision and min_value).
+        """
+        with self._lock:
+            for bucket, count in other.buckets.items():
+                self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+            self.count += other.count
+            self.total += other.total
+            if other.count:
+                self.min = other.min if self.min is None else min(self.min, other.min)
+                self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, pct):
+        """
+        :param pct: 0-100
+        :return: approximate value at percentile pct (None if empty)
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(1, int(math.ceil(self.count * pct / 100.0)))
+            seen = 0
+            for bucket in sorted(self.buckets):
+                seen += self.buckets[bucket]
+                if seen >= rank:
+                    return min(max(self._bucket_value(bucket), self.min), self.max)
+            return self.max
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """
+        :return: dict {count, mean, min, max, p50, p95, p99}
+        """
+        report = {'count': self.count, 'mean': self.mean, 'min': self.min, 'max': self.max}
+        for pct in percentiles:
+            report['p%s' % pct] = self.percentile(pct)
+        return report
+
+    def to_dict(self):
+        with self._lock:
+            return {'precision': self.precision, 'min_value': self.min_value,
+                    'buckets': dict((str(bucket), count) for bucket, count in self.buckets.items()),
+                    'count': self.count, 'total': self.total, 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, state):
+        hist = cls(state['precision'], state['min_value'])
+        hist.buckets = dict((int(bucket), count) for bucket, count in state['buckets'].items())
+        hist.count = state['count']
+        hist.total = state['total']
+        hist.min = state['min']
+        hist.max = state['max']
+        return hist
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(state['precision'], state['min_value'])
+        self.merge(StreamingHistogram.from_dict(state))
@@ -0,0 +1,690 @@
+""" Synthetic medgen-mysql contents, for benchmarks and load tests without production data.
+
+    medgen-synthetic --scale 10 -o synthetic/
+    mysql --local-infile=1 -u medgen -p < synthetic/load.sql
+
+or straight into the databases named in the medgen config (which must already exist):
+
+    medgen-synthetic --scale 1 --load
+
+Every table the medgen.db classes query is generated in one seeded pass, so the same --seed
+and --scale always give the same rows, and every identifier joins: gene2pubmed, hugo_info,
+variant_summary and gene_condition_source_id refer to genes in gene_info; clinvar_hgvs and
+var_citations to the same variants; MGREL, view_disease_subtype and disease_names to concepts
+in NAMES/view_medgen_uid; gene2pubmed and var_citations to PMIDs in medline_xml.
+
+Popularity is Zipf distributed, as it is in the real data: the first genes by rank (TP53, BRCA1,
+BRCA2, ...) carry huge PMID lists and most of the ClinVar variants, a few concepts have hundreds
+of relations and subtypes, and most variants have no citations while a few have dozens.
+
+Records used by the tests in tests/ (BRCA2 = 675, NM_001232.3:c.919G>C = VariationID 17610, ...)
+are always included.
+"""
+import os
+import sys
+import random
+import argparse
+from collections import OrderedDict
+from itertools import accumulate
+
+from .log import log
+
+DEFAULT_SCALE = 1.0
+DEFAULT_SEED = 0
+DEFAULT_EXPONENT = 1.1      # Zipf exponent of gene / concept popularity
+DEFAULT_BATCH_SIZE = 1000   # rows per INSERT in load()
+
+# entities at scale 1; everything else is derived from these.
+BASE_COUNTS = OrderedDict([
+    ('genes',     2000),
+    ('concepts',  4000),
+    ('variants', 20000),
+    ('pmids',    50000),
+])
+
+MAX_CONCEPTS = 900000       # MedGen UIDs must stay within 6 digits (see medgen.db.medgen.is_format_medgen)
+
+##########################################################################################
+#
+#       Tables (config section -> table -> columns)
+#
+##########################################################################################
+
+def _columns(spec):
+    return OrderedDict(column.split(' ', 1) for column in spec)
+
+TABLES = OrderedDict([
+    ('gene', OrderedDict([
+        ('gene_info', (_columns(['tax_id int unsigned', 'GeneID int unsigned', 'Symbol varchar(50)',
+                                 'LocusTag varchar(20)', 'Synonyms text', 'dbXrefs text', 'chromosome varchar(50)',
+                                 'map_loc varchar(20)', 'GeneDesc text', 'GeneType varchar(20)',
+                                 'Nomen_symbol varchar(20)', 'Nomen_source varchar(20)', 'Nomen_status varchar(20)',
+                                 'GeneOther text', 'LastModified varchar(10)']),
+                       ['GeneID', 'Symbol', 'Nomen_symbol'])),
+        ('gene2pubmed', (_columns(['tax_id int unsigned', 'GeneID int unsigned', 'PMID varchar(10)']),
+                         ['GeneID', 'PMID'])),
+        ('generifs_basic', (_columns(['tax_id int unsigned', 'GeneID int unsigned', 'pubmeds text',
+                                      'last_update varchar(20)', 'GeneRIF text']),
+                            ['GeneID'])),
+        ('mim2gene_medgen', (_columns(['MIM int unsigned', 'GeneID int unsigned', 'MIM_type varchar(20)',
+                                       'MIM_vocab varchar(20)', 'MedGenCUI varchar(20)']),
+                             ['MIM', 'GeneID', 'MedGenCUI'])),
+    ])),
+    ('hugo', OrderedDict([
+        ('hugo_info', (_columns(['hgnc varchar(25)', 'Symbol varchar(50)', 'Name text', 'Status text',
+                                 'LocusType text', 'LocusGroup text', 'PreviousSymbols text', 'PreviousNames text',
+                                 'Synonyms text', 'NameSynonyms text', 'Chromosome text', 'DateNameChanged text',
+                                 'AccessionNumbers text', 'EnsemblGeneID int', 'SpecialistDB text', 'pubmeds text',
+                                 'RefSeqIDs text', 'GeneFamilyTag text', 'RecordType text', 'PrimaryIDs text',
+                                 'LocusSpecificDatabases text']),
+                       ['Symbol'])),
+    ])),
+    ('clinvar', OrderedDict([
+        ('variant_summary', (_columns(['AlleleID int', 'variant_type varchar(50)', 'variant_name text',
+                                       'GeneID int', 'Symbol varchar(20)', 'ClinicalSignificance text', 'rs int',
+                                       'dbvar_nsv text', 'RCVaccession text', 'TestedInGTR char(1)',
+                                       'PhenotypeIDs text', 'Origin text', 'Assembly text', 'Chromosome varchar(20)',
+                                       'Start int', 'Stop int', 'Cytogenetic text', 'ReviewStatus text',
+                                       'HGVS_c varchar(200)', 'HGVS_p varchar(200)', 'NumberSubmitters int',
+                                       'LastEvaluated text', 'Guidelines text', 'OtherIDs text',
+                                       'ReferenceAlleleVCF text', 'AlternateAlleleVCF text']),
+                             ['AlleleID', 'GeneID', 'Symbol', 'rs', 'HGVS_c', 'HGVS_p'])),
+        ('clinvar_hgvs', (_columns(['HGVS varchar(200)', 'AlleleID int', 'VariationID int',
+                                    'RCVaccession varchar(20)']),
+                          ['HGVS', 'AlleleID', 'VariationID'])),
+        ('var_citations', (_columns(['AlleleID int', 'VariationID int', 'rs int', 'nsv varchar(20)',
+                                     'citation_source varchar(20)', 'citation_id varchar(20)']),
+                           ['AlleleID', 'VariationID', 'citation_id'])),
+        ('molecular_consequences', (_columns(['HGVS varchar(200)', 'SequenceOntologyID varchar(20)',
+                                              'Consequence varchar(100)']),
+                                    ['HGVS'])),
+        ('gene_condition_source_id', (_columns(['GeneID int', 'Symbol varchar(10)', 'ConceptID varchar(20)',
+                                                'DiseaseName varchar(1000)', 'SourceName varchar(150)',
+                                                'SourceID varchar(50)', 'DiseaseMIM varchar(20)',
+                                                'LastModified varchar(20)']),
+                                      ['GeneID', 'Symbol', 'ConceptID'])),
+        ('gene_specific_summary', (_columns(['Symbol varchar(20)', 'GeneID int', 'Submissions int',
+                                             'Alleles int']),
+                                   ['Symbol', 'GeneID'])),
+        ('disease_names', (_columns(['DiseaseName varchar(1000)', 'SourceName varchar(150)',
+                                     'ConceptID varchar(20)', 'SourceID varchar(50)', 'DiseaseMIM varchar(20)',
+                                     'LastModified varchar(20)', 'Category varchar(50)']),
+                           ['ConceptID'])),
+        ('version_info', (_columns(['version varchar(50)', 'last_loaded datetime']), [])),
+    ])),
+    ('medgen', OrderedDict([
+        ('view_medgen_uid', (_columns(['MedGenUID int unsigned', 'ConceptID char(8)']),
+                             ['MedGenUID', 'ConceptID'])),
+        ('NAMES', (_columns(['CUI char(8)', 'name text', 'source varchar(20)', 'SUPPRESS char(1)']),
+                   ['CUI'])),
+        ('MGDEF', (_columns(['CUI char(8)', 'DEF text', 'source varchar(20)', 'SUPPRESS char(1)']),
+                   ['CUI'])),
+        ('MGREL', (_columns(['CUI1 char(8)', 'AUI1 varchar(9)', 'STYPE1 varchar(50)', 'REL varchar(4)',
+                             'CUI2 char(8)', 'AUI2 varchar(9)', 'RELA varchar(100)', 'RUI varchar(10)',
+                             'SAB varchar(40)', 'SL varchar(40)', 'SUPPRESS char(1)']),
+                   ['CUI1', 'CUI2', 'REL'])),
+        ('view_concept', (_columns(['ConceptID char(8)', 'SourceVocab varchar(20)', 'SemanticType varchar(50)']),
+                          ['ConceptID'])),
+        ('view_disease_subtype', (_columns(['DiseaseID char(8)', 'DiseaseName text', 'DiseaseSource varchar(20)',
+                                            'SubtypeID char(8)', 'SubtypeName text',
+                                            'SubtypeSource varchar(20)']),
+                                  ['DiseaseID', 'SubtypeID'])),
+    ])),
+    ('pubmed', OrderedDict([
+        ('medline_xml_filename', (_columns(['id int', 'filename varchar(100)']), ['id'])),
+        ('medline_xml', (_columns(['id int', 'PMID int', 'xml mediumtext', 'Tstamp date',
+                                   'medline_xml_filename_id int']),
+                         ['id', 'PMID'])),
+        ('medline_minimum_citation', (_columns(['PMID int', 'article_title text', 'abstract_text text']),
+                                      ['PMID'])),
+    ])),
+])
+
+LOG_COLUMNS = _columns(['idx int', 'event_time datetime', 'entity_name varchar(100)', 'message varchar(200)'])
+
+##########################################################################################
+#
+#       Fixed records (used by tests/)
+#
+##########################################################################################
+
+# (GeneID, Symbol, chromosome) in popularity order: these are the hub genes.
+ANCHOR_GENES = [
+    (7157, 'TP53', '17'), (672, 'BRCA1', '17'), (675, 'BRCA2', '13'), (1956, 'EGFR', '7'),
+    (7124, 'TNF', '6'), (348, 'APOE', '19'), (3569, 'IL6', '7'), (1080, 'CFTR', '7'),
+    (7273, 'TTN', '2'), (3077, 'HFE', '6'), (4683, 'NBN', '8'), (845, 'CASQ2', '1'), (34, 'ACADM', '1'),
+    (203228, 'C9orf72', '9'),
+]
+
+# (CUI, MedGenUID, name) in popularity order
+ANCHOR_CONCEPTS = [
+    ('C0006142', 651, 'Malignant tumor of breast'),
+    ('C0677776', 155, 'Hereditary breast and ovarian cancer syndrome'),
+    ('C0007194', 2881, 'Hypertrophic cardiomyopathy'),
+    ('C0018995', 6484, 'Hereditary hemochromatosis'),
+]
+
+# (hgvs_c, GeneID, VariationID, AlleleID, [RCVaccession], rs, citations)
+ANCHOR_VARIANTS = [
+    ('NM_001232.3:c.919G>C',   845,  17610,  32649,  ['RCV000019176'], 121434550, 2),
+    ('NM_002485.4:c.1222A>G',  4683, 127856, 133313, ['RCV000115778', 'RCV000119194'], 61754796, 1),
+    ('NM_000016.4:c.1091T>C',  34,   92253,  98232,  ['RCV000077876'], 121434282, 1),
+    ('NM_133378.4:c.98772T>C', 7273, 47706,  58431,  ['RCV000040567'], 727503649, 0),
+    ('NM_000410.3:c.845G>A',   3077, 9,      15048,  ['RCV000000019'], 1800562, 40),
+]
+ANCHOR_BOOKS = {'NM_000410.3:c.845G>A': 'NBK1440'}
+
+##########################################################################################
+#
+#       Vocabulary
+#
+##########################################################################################
+
+PREFIXES   = ['Hereditary', 'Familial', 'Congenital', 'Early-onset', 'Autosomal recessive', 'Autosomal dominant',
+              'X-linked', 'Juvenile', 'Adult-onset', 'Progressive']
+ORGANS     = ['cardiac', 'renal', 'hepatic', 'neuronal', 'retinal', 'muscular', 'skeletal', 'pulmonary',
+              'cutaneous', 'intestinal', 'thyroid', 'pancreatic']
+CONDITIONS = ['dystrophy', 'myopathy', 'neuropathy', 'dysplasia', 'carcinoma', 'syndrome', 'deficiency',
+              'ataxia', 'atrophy', 'fibrosis', 'anemia', 'cardiomyopathy']
+FINDINGS   = ['Abnormality of the', 'Decreased', 'Increased', 'Absent', 'Hypoplasia of the', 'Aplasia of the']
+
+CHROMOSOMES = [str(n) for n in range(1, 23)] + ['X', 'Y']
+BASES = 'ACGT'
+GRCH37_SHIFT = -250000     # variant_summary GRCh37 Start relative to GRCh38
+AMINO_ACIDS = ['Ala', 'Arg', 'Asn', 'Asp', 'Cys', 'Gln', 'Glu', 'Gly', 'His', 'Ile', 'Leu', 'Lys', 'Met', 'Phe',
+               'Pro', 'Ser', 'Thr', 'Trp', 'Tyr', 'Val']
+
+SIGNIFICANCE = [('Uncertain significance', 40), ('Likely benign', 20), ('Benign', 12), ('Pathogenic', 12),
+                ('Likely pathogenic', 8), ('Conflicting interpretations of pathogenicity', 6), ('not provided', 2)]
+CONSEQUENCES = [('SO:0001583', 'missense variant', 50), ('SO:0001819', 'synonymous variant', 20),
+                ('SO:0001587', 'nonsense', 8), ('SO:0001589', 'frameshift variant', 8),
+                ('SO:0001627', 'intron variant', 10), ('SO:0001575', 'splice donor variant', 4)]
+CITATION_SOURCES = [('PubMed', 85), ('PubMedCentral', 10), ('NCBIBookShelf', 5)]
+RELATIONS = [('RO', 'has_manifestation', 'manifestation_of', 50), ('RN', 'mapped_to', 'mapped_from', 20),
+             ('SY', 'has_permuted_term', 'permuted_term_of', 15), ('CHD', 'isa', 'inverse_isa', 10),
+             ('SIB', '', '', 5)]
+INVERSE_REL = {'RO': 'RO', 'RN': 'RB', 'SY': 'SY', 'CHD': 'PAR', 'SIB': 'SIB'}
+SOURCES = ['MSH', 'OMIM', 'SNOMEDCT_US', 'HPO', 'GTR', 'ORDO', 'NCI']
+
+def _weighted(choices):
+    """
+    :param choices: list of tuples whose last element is a weight
+    :return: (values, cumulative weights) for Random.choices
+    """
+    return [choice[:-1] if len(choice) > 2 else choice[0] for choice in choices], \
+           list(accumulate(choice[-1] for choice in choices))
+
+def zipf_weights(n, exponent=DEFAULT_EXPONENT):
+    """
+    :return: cumulative weights 1/rank**exponent for ranks 1..n (for Random.choices)
+    """
+    return list(accumulate(1.0 / (rank + 1) ** exponent for rank in range(n)))
+
+def zipf_count(rank, top, exponent=DEFAULT_EXPONENT, minimum=1):
+    """
+    Size of the item at (0-based) rank, when the most popular one has `top`.
+    """
+    return max(minimum, int(round(top / float(rank + 1) ** exponent)))
+
+##########################################################################################
+#
+#       SyntheticDataset
+#
+##########################################################################################
+
+class SyntheticDataset(object):
+    """
+    Referentially consistent rows for the medgen-mysql tables, generated on demand.
+
+        dataset = SyntheticDataset(scale=10, seed=1)
+        for section, table, row in dataset.rows():
+            ...
+        dataset.write('synthetic/')
+    """
+    def __init__(self, scale=DEFAULT_SCALE, seed=DEFAULT_SEED, exponent=DEFAULT_EXPONENT):
+        """
+        :param scale: multiplier of BASE_COUNTS (1, 10, 100, ...; fractions give small test sets)
+        :param seed: random seed; the same seed and scale give the same rows
+        :param exponent: Zipf exponent of gene and concept popularity
+        """
+        self.scale = scale
+        self.seed = seed
+        self.exponent = exponent
+        self.counts = OrderedDict((name, max(1, int(count * scale))) for name, count in BASE_COUNTS.items())
+        self.counts['genes'] = max(self.counts['genes'], len(ANCHOR_GENES))
+        self.counts['concepts'] = min(MAX_CONCEPTS, max(self.counts['concepts'], 2 * len(ANCHOR_CONCEPTS)))
+        self.counts['variants'] = max(self.counts['variants'], len(ANCHOR_VARIANTS))
+        self.counts['pmids'] = max(self.counts['pmids'], 100)
+
+    def rows(self):
+        """
+        :return: generator of (config section, table name, row tuple), in one deterministic pass
+        """
+        rng = random.Random(self.seed)
+        self._pmids = range(10000000, 10000000 + self.counts['pmids'])
+        concepts = self._make_concepts(rng)
+        genes = self._make_genes(rng)
+
+        for row in self._concept_rows(rng, concepts):
+            yield row
+        for row in self._gene_rows(rng, genes, concepts):
+            yield row
+        for row in self._variant_rows(rng, genes, concepts):
+            yield row
+        for row in self._pubmed_rows(rng):
+            yield row
+        yield 'clinvar', 'version_info', ('synthetic-%s-%s' % (self.scale, self.seed), '2020-01-01 00:00:00')
+
+    ##########################################################################################
+    # concepts (medgen, clinvar.disease_names)
+
+    def _make_concepts(self, rng):
+        count = self.counts['concepts']
+        taken_cuis = set(cui for cui, uid, name in ANCHOR_CONCEPTS)
+        taken_uids = set(uid for cui, uid, name in ANCHOR_CONCEPTS)
+        cuis = [cui for cui in ('C%07d' % n for n in rng.sample(range(1, 5000000), count + len(taken_cuis)))
+                if cui not in taken_cuis]
+        uids = [uid for uid in rng.sample(range(1, 1000000), count + len(taken_uids)) if uid not in taken_uids]
+
+        concepts = []
+        for index in range(count):
+            if index < len(ANCHOR_CONCEPTS):
+                cui, uid, name = ANCHOR_CONCEPTS[index]
+            else:
+                cui, uid = cuis[index], uids[index]
+                if index % 5 < 3:
+                    name = '%s %s %s type %d' % (rng.choice(PREFIXES), rng.choice(ORGANS), rng.choice(CONDITIONS), index)
+                else:
+                    name = '%s %s %d' % (rng.choice(FINDINGS), rng.choice(ORGANS), index)
+            # 3 in 5 concepts (and all anchors) are diseases; the rest are findings.
+            disease = index < len(ANCHOR_CONCEPTS) or index % 5 < 3
+            concepts.append((cui, uid, name, disease, rng.choice(SOURCES)))
+        return concepts
+
+    def _concept_rows(self, rng, concepts):
+        count = len(concepts)
+        rel_values, rel_weights = _weighted(RELATIONS)
+        zipf = zipf_weights(count, self.exponent)
+        top_relations = max(2, count // 20)
+        diseases = [index for index, concept in enumerate(concepts) if concept[3]]
+        disease_zipf = zipf_weights(len(diseases), self.exponent)
+        rui = 0
+
+        for rank, (cui, uid, name, disease, source) in enumerate(concepts):
+            yield 'medgen', 'view_medgen_uid', (uid, cui)
+            yield 'medgen', 'NAMES', (cui, name, source, 'N')
+            if rank % 5 < 3:
+                yield 'medgen', 'MGDEF', (cui, 'Synthetic definition of %s.' % name.lower(), source, 'N')
+            for vocab in sorted(set([source] + rng.sample(SOURCES, rng.randint(0, 2)))):
+                yield 'medgen', 'view_concept', (cui, vocab, 'Disease or Syndrome' if disease else 'Finding')
+
+            # popular concepts relate to many others; each relation is stored in both directions.
+            for other in set(rng.choices(range(count), cum_weights=zipf,
+                                         k=zipf_count(rank, top_relations, self.exponent))):
+                if other == rank:
+                    continue
+                rel, rela, inverse_rela = rng.choices(rel_values, cum_weights=rel_weights)[0]
+                sab = rng.choice(SOURCES)
+                rui += 2
+                yield 'medgen', 'MGREL', (cui, None, 'CUI', rel, concepts[other][0], None, rela or None,
+                                          'R%08d' % rui, sab, sab, 'N')
+                yield 'medgen', 'MGREL', (concepts[other][0], None, 'CUI', INVERSE_REL[rel], cui, None,
+                                          inverse_rela or None, 'R%08d' % (rui + 1), sab, sab, 'N')
+
+            if disease:
+                yield 'clinvar', 'disease_names', (name, source, cui, '%s:%d' % (source, uid), None,
+                                                   '01 Jan 2020', 'disease')
+
+        # subtype tree: every disease but the first has one parent, preferentially a popular one.
+        for position, index in enumerate(diseases[1:], 1):
+            parent = diseases[rng.choices(range(position), cum_weights=disease_zipf[:position])[0]]
+            parent_cui, _, parent_name, _, parent_source = concepts[parent]
+            cui, _, name, _, source = concepts[index]
+            yield 'medgen', 'view_disease_subtype', (parent_cui, parent_name, parent_source, cui, name, source)
+
+    ##########################################################################################
+    # genes (gene, hugo, clinvar.gene_condition_source_id)
+
+    def _make_genes(self, rng):
+        genes = []
+        for rank in range(self.counts['genes']):
+            if rank < len(ANCHOR_GENES):
+                gene_id, symbol, chrom = ANCHOR_GENES[rank]
+            else:
+                gene_id, symbol, chrom = 100000 + rank, 'SYN%d' % rank, rng.choice(CHROMOSOMES)
+            genes.append({'GeneID': gene_id, 'Symbol': symbol, 'chromosome': chrom,
+                          'start': rng.randint(1000000, 150000000), 'transcript': rng.randint(1, 999999),
+                          'variants': 0, 'submissions': 0})
+        return genes
+
+    def _gene_rows(self, rng, genes, concepts):
+        pmids = self._pmids
+        top_pmids = max(1, len(pmids) // 5)
+        diseases = [concept for concept in concepts if concept[3]]
+        disease_zipf = zipf_weights(len(diseases), self.exponent)
+        top_conditions = max(1, len(diseases) // 30)
+        mim = 100000
+
+        for rank, gene in enumerate(genes):
+            gene_id, symbol = gene['GeneID'], gene['Symbol']
+            synonyms = '|'.join('%s%s' % (symbol, suffix) for suffix in rng.sample('ABCDEFGH', rng.randint(0, 3)))
+            map_loc = '%s%s%d.%d' % (gene['chromosome'], rng.choice('pq'), rng.randint(11, 36), rng.randint(1, 3))
+            description = '%s synthetic protein %d' % (symbol.lower(), rank)
+
+            yield 'gene', 'gene_info', (9606, gene_id, symbol, '-', synonyms or '-',
+                                        'MIM:%d|HGNC:HGNC:%d' % (mim + rank, rank + 1), gene['chromosome'], map_loc,
+                                        description, 'protein-coding', symbol, 'H', 'O', '-', '20200101')
+
+            # hub genes are cited by a large share of all PMIDs.
+            cited = sorted(rng.sample(pmids, min(len(pmids), zipf_count(rank, top_pmids, self.exponent))))
+            for pmid in cited:
+                yield 'gene', 'gene2pubmed', (9606, gene_id, str(pmid))
+            for n in range(max(1, len(cited) // 10)):
+                rif_pmids = rng.sample(cited, min(len(cited), rng.randint(1, 3)))
+                yield 'gene', 'generifs_basic', (9606, gene_id, ','.join(map(str, rif_pmids)), '2020-01-01 00:00',
+                                                 '%s is involved in %s function (%d).' % (symbol, rng.choice(ORGANS), n))
+
+            lsdbs = None
+            if rank < len(ANCHOR_GENES) or rng.random() < 0.1:
+                lsdbs = ','.join('%s|http://lsdb.example.org/%s/%s' % (name, name.lower(), symbol)
+                                 for name in rng.sample(['LOVD', 'BIC', 'UMD', 'HGMD'], rng.randint(1, 3)))
+            yield 'hugo', 'hugo_info', ('HGNC:%d' % (rank + 1), symbol, description, 'Approved',
+                                        'gene with protein product', 'protein-coding gene', None, None,
+                                        synonyms.replace('|', ', ') or None, None, map_loc, None, None,
+                                        rank + 1, None, ', '.join(map(str, cited[:5])) or None,
+                                        'NM_%06d' % gene['transcript'], rng.choice(['', 'ZNF', 'KRT', 'OR']) or None,
+                                        'Standard', None, lsdbs)
+
+            yield 'gene', 'mim2gene_medgen', (mim + rank, gene_id, 'gene', '-', '-')
+            # hub genes have many conditions; about half of the rest have one.
+            n_conditions = zipf_count(rank, top_conditions, self.exponent, minimum=0) or int(rng.random() < 0.5)
+            conditions = set(rng.choices(range(len(diseases)), cum_weights=disease_zipf, k=n_conditions))
+            for index in sorted(conditions):
+                cui, uid, name, _, source = diseases[index]
+                disease_mim = 200000 + index
+                yield 'gene', 'mim2gene_medgen', (disease_mim, gene_id, 'phenotype', 'MedGen', cui)
+                yield 'clinvar', 'gene_condition_source_id', (gene_id, symbol, cui, name, source,
+                                                              '%s:%d' % (source, uid), str(disease_mim), '01 Jan 2020')
+
+    ##########################################################################################
+    # variants (clinvar)
+
+    def _variant_rows(self, rng, genes, concepts):
+        gene_zipf = zipf_weights(len(genes), self.exponent)
+        genes_by_id = dict((gene['GeneID'], gene) for gene in genes)
+        diseases = [concept[0] for concept in concepts if concept[3]]
+        sig_values, sig_weights = _weighted(SIGNIFICANCE)
+        csq_values, csq_weights = _weighted(CONSEQUENCES)
+        src_values, src_weights = _weighted(CITATION_SOURCES)
+        pmids = self._pmids
+
+        for index in range(self.counts['variants']):
+            if index < len(ANCHOR_VARIANTS):
+                hgvs_c, gene_id, variation_id, allele_id, accessions, rs, n_citations = ANCHOR_VARIANTS[index]
+                gene = genes_by_id[gene_id]
+                position = int(''.join(c for c in hgvs_c.split(':c.')[1] if c.isdigit()))
+                ref, alt = hgvs_c[-3], hgvs_c[-1]
+            else:
+                gene = genes[rng.choices(range(len(genes)), cum_weights=gene_zipf)[0]]
+                # positions advance per gene, so every c. is unique.
+                position = 3 * gene['variants'] + rng.randint(1, 3)
+                ref = rng.choice(BASES)
+                alt = rng.choice(BASES.replace(ref, ''))
+                hgvs_c = 'NM_%06d.%d:c.%d%s>%s' % (gene['transcript'], 1 + gene['transcript'] % 4, position, ref, alt)
+                variation_id = 1000000 + index
+                allele_id = 2000000 + index
+                accessions = ['RCV%09d' % (1000000 + index)]
+                if rng.random() < 0.1:
+                    accessions.append('RCV%09d' % (5000000 + index))
+                rs = 200000000 + index
+                # heavy tail: most variants are uncited, a few have dozens of citations.
+                n_citations = min(200, int(rng.paretovariate(1.2)) - 1)
+            gene['variants'] += 1
+            submitters = min(50, int(rng.paretovariate(1.5)))
+            gene['submissions'] += submitters
+
+            hgvs_p = 'NP_%06d.%d:p.%s%d%s' % (gene['transcript'], 1 + gene['transcript'] % 4, rng.choice(AMINO_ACIDS),
+                                              position // 3 + 1, rng.choice(AMINO_ACIDS))
+            start = gene['start'] + position
+            significance = rng.choices(sig_values, cum_weights=sig_weights)[0]
+            phenotype = rng.choice(diseases)
+
+            tested = rng.choice('NY')
+            # like ClinVar, one row per assembly (GRCh37 coordinates are a fixed shift here).
+            for assembly, assembly_start in (('GRCh37', start + GRCH37_SHIFT), ('GRCh38', start)):
+                yield 'clinvar', 'variant_summary', (allele_id, 'single nucleotide variant',
+                                                     '%s (%s)' % (hgvs_c, hgvs_p.split(':')[1]), gene['GeneID'],
+                                                     gene['Symbol'], significance, rs, '-', ';'.join(accessions),
+                                                     tested, 'MedGen:%s' % phenotype, 'germline', assembly,
+                                                     gene['chromosome'], assembly_start, assembly_start, '-',
+                                                     'criteria provided, single submitter', hgvs_c, hgvs_p,
+                                                     submitters, 'Jan 01, 2020', '-', '-', ref, alt)
+            for accession in accessions:
+                yield 'clinvar', 'clinvar_hgvs', (hgvs_c, allele_id, variation_id, accession)
+                yield 'clinvar', 'clinvar_hgvs', (hgvs_p, allele_id, variation_id, accession)
+            so_id, consequence = rng.choices(csq_values, cum_weights=csq_weights)[0]
+            yield 'clinvar', 'molecular_consequences', (hgvs_c, so_id, consequence)
+
+            citations = set()
+            if hgvs_c in ANCHOR_BOOKS:
+                citations.add(('NCBIBookShelf', ANCHOR_BOOKS[hgvs_c]))
+            while len(citations) < n_citations:
+                # fixed variants cite only PubMed, so ClinvarPubmeds needs no eutils lookups for them.
+                source = 'PubMed' if index < len(ANCHOR_VARIANTS) else \
+                    rng.choices(src_values, cum_weights=src_weights)[0]
+                if source == 'PubMed':
+                    citations.add((source, str(rng.choice(pmids))))
+                elif source == 'PubMedCentral':
+                    citations.add((source, 'PMC%d' % rng.randint(1000000, 9999999)))
+                else:
+                    citations.add((source, 'NBK%d' % rng.randint(1000, 9999)))
+            for source, citation_id in sorted(citations):
+                yield 'clinvar', 'var_citations', (allele_id, variation_id, rs, '-', source, citation_id)
+
+        for gene in genes:
+            if gene['variants']:
+                yield 'clinvar', 'gene_specific_summary', (gene['Symbol'], gene['GeneID'], gene['submissions'],
+                                                           gene['variants'])
+
+    ##########################################################################################
+    # literature (pubmed)
+
+    def _pubmed_rows(self, rng):
+        per_file = 30000
+        files = (len(self._pmids) + per_file - 1) // per_file
+        for n in range(files):
+            yield 'pubmed', 'medline_xml_filename', (n + 1, 'medline20n%04d.xml.gz' % (n + 1))
+
+        for index, pmid in enumerate(self._pmids):
+            year, month, day = rng.randint(1990, 2020), rng.randint(1, 12), rng.randint(1, 28)
+            title = 'Synthetic study of %s %s %d' % (rng.choice(ORGANS), rng.choice(CONDITIONS), pmid)
+            xml = ('<MedlineCitation Status="MEDLINE" Owner="NLM"><PMID Version="1">%d</PMID>'
+                   '<DateCreated><Year>%d</Year><Month>%02d</Month><Day>%02d</Day></DateCreated>'
+                   '<Article><ArticleTitle>%s.</ArticleTitle></Article></MedlineCitation>' % (pmid, year, month, day, title))
+            yield 'pubmed', 'medline_xml', (index + 1, pmid, xml, '%d-%02d-%02d' % (year, month, day),
+                                            index // per_file + 1)
+            yield 'pubmed', 'medline_minimum_citation', (pmid, title, 'Abstract of %s.' % title.lower())
+
+    ##########################################################################################
+    # output
+
+    def write(self, directory):
+        """
+        Write <directory>/<section>/<table>.tsv for every table, and <directory>/load.sql
+        (DDL, LOAD DATA LOCAL INFILE and indexes) for the mysql client.
+
+        :return: OrderedDict {(section, table): rows written}
+        """
+        directory = os.path.abspath(directory)
+        files = {}
+        counts = OrderedDict(((section, table), 0) for section, tables in TABLES.items() for table in tables)
+        try:
+            for section, table, row in self.rows():
+                output = files.get((section, table))
+                if output is None:
+                    os.makedirs(os.path.join(directory, section), exist_ok=True)
+                    output = files[section, table] = open(_tsv_path(directory, section, table), 'w')
+                    output.write('\t'.join(TABLES[section][table][0]) + '\n')
+                output.write('\t'.join(_tsv_value(value) for value in row) + '\n')
+                counts[section, table] += 1
+        finally:
+            for output in files.values():
+                output.close()
+
+        with open(os.path.join(directory, 'load.sql'), 'w') as output:
+            for section in TABLES:
+                output.write(load_sql(section, directory, counts) + '\n')
+        log.info('synthetic dataset (scale %s, seed %s): %d rows in %s',
+                 self.scale, self.seed, sum(counts.values()), directory)
+        return counts
+
+    def load(self, batch_size=DEFAULT_BATCH_SIZE, db_class=None):
+        """
+        Create the tables and insert every row through SQLData, using the database of each
+        config section (the databases themselves must exist).
+
+        :return: OrderedDict {(section, table): rows inserted}
+        """
+        if db_class is None:
+            from .db.dataset import SQLData
+            db_class = SQLData
+        dbs = {}
+        buffers = OrderedDict()
+        counts = OrderedDict(((section, table), 0) for section, tables in TABLES.items() for table in tables)
+
+        def db_for(section):
+            if section not in dbs:
+                dbs[section] = db_class(config_section=section)
+                for statement in ddl(section):
+                    dbs[section].execute(statement)
+            return dbs[section]
+
+        def flush(section, table):
+            rows = buffers.pop((section, table))
+            columns = TABLES[section][table][0]
+            placeholders = '(%s)' % ','.join(['%s'] * len(columns))
+            sql = 'insert into %s (%s) values %s' % (table, ','.join(columns), ','.join([placeholders] * len(rows)))
+            db_for(section).execute(sql, *[value for row in rows for value in row])
+
+        for section, table, row in self.rows():
+            buffers.setdefault((section, table), []).append(row)
+            counts[section, table] += 1
+            if len(buffers[section, table]) >= batch_size:
+                flush(section, table)
+        for section, table in list(buffers):
+            flush(section, table)
+
+        for section in TABLES:
+            db = db_for(section)
+            for statement in index_sql(section):
+                db.execute(statement)
+            for statement in log_sql(section, counts):
+                db.execute(statement)
+        return counts
+
+##########################################################################################
+#
+#       SQL
+#
+##########################################################################################
+
+def _tsv_path(directory, section, table):
+    return os.path.join(directory, section, table + '.tsv')
+
+def _tsv_value(value):
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+def _sql_string(value):
+    return "'%s'" % str(value).replace('\\', '\\\\').replace("'", "\\'")
+
+def ddl(section):
+    """
+    :return: list of SQL statements creating the tables of section (and its log table and mem procedure)
+    """
+    statements = []
+    for table, (columns, indexes) in list(TABLES[section].items()) + [('log', (LOG_COLUMNS, []))]:
+        statements.append('drop table if exists %s' % table)
+        statements.append('create table %s (%s) engine=InnoDB default charset=utf8' % (
+            table, ', '.join('%s %s' % (name, kind) for name, kind in columns.items())))
+    # SQLData.ping / AsyncSQLData.ping call this.
+    statements.append('drop procedure if exists mem')
+    statements.append("create procedure mem() select table_schema, engine, table_name, table_rows "
+                      "from information_schema.tables where table_schema = database()")
+    return statements
+
+def index_sql(section):
+    """
+    :return: list of SQL statements creating the indexes of section (run after loading)
+    """
+    return ['create index idx_%s_%s on %s (%s)' % (table, column, table,
+                                                    column + '(100)' if 'text' in columns[column] else column)
+            for table, (columns, indexes) in TABLES[section].items() for column in indexes]
+
+def log_sql(section, counts):
+    """
+    :return: list of SQL statements recording the load in the log table (see SQLData.last_loaded)
+    """
+    statements = []
+    events = [(table, 'rows loaded %d' % counts[section, table]) for table in TABLES[section]]
+    events.append(('load_database.sh', 'done'))
+    for idx, (entity, message) in enumerate(events, 1):
+        statements.append("insert into log (idx, event_time, entity_name, message) values (%d, now(), %s, %s)" % (
+            idx, _sql_string(entity), _sql_string(message)))
+    return statements
+
+def _database(section):
+    from .config import get_config
+    return get_config().get(section, 'dataset', fallback=section)
+
+def load_sql(section, directory, counts):
+    """
+    :return: mysql client script creating and loading section from the TSV files in directory
+    """
+    lines = ['-- %s' % section,
+             'create database if not exists %s;' % _database(section),
+             'use %s;' % _database(section)]
+    statements = ddl(section)
+    for table, columns_indexes in TABLES[section].items():
+        statements.append("load data local infile %s into table %s fields terminated by '\\t' "
+                          "lines terminated by '\\n' ignore 1 lines (%s)" % (
+                              _sql_string(_tsv_path(directory, section, table)), table,
+                              ', '.join(columns_indexes[0])))
+    statements.extend(index_sql(section))
+    statements.extend(log_sql(section, counts))
+    lines.extend(statement + ';' for statement in statements)
+    return '\n'.join(lines) + '\n'
+
+##########################################################################################
+#
+#       main
+#
+##########################################################################################
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='medgen-synthetic', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-o', '--output', help='directory for the TSV files and load.sql')
+    parser.add_argument('--load', action='store_true', help='insert into the configured databases instead')
+    parser.add_argument('--scale', type=float, default=DEFAULT_SCALE, help='1 = %s' % ', '.join(
+        '%d %s' % (count, name) for name, count in BASE_COUNTS.items()))
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--exponent', type=float, default=DEFAULT_EXPONENT, help='Zipf exponent of popularity')
+    args = parser.parse_args(argv)
+    if not args.output and not args.load:
+        parser.error('give --output DIRECTORY and/or --load')
+
+    dataset = SyntheticDataset(args.scale, args.seed, args.exponent)
+    if args.output:
+        counts = dataset.write(args.output)
+    if args.load:
+        counts = dataset.load()
+    for (section, table), count in counts.items():
+        sys.stderr.write('%-8s %-26s %10d\n' % (section, table, count))
+    if args.output:
+        sys.stderr.write('mysql --local-infile=1 -u <user> -p < %s\n' % os.path.join(args.output, 'load.sql'))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
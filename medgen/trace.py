@@ -0,0 +1,279 @@
+""" Hierarchical tracing of annotation calls, down to each SQL statement and eutils request.
+
+    from medgen import trace
+    with trace.Tracer() as tracer:
+        Gene2ConditionSource('BRCA2')
+    print(tracer.format_tree())
+    tracer.save('trace.json')       # open in chrome://tracing or https://ui.perfetto.dev
+
+    Gene2ConditionSource                      4.1ms  (self 0.3ms)
+      Gene.id                                 1.2ms
+        GeneDB.get_gene_id_for_gene_name      1.1ms  rows=1
+      ClinVarDB.gene2condition                2.6ms  rows=3
+
+Spans:
+
+    api       each public annotate function (the medgen.api names), with its arguments
+    resolve   Gene / ConceptID lookups done on first access
+    sql       every query run through SQLData.cursor: template, statement, rows, config section
+    eutils    NCBI eutils requests made through metapub
+
+A span's self time is its duration less that of its children: for an api span, the time spent
+converting results. Spans nest across threads when the work is submitted with bind() (as
+AnnotatePanel does). While no Tracer is started, span() returns a shared no-op and traced
+functions make one extra check per call.
+"""
+import os
+import json
+import time
+import threading
+import contextvars
+from functools import wraps
+
+DEFAULT_MAX_SPANS = 100000
+MAX_ARG_LENGTH = 200
+
+_tracer = None
+_current = contextvars.ContextVar('medgen_trace_span', default=None)
+
+##########################################################################################
+#
+#       Spans
+#
+##########################################################################################
+
+class Span(object):
+    __slots__ = ('id', 'parent', 'name', 'category', 'args', 'start', 'end', 'thread', 'error')
+
+    def __init__(self, id, parent, name, category, args, start, end=None):
+        self.id = id
+        self.parent = parent
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = start
+        self.end = end
+        self.thread = threading.get_ident()
+        self.error = None
+
+    @property
+    def seconds(self):
+        return self.end - self.start
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __repr__(self):
+        return 'Span(%s, %s, %.6fs)' % (self.name, self.category, self.seconds)
+
+class _NullSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _SpanContext(object):
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        parent = _current.get()
+        self.span = Span(self.tracer._next_id(), parent.id if parent is not None else None,
+                         self.name, self.category, self.args, time.perf_counter())
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.span.end = time.perf_counter()
+        if exc_type is not None:
+            self.span.error = repr(exc_value)
+        _current.reset(self._token)
+        self.tracer._add(self.span)
+        return False
+
+def span(name, category='medgen', **args):
+    """
+    Context manager timing the block as a child of the current span (no-op unless tracing).
+
+        with trace.span('load', 'io', path=path) as sp:
+            rows = load(path)
+            sp.set(rows=len(rows))
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _SpanContext(tracer, name, category, args)
+
+def _short(value):
+    text = repr(value)
+    return text if len(text) <= MAX_ARG_LENGTH else text[:MAX_ARG_LENGTH] + '...'
+
+def traced(name, function, category='api'):
+    """
+    :return: function which runs in a span called name while tracing
+    """
+    @wraps(function)
+    def traced_function(*args, **kwargs):
+        tracer = _tracer
+        if tracer is None:
+            return function(*args, **kwargs)
+        arguments = {'args': [_short(arg) for arg in args]}
+        if kwargs:
+            arguments['kwargs'] = dict((key, _short(value)) for key, value in kwargs.items())
+        with _SpanContext(tracer, name, category, arguments):
+            return function(*args, **kwargs)
+
+    return traced_function
+
+def bind(function):
+    """
+    :return: function which runs in (a copy of) the caller's context, so that the spans it opens
+             in another thread are children of the caller's current span
+    """
+    if _tracer is None:
+        return function
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(function, *args, **kwargs)
+
+##########################################################################################
+#
+#       Tracer
+#
+##########################################################################################
+
+class Tracer(object):
+    """
+    Collects the spans finished (in any thread) between start() and stop(), or inside a with block.
+
+    :param max_spans: spans kept; later ones are counted in dropped
+    """
+    def __init__(self, max_spans=DEFAULT_MAX_SPANS):
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped = 0
+        self._ids = 0
+        self._lock = threading.Lock()
+        self._previous = None
+        self._origin = None
+
+    def _next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def _add(self, span):
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def _on_query(self, event):
+        end = time.perf_counter()
+        parent = _current.get()
+        sql = ' '.join(event.sql.split())
+        self._add(Span(self._next_id(), parent.id if parent is not None else None, event.template, 'sql',
+                       {'sql': _short(sql), 'args': [_short(arg) for arg in event.args or ()],
+                        'rows': event.rows, 'section': event.db._cfg_section},
+                       end - event.seconds, end))
+
+    def start(self):
+        global _tracer
+        from .db.dataset import add_query_listener
+        self._origin = time.perf_counter()
+        self._previous, _tracer = _tracer, self
+        add_query_listener(self._on_query)
+        return self
+
+    def stop(self):
+        global _tracer
+        from .db.dataset import remove_query_listener
+        remove_query_listener(self._on_query)
+        _tracer = self._previous
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def children(self):
+        """
+        :return: dict {span id or None (the roots): [spans in start order]}
+        """
+        children = {}
+        known = set(span.id for span in self.spans)
+        for span in sorted(self.spans, key=lambda span: span.start):
+            parent = span.parent if span.parent in known else None
+            children.setdefault(parent, []).append(span)
+        return children
+
+    def roots(self):
+        return self.children().get(None, [])
+
+    def self_seconds(self, span, children=None):
+        """
+        :return: duration of span less the time covered by its children
+        """
+        children = self.children() if children is None else children
+        covered, until = 0.0, span.start
+        for child in children.get(span.id, []):
+            start, end = max(child.start, until), min(child.end, span.end)
+            if end > start:
+                covered += end - start
+                until = end
+        return span.seconds - covered
+
+    def format_tree(self):
+        children = self.children()
+        lines = []
+
+        def walk(span, depth):
+            note = ''
+            if children.get(span.id):
+                note = '  (self %.1fms)' % (1000 * self.self_seconds(span, children))
+            if 'rows' in span.args:
+                note += '  rows=%s' % span.args['rows']
+            if span.error:
+                note += '  error=%s' % span.error
+            lines.append('%-40s %8.1fms%s' % ('  ' * depth + span.name, 1000 * span.seconds, note))
+            for child in children.get(span.id, []):
+                walk(child, depth + 1)
+
+        for root in children.get(None, []):
+            walk(root, 0)
+        if self.dropped:
+            lines.append('(%d spans dropped)' % self.dropped)
+        return '\n'.join(lines)
+
+    def to_chrome(self):
+        """
+        :return: dict in the Chrome trace-event format (complete 'X' events, microseconds)
+        """
+        origin = self._origin if self._origin is not None else min([span.start for span in self.spans] or [0])
+        events = []
+        for span in sorted(self.spans, key=lambda span: span.start):
+            args = dict(span.args, span_id=span.id, parent_id=span.parent)
+            if span.error:
+                args['error'] = span.error
+            events.append({'name': span.name, 'cat': span.category, 'ph': 'X',
+                           'ts': round((span.start - origin) * 1e6, 3), 'dur': round(span.seconds * 1e6, 3),
+                           'pid': os.getpid(), 'tid': span.thread, 'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path):
+        with open(path, 'w') as fh:
+            json.dump(self.to_chrome(), fh, default=str)
@@ -0,0 +1,399 @@
+""" Streaming VCF annotation from ClinVar.
+
+    medgen-vcf sample.vcf.gz -o sample.clinvar.vcf.gz --workers 8
+
+Each record is matched to ClinVar variants (variant_summary, for one assembly) by position
+(Start == POS, or POS + 1 for indels: VCF's padding base) and by the rs numbers in its ID column.
+A variant matches when its ReferenceAlleleVCF is the record's REF and its AlternateAlleleVCF one
+of its ALT alleles; an rs number names a site, not an allele, so variants found by rs number whose
+alleles do not match (or are not known) are reported on their own. Matches are added to INFO, one
+value per ClinVar variation, in the order found:
+
+    CLINVAR_VID         VariationID
+    CLINVAR_SIG         ClinicalSignificance (spaces as '_')
+    CLINVAR_CITATIONS   source:id citations of the variation, separated by '|' ('.' if none)
+    CLINVAR_RS_VID      VariationID of the variants with one of the record's rs numbers but other
+                        (or unknown) alleles
+
+Nothing is asked of the database per record: ClinVarVcfIndex is built once, from the in-memory
+variant table and interval index (medgen.db.variant_table, medgen.intervals) plus one read of
+clinvar_hgvs, var_citations and the alleles of variant_summary. The VCF is read and written as a stream, in chunks of at most
+chunk_size records of one chromosome; with workers > 1 the chunks are annotated by a process
+pool (several chromosomes, and several chunks of a long one, at once) and written back in input
+order, with at most 2 chunks per worker in flight, so memory does not grow with the input.
+"""
+import os
+import sys
+import gzip
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .db.columnar import EncodedColumn
+from .intervals import DEFAULT_ASSEMBLY, normalize_chromosome
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_CHUNK_SIZE = 5000   # VCF records per unit of work
+
+INFO_HEADERS = [
+    '##INFO=<ID=CLINVAR_VID,Number=.,Type=Integer,Description="ClinVar VariationID">',
+    '##INFO=<ID=CLINVAR_SIG,Number=.,Type=String,Description="ClinVar ClinicalSignificance, per CLINVAR_VID">',
+    '##INFO=<ID=CLINVAR_CITATIONS,Number=.,Type=String,'
+    'Description="ClinVar citations (source:id, separated by |), per CLINVAR_VID">',
+    '##INFO=<ID=CLINVAR_RS_VID,Number=.,Type=Integer,'
+    'Description="ClinVar VariationID of the variants with this rs number but other or unknown alleles">',
+]
+
+# ReferenceAlleleVCF / AlternateAlleleVCF values which are not alleles
+UNKNOWN_ALLELES = frozenset(['', '-', '.', 'na', 'NA'])
+
+def info_value(text):
+    """
+    :return: text usable as a VCF INFO value: spaces as '_', reserved characters percent-encoded
+    """
+    text = str(text).replace('%', '%25')
+    for char, code in ((';', '%3B'), ('=', '%3D'), (',', '%2C'), ('|', '%7C'), ('\t', '%09')):
+        text = text.replace(char, code)
+    return text.replace(' ', '_')
+
+##########################################################################################
+#
+#       Index
+#
+##########################################################################################
+
+class ClinVarVcfIndex(object):
+    """
+    ClinVar lookups by rs number and position for one assembly, over the variant table rows.
+    """
+    def __init__(self, intervals, assembly, variation_ids, citation_alleles, citations, allele_codes, ref_codes,
+                 alt_codes):
+        """
+        :param intervals: medgen.intervals.GenomeIntervals
+        :param variation_ids: int64 array, VariationID of each variant table row (-1 if unknown)
+        :param citation_alleles: sorted int64 array of AlleleIDs, one per citation
+        :param citations: citation text (source:id) of each entry of citation_alleles
+        :param allele_codes: dict {allele: code} of the alleles in ref_codes and alt_codes
+        :param ref_codes: int array, ReferenceAlleleVCF code of each variant table row (-1 if unknown)
+        :param alt_codes: int array, AlternateAlleleVCF code of each variant table row (-1 if unknown)
+        """
+        self.intervals = intervals
+        self.assembly = assembly
+        table = intervals.table
+        self.variation_ids = variation_ids
+        self.allele_codes = allele_codes
+        self.ref_codes = ref_codes
+        self.alt_codes = alt_codes
+        self.allele_ids = np.asarray(table['AlleleID'], dtype=np.int64)
+        self.citation_alleles = citation_alleles
+        self.citations = citations
+
+        significance = table['ClinicalSignificance']
+        self.significance_codes = significance.codes
+        self.significances = [info_value(value) for value in significance.categories]
+
+        rs = np.asarray(table['rs'], dtype=np.float64)
+        rows = np.flatnonzero((rs > 0) & (table['Assembly'] == assembly))
+        order = np.argsort(rs[rows], kind='stable')
+        self.rs = rs[rows][order].astype(np.int64)
+        self.rs_rows = rows[order]
+
+    @classmethod
+    def build(cls, assembly=DEFAULT_ASSEMBLY, db=None):
+        """
+        :param db: ClinVarDB (the shared one by default)
+        """
+        from .db.clinvar import ClinVarDB
+        from .db.registry import get_db
+        from .intervals import get_clinvar_intervals
+        db = db or get_db(ClinVarDB)
+        intervals = get_clinvar_intervals(assembly)
+        allele_ids = np.asarray(intervals.table['AlleleID'], dtype=np.int64)
+
+        variations = db.fetchcolumns('select distinct AlleleID, VariationID from clinvar_hgvs')
+        variation_ids = np.full(len(allele_ids), -1, dtype=np.int64)
+        if variations.rows:
+            found, hit = _lookup(np.asarray(variations['AlleleID'], dtype=np.int64), allele_ids)
+            variation_ids[hit] = np.asarray(variations['VariationID'], dtype=np.int64)[found[hit]]
+
+        # AlleleID is unique within one assembly's variant_summary rows.
+        vcf_alleles = db.fetchcolumns('select AlleleID, ReferenceAlleleVCF, AlternateAlleleVCF from variant_summary '
+                                      'where Assembly = %s', assembly)
+        allele_codes, codes = {}, []
+        for name in ('ReferenceAlleleVCF', 'AlternateAlleleVCF'):
+            row_codes = np.full(len(allele_ids), -1, dtype=np.int32)
+            if vcf_alleles.rows:
+                column = vcf_alleles[name]
+                # the column's own codes -> codes shared by both columns (-1: not an allele)
+                recode = np.array([-1 if value is None or value in UNKNOWN_ALLELES else
+                                   allele_codes.setdefault(value, len(allele_codes))
+                                   for value in column.categories] + [-1],
+                                  dtype=np.int32)
+                found, hit = _lookup(np.asarray(vcf_alleles['AlleleID'], dtype=np.int64), allele_ids)
+                row_codes[hit] = recode[column.codes[found[hit]]]
+            codes.append(row_codes)
+
+        cited = db.fetchcolumns('select distinct AlleleID, citation_source, citation_id from var_citations')
+        if cited.rows:
+            alleles = np.asarray(cited['AlleleID'], dtype=np.int64)
+            order = np.argsort(alleles, kind='stable')
+            sources, ids = _values(cited['citation_source']), _values(cited['citation_id'])
+            citations = [info_value('%s:%s' % (sources[i], ids[i])) for i in order.tolist()]
+            citation_alleles = alleles[order]
+        else:
+            citations, citation_alleles = [], np.empty(0, dtype=np.int64)
+        return cls(intervals, assembly, variation_ids, citation_alleles, citations, allele_codes, *codes)
+
+    def match(self, chromosome, positions, ids, refs, alts):
+        """
+        Variant table rows of a chunk of VCF records of one chromosome.
+
+        :param positions: int64 array of POS
+        :param ids: ID column of each record
+        :param refs: REF of each record
+        :param alts: list of the ALT alleles of each record
+        :return: (matches, rs_matches): per record, a list of the rows with its REF and one of its ALTs
+                 (found by position or rs number), and a list of the other rows found by rs number
+        """
+        # candidate (record, row) pairs in the order found: by position, then by rs number.
+        records, rows = [], []
+        index = self.intervals.indexes.get((self.assembly, normalize_chromosome(chromosome)))
+        if index is not None:
+            indels = np.array([any(len(alt) != len(ref) for alt in record_alts) for ref, record_alts in zip(refs, alts)],
+                              dtype=bool)
+            for shifted in (positions, positions + 1):
+                lo = np.searchsorted(index.starts, shifted, 'left')
+                hi = np.searchsorted(index.starts, shifted, 'right')
+                if shifted is not positions:
+                    hi = np.where(indels, hi, lo)
+                for record in np.flatnonzero(hi > lo).tolist():
+                    found = index.ids[lo[record]:hi[record]].tolist()
+                    records.extend([record] * len(found))
+                    rows.extend(found)
+        by_position = len(rows)
+
+        for record, text in enumerate(ids):
+            for token in text.split(';'):
+                if token[:2].lower() == 'rs' and token[2:].isdigit():
+                    number = int(token[2:])
+                    start, end = np.searchsorted(self.rs, [number, number + 1]).tolist()
+                    records.extend([record] * (end - start))
+                    rows.extend(self.rs_rows[start:end].tolist())
+
+        matches = [[] for _ in range(len(positions))]
+        rs_matches = [[] for _ in range(len(positions))]
+        if rows:
+            ref_codes = self.ref_codes[rows].tolist()
+            alt_codes = self.alt_codes[rows].tolist()
+            record_refs, record_alts = {}, {}
+            for i, (record, row) in enumerate(zip(records, rows)):
+                if record not in record_refs:
+                    record_refs[record] = self.allele_codes.get(refs[record], -1)
+                    record_alts[record] = set(self.allele_codes.get(alt, -1) for alt in alts[record])
+                ref, alt = ref_codes[i], alt_codes[i]
+                if ref >= 0 and alt >= 0 and ref == record_refs[record] and alt in record_alts[record]:
+                    matches[record].append(row)
+                elif i >= by_position:
+                    rs_matches[record].append(row)
+        return matches, rs_matches
+
+    def info(self, matches, rs_matches=None):
+        """
+        :param matches: list (per record) of lists of rows, as from match
+        :param rs_matches: list (per record) of lists of rows found by rs number only, as from match
+        :return: list (per record) of INFO fields (without separator), '' for records without a match
+        """
+        rows = np.array([row for found in matches for row in found], dtype=np.int64)
+        # one gather per chunk: the per record loop below only touches Python lists.
+        vids = self.variation_ids[rows].tolist()
+        codes = self.significance_codes[rows].tolist()
+        alleles = self.allele_ids[rows]
+        cite_starts = np.searchsorted(self.citation_alleles, alleles, 'left').tolist()
+        cite_ends = np.searchsorted(self.citation_alleles, alleles, 'right').tolist()
+
+        infos, i = [], 0
+        for record, found in enumerate(matches):
+            variations, significances, citations = [], [], []
+            seen = set()
+            for row in found:
+                vid, code, cite_start, cite_end = vids[i], codes[i], cite_starts[i], cite_ends[i]
+                i += 1
+                key = vid if vid >= 0 else ('allele', row)
+                if key in seen:
+                    continue
+                seen.add(key)
+                variations.append(str(vid) if vid >= 0 else '.')
+                significances.append(self.significances[code] if code >= 0 else '.')
+                citations.append('|'.join(self.citations[cite_start:cite_end]) or '.')
+            fields = ['CLINVAR_VID=%s;CLINVAR_SIG=%s;CLINVAR_CITATIONS=%s' % (
+                ','.join(variations), ','.join(significances), ','.join(citations))] if variations else []
+            if rs_matches is not None and rs_matches[record]:
+                rs_vids = []
+                for vid in self.variation_ids[rs_matches[record]].tolist():
+                    if vid >= 0 and vid not in seen and vid not in rs_vids:
+                        rs_vids.append(vid)
+                if rs_vids:
+                    fields.append('CLINVAR_RS_VID=%s' % ','.join(map(str, rs_vids)))
+            infos.append(';'.join(fields))
+        return infos
+
+def _values(column):
+    return (column.decode() if isinstance(column, EncodedColumn) else column).tolist()
+
+def _lookup(keys, values):
+    """
+    :param keys: int64 array
+    :param values: int64 array of values to find in keys
+    :return: (found, hit): per value, a position in keys, and whether keys holds the value there
+    """
+    if not len(keys):
+        return np.zeros(len(values), dtype=np.int64), np.zeros(len(values), dtype=bool)
+    order = np.argsort(keys, kind='stable')
+    found = np.minimum(np.searchsorted(keys[order], values), len(keys) - 1)
+    hit = keys[order][found] == values
+    return order[found], hit
+
+##########################################################################################
+#
+#       Annotation
+#
+##########################################################################################
+
+# the index of a pool worker (inherited on fork, else passed to the initializer once).
+_index = None
+
+def _set_index(index):
+    global _index
+    _index = index
+
+def annotate_chunk(index, chromosome, lines):
+    """
+    :param lines: VCF data lines of one chromosome (with line ends)
+    :return: (annotated text, records, records matched)
+    """
+    rows = [line.rstrip('\r\n').split('\t') for line in lines]
+    positions = np.array([int(fields[1]) if len(fields) > 1 and fields[1].isdigit() else -1 for fields in rows],
+                         dtype=np.int64)
+    ids = [fields[2] if len(fields) > 2 else '.' for fields in rows]
+    refs = [fields[3] if len(fields) > 4 else '' for fields in rows]
+    alts = [fields[4].split(',') if len(fields) > 4 else [] for fields in rows]
+    out, matched = [], 0
+    for fields, line, info in zip(rows, lines, index.info(*index.match(chromosome, positions, ids, refs, alts))):
+        if len(fields) < 8:
+            info = ''
+        if not info:
+            out.append(line if line.endswith('\n') else line + '\n')
+            continue
+        matched += 1
+        fields[7] = info if fields[7] in ('', '.') else '%s;%s' % (fields[7], info)
+        out.append('\t'.join(fields) + '\n')
+    return ''.join(out), len(rows), matched
+
+def _annotate_in_worker(chromosome, lines):
+    return annotate_chunk(_index, chromosome, lines)
+
+def read_chunks(lines, output, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write the header lines of a VCF to output (with the INFO_HEADERS) and yield its records.
+
+    :return: generator of (chromosome, list of lines): at most chunk_size lines, all of one chromosome
+    """
+    chromosome, chunk = None, []
+    for line in lines:
+        if line.startswith('#'):
+            if line.startswith('#CHROM'):
+                output.write(''.join(header + '\n' for header in INFO_HEADERS))
+            output.write(line)
+            continue
+        if not line.strip():
+            continue
+        this = line.split('\t', 1)[0]
+        if chunk and (this != chromosome or len(chunk) >= chunk_size):
+            yield chromosome, chunk
+            chunk = []
+        chromosome = this
+        chunk.append(line)
+    if chunk:
+        yield chromosome, chunk
+
+def annotate_vcf(lines, output, index=None, workers=DEFAULT_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :param lines: VCF lines (e.g. an open file)
+    :param output: file to write the annotated VCF to
+    :param index: ClinVarVcfIndex (built for GRCh38 by default)
+    :return: summary dict: records, matched, seconds
+    """
+    index = index or ClinVarVcfIndex.build()
+    start = time.perf_counter()
+    records = matched = 0
+    chunks = read_chunks(lines, output, chunk_size)
+
+    if workers <= 1:
+        for chromosome, chunk in chunks:
+            text, count, found = annotate_chunk(index, chromosome, chunk)
+            output.write(text)
+            records += count
+            matched += found
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_set_index,
+                                 initargs=(index,)) as pool:
+            for chromosome, chunk in chunks:
+                if len(pending) >= 2 * workers:
+                    text, count, found = pending.popleft().result()
+                    output.write(text)
+                    records += count
+                    matched += found
+                pending.append(pool.submit(_annotate_in_worker, chromosome, chunk))
+            while pending:
+                text, count, found = pending.popleft().result()
+                output.write(text)
+                records += count
+                matched += found
+
+    return {'records': records, 'matched': matched, 'seconds': round(time.perf_counter() - start, 3)}
+
+##########################################################################################
+#
+#       main
+#
+##########################################################################################
+
+def _open(path, mode):
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't')
+    return open(path, mode)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='medgen-vcf', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', nargs='?', default='-', help='VCF file, .gz for gzip (default: stdin)')
+    parser.add_argument('-o', '--output', default='-', help='annotated VCF file (default: stdout)')
+    parser.add_argument('--assembly', default=DEFAULT_ASSEMBLY, help='ClinVar Assembly the VCF is on')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='processes (1: annotate in this one)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='records per unit of work')
+    args = parser.parse_args(argv)
+
+    index = ClinVarVcfIndex.build(args.assembly)
+    infile, outfile = _open(args.input, 'r'), _open(args.output, 'w')
+    try:
+        summary = annotate_vcf(infile, outfile, index, workers=args.workers, chunk_size=args.chunk_size)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    sys.stderr.write('%(records)d records, %(matched)d matched ClinVar, %(seconds).1fs\n' % summary)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
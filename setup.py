@@ -44,5 +44,18 @@ setup(
         'pyrfc3339',
         'ipython',
         ],
+    entry_points = {
+        'console_scripts': ['medgen-annotate = medgen.cli:main',
+                            'medgen-benchmark = medgen.benchmark:main',
+                            'medgen-explain = medgen.db.explain:main',
+                            'medgen-job = medgen.job:main',
+                            'medgen-loadtest = medgen.loadtest:main',
+                            'medgen-service = medgen.service.app:main',
+                            'medgen-synthetic = medgen.synthetic:main',
+                            'medgen-vcf = medgen.vcf:main'],
+        },
+    extras_require = {
+        'async': ['aiomysql'],
+        },
     )
 
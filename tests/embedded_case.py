@@ -0,0 +1,34 @@
+""" Base test case for tests against the embedded synthetic database (see medgen.db.embedded). """
+import shutil
+import tempfile
+from unittest import TestCase
+
+from medgen.db import embedded, registry
+from medgen.db.dataset import set_connection_factory
+from medgen.db.gene import GeneBorg
+
+class EmbeddedTestCase(TestCase):
+    """
+    Builds a synthetic medgen-mysql (scale, seed) into cls.directory once per class and connects
+    every SQLData to it; tearDownClass restores the default connection factory and shared instances.
+    Subclasses with fixtures of their own call super() first in setUpClass and last in tearDownClass.
+    """
+    scale = 0.02
+    seed = 0
+
+    @classmethod
+    def setUpClass(cls):
+        super(EmbeddedTestCase, cls).setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        embedded.build(cls.directory, scale=cls.scale, seed=cls.seed)
+        registry.reset()
+        GeneBorg.clear()
+        embedded.use(cls.directory)
+
+    @classmethod
+    def tearDownClass(cls):
+        set_connection_factory(None)
+        registry.reset()
+        GeneBorg.clear()
+        shutil.rmtree(cls.directory)
+        super(EmbeddedTestCase, cls).tearDownClass()
@@ -0,0 +1,125 @@
+import asyncio
+from unittest import TestCase
+from hamcrest import assert_that, equal_to, is_, greater_than, has_entries, contains_inanyorder
+
+from medgen.db import registry
+from medgen.db.aio import AsyncSQLData, AsyncGeneDB, AsyncClinVarDB, AsyncMedGenDB, AsyncHugoDB
+from medgen.annotate import aio
+
+##########################################################################################
+#
+#       Local stand-in for an aiomysql pool
+#
+##########################################################################################
+
+ROWS = {
+    'from gene_info where Symbol':         [{'ID': 675}],
+    'select * from gene_info':             [{'GeneID': 675, 'Symbol': 'BRCA2'}],
+    'from gene2pubmed':                    [{'PMID': '12345'}, {'PMID': '23456'}],
+    'from gene_condition_source_id':       [{'GeneID': 675, 'ConceptID': 'C0677776'}],
+    'from variant_summary':                [{'ClinicalSignificance': 'Pathogenic', 'cnt_variants': 9}],
+    'from hugo_info':                      [{'LocusSpecificDatabases': 'LOVD|http://lovd,BIC|http://bic',
+                                             'GeneFamilyTag': None, 'pubmeds': '1, 2'}],
+    'from NAMES':                          [{'CUI': 'C0007194', 'name': 'Hypertrophic cardiomyopathy'}],
+    'from clinvar_hgvs where HGVS':        [{'ID': 17610}],
+}
+
+class StandinCursor(object):
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, args=None):
+        self.pool.queries.append((sql, args))
+        self.pool.active += 1
+        self.pool.max_active = max(self.pool.max_active, self.pool.active)
+        await asyncio.sleep(0.01)
+        self.pool.active -= 1
+        self.rows = []
+        for fragment, rows in ROWS.items():
+            if fragment in sql:
+                self.rows = [dict(row) for row in rows]
+
+    async def fetchall(self):
+        return self.rows
+
+class StandinConnection(object):
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return StandinCursor(self.pool)
+
+class StandinPool(object):
+
+    def __init__(self):
+        self.queries = []
+        self.active = 0
+        self.max_active = 0
+
+    def acquire(self):
+        return StandinConnection(self)
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+##########################################################################################
+
+class AsyncAnnotateTestCase(TestCase):
+
+    def setUp(self):
+        self.pool = StandinPool()
+        for db_class in (AsyncGeneDB, AsyncClinVarDB, AsyncMedGenDB, AsyncHugoDB):
+            registry.set_db(db_class, db_class(pool=self.pool))
+
+    def tearDown(self):
+        registry.reset()
+
+    def test_fetch(self):
+        db = AsyncSQLData(dataset='medgen', pool=self.pool)
+        assert_that(asyncio.run(db.fetchID('select GeneID as ID from gene_info where Symbol = %s', 'BRCA2')), is_(675))
+        assert_that(asyncio.run(db.fetchrow('select nothing')), is_(None))
+        assert_that(self.pool.queries[0], equal_to(('select GeneID as ID from gene_info where Symbol = %s', ('BRCA2',))))
+
+    def test_annotate_gene_gathers_across_schemas(self):
+        record = asyncio.run(aio.annotate_gene('BRCA2'))
+
+        assert_that(record['GeneInfo'], has_entries({'Symbol': 'BRCA2'}))
+        assert_that(record['Gene2ClinicalSignificance'][0]['cnt_variants'], is_(9))
+        assert_that(list(record['Gene2LocusDB']['LocusSpecificDatabases']), contains_inanyorder('LOVD', 'BIC'))
+        assert_that(len(record['Gene2PubMed']), is_(2))
+        assert_that(self.pool.max_active, greater_than(1))
+
+    def test_point_lookups(self):
+        async def lookups():
+            return await asyncio.gather(aio.GeneID('BRCA2'), aio.ConceptName('C0007194'),
+                                        aio.ClinvarVariationID('NM_001232.3:c.919G>C'))
+        gene_id, name, variation_ids = asyncio.run(lookups())
+        assert_that(gene_id, is_(675))
+        assert_that(name['CUI'], equal_to('C0007194'))
+        assert_that(variation_ids, equal_to([17610]))
+
+    def test_unknown_gene(self):
+        rows = ROWS.pop('from gene_info where Symbol')
+        try:
+            assert_that(asyncio.run(aio.GeneInfo('NOSUCHGENE')), is_(None))
+            assert_that(self.pool.queries[-1][1], equal_to(('NOSUCHGENE',)))
+        finally:
+            ROWS['from gene_info where Symbol'] = rows
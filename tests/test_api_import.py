@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import subprocess
+from unittest import TestCase
+from hamcrest import assert_that, less_than, is_not, has_item, equal_to, is_
+
+# seconds; override with MEDGEN_IMPORT_BUDGET on slow machines.
+IMPORT_BUDGET = float(os.getenv('MEDGEN_IMPORT_BUDGET', '0.25'))
+
+_PROBE = """
+import sys, time, json
+t0 = time.perf_counter()
+import medgen.api
+elapsed = time.perf_counter() - t0
+medgen.api.GeneID, medgen.api.ClinvarPubmeds, medgen.api.PMID2Article
+from medgen.db import registry
+print(json.dumps({'elapsed': elapsed, 'modules': sorted(sys.modules), 'instances': len(registry._instances)}))
+"""
+
+def _probe():
+    """ import medgen.api in a fresh interpreter (the only honest way to time an import). """
+    out = subprocess.check_output([sys.executable, '-c', _PROBE],
+                                  cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+class ApiImportTestCase(TestCase):
+
+    def test_import_budget(self):
+        best = min(_probe()['elapsed'] for _ in range(3))
+        assert_that(best, less_than(IMPORT_BUDGET))
+
+    def test_no_heavy_imports(self):
+        modules = _probe()['modules']
+        for heavy in ['metapub', 'requests', 'MySQLdb', 'pyrfc3339']:
+            assert_that(modules, is_not(has_item(heavy)))
+
+    def test_api_names_do_not_build_db_objects(self):
+        assert_that(_probe()['instances'], is_(0))
+
+    def test_api_function_docstrings(self):
+        import medgen.api
+        from medgen.db.gene import GeneDB
+        assert_that(medgen.api.GeneID.__doc__, equal_to(GeneDB.get_gene_id.__doc__))
+        assert_that(medgen.api.__all__, has_item('Gene2ConditionSource'))
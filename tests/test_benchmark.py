@@ -0,0 +1,43 @@
+import copy
+from hamcrest import assert_that, equal_to, is_, greater_than, has_entries
+
+from medgen import benchmark
+
+from embedded_case import EmbeddedTestCase
+
+class BenchmarkTestCase(EmbeddedTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(BenchmarkTestCase, cls).setUpClass()
+        cls.report = benchmark.run(repeat=3, min_seconds=0, select='Gene2', meta={'database': 'embedded'})
+
+    def test_report(self):
+        cases = self.report['cases']
+        assert_that(sorted(set(case['function'] for case in cases.values())), equal_to(
+            ['Gene2ClinicalSignificance', 'Gene2ConditionSource', 'Gene2Function', 'Gene2LocusDB',
+             'Gene2MIM', 'Gene2PubMed']))
+        assert_that(self.report['meta'], has_entries({'database': 'embedded', 'repeat': 3}))
+
+        hub = cases['Gene2Function[hub]']
+        assert_that(hub, has_entries({'calls': 3, 'errors': 0, 'queries_per_call': 1.0, 'cold_queries': 1}))
+        assert_that(hub['latency']['count'], is_(3))
+        assert_that(hub['rows_per_call'], greater_than(cases['Gene2Function[typical]']['rows_per_call']))
+        assert_that(hub['peak_bytes'], greater_than(0))
+
+    def test_compare(self):
+        assert_that(benchmark.compare(self.report, self.report), equal_to([]))
+
+        slower = copy.deepcopy(self.report)
+        case = slower['cases']['Gene2MIM[typical]']
+        case['latency']['p95'] += 1.0
+        case['queries_per_call'] += 1
+        regressions = benchmark.compare(self.report, slower)
+        assert_that([(reg.case, reg.metric) for reg in regressions], equal_to(
+            [('Gene2MIM[typical]', 'latency_p95'), ('Gene2MIM[typical]', 'queries_per_call')]))
+
+        # 3x slower, but below the noise floor
+        before, after = copy.deepcopy(self.report), copy.deepcopy(self.report)
+        before['cases']['Gene2MIM[typical]']['latency']['p50'] = 0.0001
+        after['cases']['Gene2MIM[typical]']['latency']['p50'] = 0.0003
+        assert_that(benchmark.compare(before, after), equal_to([]))
@@ -0,0 +1,63 @@
+import io
+import json
+from unittest import TestCase, mock
+from hamcrest import assert_that, equal_to, is_, has_entries, contains_string, has_length
+
+from medgen import cli
+
+FAKE_ANNOTATORS = {
+    'hgvs': lambda query: {'VariationID': [17610]},
+    'gene': lambda query: {'GeneID': 675},
+    'cui':  lambda query: {'ConceptName': 'Hypertrophic cardiomyopathy'},
+}
+
+class CliTestCase(TestCase):
+
+    def test_query_kind(self):
+        assert_that(cli.query_kind('NM_001232.3:c.919G>C'), equal_to('hgvs'))
+        assert_that(cli.query_kind('C0007194'), equal_to('cui'))
+        assert_that(cli.query_kind('BRCA2'), equal_to('gene'))
+        assert_that(cli.query_kind('CDKN2AIP'), equal_to('gene'))
+        assert_that(cli.query_kind('2881'), equal_to('cui'))
+        assert_that(cli.query_kind('100287045'), equal_to('gene'))
+
+    def test_read_tsv_by_column_name(self):
+        lines = iter(['id\thgvs_c\n', '1\tNM_001232.3:c.919G>C\n', '\n', '2\tNM_198578.3:c.6055G>A\n'])
+        records = list(cli.read_tsv(lines, 'hgvs_c'))
+        assert_that([record['query'] for record in records], equal_to(['NM_001232.3:c.919G>C', 'NM_198578.3:c.6055G>A']))
+        assert_that(records[0]['id'], equal_to('1'))
+
+    def test_read_tsv_skips_short_rows(self):
+        lines = iter(['BRCA2\t1\n', 'TP53\n', 'ACADM\t2\n'])
+        with self.assertLogs('medgen', 'WARNING') as logs:
+            records = list(cli.read_tsv(lines, 1))
+        assert_that([record['query'] for record in records], equal_to(['1', '2']))
+        assert_that(logs.output[0], contains_string('line 2'))
+
+    def test_read_jsonl_skips_bad_lines(self):
+        lines = iter(['{"q": "BRCA2"}\n', '{"q": \n', '{"gene": "TP53"}\n', '[1]\n', '{"q": 675}\n'])
+        with self.assertLogs('medgen', 'WARNING') as logs:
+            records = list(cli.read_jsonl(lines, 'q'))
+        assert_that([record['query'] for record in records], equal_to(['BRCA2', '675']))
+        assert_that([line for line in logs.output if 'skipping line' in line], has_length(3))
+        assert_that(logs.output[0], contains_string('line 2'))
+
+    @mock.patch.dict(cli.ANNOTATORS, FAKE_ANNOTATORS)
+    def test_run_keeps_input_order(self):
+        queries = ['BRCA2', 'C0007194', 'NM_001232.3:c.919G>C'] * 50
+        output = io.StringIO()
+        lines = iter(json.dumps({'q': query, 'sample': n}) for n, query in enumerate(queries))
+        summary = cli.run(cli.read_jsonl(lines, 'q'), output, workers=4, window=7)
+
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert_that([row['sample'] for row in rows], equal_to(list(range(len(queries)))))
+        assert_that(rows[1], has_entries({'kind': 'cui', 'ConceptName': 'Hypertrophic cardiomyopathy'}))
+        assert_that(summary['items'], is_(150))
+        assert_that(summary['latency']['count'], is_(150))
+
+    @mock.patch.dict(cli.ANNOTATORS, {'gene': mock.Mock(side_effect=RuntimeError('no db'))})
+    def test_errors_are_reported_per_row(self):
+        output = io.StringIO()
+        summary = cli.run(cli.read_tsv(iter(['BRCA2\n'])), output)
+        assert_that(json.loads(output.getvalue())['error'], equal_to("RuntimeError('no db')"))
+        assert_that(summary['errors'], is_(1))
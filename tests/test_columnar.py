@@ -0,0 +1,67 @@
+from decimal import Decimal
+from unittest import TestCase
+from hamcrest import assert_that, equal_to, is_, none, instance_of
+
+import numpy as np
+
+from medgen.db.columnar import columns_from_chunks, EncodedColumn, NULL_CODE
+from medgen.db.clinvar import ClinVarDB
+from medgen.db.registry import get_db
+
+from embedded_case import EmbeddedTestCase
+
+class ColumnsTestCase(TestCase):
+
+    def test_types_across_chunks(self):
+        chunks = [(['id', 'score', 'name', 'mixed', 'late'], [(1, Decimal('0.5'), 'a', 1, None),
+                                                               (2, None, 'b', 'x', None)]),
+                  (['id', 'score', 'name', 'mixed', 'late'], [(3, Decimal('1.5'), None, 2, 7),
+                                                               (None, 2.0, 'a', 'y', 8)])]
+        columns = columns_from_chunks(chunks)
+        assert_that(columns.rows, equal_to(4))
+        assert_that(columns['id'].dtype, equal_to(np.float64))
+        assert_that(np.isnan(columns['id'][3]), is_(True))
+        assert_that(columns['score'].tolist()[2:], equal_to([1.5, 2.0]))
+        assert_that(columns['name'], instance_of(EncodedColumn))
+        assert_that(columns['name'].codes.tolist(), equal_to([0, 1, NULL_CODE, 0]))
+        assert_that(columns['name'].decode().tolist(), equal_to(['a', 'b', None, 'a']))
+        assert_that(columns['mixed'].tolist(), equal_to([1, 'x', 2, 'y']))
+        assert_that(columns['late'].tolist()[2:], equal_to([7.0, 8.0]))
+
+    def test_encoded_column(self):
+        column = columns_from_chunks([(['c'], [('x',), ('y',), ('x',), (None,)])])['c']
+        assert_that((column == 'x').tolist(), equal_to([True, False, True, False]))
+        assert_that((column == 'missing').any(), is_(False))
+        assert_that(column.isin(['y', None]).tolist(), equal_to([False, True, False, True]))
+        assert_that(dict(column.counts()), equal_to({'x': 2, 'y': 1}))
+        assert_that(column[1], equal_to('y'))
+        assert_that(column[3], is_(none()))
+        assert_that(column[column == 'x'].codes.tolist(), equal_to([0, 0]))
+
+    def test_empty(self):
+        columns = columns_from_chunks([(['a', 'b'], [])])
+        assert_that((list(columns), columns.rows), equal_to((['a', 'b'], 0)))
+
+class FetchColumnsTestCase(EmbeddedTestCase):
+
+    def test_matches_fetchall(self):
+        db = get_db(ClinVarDB)
+        sql = 'select AlleleID, GeneID, ClinicalSignificance, NumberSubmitters from variant_summary order by AlleleID'
+        rows = db.fetchall(sql)
+        columns = db.fetchcolumns(sql, chunk_size=7)
+
+        assert_that(columns.rows, equal_to(len(rows)))
+        assert_that(columns['GeneID'].dtype, equal_to(np.int64))
+        assert_that(columns['GeneID'].tolist(), equal_to([row['GeneID'] for row in rows]))
+        assert_that(columns['ClinicalSignificance'].decode().tolist(),
+                    equal_to([row['ClinicalSignificance'] for row in rows]))
+
+        records = columns.to_records()
+        assert_that(records['ClinicalSignificance'][0], equal_to(rows[0]['ClinicalSignificance']))
+        assert_that(records['AlleleID'].tolist(), equal_to([row['AlleleID'] for row in rows]))
+
+    def test_chunks(self):
+        chunks = list(get_db(ClinVarDB).fetchchunks('select AlleleID from variant_summary', chunk_size=100))
+        assert_that([names for names, rows in chunks], equal_to([['AlleleID']] * len(chunks)))
+        assert_that(max(len(rows) for names, rows in chunks), equal_to(100))
+        assert_that(chunks[0][1][0], instance_of(tuple))
@@ -0,0 +1,78 @@
+import pickle
+import threading
+import multiprocessing
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from hamcrest import assert_that, is_, equal_to, is_not, none
+
+from medgen.db.dataset import SQLData
+from medgen.db.gene import GeneDB
+from medgen.db.registry import get_db
+
+GENES = [('BRCA2', 675), ('BRCA1', 672), ('TP53', 7157), ('CFTR', 1080), ('MLH1', 4292)]
+CONCEPT = ('C0007194', 2881)
+
+def _child_connection(db):
+    return db.conn is None
+
+def _hammer(round_number):
+    """ one worker's mix of medgen.api calls; returns the mismatches it saw. """
+    from medgen.api import GeneID, GeneName, ConceptName, Gene2ClinicalSignificance
+    errors = []
+    for name, gene_id in GENES:
+        if GeneID(name) != gene_id:
+            errors.append(('GeneID', name))
+        if GeneName(gene_id) != name:
+            errors.append(('GeneName', gene_id))
+        Gene2ClinicalSignificance(gene_id)
+    if ConceptName(CONCEPT[0])['CUI'] != CONCEPT[0]:
+        errors.append(('ConceptName', CONCEPT[0]))
+    return errors
+
+
+class ConnectionOwnershipTestCase(TestCase):
+    """ no database needed: connections are stand-in objects. """
+
+    def test_connection_per_thread(self):
+        db = SQLData(dataset='medgen')
+        db.conn = object()
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(db.conn))
+        thread.start()
+        thread.join()
+        assert_that(seen, equal_to([None]))
+        assert_that(db.conn, is_not(none()))
+
+    def test_connection_dropped_after_fork(self):
+        db = SQLData(dataset='medgen')
+        db.conn = object()
+        with multiprocessing.get_context('fork').Pool(1) as pool:
+            assert_that(pool.apply(_child_connection, (db,)), is_(True))
+
+    def test_pickle_without_connection(self):
+        db = SQLData(dataset='medgen')
+        db.conn = object()
+        clone = pickle.loads(pickle.dumps(db))
+        assert_that(clone.conn, is_(None))
+        assert_that(clone._db_name, equal_to('medgen'))
+
+
+class ApiStressTestCase(TestCase):
+    """ requires medgen-mysql. """
+    ROUNDS = 200
+
+    def setUp(self):
+        # connect in the parent first, so forked workers inherit an open connection.
+        get_db(GeneDB).get_gene_name(675)
+
+    def test_thread_pool(self):
+        with ThreadPoolExecutor(16) as pool:
+            errors = [err for result in pool.map(_hammer, range(self.ROUNDS)) for err in result]
+        assert_that(errors, equal_to([]))
+
+    def test_process_pool(self):
+        with multiprocessing.get_context('fork').Pool(8) as pool:
+            errors = [err for result in pool.map(_hammer, range(self.ROUNDS)) for err in result]
+        assert_that(errors, equal_to([]))
+        # and the parent's connection still works afterwards.
+        assert_that(get_db(GeneDB).get_gene_name(675), equal_to('BRCA2'))
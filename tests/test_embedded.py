@@ -0,0 +1,87 @@
+import threading
+from hamcrest import assert_that, equal_to, is_, greater_than, has_entries, has_item
+
+from medgen.api import GeneID, GeneInfo, Gene2PubMed, ClinvarVariationID, ConceptRelations
+from medgen.db import registry
+from medgen.db.dataset import add_query_listener, remove_query_listener
+
+from embedded_case import EmbeddedTestCase
+
+class EmbeddedDatabaseTestCase(EmbeddedTestCase):
+
+    seed = 3
+
+    def setUp(self):
+        self.events = []
+        add_query_listener(self.events.append)
+
+    def tearDown(self):
+        remove_query_listener(self.events.append)
+
+    def test_api_functions(self):
+        assert_that(GeneID('BRCA2'), is_(675))
+        assert_that(GeneInfo(675), has_entries({'GeneID': 675, 'Symbol': 'BRCA2'}))
+        assert_that(GeneInfo('NOSUCHGENE'), is_(None))
+        assert_that(ClinvarVariationID('NM_001232.3:c.919G>C'), equal_to([17610]))
+        assert_that(len(Gene2PubMed(7157)), greater_than(len(Gene2PubMed(845))))
+        assert_that(len(ConceptRelations('C0006142')), greater_than(0))
+
+    def test_query_events_name_the_db_method(self):
+        GeneInfo(675)
+        event = self.events[-1]
+        assert_that(event.template, is_('GeneDB.get_gene_info'))
+        assert_that(event.rows, is_(1))
+        assert_that(event.args, equal_to((675,)))
+        assert_that(event.seconds, greater_than(0))
+
+    def test_attached_databases(self):
+        from medgen.db.gene import GeneDB
+        rows = registry.get_db(GeneDB).fetchall('call mem')
+        assert_that([row['table_name'] for row in rows], has_item('gene_info'))
+        assert_that([row['table_name'] for row in registry.get_db(GeneDB).ping()['tables']], has_item('gene_info'))
+
+    def test_ping_before_any_query(self):
+        from medgen.db.gene import GeneDB
+        assert_that([row['table_name'] for row in GeneDB().ping()['tables']], has_item('gene_info'))
+
+        db, results = GeneDB(), []
+        thread = threading.Thread(target=lambda: results.append(db.ping()))
+        thread.start()
+        thread.join()
+        assert_that([row['table_name'] for row in results[0]['tables']], has_item('gene_info'))
+
+    def test_mixed_case_symbols(self):
+        from medgen.db.gene import GeneDB
+        db = registry.get_db(GeneDB)
+        assert_that(db.get_gene_ids_for_gene_names(['C9orf72', 'BRCA2', 'NOSUCHGENE']),
+                    equal_to({'C9orf72': 203228, 'BRCA2': 675, 'NOSUCHGENE': None}))
+        assert_that(GeneID('c9orf72'), is_(203228))
+        # the miss was not cached: it is asked for again
+        self.events[:] = []
+        assert_that(GeneID('NOSUCHGENE'), is_(None))
+        assert_that(len(self.events), is_(1))
+
+    def test_interned_types(self):
+        from medgen.parse.gene import Gene
+        from medgen.parse.concept import Concept
+        self.events[:] = []
+        assert_that(Gene('BRCA2'), equal_to(Gene('BRCA2')))
+        assert_that(len(set([Gene(675), Gene('675')])), is_(1))
+        assert_that(self.events, equal_to([]))
+
+        # the same gene or concept, whichever identifier it was made from
+        assert_that(Gene(675), equal_to(Gene('BRCA2')))
+        assert_that(len(set([Gene(675), Gene('BRCA2')])), is_(1))
+        assert_that(Gene(675) == Gene('TP53'), is_(False))
+        assert_that(Concept(2881), equal_to(Concept('C0007194')))
+        assert_that(hash(Concept(2881)), equal_to(hash(Concept('C0007194'))))
+        assert_that(Concept('C9999998') == Concept('C9999999'), is_(False))
+
+        unknown = Concept('C9999999')
+        assert_that(unknown.medgen_uid, is_(None))
+        assert_that(Concept('C9999999') is unknown, is_(False))
+
+        known = Gene('BRCA2')
+        assert_that(known.id, is_(675))
+        registry.clear_caches()
+        assert_that(Gene('BRCA2') is known, is_(False))
@@ -0,0 +1,55 @@
+import os
+import sqlite3
+from hamcrest import assert_that, equal_to, is_, has_item, has_entries
+
+from medgen.db import registry
+from medgen.db.dataset import SQLData
+from medgen.db.explain import audit, findings, SAMPLES, SKIPPED
+
+from embedded_case import EmbeddedTestCase
+
+class ExplainAuditTestCase(EmbeddedTestCase):
+
+    def test_mysql_findings(self):
+        row = {'table': 'gene_info', 'type': 'ALL', 'possible_keys': None, 'key': None, 'rows': 61000,
+               'Extra': 'Using where; Using temporary; Using filesort'}
+        assert_that(findings(row), equal_to(['full scan', 'no usable index', 'filesort', 'temporary']))
+        assert_that(findings({'type': 'ref', 'possible_keys': 'GeneID', 'key': 'GeneID', 'Extra': None}),
+                    equal_to([]))
+
+    def test_hot_templates_use_indexes(self):
+        report = audit()
+        hot = dict((entry['template'], entry) for entry in report if entry['hot'])
+        assert_that(hot, has_entries({'GeneDB.gene2pubmed': has_entries({'failed': False}),
+                                      'MedGenDB.concept_relations': has_entries({'failed': False})}))
+        assert_that([entry['template'] for entry in report if entry['failed']], equal_to([]))
+
+        # known full scan, accepted with a reason
+        synonyms = hot['GeneDB.get_gene_synonyms']
+        assert_that(synonyms['findings'], has_item('gene_info: full scan'))
+        assert_that(synonyms['accepted'] is not None)
+
+    def test_full_scan_of_hot_template_fails(self):
+        conn = sqlite3.connect(os.path.join(self.directory, 'gene.sqlite'))
+        conn.execute('drop index idx_gene2pubmed_GeneID')
+        conn.commit()
+        conn.close()
+        try:
+            entry, = audit(select='GeneDB.gene2pubmed', hot={'GeneDB.gene2pubmed'})
+            assert_that(entry['failed'], is_(True))
+            assert_that(entry['statements'][0]['plan'][0], has_entries({'table': 'gene2pubmed', 'type': 'ALL'}))
+        finally:
+            conn = sqlite3.connect(os.path.join(self.directory, 'gene.sqlite'))
+            conn.execute('create index idx_gene2pubmed_GeneID on gene2pubmed (GeneID)')
+            conn.commit()
+            conn.close()
+            # open connections keep the plans they prepared without the index
+            registry.reset()
+
+    def test_samples_cover_every_public_method(self):
+        sampled = set('%s.%s' % (db_class.__name__, method) for db_class, method, args in SAMPLES)
+        public = set('%s.%s' % (db_class.__name__, name)
+                     for db_class in SQLData.__subclasses__() if db_class.__module__.startswith('medgen.db.')
+                     for name, value in vars(db_class).items() if callable(value) and not name.startswith('_'))
+        assert_that(sorted(public - sampled - set(SKIPPED)), equal_to([]))
+        assert_that(sorted(set(SKIPPED) & sampled), equal_to([]))
@@ -0,0 +1,50 @@
+from hamcrest import assert_that, equal_to, is_, calling, raises
+
+from medgen.api import GeneInfo, GeneID, Gene2MIM, Gene2PubMed, ConceptRelations, AnnotatePanel
+from medgen.db.gene import GeneBorg
+from medgen.db.instrument import QueryCounter, QueryBudgetExceeded
+
+from embedded_case import EmbeddedTestCase
+
+class QueryCounterTestCase(EmbeddedTestCase):
+
+    def setUp(self):
+        GeneBorg.clear()
+
+    def test_budget_per_api_call(self):
+        with QueryCounter(budget=2) as queries:
+            GeneInfo('BRCA2')
+        assert_that(queries.by_template(), equal_to(
+            {'GeneDB.get_gene_id_for_gene_name': 1, 'GeneDB.get_gene_info': 1}))
+
+        # symbol lookups and gene2pubmed are cached
+        with QueryCounter(budget=0):
+            GeneID('BRCA2')
+        with QueryCounter(budget=1):
+            Gene2PubMed(7157)
+            Gene2PubMed(7157)
+        with QueryCounter(budget=1):
+            ConceptRelations('C0006142')
+
+    def test_budget_exceeded(self):
+        def over_budget():
+            with QueryCounter(budget=1, label='GeneInfo(BRCA2)'):
+                GeneInfo('BRCA2')
+        assert_that(calling(over_budget), raises(QueryBudgetExceeded, 'GeneInfo\\(BRCA2\\) ran 2 queries'))
+
+    def test_duplicates_are_logged(self):
+        with self.assertLogs('medgen', 'WARNING') as logs:
+            with QueryCounter() as queries:
+                Gene2MIM(675)
+                Gene2MIM(675)
+                Gene2MIM(672)
+        assert_that(list(queries.duplicates().values()), equal_to([2]))
+        assert_that(len(logs.records), is_(1))
+        assert_that(logs.records[0].getMessage(), equal_to(
+            'block: same query run 2 times by GeneDB.gene2mim: select * from mim2gene_medgen where GeneID = %s (675,)'))
+
+    def test_threads(self):
+        with QueryCounter() as own, QueryCounter(all_threads=True) as every:
+            list(AnnotatePanel(['BRCA2']))
+        assert_that(own.count, is_(0))
+        assert_that(every.count >= 7)
@@ -0,0 +1,77 @@
+import random
+from unittest import TestCase
+from hamcrest import assert_that, equal_to, greater_than, less_than
+
+import numpy as np
+
+from medgen.intervals import IntervalIndex, read_bed, normalize_chromosome, get_clinvar_intervals
+
+from embedded_case import EmbeddedTestCase
+
+class IntervalIndexTestCase(TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        starts = [rng.randint(1, 10000) for _ in range(500)]
+        stops = [start + (rng.randint(0, 2000) if rng.random() < 0.05 else rng.randint(0, 10)) for start in starts]
+        index = IntervalIndex(starts, stops)
+        queries = [(start, start + rng.randint(0, 300)) for start in (rng.randint(1, 12000) for _ in range(200))]
+
+        expected = [(q, i) for q, (start, stop) in enumerate(queries)
+                    for i in range(len(starts)) if starts[i] <= stop and stops[i] >= start]
+        regions, ids = index.overlapping_many([q[0] for q in queries], [q[1] for q in queries])
+        assert_that(sorted(zip(regions.tolist(), ids.tolist())), equal_to(sorted(expected)))
+        assert_that(sorted(index.overlapping(*queries[0]).tolist()), equal_to([i for q, i in expected if q == 0]))
+
+    def test_long_intervals(self):
+        # SNVs along a chromosome, and CNVs spanning most of it which would make max_end useless.
+        rng = random.Random(1)
+        starts = [rng.randint(1, 10000000) for _ in range(2000)]
+        stops = list(starts)
+        starts += [5, 2000000, 4000000]
+        stops += [9000000, 2500000, 9999999]
+        index = IntervalIndex(starts, stops)
+        short, long = index.groups
+        assert_that(len(long[0]), equal_to(3))
+        assert_that(int((short[2] - short[1]).max()), less_than(1000))
+
+        queries = [(start, start + rng.randint(0, 50000)) for start in (rng.randint(1, 10000000) for _ in range(300))]
+        expected = [(q, i) for q, (start, stop) in enumerate(queries)
+                    for i in sorted(range(len(starts)), key=lambda i: starts[i])
+                    if starts[i] <= stop and stops[i] >= start]
+        regions, ids = index.overlapping_many([q[0] for q in queries], [q[1] for q in queries])
+        assert_that(list(zip(regions.tolist(), ids.tolist())), equal_to(expected))
+        assert_that(index.overlapping(1, 10).tolist(), equal_to([2000]))
+
+    def test_empty(self):
+        regions, ids = IntervalIndex([], []).overlapping_many([1], [5])
+        assert_that((len(regions), len(ids)), equal_to((0, 0)))
+
+    def test_read_bed(self):
+        regions = read_bed(['track name=panel\n', 'chr13\t100\t200\tBRCA2\n', '# comment\n', 'chrM\t0\t10\n'])
+        assert_that(regions.chromosomes, equal_to(['13', 'MT']))
+        assert_that((regions.starts.tolist(), regions.stops.tolist()), equal_to(([101, 1], [200, 10])))
+        assert_that(regions.names, equal_to(['BRCA2', None]))
+        assert_that(normalize_chromosome('chrX'), equal_to('X'))
+
+class ClinVarIntervalsTestCase(EmbeddedTestCase):
+
+    def test_regions(self):
+        intervals = get_clinvar_intervals()
+        table = intervals.table
+        brca2 = table.rows(genes=[675])
+        chromosome = brca2[0]['Chromosome']
+        start, stop = min(row['Start'] for row in brca2), max(row['Stop'] for row in brca2)
+
+        rows = intervals.overlapping('chr' + chromosome, start, stop)
+        assert_that(sorted(row['AlleleID'] for row in table.take(rows)),
+                    equal_to(sorted(row['AlleleID'] for row in table.rows(chromosome=chromosome, start=start,
+                                                                           stop=stop))))
+        assert_that(len(rows), greater_than(0))
+
+        regions = read_bed(['chr%s\t%d\t%d\n' % (chromosome, start - 1, stop), 'chrUn\t0\t10\n',
+                            '%s\t%d\t%d\n' % (chromosome, start - 1, start)])
+        region, found = intervals.overlapping_regions(regions)
+        assert_that(sorted(found[region == 0].tolist()), equal_to(sorted(rows.tolist())))
+        assert_that(np.count_nonzero(region == 1), equal_to(0))
+        assert_that(np.count_nonzero(region == 2), greater_than(0))
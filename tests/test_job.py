@@ -0,0 +1,75 @@
+import io
+import json
+import shutil
+import tempfile
+from unittest import TestCase
+from hamcrest import assert_that, equal_to, is_, calling, raises
+
+from medgen.job import AnnotationJob, merge_parts, stable_shard
+
+ITEMS = ['NM_%06d.1:c.%dA>G' % (n, n) for n in range(500)]
+
+class Crash(BaseException):
+    """ stands in for the process dying (not an annotation error). """
+
+def annotate(item):
+    return item.upper()
+
+class CrashAt(object):
+
+    def __init__(self, item):
+        self.item = item
+
+    def __call__(self, item):
+        if item == self.item:
+            raise Crash(item)
+        return annotate(item)
+
+
+class AnnotationJobTestCase(TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def merged(self):
+        output = io.StringIO()
+        merge_parts(self.workdir, output)
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_stable_shard(self):
+        assert_that(stable_shard('BRCA2', 10), equal_to(stable_shard('BRCA2', 10)))
+        assert_that(set(stable_shard(item, 4) for item in ITEMS), equal_to({0, 1, 2, 3}))
+
+    def test_shards_merge_in_input_order(self):
+        for shard in range(3):
+            AnnotationJob(annotate, self.workdir, shard=shard, num_shards=3, workers=4,
+                          checkpoint_every=10, part_size=60).run(ITEMS)
+
+        records = self.merged()
+        assert_that([record['offset'] for record in records], equal_to(list(range(len(ITEMS)))))
+        assert_that(records[7]['result'], equal_to(ITEMS[7].upper()))
+
+    def test_resume_after_crash_writes_each_item_once(self):
+        crashing = AnnotationJob(CrashAt(ITEMS[321]), self.workdir, workers=4, checkpoint_every=25, part_size=100)
+        assert_that(calling(crashing.run).with_args(ITEMS), raises(Crash))
+
+        resumed = AnnotationJob(annotate, self.workdir, workers=4, checkpoint_every=25, part_size=100)
+        assert_that(resumed.state['offset'] < 321)
+        state = resumed.run(ITEMS)
+
+        assert_that(state['finished'], is_(True))
+        assert_that(state['done'], is_(len(ITEMS)))
+        assert_that([record['offset'] for record in self.merged()], equal_to(list(range(len(ITEMS)))))
+
+    def test_errors_are_recorded_after_retries(self):
+        calls = []
+        def flaky(item):
+            calls.append(item)
+            raise RuntimeError('MySQL server has gone away')
+        state = AnnotationJob(flaky, self.workdir, retries=2, backoff=0).run(ITEMS[:3])
+        assert_that(state['errors'], is_(3))
+        assert_that(len(calls), is_(9))
+        assert_that(self.merged()[0]['error'], equal_to("RuntimeError('MySQL server has gone away')"))
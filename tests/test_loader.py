@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from hamcrest import assert_that, equal_to, is_, calling, raises, instance_of
+
+from medgen.db.loader import BatchLoader
+
+class CountingBatch(object):
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, keys):
+        with self.lock:
+            self.calls.append(list(keys))
+        if self.delay:
+            threading.Event().wait(self.delay)
+        return dict((key, key * 2) for key in keys if key != 'missing')
+
+
+class BatchLoaderTestCase(TestCase):
+
+    def test_concurrent_keys_share_one_batch(self):
+        batch = CountingBatch()
+        loader = BatchLoader(batch, window=0.05)
+        keys = [1, 2, 3, 2, 1, 4]
+        with ThreadPoolExecutor(len(keys)) as pool:
+            results = list(pool.map(loader.load, keys))
+
+        assert_that(results, equal_to([2, 4, 6, 4, 2, 8]))
+        assert_that(len(batch.calls), is_(1))
+        assert_that(sorted(batch.calls[0]), equal_to([1, 2, 3, 4]))
+
+    def test_identical_key_shares_inflight_fetch(self):
+        batch = CountingBatch(delay=0.05)
+        loader = BatchLoader(batch, window=0.001)
+        first = loader.submit(7)
+        threading.Event().wait(0.01)   # first batch is now being fetched
+        second = loader.submit(7)
+        assert_that(second is first)
+        assert_that(first.result(), is_(14))
+        assert_that(len(batch.calls), is_(1))
+
+    def test_max_batch_size(self):
+        batch = CountingBatch()
+        loader = BatchLoader(batch, window=10, max_batch_size=3)
+        assert_that(loader.load_many([1, 2, 3]), equal_to([2, 4, 6]))
+        assert_that(batch.calls, equal_to([[1, 2, 3]]))
+
+    def test_missing_key_is_none(self):
+        loader = BatchLoader(CountingBatch())
+        assert_that(loader.load('missing'), is_(None))
+
+    def test_errors_reach_every_caller(self):
+        def broken(keys):
+            raise RuntimeError('db went away')
+        loader = BatchLoader(broken, window=0.01)
+        futures = [loader.submit(key) for key in range(3)]
+        for future in futures:
+            assert_that(calling(future.result), raises(RuntimeError))
+
+    def test_coroutines(self):
+        batch = CountingBatch()
+        loader = BatchLoader(batch, window=0.02)
+
+        async def lookups():
+            return await asyncio.gather(*[loader.aload(key) for key in range(10)])
+
+        assert_that(asyncio.run(lookups()), equal_to([key * 2 for key in range(10)]))
+        assert_that(len(batch.calls), is_(1))
+
+    def test_bad_key_fails_alone(self):
+        def poisoned(keys):
+            if 'bad' in keys:
+                raise ValueError('bad key')
+            return dict((key, key * 2) for key in keys)
+        loader = BatchLoader(poisoned, window=0.02)
+
+        async def lookups():
+            return await asyncio.gather(*[loader.aload(key) for key in [1, 'bad', 2, 3]],
+                                        return_exceptions=True)
+
+        results = asyncio.run(lookups())
+        assert_that([results[0], results[2], results[3]], equal_to([2, 4, 6]))
+        assert_that(results[1], instance_of(ValueError))
+        # the failed batch, then one batch per key
+        assert_that(loader.batches, is_(5))
+        assert_that(loader.keys, is_(8))
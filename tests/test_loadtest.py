@@ -0,0 +1,56 @@
+import os
+import json
+import time
+from hamcrest import assert_that, equal_to, is_, greater_than, has_entries, contains_inanyorder
+
+from medgen import api, loadtest
+
+from embedded_case import EmbeddedTestCase
+
+class LoadTestTestCase(EmbeddedTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        loadtest.stop_capture()
+        super(LoadTestTestCase, cls).tearDownClass()
+
+    def test_capture(self):
+        path = os.path.join(self.directory, 'capture.jsonl')
+        loadtest.start_capture(path)
+        try:
+            expected = api.GeneInfo('BRCA2')
+            api.ConceptRelations('C0006142')
+        finally:
+            loadtest.stop_capture()
+        assert_that(api.GeneInfo('BRCA2'), equal_to(expected))
+        assert_that(hasattr(api.GeneInfo, 'captured_function'), is_(False))
+
+        with open(path) as fh:
+            calls = loadtest.read_calls(fh)
+        assert_that([(call['function'], call['args']) for call in calls],
+                    equal_to([('GeneInfo', ['BRCA2']), ('ConceptRelations', ['C0006142'])]))
+
+    def test_replay(self):
+        now = time.time()
+        calls = [{'t': now + i * 0.001, 'function': 'GeneID', 'args': ['TP53'], 'kwargs': {}} for i in range(10)]
+        calls.append({'t': now, 'function': 'Fails', 'args': [], 'kwargs': {}})
+        calls.append({'t': now, 'function': 'GeneID', 'args': [{'$repr': '<object>'}], 'kwargs': {}})
+
+        def fails():
+            raise ValueError('no')
+
+        replay = loadtest.LoadReplay(sorted(calls, key=lambda call: call['t']), speed=0, concurrency=2,
+                                     interval=60, functions={'GeneID': api.GeneID, 'Fails': fails})
+        report = replay.run()
+        assert_that(report, has_entries({'calls': 11, 'skipped': 1, 'errors': 1,
+                                         'error_types': {'ValueError': 1}}))
+        assert_that(report['latency']['count'], equal_to(11))
+        assert_that(list(report['functions']), contains_inanyorder('GeneID', 'Fails'))
+        assert_that(report['functions']['GeneID']['errors'], equal_to(0))
+        assert_that(len(report['windows']), equal_to(1))
+        window = report['windows'][0]
+        assert_that(window['calls'], equal_to(11))
+        assert_that(window['busy'], greater_than(0))
+        assert_that(window['saturation'] <= 1.0, is_(True))
+        assert_that(loadtest.format_report(report), is_(str))
+        json.dumps(report)
@@ -0,0 +1,43 @@
+import time
+from unittest import TestCase
+from hamcrest import assert_that, is_, less_than_or_equal_to, greater_than, close_to
+
+from medgen.log import ParallelLogContainer
+
+def check(item):
+    if item % 10 == 0:
+        raise ValueError(item)
+    time.sleep(0.001)
+    return item
+
+class ParallelLogContainerTestCase(TestCase):
+
+    def test_threads(self):
+        stats = ParallelLogContainer(check, range(1000), workers=8, max_failures=5)
+        summary = stats.summary()
+
+        assert_that(stats.passed, is_(900))
+        assert_that(stats.failed, is_(100))
+        assert_that(len(stats.failures), is_(5))
+        assert_that(summary['items_per_sec'], greater_than(0))
+        assert_that(summary['p50'], close_to(0.001, 0.001))
+        assert_that(summary['p50'], less_than_or_equal_to(summary['p99']))
+
+    def test_processes(self):
+        stats = ParallelLogContainer(check, range(200), workers=2, processes=True)
+        assert_that(stats.passed, is_(180))
+        assert_that(stats.failures[0][1], is_('ValueError(0)'))
+
+    def test_bounded_queue(self):
+        completed = []
+        outstanding = []
+        def items():
+            for n in range(100):
+                outstanding.append(n - len(completed))
+                yield n
+        def slow(item):
+            time.sleep(0.002)
+            completed.append(item)
+        stats = ParallelLogContainer(slow, items(), workers=2, queue_size=4)
+        assert_that(stats.passed, is_(100))
+        assert_that(max(outstanding), less_than_or_equal_to(4))
@@ -0,0 +1,47 @@
+import os
+from hamcrest import assert_that, equal_to, is_, none, contains_string, instance_of
+
+from medgen import magics
+from medgen.api import GeneInfo
+from medgen.db import registry
+from medgen.db.gene import GeneBorg
+from medgen.db.instrument import QueryCounter
+
+from embedded_case import EmbeddedTestCase
+
+class MagicsTestCase(EmbeddedTestCase):
+
+    def setUp(self):
+        GeneBorg.clear()
+        registry.clear_caches()
+
+    def test_profile(self):
+        profile = magics.run("Gene2ConditionSource('BRCA2')")
+        assert_that(profile.error, is_(none()))
+        assert_that(profile.result, instance_of(list))
+        assert_that([event.template for event in profile.queries],
+                    equal_to(['GeneDB.get_gene_id_for_gene_name', 'ClinVarDB.gene2condition']))
+        assert_that(profile.cache, equal_to({('gene', 'miss'): 1, ('gene2id', 'miss'): 1}))
+
+        text = magics.format_profile(profile)
+        assert_that(text, contains_string('2 queries'))
+        assert_that(text, contains_string('cache: gene 0 hit / 1 miss, gene2id 0 hit / 1 miss'))
+        assert_that(text, contains_string('memory: '))
+        assert_that(magics.format_queries(profile), contains_string('gene_condition_source_id'))
+
+    def test_error(self):
+        profile = magics.run('missing_name', {})
+        assert_that(profile.error, instance_of(NameError))
+        assert_that(magics.format_queries(profile), contains_string('error: NameError'))
+
+    def test_warm(self):
+        path = os.path.join(self.directory, 'warm.txt')
+        with open(path, 'w') as fh:
+            fh.write('# panel\nBRCA2, TP53\n672  C0006142\n')
+        genes, cuis = magics.read_warm_file(path)
+        assert_that((genes, cuis), equal_to((['BRCA2', 'TP53', '672'], ['C0006142'])))
+        assert_that(magics.warm(genes, cuis), equal_to((3, 1)))
+
+        with QueryCounter() as queries:
+            GeneInfo('BRCA2')
+        assert_that(queries.by_template(), equal_to({'GeneDB.get_gene_info': 1}))
@@ -0,0 +1,100 @@
+import gc
+import threading
+import urllib.request
+from unittest import TestCase
+from hamcrest import assert_that, equal_to, is_, contains_string, greater_than, calling, raises
+
+from medgen import metrics
+from medgen.api import Gene2PubMed, GeneInfo
+from medgen.db.gene import GeneBorg
+
+from embedded_case import EmbeddedTestCase
+
+def sample(registry, name, *labels):
+    metric = registry.get(name)
+    return metric.labels(*labels).value
+
+class MetricsTestCase(TestCase):
+
+    def test_exposition(self):
+        reg = metrics.Registry()
+        queries = reg.counter('test_queries_total', 'Queries', ('section',))
+        seconds = reg.histogram('test_seconds', 'Seconds', buckets=(0.1, 1.0))
+        queries.labels('gene').inc()
+        queries.labels('gene').inc(2)
+        queries.labels('say "hi"').inc()
+        seconds.observe(0.05)
+        seconds.observe(0.5)
+        seconds.observe(5)
+
+        text = metrics.exposition(reg)
+        assert_that(text, contains_string('# TYPE test_queries_total counter\n'))
+        assert_that(text, contains_string('test_queries_total{section="gene"} 3\n'))
+        assert_that(text, contains_string('test_queries_total{section="say \\"hi\\""} 1\n'))
+        assert_that(text, contains_string('test_seconds_bucket{le="0.1"} 1\n'
+                                          'test_seconds_bucket{le="1"} 2\n'
+                                          'test_seconds_bucket{le="+Inf"} 3\n'
+                                          'test_seconds_sum 5.55\n'
+                                          'test_seconds_count 3\n'))
+
+    def test_registry(self):
+        reg = metrics.Registry()
+        gauge = reg.gauge('test_open', 'Open', ('section',))
+        assert_that(reg.gauge('test_open', 'Open', ('section',)), is_(gauge))
+        assert_that(calling(reg.counter).with_args('test_open', 'Open', ('section',)), raises(ValueError))
+        assert_that(calling(gauge.labels).with_args('gene', 'clinvar'), raises(ValueError))
+        gauge.labels('gene').inc()
+        gauge.labels('gene').dec()
+        gauge.labels('gene').inc()
+        assert_that(sample(reg, 'test_open', 'gene'), equal_to(1))
+        reg.clear()
+        assert_that(metrics.exposition(reg), equal_to('# HELP test_open Open\n# TYPE test_open gauge\n'))
+
+class LibraryMetricsTestCase(EmbeddedTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        metrics.disable()
+        super(LibraryMetricsTestCase, cls).tearDownClass()
+
+    def test_queries_connections_and_cache(self):
+        GeneBorg.clear()
+        gc.collect()    # connections of earlier tests are uncounted now, not after the clear
+        metrics.REGISTRY.clear()
+        metrics.enable()
+        Gene2PubMed(7157)
+        Gene2PubMed(7157)
+
+        reg = metrics.REGISTRY
+        assert_that(sample(reg, 'medgen_queries_total', 'gene', 'GeneDB.gene2pubmed'), equal_to(1))
+        assert_that(reg.get('medgen_query_rows_total').labels('gene', 'GeneDB.gene2pubmed').value, greater_than(0))
+        assert_that(sample(reg, 'medgen_connections_opened_total', 'gene'), equal_to(1))
+        assert_that(sample(reg, 'medgen_connections_open', 'gene'), equal_to(1))
+        assert_that(sample(reg, 'medgen_cache_requests_total', 'gene2pubmed', 'miss'), equal_to(1))
+        assert_that(sample(reg, 'medgen_cache_requests_total', 'gene2pubmed', 'hit'), equal_to(1))
+
+        server = metrics.serve(0, '127.0.0.1')
+        try:
+            url = 'http://127.0.0.1:%d/metrics' % server.server_address[1]
+            with urllib.request.urlopen(url) as response:
+                assert_that(response.headers['Content-Type'], equal_to(metrics.CONTENT_TYPE))
+                body = response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert_that(body, contains_string(
+            'medgen_query_seconds_count{section="gene",template="GeneDB.gene2pubmed"} 1\n'))
+
+    def test_connections_of_ended_threads(self):
+        metrics.enable()
+        gc.collect()
+        opened = sample(metrics.REGISTRY, 'medgen_connections_opened_total', 'gene')
+        open_before = sample(metrics.REGISTRY, 'medgen_connections_open', 'gene')
+        # a thread which ends without close() takes its connection with it
+        worker = threading.Thread(target=GeneInfo, args=(672,))
+        worker.start()
+        worker.join()
+        del worker
+        gc.collect()
+        assert_that(sample(metrics.REGISTRY, 'medgen_connections_opened_total', 'gene'), equal_to(opened + 1))
+        assert_that(sample(metrics.REGISTRY, 'medgen_connections_open', 'gene'), equal_to(open_before))
@@ -0,0 +1,69 @@
+import time
+import threading
+from collections import OrderedDict
+from unittest import TestCase
+from hamcrest import assert_that, equal_to, is_, has_key, less_than_or_equal_to, contains_exactly
+
+from medgen.annotate.panel import annotate_panel, StageTimings
+
+class SlowStage(object):
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, gene):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if gene == 'BROKEN':
+            raise ValueError(gene)
+        return 'annotated %s' % gene
+
+
+class PanelTestCase(TestCase):
+
+    def setUp(self):
+        self.info = SlowStage(0.01)
+        self.pubmed = SlowStage(0.01)
+        self.stages = OrderedDict([('GeneInfo', (self.info, None)), ('Gene2PubMed', (self.pubmed, None))])
+
+    def test_one_record_per_gene(self):
+        genes = ['BRCA%d' % n for n in range(20)]
+        timings = StageTimings()
+        records = list(annotate_panel(genes, stages=self.stages, max_workers=8, timings=timings))
+
+        assert_that(sorted(record['Gene'] for record in records), equal_to(sorted(genes)))
+        assert_that(list(records[0].keys()), contains_exactly('Gene', 'GeneInfo', 'Gene2PubMed', 'errors', 'timing'))
+        assert_that(records[0]['GeneInfo'], equal_to('annotated %s' % records[0]['Gene']))
+        assert_that(timings.summary()['Gene2PubMed']['calls'], is_(20))
+
+    def test_bounded_per_host(self):
+        shared = SlowStage(0.01)
+        stages = OrderedDict([('GeneInfo', (shared, None)), ('Gene2PubMed', (shared, None))])
+        list(annotate_panel(range(30), stages=stages, max_workers=16, max_per_host=3))
+        assert_that(shared.max_active, less_than_or_equal_to(3))
+
+    def test_stage_errors_are_recorded(self):
+        records = list(annotate_panel(['BROKEN'], stages=self.stages))
+        assert_that(records[0]['errors'], has_key('GeneInfo'))
+        assert_that(records[0]['GeneInfo'], is_(None))
+
+    def test_none_gene_is_annotated(self):
+        records = list(annotate_panel([None, 'BRCA1'], stages=self.stages))
+        assert_that(sorted(str(record['Gene']) for record in records), equal_to(['BRCA1', 'None']))
+
+    def test_panels_share_threads(self):
+        threads = set()
+        def stage(gene):
+            threads.add(threading.get_ident())
+            time.sleep(0.001)
+        stages = OrderedDict([('GeneInfo', (stage, None)), ('Gene2PubMed', (stage, None))])
+        for panel in range(3):
+            list(annotate_panel(range(20), stages=stages, max_workers=4))
+        assert_that(len(threads), less_than_or_equal_to(4))
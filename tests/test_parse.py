@@ -3,6 +3,7 @@ from hamcrest import equal_to, assert_that, is_, greater_than, is_in, has_entrie
 
 from medgen.parse.gene    import Gene
 from medgen.parse.concept import Concept
+from medgen.db import registry
 
 class ParseTestCase(unittest.TestCase):
 
@@ -19,5 +20,20 @@ class ParseTestCase(unittest.TestCase):
         #assert_that(Concept('C0007194').medgen_uid, equal_to(Concept(2881).medgen_uid))
         #self.assertEqual(Concept('C0007194').medgen_uid, Concept(2881).medgen_uid)
 
+    def test_interned(self):
+        assert_that(Gene(675) is Gene('675'))
+        assert_that(Gene(Gene('BRCA2')) is Gene('BRCA2'))
+        assert_that(Concept(2881) is Concept('2881'))
+        assert_that(hasattr(Gene(675), '__dict__'), is_(False))
+        assert_that(hasattr(Concept(2881), '__dict__'), is_(False))
+
+    def test_known_identifier_needs_no_query(self):
+        registry.reset()
+        assert_that(Gene(675).id, equal_to(675))
+        assert_that(Gene('BRCA2').name, equal_to('BRCA2'))
+        assert_that(Concept('C0007194').umls_cui, equal_to('C0007194'))
+        assert_that(Concept(2881).medgen_uid, equal_to(2881))
+        assert_that(len(registry._instances), is_(0))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,68 @@
+import os
+import time
+import shutil
+import datetime
+from decimal import Decimal
+from hamcrest import assert_that, equal_to, is_, greater_than_or_equal_to, calling, raises
+
+from medgen.api import GeneInfo, GeneSynonyms, Gene2PubMed, ConceptRelations
+from medgen.db import registry, replay
+from medgen.db.gene import GeneDB, GeneBorg
+from medgen.db.dataset import set_connection_factory
+
+from embedded_case import EmbeddedTestCase
+
+def workload():
+    return [GeneInfo('BRCA2'), GeneSynonyms('BRCA2'), Gene2PubMed(7157), ConceptRelations('C0006142')]
+
+class ReplayTestCase(EmbeddedTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(ReplayTestCase, cls).setUpClass()
+        cls.path = os.path.join(cls.directory, 'workload.json.gz')
+        with replay.Recorder(cls.path) as recorder:
+            cls.expected = workload()
+        cls.recording = recorder.recording
+
+    def setUp(self):
+        # nothing left connected to the embedded databases
+        set_connection_factory(None)
+        registry.reset()
+        GeneBorg.clear()
+
+    def test_replay_without_database(self):
+        shutil.move(os.path.join(self.directory, 'gene.sqlite'), os.path.join(self.directory, 'gone'))
+        try:
+            recording = replay.use(self.path)
+            assert_that(workload(), equal_to(self.expected))
+            assert_that(recording.misses, is_(0))
+            assert_that(recording.hits, is_(len(self.recording)))
+        finally:
+            shutil.move(os.path.join(self.directory, 'gone'), os.path.join(self.directory, 'gene.sqlite'))
+
+    def test_miss(self):
+        replay.use(self.path)
+        assert_that(calling(GeneInfo).with_args(672), raises(replay.ReplayMiss, 'gene_info'))
+
+    def test_injected_latency(self):
+        replay.use(self.path, latency=0.01)
+        start = time.perf_counter()
+        GeneInfo(675)
+        assert_that(time.perf_counter() - start, greater_than_or_equal_to(0.01))
+
+    def test_mysql_escaping(self):
+        recording = replay.Recording()
+        recording.add('gene', 'select * from gene_info where Symbol = %s', ["O\\'BRIEN"], ['GeneID'], [[1]])
+        replay.use(recording)
+        assert_that(registry.get_db(GeneDB).fetchall('select * from gene_info where Symbol = %s', "O'BRIEN"),
+                    equal_to([{'GeneID': 1}]))
+
+    def test_values_round_trip(self):
+        recording = replay.Recording()
+        value = [datetime.datetime(2019, 10, 4, 12, 30), datetime.date(2019, 10, 4), Decimal('1.50'), b'\x00\xff']
+        recording.add('clinvar', 'select * from log', None, ['a', 'b', 'c', 'd'], [value])
+        path = os.path.join(self.directory, 'values.json.gz')
+        recording.save(path)
+        loaded = replay.Recording.load(path)
+        assert_that(loaded.lookup('clinvar', 'select * from log', ())['rows'], equal_to([value]))
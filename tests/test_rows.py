@@ -0,0 +1,65 @@
+import json
+import pickle
+from unittest import TestCase
+from hamcrest import assert_that, equal_to, is_, none, instance_of, same_instance, calling, raises
+
+from medgen.db.rows import Record, record_class, make_rows, json_default
+from medgen.db.clinvar import ClinVarDB
+from medgen.db.gene import GeneDB
+from medgen.db.medgen import MedGenDB
+from medgen.db.registry import get_db
+
+from embedded_case import EmbeddedTestCase
+
+class RecordTestCase(TestCase):
+
+    def test_dict_interface(self):
+        record = make_rows(['GeneID', 'Symbol'], [(672, 'BRCA1')], 'record')[0]
+        assert_that(record, instance_of(Record))
+        assert_that((record.GeneID, record['Symbol'], record.get('missing')), equal_to((672, 'BRCA1', None)))
+        assert_that('Symbol' in record, is_(True))
+        assert_that(list(record.items()), equal_to([('GeneID', 672), ('Symbol', 'BRCA1')]))
+        assert_that(record, equal_to({'GeneID': 672, 'Symbol': 'BRCA1'}))
+        assert_that(dict(record), equal_to({'GeneID': 672, 'Symbol': 'BRCA1'}))
+        assert_that(calling(record.__getitem__).with_args('missing'), raises(KeyError))
+        assert_that(hasattr(record, '__dict__'), is_(False))
+
+    def test_one_class_per_columns(self):
+        assert_that(record_class(['a', 'b']), same_instance(record_class(('a', 'b'))))
+        assert_that(record_class(['count(*)']), is_(none()))
+        assert_that(make_rows(['count(*)'], [(3,)], 'record')[0], equal_to({'count(*)': 3}))
+
+    def test_pickle_and_json(self):
+        record = make_rows(['pubmeds', 'GeneRIF'], [('123', 'binds DNA')], 'record')[0]
+        assert_that(pickle.loads(pickle.dumps(record)), equal_to(record))
+        assert_that(json.loads(json.dumps([record], default=json_default)),
+                    equal_to([{'pubmeds': '123', 'GeneRIF': 'binds DNA'}]))
+
+    def test_other_factories(self):
+        assert_that(make_rows(['a', 'b'], [(1, 2)], 'namedtuple')[0].b, equal_to(2))
+        assert_that(make_rows(['a', 'b'], iter([(1, 2)]), 'tuple')[0], equal_to((1, 2)))
+        assert_that(calling(make_rows).with_args(['a'], [], 'rows'), raises(ValueError))
+
+class FetchRowsTestCase(EmbeddedTestCase):
+
+    def test_fetchall_and_fetchiter(self):
+        db = get_db(ClinVarDB)
+        sql = 'select AlleleID, GeneID, ClinicalSignificance from variant_summary order by AlleleID'
+        rows = db.fetchall(sql)
+        assert_that(db.fetchall(sql, row_factory='record'), equal_to(rows))
+        assert_that(list(db.fetchiter(sql, row_factory='record', chunk_size=7)), equal_to(rows))
+        assert_that(list(db.fetchiter(sql)), equal_to(rows))
+        assert_that(db.fetchall(sql, row_factory='tuple')[0],
+                    equal_to((rows[0]['AlleleID'], rows[0]['GeneID'], rows[0]['ClinicalSignificance'])))
+
+    def test_methods_return_dicts_unless_asked(self):
+        for method, arg in ((get_db(GeneDB).gene_function, 7157),
+                            (get_db(MedGenDB).concept_relations, 'C0006142'),
+                            (get_db(ClinVarDB).var_citations, 'NM_000410.3:c.845G>A')):
+            rows = method(arg)
+            assert_that(len(rows) > 0, is_(True))
+            assert_that(rows[0], instance_of(dict))
+            json.dumps(rows)
+            records = method(arg, row_factory='record')
+            assert_that(records[0], instance_of(Record))
+            assert_that(records, equal_to(rows))
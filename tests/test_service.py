@@ -0,0 +1,148 @@
+import json
+import asyncio
+from unittest import TestCase, mock
+from hamcrest import assert_that, equal_to, is_, greater_than, has_entries, has_key
+
+from medgen.db import registry
+from medgen.service.app import AnnotationService, configure_pools
+from medgen.service.cache import ResultCache
+from medgen.service.loadtest import LoadTest
+from medgen.service import standin
+from medgen.service.standin import StandinPool
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class ResultCacheTestCase(TestCase):
+
+    def test_lru_and_ttl(self):
+        clock = FakeClock()
+        cache = ResultCache(maxsize=2, ttl=10, clock=clock)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        assert_that(cache.get('b'), is_(None))
+        assert_that(cache.get('a'), is_(1))
+
+        clock.now = 11
+        assert_that(cache.get('a'), is_(None))
+        assert_that(len(cache), is_(1))
+
+    def test_concurrent_misses_share_one_load(self):
+        cache = ResultCache()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'BRCA2'
+
+        async def burst():
+            return await asyncio.gather(*[cache.get_or_load('675', load) for _ in range(20)])
+
+        assert_that(asyncio.run(burst()), equal_to(['BRCA2'] * 20))
+        assert_that(len(calls), is_(1))
+        assert_that(cache.stats(), has_entries({'misses': 20, 'shared': 19}))
+
+    def test_cancelled_caller_does_not_fail_the_others(self):
+        cache = ResultCache()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            return 'BRCA2'
+
+        async def two_callers():
+            first = asyncio.ensure_future(cache.get_or_load('675', load))
+            second = asyncio.ensure_future(cache.get_or_load('675', load))
+            await asyncio.sleep(0)
+            first.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert_that(asyncio.run(two_callers()), equal_to('BRCA2'))
+        assert_that(cache.get('675'), equal_to('BRCA2'))
+        assert_that(cache.stats(), has_entries({'misses': 2, 'shared': 1}))
+
+    def test_failures_are_not_cached(self):
+        cache = ResultCache()
+
+        async def fail():
+            raise RuntimeError('no db')
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(cache.get_or_load('675', fail))
+        assert_that(len(cache), is_(0))
+
+
+class AnnotationServiceTestCase(TestCase):
+
+    def setUp(self):
+        self.pool = StandinPool(latency=0.001)
+        configure_pools(pool=self.pool)
+        self.service = AnnotationService()
+
+    def tearDown(self):
+        registry.reset()
+
+    def test_get(self):
+        status, payload = asyncio.run(self.service.handle('GET', '/gene/BRCA2'))
+        assert_that(status, is_(200))
+        assert_that(payload['result']['GeneInfo'], has_entries({'GeneID': 675}))
+
+        status, payload = asyncio.run(self.service.handle('GET', '/variant/NM_000059.3%3Ac.68-7T%3EA'))
+        assert_that(payload['query'], equal_to('NM_000059.3:c.68-7T>A'))
+        assert_that(payload['result']['VariationID'], equal_to([17610]))
+
+    def test_batch_keeps_order_and_dedupes(self):
+        queries = ['C0677776', '12345', 'C0677776']
+        status, payload = asyncio.run(self.service.handle('POST', '/concept', json.dumps(queries).encode()))
+        assert_that(status, is_(200))
+        assert_that([row['query'] for row in payload['results']], equal_to(queries))
+        assert_that(payload['results'][0], has_key('result'))
+        assert_that(self.service.cache.stats()['misses'], is_(2))
+
+    @mock.patch.object(standin, 'ROWS', [('from gene_info where Symbol', [])] + standin.ROWS)
+    def test_unknown_gene(self):
+        status, payload = asyncio.run(self.service.handle('GET', '/gene/NOSUCHGENE'))
+        assert_that(status, is_(404))
+        status, payload = asyncio.run(self.service.handle('POST', '/gene', b'["NOSUCHGENE"]'))
+        assert_that(payload['results'], equal_to([{'query': 'NOSUCHGENE', 'result': None}]))
+
+    def test_errors(self):
+        assert_that(asyncio.run(self.service.handle('GET', '/protein/P51587'))[0], is_(404))
+        assert_that(asyncio.run(self.service.handle('POST', '/gene', b'BRCA2'))[0], is_(400))
+        assert_that(asyncio.run(self.service.handle('DELETE', '/gene/BRCA2'))[0], is_(405))
+        self.service.max_batch = 2
+        assert_that(asyncio.run(self.service.handle('POST', '/gene', b'["1", "2", "3"]'))[0], is_(413))
+
+    def test_health_and_metrics(self):
+        status, payload = asyncio.run(self.service.handle('GET', '/health'))
+        assert_that(status, is_(200))
+        assert_that(payload, equal_to({'gene': True, 'clinvar': True, 'medgen': True, 'hugo': True}))
+
+        status, payload = asyncio.run(self.service.handle('GET', '/metrics'))
+        assert_that(payload['requests']['health']['count'], is_(1))
+        assert_that(payload['pools']['gene'], has_entries({'maxsize': 10}))
+
+    def test_http_under_concurrent_load(self):
+        async def load():
+            server = await self.service.serve('127.0.0.1', 0)
+            host, port = server.sockets[0].getsockname()[:2]
+            try:
+                return await LoadTest(host, port, connections=20, duration=0.5, distinct=20).run()
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        report = asyncio.run(load())
+        assert_that(report['requests'], greater_than(20))
+        assert_that(report['errors'], equal_to({}))
+        assert_that(list(report['statuses']), equal_to([200]))
+        assert_that(self.service.cache.stats()['hits'], greater_than(0))
@@ -0,0 +1,54 @@
+import os
+from hamcrest import assert_that, equal_to, is_, greater_than
+
+from medgen.db import registry
+from medgen.db.clinvar import ClinVarDB
+from medgen.db.instrument import QueryCounter
+from medgen.db.registry import get_db
+from medgen.db.significance_matrix import get_significance_matrix, clear_significance_matrix, matrix_path
+
+from embedded_case import EmbeddedTestCase
+
+class SignificanceMatrixTestCase(EmbeddedTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(SignificanceMatrixTestCase, cls).setUpClass()
+        cls.cache = os.path.join(cls.directory, 'cache')
+        cls.matrix = get_significance_matrix(cls.cache)
+
+    def test_gene_matches_db(self):
+        db = get_db(ClinVarDB)
+        for gene in (675, 'TP53'):
+            assert_that(self.matrix.frequency(gene),
+                        equal_to(db.gene_to_clinical_significance_type_frequency(gene)))
+        assert_that(self.matrix.summary('BRCA2'), equal_to(db.gene_summary(675)))
+        assert_that((self.matrix.gene('NOTAGENE'), self.matrix.summary(999999999)), equal_to(({}, None)))
+
+    def test_reset_drops_the_matrix(self):
+        matrix = get_significance_matrix(self.cache)
+        registry.reset()
+        assert_that(get_significance_matrix(self.cache) is matrix, is_(False))
+
+    def test_rollups(self):
+        panel = self.matrix.panel(['BRCA2', 675, 7157])
+        brca2, tp53 = self.matrix.gene(675), self.matrix.gene(7157)
+        assert_that(panel, equal_to(dict((key, brca2.get(key, 0) + tp53.get(key, 0)) for key in set(brca2) | set(tp53))))
+
+        total = get_db(ClinVarDB).fetchrow('select count(*) as n from variant_summary')['n']
+        assert_that(sum(self.matrix.genome().values()), equal_to(total))
+        assert_that(int(self.matrix.dense().sum()), equal_to(total))
+        dense = self.matrix.dense([675, 'NOTAGENE'])
+        assert_that((int(dense[0].sum()), int(dense[1].sum())), equal_to((sum(brca2.values()), 0)))
+
+    def test_saved_per_version(self):
+        path = matrix_path(get_db(ClinVarDB).get_version(), self.cache)
+        assert_that(os.path.exists(path), is_(True))
+        clear_significance_matrix()
+        with QueryCounter() as queries:
+            matrix = get_significance_matrix(self.cache)
+            matrix.gene('BRCA2')
+        assert_that(queries.by_template(), equal_to({'ClinVarDB.get_version': 1}))
+        assert_that(matrix.gene('BRCA2'), equal_to(self.matrix.gene('BRCA2')))
+        assert_that(matrix.symbols, equal_to(self.matrix.symbols))
+        assert_that(len(matrix), greater_than(0))
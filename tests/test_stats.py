@@ -0,0 +1,38 @@
+import pickle
+import random
+from unittest import TestCase
+from hamcrest import assert_that, close_to, is_, none, equal_to
+
+from medgen.stats import StreamingHistogram
+
+class StreamingHistogramTestCase(TestCase):
+
+    def test_percentiles_within_precision(self):
+        values = [random.expovariate(100.0) for _ in range(20000)]
+        hist = StreamingHistogram()
+        for value in values:
+            hist.add(value)
+        values.sort()
+        for pct in (50, 95, 99):
+            exact = values[int(len(values) * pct / 100.0) - 1]
+            assert_that(hist.percentile(pct), close_to(exact, exact * 0.02))
+        assert_that(hist.count, is_(20000))
+        assert_that(hist.max, equal_to(values[-1]))
+
+    def test_memory_is_bounded(self):
+        hist = StreamingHistogram()
+        for n in range(100000):
+            hist.add(0.001 + (n % 1000) * 1e-6)
+        assert_that(len(hist.buckets) < 100)
+
+    def test_merge_and_pickle(self):
+        one, two = StreamingHistogram(), StreamingHistogram()
+        for n in range(1, 101):
+            (one if n % 2 else two).add(n / 1000.0)
+        merged = pickle.loads(pickle.dumps(one)).merge(two)
+        assert_that(merged.count, is_(100))
+        assert_that(merged.percentile(50), close_to(0.050, 0.001))
+        assert_that(merged.min, equal_to(0.001))
+
+    def test_empty(self):
+        assert_that(StreamingHistogram().percentile(99), none())
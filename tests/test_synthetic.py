@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+from collections import Counter, defaultdict
+from unittest import TestCase
+from hamcrest import assert_that, equal_to, is_, greater_than, has_item, is_in, contains_string
+
+from medgen.synthetic import SyntheticDataset, TABLES, ddl
+
+SCALE = 0.05
+
+class SyntheticDatasetTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tables = defaultdict(list)
+        for section, table, row in SyntheticDataset(scale=SCALE, seed=7).rows():
+            cls.tables[table].append(dict(zip(TABLES[section][table][0], row)))
+
+    def column(self, table, name):
+        return [row[name] for row in self.tables[table]]
+
+    def test_deterministic(self):
+        first = list(SyntheticDataset(scale=SCALE, seed=7).rows())
+        assert_that(sum(len(rows) for rows in self.tables.values()), is_(len(first)))
+        assert_that(first, equal_to(list(SyntheticDataset(scale=SCALE, seed=7).rows())))
+        assert_that(first != list(SyntheticDataset(scale=SCALE, seed=8).rows()))
+
+    def test_referential_consistency(self):
+        genes = set(self.column('gene_info', 'GeneID'))
+        assert_that(set(self.column('gene2pubmed', 'GeneID')) <= genes)
+        assert_that(set(self.column('variant_summary', 'GeneID')) <= genes)
+        assert_that(set(self.column('gene_condition_source_id', 'GeneID')) <= genes)
+
+        pmids = set(str(pmid) for pmid in self.column('medline_xml', 'PMID'))
+        assert_that(set(self.column('gene2pubmed', 'PMID')) <= pmids)
+
+        cuis = set(self.column('NAMES', 'CUI'))
+        assert_that(set(self.column('view_medgen_uid', 'ConceptID')), equal_to(cuis))
+        assert_that(set(self.column('MGREL', 'CUI1')) | set(self.column('MGREL', 'CUI2')) <= cuis)
+        assert_that(set(self.column('view_disease_subtype', 'DiseaseID')) <= cuis)
+
+        variations = set(self.column('clinvar_hgvs', 'VariationID'))
+        assert_that(set(self.column('var_citations', 'VariationID')) <= variations)
+        assert_that(set(self.column('variant_summary', 'HGVS_c')) <= set(self.column('clinvar_hgvs', 'HGVS')))
+
+    def test_hub_genes_are_skewed(self):
+        pmids_per_gene = Counter(self.column('gene2pubmed', 'GeneID'))
+        counts = sorted(pmids_per_gene.values())
+        assert_that(pmids_per_gene.most_common(1)[0][0], is_(7157))
+        assert_that(counts[-1], greater_than(50 * counts[len(counts) // 2]))
+
+    def test_fixtures_used_by_tests(self):
+        rows = [row for row in self.tables['clinvar_hgvs'] if row['HGVS'] == 'NM_001232.3:c.919G>C']
+        assert_that([row['VariationID'] for row in rows], equal_to([17610]))
+        assert_that((675, 'BRCA2'), is_in([(row['GeneID'], row['Symbol']) for row in self.tables['gene_info']]))
+        hfe = [row['citation_id'] for row in self.tables['var_citations'] if row['VariationID'] == 9]
+        assert_that(len(hfe), greater_than(35))
+        assert_that(hfe, has_item('NBK1440'))
+
+    def test_scale(self):
+        small = SyntheticDataset(scale=1).counts
+        large = SyntheticDataset(scale=10).counts
+        assert_that(large['variants'], is_(10 * small['variants']))
+
+    def test_write(self):
+        directory = tempfile.mkdtemp()
+        try:
+            counts = SyntheticDataset(scale=0.01, seed=7).write(directory)
+            with open(os.path.join(directory, 'clinvar', 'variant_summary.tsv')) as tsv:
+                lines = tsv.read().splitlines()
+            assert_that(len(lines), is_(counts['clinvar', 'variant_summary'] + 1))
+            assert_that(lines[0].split('\t'), equal_to(list(TABLES['clinvar']['variant_summary'][0])))
+
+            with open(os.path.join(directory, 'load.sql')) as sql:
+                script = sql.read()
+            for section, tables in TABLES.items():
+                for table in tables:
+                    assert_that(script, contains_string('create table %s (' % table))
+                    assert_that(script, contains_string('%s.tsv' % os.path.join(directory, section, table)))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_ddl_creates_mem_procedure(self):
+        assert_that(ddl('gene')[-1], contains_string('create procedure mem()'))
@@ -0,0 +1,51 @@
+import json
+from hamcrest import assert_that, equal_to, is_, none, has_entries, contains_string
+
+from medgen import trace
+from medgen.api import Gene2ConditionSource, AnnotatePanel
+from medgen.annotate.panel import STAGES
+from medgen.db import registry
+from medgen.db.gene import GeneBorg
+
+from embedded_case import EmbeddedTestCase
+
+class TraceTestCase(EmbeddedTestCase):
+
+    def setUp(self):
+        GeneBorg.clear()
+        registry.clear_caches()
+
+    def test_spans(self):
+        with trace.Tracer() as tracer:
+            Gene2ConditionSource('BRCA2')
+        assert_that(trace._tracer, is_(none()))
+
+        children = tracer.children()
+        [root] = tracer.roots()
+        assert_that((root.name, root.category, root.args), equal_to(('Gene2ConditionSource', 'api',
+                                                                      {'args': ["'BRCA2'"]})))
+        assert_that([(span.name, span.category) for span in children[root.id]],
+                    equal_to([('Gene.id', 'resolve'), ('ClinVarDB.gene2condition', 'sql')]))
+        resolve, query = children[root.id]
+        assert_that([span.name for span in children[resolve.id]], equal_to(['GeneDB.get_gene_id_for_gene_name']))
+        assert_that(query.args, has_entries({'section': 'clinvar'}))
+        assert_that(query.args['sql'], contains_string('gene_condition_source_id'))
+        assert_that(tracer.self_seconds(root) <= root.seconds - query.seconds, is_(True))
+        assert_that(tracer.format_tree(), contains_string('  ClinVarDB.gene2condition'))
+
+        chrome = json.loads(json.dumps(tracer.to_chrome()))
+        assert_that(len(chrome['traceEvents']), equal_to(4))
+        assert_that(chrome['traceEvents'][0], has_entries({'name': 'Gene2ConditionSource', 'ph': 'X', 'cat': 'api'}))
+
+    def test_untraced(self):
+        assert_that(trace.span('nothing'), is_(trace._NULL_SPAN))
+        assert_that(trace.bind(len), is_(len))
+
+    def test_panel_threads(self):
+        stages = dict((name, STAGES[name]) for name in ('GeneInfo', 'Gene2MIM'))
+        with trace.Tracer() as tracer:
+            with trace.span('panel', 'test'):
+                list(AnnotatePanel(['BRCA2', 'TP53'], stages=stages, max_workers=2))
+        [root] = tracer.roots()
+        names = sorted(span.name for span in tracer.children()[root.id])
+        assert_that(names, equal_to(['Gene2MIM', 'Gene2MIM', 'GeneInfo', 'GeneInfo']))
@@ -0,0 +1,74 @@
+from hamcrest import assert_that, equal_to, greater_than, calling, raises
+
+from medgen.db import registry
+from medgen.db.clinvar import ClinVarDB
+from medgen.db.registry import get_db
+from medgen.db.variant_table import VariantTable, get_variant_table
+
+from embedded_case import EmbeddedTestCase
+
+class VariantTableTestCase(EmbeddedTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(VariantTableTestCase, cls).setUpClass()
+        cls.table = get_variant_table()
+
+    def test_matches_sql(self):
+        db = get_db(ClinVarDB)
+        assert_that(len(self.table), equal_to(db.fetchrow('select count(*) as n from variant_summary '
+                                                          'where Assembly = %s', 'GRCh38')['n']))
+
+        sql_count = db.fetchrow('select count(*) as n from variant_summary V, molecular_consequences M '
+                                'where M.HGVS = V.HGVS_c and V.Assembly = %s and V.GeneID in (675, 7157) '
+                                'and V.NumberSubmitters >= 2 and M.Consequence = %s '
+                                'and V.ClinicalSignificance in (%s, %s)',
+                                'GRCh38', 'missense variant', 'Pathogenic', 'Likely pathogenic')['n']
+        count = self.table.count(genes=['BRCA2', 7157], consequence='missense variant', min_submitters=2,
+                                 significance=['Pathogenic', 'Likely pathogenic'])
+        assert_that(count, equal_to(sql_count))
+        assert_that(self.table.count(genes=['675']), greater_than(0))
+        assert_that(self.table.count(significance=lambda value: 'pathogenic' in value.lower()),
+                    equal_to(db.fetchrow('select count(*) as n from variant_summary '
+                                         'where Assembly = %s and lower(ClinicalSignificance) like %s',
+                                         'GRCh38', '%pathogenic%')['n']))
+
+    def test_one_row_per_variant(self):
+        allele_ids = self.table['AlleleID']
+        assert_that(len(set(allele_ids.tolist())), equal_to(len(self.table)))
+        assert_that(self.table.categories('Assembly'), equal_to(['GRCh38']))
+
+        every = VariantTable.load(assembly=None)
+        assert_that(len(every), equal_to(2 * len(self.table)))
+        assert_that(every.count(assembly='GRCh37', genes=[675]), equal_to(self.table.count(genes=[675])))
+        assert_that(get_variant_table('GRCh37').count(genes=[675]), equal_to(self.table.count(genes=[675])))
+
+    def test_reset_loads_again(self):
+        from medgen.intervals import get_clinvar_intervals
+        table, intervals = get_variant_table(), get_clinvar_intervals()
+        registry.reset()
+        assert_that(get_variant_table() is table, equal_to(False))
+        assert_that(get_clinvar_intervals() is intervals, equal_to(False))
+
+        table = get_variant_table()
+        registry.set_db(ClinVarDB, ClinVarDB())
+        assert_that(get_variant_table() is table, equal_to(False))
+        assert_that(len(get_variant_table()), equal_to(len(table)))
+
+    def test_count_by(self):
+        counts = self.table.count_by('ClinicalSignificance', genes=[675])
+        expected = get_db(ClinVarDB).fetchall('select ClinicalSignificance, count(*) as n from variant_summary '
+                                              'where GeneID = %s and Assembly = %s group by ClinicalSignificance',
+                                              675, 'GRCh38')
+        assert_that(dict(counts), equal_to(dict((row['ClinicalSignificance'], row['n']) for row in expected)))
+        by_gene = self.table.count_by('GeneID')
+        assert_that(list(by_gene.values()), equal_to(sorted(by_gene.values(), reverse=True)))
+        assert_that(sum(by_gene.values()), equal_to(len(self.table)))
+
+    def test_rows_and_region(self):
+        row = self.table.rows(genes=[675])[0]
+        region = self.table.rows(chromosome=row['Chromosome'], start=row['Start'], stop=row['Stop'])
+        assert_that(row in region, equal_to(True))
+        assert_that(type(row['GeneID']), equal_to(int))
+        assert_that(len(self.table.where(genes=[675])), equal_to(self.table.count(genes=[675])))
+        assert_that(calling(self.table.count).with_args(gene=[675]), raises(TypeError))
@@ -0,0 +1,71 @@
+import io
+from hamcrest import assert_that, equal_to, contains_string, starts_with, has_item
+
+from medgen.db.clinvar import ClinVarDB
+from medgen.db.registry import get_db
+from medgen.vcf import ClinVarVcfIndex, annotate_vcf, info_value
+
+from embedded_case import EmbeddedTestCase
+
+HEADER = '##fileformat=VCFv4.2\n#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n'
+
+def _info(line):
+    fields = dict(field.split('=', 1) for field in line.rstrip('\n').split('\t')[7].split(';') if '=' in field)
+    return fields
+
+class VcfTestCase(EmbeddedTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(VcfTestCase, cls).setUpClass()
+        cls.index = ClinVarVcfIndex.build()
+        cls.variant = cls.index.intervals.table.rows(genes=[675])[0]
+        cls.variation_id = get_db(ClinVarDB).fetchrow('select VariationID from clinvar_hgvs where AlleleID = %s',
+                                                      cls.variant['AlleleID'])['VariationID']
+        alleles = get_db(ClinVarDB).fetchrow('select ReferenceAlleleVCF, AlternateAlleleVCF from variant_summary '
+                                             'where AlleleID = %s and Assembly = %s', cls.variant['AlleleID'], 'GRCh38')
+        cls.ref, cls.alt = alleles['ReferenceAlleleVCF'], alleles['AlternateAlleleVCF']
+        cls.other = [base for base in 'ACGT' if base not in (cls.ref, cls.alt)][0]
+
+    def _vcf(self):
+        chromosome, start, rs = self.variant['Chromosome'], self.variant['Start'], self.variant['rs']
+        ref, alt, other = self.ref, self.alt, self.other
+        return HEADER + ''.join([
+            'chr%s\t%d\t.\t%s\t%s,%s\t.\tPASS\tDP=10\n' % (chromosome, start, ref, other, alt),  # position
+            '%s\t1\trs%d\t%s\t%s\t.\tPASS\t.\n' % (chromosome, rs, ref, alt),                  # rs number
+            '%s\t1\trs%d\t%s\t%s\t.\tPASS\t.\n' % (chromosome, rs, ref, other),                # rs, other allele
+            '%s\t%d\t.\t%s\t%s\t.\tPASS\t.\n' % (chromosome, start, ref, other),               # other allele
+            '%s\t%d\t.\t%sC\t%s\t.\tPASS\t.\n' % (chromosome, start - 1, ref, ref),             # deletion
+            '%s\t%d\t.\tA\tG\t.\tPASS\t.\n' % (chromosome, start - 1),                          # nothing
+            'chrUn\t5\t.\tA\tG\t.\tPASS\t.\n'])
+
+    def test_annotate(self):
+        output = io.StringIO()
+        summary = annotate_vcf(io.StringIO(self._vcf()), output, self.index, workers=1)
+        assert_that((summary['records'], summary['matched']), equal_to((7, 3)))
+
+        lines = output.getvalue().splitlines(True)
+        assert_that(lines[1], starts_with('##INFO=<ID=CLINVAR_VID'))
+        records = [line for line in lines if not line.startswith('#')]
+        assert_that(records[0], contains_string('DP=10;CLINVAR_VID='))
+        for record in records[:2]:
+            info = _info(record)
+            assert_that(info['CLINVAR_VID'].split(',')[0], equal_to(str(self.variation_id)))
+            assert_that(info['CLINVAR_SIG'].split(',')[0], equal_to(info_value(self.variant['ClinicalSignificance'])))
+            assert_that('CLINVAR_RS_VID' in info, equal_to(False))
+        # the rs number names the site, not this allele
+        info = _info(records[2])
+        assert_that('CLINVAR_VID' in info, equal_to(False))
+        assert_that(info['CLINVAR_RS_VID'].split(','), has_item(str(self.variation_id)))
+        assert_that(records[3:], equal_to(self._vcf().splitlines(True)[5:]))
+
+    def test_workers_keep_order(self):
+        vcf = HEADER + ''.join(self._vcf().splitlines(True)[2:]) * 20
+        serial, parallel = io.StringIO(), io.StringIO()
+        annotate_vcf(io.StringIO(vcf), serial, self.index, workers=1, chunk_size=3)
+        summary = annotate_vcf(io.StringIO(vcf), parallel, self.index, workers=2, chunk_size=3)
+        assert_that(parallel.getvalue(), equal_to(serial.getvalue()))
+        assert_that(summary['records'], equal_to(140))
+
+    def test_info_value(self):
+        assert_that(info_value('Benign; other, 5%'), equal_to('Benign%3B_other%2C_5%25'))